@@ -0,0 +1,77 @@
+# agent_profile.py
+# Look inside the running agent without restarting it (core/profiling.py).
+#
+#   python agent_profile.py cpu 30                  cProfile agent requests and events for 30s, then show it
+#   python agent_profile.py cpu 30 --sample         sample every thread's stack instead (.folded)
+#   python agent_profile.py mem start|snapshot|stop tracemalloc; snapshot/stop write the top growth
+#   python agent_profile.py status
+#   python agent_profile.py show [PATH]             view a dump (default: the latest)
+import argparse
+import os
+import sys
+import time
+
+from core.agent import DEFAULT_RUNTIME_DIR, connect
+from core.ipc import IpcError
+from core.profiling import latest_dump, render_dump
+
+
+def _client():
+    client = connect()
+    if client is None:
+        print("The agent is not running.")
+        sys.exit(1)
+    return client
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Profile the running USB Guard agent.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    cpu = sub.add_parser("cpu", help="capture a CPU profile for N seconds")
+    cpu.add_argument("seconds", type=float, nargs="?", default=10.0)
+    cpu.add_argument("--sample", action="store_true", help="stack sampling of all threads instead of cProfile")
+    cpu.add_argument("--no-wait", action="store_true", help="return at once; view it later with 'show'")
+    mem = sub.add_parser("mem", help="tracemalloc control")
+    mem.add_argument("action", choices=("start", "snapshot", "stop"))
+    mem.add_argument("--frames", type=int, default=5, help="traceback depth to record (start only)")
+    sub.add_parser("stop", help="end a running CPU capture early")
+    sub.add_parser("status")
+    show = sub.add_parser("show", help="view a dump")
+    show.add_argument("path", nargs="?")
+    show.add_argument("--dir", default=os.path.join(DEFAULT_RUNTIME_DIR, "profiles"))
+    show.add_argument("--limit", type=int, default=30)
+    show.add_argument("--sort", default="cumulative", help="pstats sort key (cumulative, tottime, calls, ...)")
+    args = ap.parse_args()
+
+    if args.cmd == "show":
+        path = args.path or latest_dump(args.dir)
+        if path is None:
+            print(f"No dumps in {args.dir}.")
+            sys.exit(1)
+        print(render_dump(path, args.limit, args.sort))
+        sys.exit(0)
+
+    client = _client()
+    try:
+        if args.cmd == "cpu":
+            started = client.profile("cpu", seconds=args.seconds, mode="sample" if args.sample else "cprofile")
+            print(f"Profiling for {args.seconds:g}s -> {started['path']}")
+            if not args.no_wait:
+                time.sleep(max(0.0, started["until"] - time.time()))
+                while client.profile("status")["cpu"] is not None:
+                    time.sleep(0.2)
+                print(render_dump(started["path"]))
+        elif args.cmd == "mem":
+            if args.action == "start":
+                result = client.profile("mem_start", frames=args.frames)
+                print(f"tracemalloc on ({result['frames']} frames); run 'mem snapshot' later to see what grew.")
+            else:
+                result = client.profile("mem_" + args.action)
+                print(render_dump(result["path"]))
+        else:
+            print(client.profile(args.cmd))
+    except IpcError as e:
+        print(f"Failed: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
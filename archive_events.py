@@ -0,0 +1,108 @@
+# archive_events.py
+# Write the events table to a columnar archive file and report from archives. Needs NumPy.
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from core.archive import Archive, write_archive
+from core.db import DEFAULT_DB_PATH
+from export_events import _parse_time
+
+EPILOG = """
+Examples:
+  python archive_events.py write events-2024.uga --since 2024-01-01 --until 2024-12-31
+  python archive_events.py info events-2024.uga
+  python archive_events.py report events-2024.uga --since 2024-06-01 --top 10
+"""
+
+
+def _fmt(ts) -> str:
+    return "-" if ts is None else datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def cmd_write(args) -> int:
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+
+    def progress(rows):
+        print(f"\r{rows} rows", end="", file=sys.stderr, flush=True)
+
+    t0 = time.perf_counter()
+    try:
+        stats = write_archive(conn, args.out, args.since, args.until, block_rows=args.block_rows,
+                              progress=None if args.quiet else progress)
+    except KeyboardInterrupt:
+        print("\nArchive cancelled.", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    if not args.quiet:
+        print(f"\nArchived {stats['rows']} events in {stats['blocks']} blocks to {args.out} "
+              f"({stats['bytes'] / 2**20:.1f} MiB) in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return 0
+
+
+def cmd_info(args) -> int:
+    with Archive(args.archive) as archive:
+        lo, hi = archive.time_range()
+        print(f"{args.archive}: {archive.rows} events in {len(archive.index)} blocks, {_fmt(lo)} .. {_fmt(hi)}")
+        for column in ("action", "decision", "model", "pnp_id", "vid", "pid", "serial", "note"):
+            print(f"  {column:<9} {len(archive.dictionary(column)) - 1} distinct values")
+    return 0
+
+
+def cmd_report(args) -> int:
+    with Archive(args.archive) as archive:
+        t0 = time.perf_counter()
+        data = archive.scan(("action", "decision", "serial"), args.since, args.until)
+        inserts = data["action"] == archive.code("action", "insert")
+        decisions = archive.dictionary("decision")
+        counts = np.bincount(data["decision"][inserts], minlength=len(decisions))
+        blocked = inserts & (data["decision"] == archive.code("decision", "blocked"))
+        serials = np.bincount(data["serial"][blocked], minlength=len(archive.dictionary("serial")))
+        top = np.argsort(-serials, kind="stable")[:args.top]
+        elapsed = time.perf_counter() - t0
+        print(f"{int(inserts.sum())} inserts of {len(inserts)} events ({_fmt(args.since)} .. {_fmt(args.until)}), "
+              f"scanned in {elapsed * 1000:.0f} ms")
+        for code in np.flatnonzero(counts):
+            print(f"  {decisions[code] or '-':<10} {counts[code]}")
+        if serials.any():
+            print("Most blocked serials:")
+            for code in top[serials[top] > 0]:
+                print(f"  {serials[code]:>7}  {archive.dictionary('serial')[code] or '-'}")
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Columnar archive of USB events.", epilog=EPILOG,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("write", help="archive events from the database")
+    w.add_argument("out")
+    w.add_argument("--db", default=DEFAULT_DB_PATH)
+    w.add_argument("--block-rows", type=int, default=65536)
+    w.add_argument("--quiet", action="store_true")
+    i = sub.add_parser("info", help="summary of an archive")
+    i.add_argument("archive")
+    r = sub.add_parser("report", help="insert decisions and most blocked serials")
+    r.add_argument("archive")
+    r.add_argument("--top", type=int, default=10)
+    for p in (w, r):
+        p.add_argument("--since", type=_parse_time)
+        p.add_argument("--until", type=_parse_time)
+    args = ap.parse_args(argv)
+    try:
+        return {"write": cmd_write, "info": cmd_info, "report": cmd_report}[args.cmd](args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except sqlite3.Error as e:
+        print(f"Error: {args.db}: {e}", file=sys.stderr)  # only "write" opens the database
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
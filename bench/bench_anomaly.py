@@ -0,0 +1,127 @@
+# bench/bench_anomaly.py
+# Replay benchmark for core/anomaly.py: accuracy on a labelled synthetic stream
+# (ordinary office traffic, including flaky-cable reconnects, with injected
+# reconnect bursts and cloned serials), throughput, and the memory ceiling with
+# far more distinct devices than the detector keeps.
+#
+#   python -m bench.bench_anomaly [events]        (default 500000)
+#   python -m bench.bench_anomaly --db data/usb_guard.db   replay logged history instead (no labels)
+
+import argparse
+import random
+import sqlite3
+import time
+import tracemalloc
+
+from core.anomaly import AnomalyDetector
+
+
+def _evt(ts, vid, pid, serial, label=None):
+    return {"action": "insert", "timestamp": ts, "vid": vid, "pid": pid, "serial": serial,
+            "pnp_id": f"USB\\VID_{vid}&PID_{pid}\\{serial}", "label": label}
+
+
+def synthetic(events: int, seed: int = 1, attack_rate: float = 0.001):
+    """Yield labelled inserts in time order; label is None, "rapid_reconnect" or "identity_mismatch"."""
+    rnd = random.Random(seed)
+    devices = [("%04X" % rnd.randrange(0x10000), "%04X" % rnd.randrange(0x10000), "%016X" % rnd.getrandbits(64))
+               for _ in range(max(100, events // 5))]
+    seen = []
+    ts = 1700000000.0
+    n = 0
+    while n < events:
+        ts += rnd.expovariate(1 / 3.0)  # an insert every ~3 s across the fleet
+        vid, pid, serial = rnd.choice(devices)
+        r = rnd.random()
+        if r < attack_rate:
+            # injection device: re-enumerates 8 times, ~0.3 s apart
+            bad_serial = "BADUSB%08d" % n
+            for _ in range(8):
+                ts += 0.3
+                yield _evt(ts, "1337", "0001", bad_serial, "rapid_reconnect")
+                n += 1
+        elif r < 2 * attack_rate and seen:
+            # clone: the serial of a device already seen, under someone else's VID/PID
+            vid, pid, serial = rnd.choice(seen)
+            yield _evt(ts, "%04X" % ((int(vid, 16) + 1) % 0x10000), pid, serial, "identity_mismatch")
+            n += 1
+        elif r < 0.02:
+            # flaky cable: two or three quick reconnects, not an attack
+            for _ in range(rnd.randint(2, 3)):
+                ts += rnd.uniform(1, 4)
+                yield _evt(ts, vid, pid, serial)
+                n += 1
+        else:
+            yield _evt(ts, vid, pid, serial)
+            n += 1
+        if r >= 2 * attack_rate and len(seen) < 10000:
+            seen.append((vid, pid, serial))
+
+
+def accuracy(events: int):
+    stream = list(synthetic(events))
+    det = AnomalyDetector()
+    attacks = {"rapid_reconnect": set(), "identity_mismatch": set()}
+    caught = {"rapid_reconnect": set(), "identity_mismatch": set()}
+    false_pos = 0
+    t0 = time.perf_counter()
+    for i, evt in enumerate(stream):
+        findings = det.observe(evt)
+        label = evt["label"]
+        # a burst is one attack (its pnp_id); a clone event is one attack
+        attack = evt["pnp_id"] if label == "rapid_reconnect" else i
+        if label:
+            attacks[label].add(attack)
+        for f in findings:
+            if f["kind"] == label:
+                caught[label].add(attack)
+            else:
+                false_pos += 1
+    elapsed = time.perf_counter() - t0
+    print(f"{len(stream):,} inserts replayed: {len(stream) / elapsed:,.0f} events/s "
+          f"({elapsed * 1e6 / len(stream):.2f} us/event)")
+    for kind in attacks:
+        total = len(attacks[kind])
+        print(f"  {kind:<18} {len(caught[kind]):>5} of {total:>5} caught"
+              f" ({len(caught[kind]) / total:.1%})" if total else f"  {kind}: none injected")
+    print(f"  false positives    {false_pos} ({false_pos / len(stream):.4%} of events)")
+
+
+def memory_ceiling(events: int):
+    det = AnomalyDetector(max_devices=10000, max_serials=100000)
+    tracemalloc.start()
+    rnd = random.Random(3)
+    for i in range(events):  # every insert a new device: worst case for the LRU maps
+        det.observe(_evt(1700000000.0 + i, "%04X" % rnd.randrange(0x10000), "0001", "%016X" % rnd.getrandbits(64)))
+        if i == events // 2:
+            half = tracemalloc.get_traced_memory()[0]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    snap = det.snapshot()
+    print(f"{events:,} distinct devices: tracking {snap['devices']:,} devices and {snap['serials']:,} serials; "
+          f"{half / 2**20:.1f} MiB at half-way, {current / 2**20:.1f} MiB at the end (peak {peak / 2**20:.1f})")
+
+
+def replay_db(path: str):
+    conn = sqlite3.connect(path)
+    det = AnomalyDetector()
+    n = 0
+    t0 = time.perf_counter()
+    for ts, vid, pid, serial, pnp_id in conn.execute(
+            "SELECT ts, vid, pid, serial, pnp_id FROM events WHERE action = 'insert' ORDER BY id"):
+        det.observe({"action": "insert", "timestamp": ts, "vid": vid, "pid": pid, "serial": serial, "pnp_id": pnp_id})
+        n += 1
+    elapsed = time.perf_counter() - t0
+    print(f"{n:,} logged inserts: {n / max(elapsed, 1e-9):,.0f} events/s; findings: {det.snapshot()}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Anomaly detector accuracy, throughput and memory.")
+    ap.add_argument("events", type=int, nargs="?", default=500000)
+    ap.add_argument("--db", help="replay the events table of this database instead")
+    args = ap.parse_args()
+    if args.db:
+        replay_db(args.db)
+    else:
+        accuracy(args.events)
+        memory_ceiling(args.events)
@@ -0,0 +1,87 @@
+# bench/bench_archive.py
+# Columnar archive (core/archive.py) versus the SQLite events table: on-disk size,
+# and the time of three report queries over the full history and over its last 30 days.
+#
+#   python -m bench.bench_archive DB          (e.g. a file from python -m bench.gen_db)
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from bench.common import best_ms
+from core.archive import Archive, write_archive
+
+
+def sqlite_bytes(conn) -> tuple:
+    """(events table, events table + its indexes) in bytes, from the dbstat virtual table."""
+    sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+    table = sizes.get("events", 0)
+    indexes = sum(v for k, v in sizes.items() if k.startswith("idx_events_"))
+    return table, table + indexes
+
+
+def sqlite_queries(conn, since):
+    where = "action = 'insert'" + (" AND ts >= ?" if since else "")
+    params = (since,) if since else ()
+    return {
+        "decisions": lambda: conn.execute(f"SELECT decision, COUNT(*) FROM events WHERE {where} "
+                                          "GROUP BY decision", params).fetchall(),
+        "blocked/day": lambda: conn.execute(f"SELECT ts / 86400, COUNT(*) FROM events WHERE {where} "
+                                            "AND decision = 'blocked' GROUP BY 1", params).fetchall(),
+        "top serials": lambda: conn.execute(f"SELECT serial, COUNT(*) AS n FROM events WHERE {where} "
+                                            "AND decision = 'blocked' GROUP BY serial ORDER BY n DESC LIMIT 10",
+                                            params).fetchall(),
+    }
+
+
+def archive_queries(archive, since):
+    insert, blocked = archive.code("action", "insert"), archive.code("decision", "blocked")
+
+    def decisions():
+        d = archive.scan(("action", "decision"), since)
+        return np.bincount(d["decision"][d["action"] == insert])
+
+    def blocked_per_day():
+        d = archive.scan(("ts", "action", "decision"), since)
+        days = d["ts"][(d["action"] == insert) & (d["decision"] == blocked)] // 86400
+        return np.unique(days, return_counts=True)
+
+    def top_serials():
+        d = archive.scan(("action", "decision", "serial"), since)
+        counts = np.bincount(d["serial"][(d["action"] == insert) & (d["decision"] == blocked)])
+        return np.argsort(-counts)[:10]
+
+    return {"decisions": decisions, "blocked/day": blocked_per_day, "top serials": top_serials}
+
+
+def main(path: str, repeat: int):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "events.uga")
+        t0 = time.perf_counter()
+        stats = write_archive(conn, out)
+        print(f"archived {stats['rows']:,} events in {time.perf_counter() - t0:.1f}s")
+        table, with_indexes = sqlite_bytes(conn)
+        print(f"size: SQLite events {table / 2**20:.1f} MiB ({with_indexes / 2**20:.1f} MiB with indexes), "
+              f"archive {stats['bytes'] / 2**20:.1f} MiB ({table / stats['bytes']:.1f}x smaller than the table)")
+        with Archive(out) as archive:
+            hi = archive.time_range()[1] or 0
+            for label, since in (("full history", None), ("last 30 days", hi - 30 * 86400)):
+                print(f"{label}:")
+                sq, aq = sqlite_queries(conn, since), archive_queries(archive, since)
+                for name in sq:
+                    s, a = best_ms(sq[name], repeat), best_ms(aq[name], repeat)
+                    print(f"  {name:<12} SQLite {s:9.1f} ms | archive {a:8.1f} ms | {s / a:6.1f}x")
+    conn.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Archive size and scan speed versus the SQLite events table.")
+    ap.add_argument("db")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    main(args.db, args.repeat)
@@ -0,0 +1,64 @@
+# bench/bench_fleet.py
+# Collector ingest rate with many simulated agents shipping at once (core/shipper.py -> core/collector.py).
+# Each agent has its own events DB and spool; all ship concurrently to one local collector.
+#
+#   python -m bench.bench_fleet [agents] [events_per_agent]      (defaults 50, 2000)
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench.common import fill_events
+from core.collector import Collector, make_server
+from core.db import DB
+from core.shipper import Shipper
+
+
+def main(agents: int = 50, per_agent: int = 2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = Collector(os.path.join(tmp, "fleet.db"))
+        server = make_server(collector, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        shippers = []
+        for a in range(agents):
+            db = DB(os.path.join(tmp, f"agent{a}.db"))
+            fill_events(db, per_agent, seed=a)
+            agent_id = f"agent-{a:04d}"
+            shippers.append(Shipper(db, url, collector.enroll(agent_id), spool_dir=os.path.join(tmp, f"spool{a}"),
+                                    agent_id=agent_id))
+
+        t0 = time.perf_counter()
+        for s in shippers:
+            s.spool_new()
+        spool_s = time.perf_counter() - t0
+        spooled = sum(os.path.getsize(os.path.join(s.spool_dir, n)) for s in shippers for n in s.pending())
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=s.ship_pending) for s in shippers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        ship_s = time.perf_counter() - t0
+
+        total = agents * per_agent
+        (ingested,) = collector.conn.execute("SELECT COUNT(*) FROM fleet_events").fetchone()
+        print(f"{agents} agents x {per_agent} events = {total:,} rows")
+        print(f"spool : {spool_s:.2f}s, {spooled / 1024:,.0f} KiB gzip on disk "
+              f"({spooled / total:.1f} bytes/row)")
+        print(f"ingest: {ingested:,} rows in {ship_s:.2f}s = {ingested / ship_s:,.0f} rows/s "
+              f"({sum(s.stats['shipped_batches'] for s in shippers)} batches)")
+
+        server.shutdown()
+        server.server_close()
+        collector.close()
+        for s in shippers:
+            s.db.conn.close()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,40 @@
+# bench/bench_fts.py
+# Compare the events_fts index against LIKE '%x%' scans.
+#
+#   python -m bench.bench_fts [rows]      (default 200000)
+
+import os
+import sys
+import tempfile
+import time
+
+from bench.common import best_ms, fill_events
+from core.db import DB, FTS_COLUMNS
+
+def main(rows: int = 200_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        t0 = time.perf_counter()
+        fill_events(db, rows)
+        print(f"filled {rows} rows in {time.perf_counter() - t0:.1f}s")
+
+        needle = db.conn.execute("SELECT serial FROM events ORDER BY random() LIMIT 1").fetchone()[0][3:11]
+        where = " OR ".join(f"{c} LIKE ?" for c in FTS_COLUMNS)
+
+        def like_scan():
+            db.conn.execute(
+                f"SELECT id FROM events WHERE {where} ORDER BY id DESC LIMIT 200",
+                ["%" + needle + "%"] * len(FTS_COLUMNS),
+            ).fetchall()
+
+        def fts():
+            db.search_events(needle, limit=200)
+
+        print(f"needle={needle!r}")
+        print(f"  LIKE '%x%' scan : {best_ms(like_scan):9.2f} ms")
+        print(f"  FTS5 search     : {best_ms(fts):9.2f} ms")
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,38 @@
+# bench/bench_log.py
+# Structured logging throughput (core/log.py): what a log call costs the caller
+# (the watcher thread) and how fast the writer thread drains JSON to the rotating file.
+#
+#   python -m bench.bench_log [records]      (default 100000)
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from core import log
+
+
+def main(records: int = 100000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.log")
+        handler = log.setup_logging(path, console=False, max_queue=records)
+        logger = logging.getLogger("usb_guard.bench")
+        fields = {"event_id": 0, "action": "insert", "decision": "blocked", "vid": "0781", "pid": "5567",
+                  "serial": "S0", "stages_ms": {"decide": 0.05, "enforce": 1.2, "log": 0.3}}
+
+        t0 = time.perf_counter()
+        for i in range(records):
+            logger.info("[INSERT] Stick | VID:0781 PID:5567 S/N:S%d -> BLOCKED (x)", i, extra={"fields": fields})
+        call_s = time.perf_counter() - t0
+        log.shutdown_logging()
+        total_s = time.perf_counter() - t0
+
+        size = sum(os.path.getsize(os.path.join(tmp, n)) for n in os.listdir(tmp))
+        print(f"{records:,} records, {handler.dropped} dropped, {size / 1024:,.0f} KiB written")
+        print(f"caller : {call_s * 1e6 / records:.2f} us/record ({records / call_s:,.0f} records/s)")
+        print(f"drained: {records / total_s:,.0f} records/s end to end")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
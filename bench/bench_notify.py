@@ -0,0 +1,53 @@
+# bench/bench_notify.py
+# Toast path under a flood: a hub with many drives plus a flapping device.
+# Old path: one synchronous toast per event on the calling thread. New path: core.notifier.Notifier.
+# The backend is CountingBackend with a delay standing in for a slow toast API.
+#
+#   python -m bench.bench_notify [hub_devices] [flaps]      (defaults 20, 50)
+
+import sys
+import time
+
+from core.notifier import CountingBackend, Notifier
+
+TOAST_DELAY = 0.05
+
+
+def _events(hub: int, flaps: int):
+    for i in range(hub):
+        yield {"timestamp": 0, "action": "insert", "model": f"Hub drive {i}", "pnp_id": f"USB\\HUB\\{i}",
+               "vid": "0781", "pid": "5567", "serial": f"HUB{i}"}, "blocked"
+    for i in range(flaps):
+        action = "insert" if i % 2 == 0 else "remove"
+        yield {"timestamp": 0, "action": action, "model": "Loose cable", "pnp_id": "USB\\FLAP\\1",
+               "vid": "0951", "pid": "1666", "serial": "FLAP1"}, "blocked" if action == "insert" else "observe"
+
+
+def main(hub: int = 20, flaps: int = 50):
+    events = list(_events(hub, flaps))
+
+    backend = CountingBackend(delay=TOAST_DELAY)
+    t0 = time.perf_counter()
+    for evt, decision in events:
+        backend("USB " + decision.upper(), evt["model"], 7)
+    blocked_for = time.perf_counter() - t0
+    print(f"synchronous : {len(events)} events -> {backend.count} toasts, "
+          f"event thread blocked {blocked_for * 1000:.0f} ms")
+
+    for label, options in (("coalesced", {}), ("no removals", {"show_removals": False})):
+        backend = CountingBackend(delay=TOAST_DELAY)
+        n = Notifier(backend, **options).start()
+        t0 = time.perf_counter()
+        for evt, decision in events:
+            n.device_event(evt, decision, "bench")
+        blocked_for = time.perf_counter() - t0
+        n.stop()
+        s = n.stats()
+        print(f"{label:<12}: {len(events)} events -> {backend.count} toasts, "
+              f"event thread blocked {blocked_for * 1000:.1f} ms "
+              f"(coalesced {s['coalesced']}, per-device {s['suppressed_device']}, "
+              f"removals {s['suppressed_removal']}, rate-limited {s['rate_limited']})")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
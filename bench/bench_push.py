@@ -0,0 +1,70 @@
+# bench/bench_push.py
+# Time from an event entering the agent to a subscribed client receiving it (core/events.py over
+# core/ipc.py), compared with the old 3 s SQLite polling. The GUI adds one Tk drain tick
+# (PUSH_POLL_MS) plus paint time; it reports its own figures under View > Refresh Timings.
+#
+#   python -m bench.bench_push [events]      (default 2000)
+
+import os
+import queue
+import sys
+import tempfile
+import time
+
+from core.agent import Agent, AgentClient
+from core.db import DB
+from core.events import event_record
+
+
+def _process(evt, db, bus):
+    # guardian.process_event minus PowerShell and toasts
+    event_id = db.log_event(evt["timestamp"], evt["action"], evt["model"], evt["pnp_id"],
+                            evt["vid"], evt["pid"], evt["serial"], "blocked", "bench")
+    bus.publish(event_record(evt, "blocked", "bench", event_id))
+    return {"decision": "blocked", "note": "bench", "id": event_id}
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main(n: int = 2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        agent = Agent(db, runtime_dir=tmp, monitor=False, process=_process)
+        agent.start()
+        client = AgentClient(tmp)
+        received = queue.Queue()
+        client.subscribe(lambda e: received.put((time.time(), e)))
+        client.call("ping")
+
+        latencies = []
+        for i in range(n):
+            agent.handle_event({"timestamp": time.time(), "action": "insert", "model": "Bench",
+                                "pnp_id": f"USB\\VID_0781&PID_5567\\B{i}", "vid": "0781", "pid": "5567",
+                                "serial": f"B{i}"})
+            t_recv, evt = received.get(timeout=10)
+            latencies.append((t_recv - evt["detected_at"]) * 1000.0)
+
+        print(f"insert -> subscriber ({n} events, {agent.ipc.transport} socket)")
+        print(f"  p50 {_pct(latencies, 0.50):.2f} ms   p95 {_pct(latencies, 0.95):.2f} ms   "
+              f"p99 {_pct(latencies, 0.99):.2f} ms   max {max(latencies):.2f} ms")
+        print("  old polling: uniform over 0-3000 ms, mean ~1500 ms")
+
+        # burst with a subscriber that isn't reading: publishing must not slow down
+        stalled = agent.bus.subscribe(maxsize=100)
+        t0 = time.perf_counter()
+        for i in range(n):
+            agent.bus.publish({"kind": "event", "n": i})
+        dt = time.perf_counter() - t0
+        print(f"burst of {n} with a stalled subscriber: {dt * 1e6 / n:.1f} us/publish, "
+              f"{stalled.dropped} dropped for it, {agent.ipc.dropped} dropped for IPC clients")
+
+        client.close()
+        agent.stop()
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,34 @@
+# bench/bench_query.py
+# Keyset page fetch time (DB.query_events) versus table size.
+#
+#   python -m bench.bench_query [max_rows]      (default 1000000)
+
+import os
+import sys
+import tempfile
+
+from bench.common import best_ms, fill_events
+from core.db import DB
+
+
+def main(max_rows: int = 1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        size = 0
+        target = 1000
+        while target <= max_rows:
+            fill_events(db, target - size, seed=target)
+            size = target
+
+            # a page from the top, one from deep history, and a filtered page
+            _, deep = db.query_events(limit=size // 2)
+            first = best_ms(lambda: db.query_events(limit=200))
+            middle = best_ms(lambda: db.query_events(after_cursor=deep, limit=200))
+            blocked = best_ms(lambda: db.query_events({"decision": "blocked"}, deep, limit=200))
+            print(f"{size:>10} rows | first {first:7.3f} ms | mid {middle:7.3f} ms | blocked {blocked:7.3f} ms")
+            target *= 10
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,93 @@
+# bench/bench_runtime.py
+# Event path under load: the asyncio runtime (core/runtime.py) versus handling each
+# event on the watcher thread (core.guardian.process_event), with PowerShell
+# replaced by a stub that takes `--enforce-ms` per call.
+#
+#   python -m bench.bench_runtime [events]     (default 2000)
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from core.blocker import StubEnforcer
+from core.db import DB
+from core.guardian import process_event
+from core.notifier import CountingBackend, Notifier
+from core.runtime import Runtime
+
+
+class SlowEnforcer(StubEnforcer):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def disable_device(self, instance_id: str):
+        time.sleep(self.delay)
+        return super().disable_device(instance_id)
+
+
+def _events(n: int):
+    return [{"action": "insert", "timestamp": time.time(), "model": "Stick", "vid": "0781", "pid": "5567",
+             "serial": f"S{i:06d}", "pnp_id": f"USB\\VID_0781&PID_5567\\S{i:06d}"} for i in range(n)]
+
+
+def _report(label: str, latencies: list, elapsed: float):
+    q = statistics.quantiles(latencies, n=100)
+    print(f"{label:<10} {len(latencies) / elapsed:8,.0f} events/s | latency p50 {q[49] * 1000:8.1f} ms"
+          f"  p99 {q[98] * 1000:8.1f} ms  max {max(latencies) * 1000:8.1f} ms")
+
+
+def bench_threaded(db, events, delay):
+    notifier = Notifier(CountingBackend()).start()
+    enforcer = SlowEnforcer(delay)
+    t0 = time.perf_counter()
+    latencies = []
+    for evt in events:  # a burst: every event is waiting from t0
+        process_event(evt, db, notifier=notifier, enforcer=enforcer)
+        latencies.append(time.perf_counter() - t0)
+    _report("threaded", latencies, time.perf_counter() - t0)
+    notifier.stop()
+
+
+def bench_runtime(db, events, delay, workers):
+    runtime = Runtime(db, enforcer=SlowEnforcer(delay), notifier=Notifier(CountingBackend()).start(),
+                      workers={"powershell": workers})
+
+    async def main():
+        serving = asyncio.get_running_loop().create_task(runtime.serve())
+        await asyncio.sleep(0)
+        t0 = time.perf_counter()
+        latencies = []
+
+        def done(_fut):
+            latencies.append(time.perf_counter() - t0)
+
+        futures = []
+        for evt in events:
+            fut = await runtime.put(evt)
+            fut.add_done_callback(done)
+            futures.append(fut)
+        await asyncio.gather(*futures)
+        _report(f"runtime/{workers}", latencies, time.perf_counter() - t0)
+        runtime.request_stop()
+        await serving
+
+    asyncio.run(main())
+    print(f"           {runtime.stats['batches']} DB commits, largest batch {runtime.stats['max_batch']}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="asyncio runtime vs. per-event handling under a burst of inserts.")
+    ap.add_argument("events", type=int, nargs="?", default=2000)
+    ap.add_argument("--enforce-ms", type=float, default=5.0, help="stub Disable-PnpDevice time (default 5)")
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, fn in (("threaded", lambda db: bench_threaded(db, _events(args.events), args.enforce_ms / 1000)),
+                          ("runtime", lambda db: bench_runtime(db, _events(args.events), args.enforce_ms / 1000, 4)),
+                          ("runtime16", lambda db: bench_runtime(db, _events(args.events), args.enforce_ms / 1000, 16))):
+            db = DB(os.path.join(tmp, f"{label}.db"))
+            fn(db)
+            db.conn.close()
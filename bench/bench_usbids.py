@@ -0,0 +1,54 @@
+# bench/bench_usbids.py
+# usb.ids name lookups (core/usbids.py): build time, index size and per-lookup cost
+# of the memory-mapped binary search. Uses a real usb.ids if given, else a
+# synthetic one of the same shape (~3,500 vendors, ~20,000 products).
+#
+#   python -m bench.bench_usbids [path/to/usb.ids]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core.usbids import UsbIds, compile_usb_ids
+
+
+def _synthetic(path: str, vendors: int = 3500, products: int = 20000, seed: int = 1):
+    rnd = random.Random(seed)
+    vids = sorted(rnd.sample(range(0x10000), vendors))
+    per_vendor = products // vendors
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# synthetic usb.ids\n")
+        for vid in vids:
+            f.write(f"{vid:04x}  Vendor {vid:04X} Corp.\n")
+            for pid in sorted(rnd.sample(range(0x10000), per_vendor)):
+                f.write(f"\t{pid:04x}  Product {pid:04X} Mass Storage\n")
+        f.write("C 00  (Defined at Interface level)\n")
+
+
+def main(src: str | None = None, lookups: int = 200000):
+    with tempfile.TemporaryDirectory() as tmp:
+        if src is None:
+            src = os.path.join(tmp, "usb.ids")
+            _synthetic(src)
+        out = os.path.join(tmp, "usb.ids.idx")
+        t0 = time.perf_counter()
+        n_vendors, n_products = compile_usb_ids(src, out)
+        build_s = time.perf_counter() - t0
+        print(f"{n_vendors:,} vendors, {n_products:,} products: built in {build_s:.2f}s, "
+              f"{os.path.getsize(src) / 1024:,.0f} KiB text -> {os.path.getsize(out) / 1024:,.0f} KiB index")
+
+        index = UsbIds(out)
+        rnd = random.Random(2)
+        probes = [(f"{rnd.randrange(0x10000):04X}", f"{rnd.randrange(0x10000):04X}") for _ in range(lookups)]
+        t0 = time.perf_counter()
+        for vid, pid in probes:
+            index.lookup(vid, pid)
+        lookup_s = time.perf_counter() - t0
+        print(f"lookup : {lookup_s * 1e6 / lookups:.2f} us per (vendor, product) pair")
+        index.close()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
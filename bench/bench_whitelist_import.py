@@ -0,0 +1,61 @@
+# bench/bench_whitelist_import.py
+# Bulk whitelist import (core/whitelist_io.import_whitelist) vs one whitelist_add per entry.
+#
+#   python -m bench.bench_whitelist_import [entries]      (default 100000)
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core.db import DB
+from core.whitelist_io import import_whitelist
+
+
+def _write_csv(path: str, n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["label", "vid", "pid", "serial"])
+        for i in range(n):
+            if i % 4 == 0:
+                w.writerow([f"Dept device {i}", "", "", "%016x" % rnd.getrandbits(64)])
+            else:
+                w.writerow([f"Dept device {i}", "%04x" % rnd.randrange(0x10000), "%04x" % rnd.randrange(0x10000),
+                            "%016x" % rnd.getrandbits(64)])
+
+
+def main(n: int = 100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "wl.csv")
+        _write_csv(src, n)
+
+        db = DB(os.path.join(tmp, "bulk.db"))
+        t0 = time.perf_counter()
+        stats = import_whitelist(db, src)
+        dt = time.perf_counter() - t0
+        print(f"bulk import : {stats['inserted']} rows in {dt:.2f}s ({stats['inserted'] / dt:,.0f} rows/s)")
+
+        # re-import: everything is a duplicate
+        t0 = time.perf_counter()
+        stats = import_whitelist(db, src)
+        print(f"re-import   : {stats['duplicates']} duplicates skipped in {time.perf_counter() - t0:.2f}s")
+        db.conn.close()
+
+        # baseline: what running whitelist_add.py per device boils down to (minus process start)
+        sample = min(n, 2000)
+        db = DB(os.path.join(tmp, "single.db"))
+        with open(src, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))[:sample]
+        t0 = time.perf_counter()
+        for r in rows:
+            db.whitelist_add(r["label"], r["vid"] or None, r["pid"] or None, r["serial"])
+        dt = time.perf_counter() - t0
+        print(f"one-by-one  : {sample} rows in {dt:.2f}s ({sample / dt:,.0f} rows/s)")
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
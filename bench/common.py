@@ -0,0 +1,51 @@
+# bench/common.py
+# Shared helpers for the benchmark scripts.
+
+import random
+import time
+
+from core.db import DB
+
+MODELS = ["SanDisk Ultra USB Device", "Kingston DataTraveler 3.0", "ADATA USB Flash Drive",
+          "Generic Flash Disk USB Device", "Samsung Flash Drive FIT"]
+
+INSERT_EVENT_SQL = (
+    "INSERT INTO events(ts, action, model, pnp_id, vid, pid, serial, decision, note)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def fill_events(db: DB, rows: int, seed: int = 1, batch_size: int = 10000):
+    """Append `rows` random insert events ending at now, one transaction per batch."""
+    rnd = random.Random(seed)
+    now = int(time.time())
+    batch = []
+    for i in range(rows):
+        serial = "%016X" % rnd.getrandbits(64)
+        vid, pid = "%04X" % rnd.randrange(0x10000), "%04X" % rnd.randrange(0x10000)
+        blocked = rnd.random() < 0.3
+        batch.append((
+            now - rows + i, "insert", rnd.choice(MODELS),
+            f"USBSTOR\\DISK&VEN_X&PROD_Y\\{serial}&0", vid, pid, serial,
+            "blocked" if blocked else "allowed",
+            "not on whitelist; disabled" if blocked else "on whitelist",
+        ))
+        if len(batch) == batch_size:
+            _flush(db, batch)
+    _flush(db, batch)
+
+
+def _flush(db: DB, batch: list):
+    with db.lock, db.conn:
+        db.conn.executemany(INSERT_EVENT_SQL, batch)
+    batch.clear()
+
+
+def best_ms(fn, repeat: int = 5) -> float:
+    """Best-of-N wall time of fn() in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
@@ -0,0 +1,231 @@
+# bench/gen_db.py
+# Build a realistic USB Guard database (years of events, a large whitelist) for
+# query tuning, benchmarks and GUI work. Needs NumPy. Same seed -> same file content.
+#
+# The population is skewed the way real logs are: a small set of regular devices
+# (mostly whitelisted, Zipf-distributed, plugged in on most working days), a long
+# tail of one-time visitors (mostly blocked), and bursts where many devices show
+# up within minutes. Every plug is an insert followed by a removal. Timestamps
+# follow office hours and weekdays.
+#
+# Rows are bulk-inserted with indexes, triggers and the FTS index dropped; opening
+# the file with core.db.DB afterwards recreates them in one pass each.
+#
+# Throughput: the load runs at about 10M rows/min, but rebuilding the indexes takes
+# about 5x as long as the load. Most of that is the trigram FTS index. A complete
+# run therefore manages about 1.5-2M rows/min. --no-index stops after the load and
+# leaves the index build to the first DB() open of the file.
+#
+#   python -m bench.gen_db data/usb_guard.db --events 10000000 --whitelist 100000 --days 1095 --seed 1
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from core.db import DB
+
+MODELS = np.array(["SanDisk Ultra USB Device", "Kingston DataTraveler 3.0", "ADATA USB Flash Drive",
+                   "Generic Flash Disk USB Device", "Samsung Flash Drive FIT", "WD My Passport 25E2",
+                   "Seagate Expansion Desk", "Lexar USB Flash Drive"])
+# working hours, relative plug-in rate per hour of day
+HOURLY = np.array([1, 1, 1, 1, 1, 2, 4, 10, 30, 45, 45, 40, 25, 35, 45, 45, 40, 30, 12, 6, 4, 3, 2, 1], float)
+WEEKDAY = np.array([1, 1, 1, 1, 1, 0.15, 0.1])  # Monday..Sunday
+
+# device columns first, so a row is one tuple concatenation: device fields + per-event fields
+INSERT_SQL = ("INSERT INTO events(model, pnp_id, vid, pid, serial, ts, action, decision, note, "
+              "detect_us, decide_us, enforce_us) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+ALLOWED = ("insert", "allowed", "on whitelist; enabled")
+BLOCKED = ("insert", "blocked", "not on whitelist; disabled")
+REMOVED = ("remove", "observe", "device removed", None, None, None)
+
+
+class Population:
+    """Devices as parallel arrays: strings are built once here and looked up per event."""
+
+    def __init__(self, rng, regulars: int, visitors: int):
+        n = regulars + visitors
+        self.regulars = regulars
+        vendors = rng.integers(0, 0x10000, size=max(8, regulars // 20))
+        # regulars come from a handful of fleet vendors; visitors from anywhere
+        vid = np.concatenate([rng.choice(vendors, regulars), rng.integers(0, 0x10000, visitors)])
+        pid = rng.integers(0, 0x10000, n)
+        serial_hi = rng.integers(0, 2 ** 32, n, dtype=np.uint64)
+        serial_lo = rng.integers(0, 2 ** 32, n, dtype=np.uint64)
+        self.vid = [f"{v:04X}" for v in vid.tolist()]
+        self.pid = [f"{p:04X}" for p in pid.tolist()]
+        self.serial = [f"{h:08X}{l:08X}" for h, l in zip(serial_hi.tolist(), serial_lo.tolist())]
+        self.model = MODELS[rng.integers(0, len(MODELS), n)].tolist()
+        self.pnp_id = [f"USB\\VID_{v}&PID_{p}\\{s}" for v, p, s in zip(self.vid, self.pid, self.serial)]
+        self.fields = list(zip(self.model, self.pnp_id, self.vid, self.pid, self.serial))
+        # 90% of regulars and 3% of visitors are on the whitelist
+        self.whitelisted = np.concatenate([rng.random(regulars) < 0.9, rng.random(visitors) < 0.03])
+
+
+def _day_weights(days: int, start: int) -> np.ndarray:
+    weekday = ((start // 86400 + np.arange(days)) + 3) % 7  # 1970-01-01 was a Thursday
+    w = WEEKDAY[weekday]
+    return w / w.sum()
+
+
+def _plugs(rng, pop: Population, n: int, day_start: int, burst_share: float):
+    """n plug-ins on one day: (ts, device) arrays."""
+    hours = rng.choice(24, n, p=HOURLY / HOURLY.sum())
+    ts = day_start + hours * 3600 + rng.integers(0, 3600, n)
+    # Zipf over regulars for most plugs, uniform over the visitor tail for the rest
+    regular = rng.random(n) < 0.7
+    ranks = (rng.zipf(1.3, n) - 1) % pop.regulars
+    tail = pop.regulars + rng.integers(0, len(pop.vid) - pop.regulars, n)
+    device = np.where(regular, ranks, tail)
+    bursts = rng.random(n) < burst_share
+    if bursts.any():
+        # a burst: everything within a few minutes of one moment (e.g. a training room)
+        center = day_start + 9 * 3600 + rng.integers(0, 8 * 3600)
+        ts[bursts] = np.minimum(center + rng.exponential(90, bursts.sum()).astype(np.int64), day_start + 86399)
+    return ts, device
+
+
+def _timings(rng, blocked: np.ndarray):
+    """Plausible detect/decide/enforce microseconds; enforcement is a PowerShell call."""
+    n = len(blocked)
+    detect = rng.lognormal(6.0, 0.6, n).astype(np.int64)
+    decide = rng.lognormal(3.5, 0.4, n).astype(np.int64)
+    enforce = rng.lognormal(np.where(blocked, 13.4, 13.1), 0.3).astype(np.int64)
+    return detect.tolist(), decide.tolist(), enforce.tolist()
+
+
+def _strip(conn: sqlite3.Connection):
+    """Drop indexes, triggers and the FTS table; DB() recreates them after the load."""
+    conn.execute("DROP TABLE IF EXISTS events_fts")
+    conn.execute("PRAGMA user_version = 0")  # so the next DB() runs its migrations again
+    for kind, name in conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL"
+    ).fetchall():
+        conn.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+
+
+def generate(path: str, events: int, whitelist: int = 100000, days: int = 1095, seed: int = 1,
+             end: int | None = None, chunk_days: int = 30, progress=None, build_indexes: bool = True) -> dict:
+    """
+    Write a new database at `path` (which must not exist). Returns timing stats.
+    events counts both inserts and removals; end is the last day's unix time (default: today).
+    build_indexes=False leaves indexes, triggers and the FTS index to the next DB(path).
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    rng = np.random.default_rng(seed)
+    end = (end if end is not None else int(time.time())) // 86400 * 86400
+    start = end - days * 86400
+    plugs = events // 2
+    pop = Population(rng, regulars=max(10, plugs // 2000), visitors=max(10, plugs // 3))
+
+    db = DB(path)
+    db.conn.close()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    _strip(conn)
+    t0 = time.perf_counter()
+
+    # whitelist: every whitelisted device, padded with unrelated entries
+    listed = np.flatnonzero(pop.whitelisted).tolist()
+    created = start - 86400
+    conn.executemany(
+        "INSERT INTO whitelist(label, vid, pid, serial, created_at) VALUES (?, ?, ?, ?, ?)",
+        ((f"{pop.model[i]} #{i}", pop.vid[i], pop.pid[i], pop.serial[i], created) for i in listed),
+    )
+    pad = max(0, whitelist - len(listed))
+    conn.executemany(
+        "INSERT INTO whitelist(label, vid, pid, serial, created_at) VALUES (?, ?, ?, ?, ?)",
+        ((f"Fleet device {k}", f"{v:04X}", f"{p:04X}", f"{s:016X}", created) for k, (v, p, s) in enumerate(zip(
+            rng.integers(0, 0x10000, pad).tolist(), rng.integers(0, 0x10000, pad).tolist(),
+            rng.integers(0, 2 ** 63, pad).tolist()))),
+    )
+
+    per_day = rng.multinomial(plugs, _day_weights(days, start))
+    written = 0
+    for first in range(0, days, chunk_days):
+        chunk_end = start + min(days, first + chunk_days) * 86400
+        ts_parts, dev_parts = [], []
+        for d in range(first, min(days, first + chunk_days)):
+            if per_day[d]:
+                ts, dev = _plugs(rng, pop, int(per_day[d]), start + d * 86400, burst_share=0.02)
+                ts_parts.append(ts)
+                dev_parts.append(dev)
+        if not ts_parts:
+            continue
+        ins_ts = np.concatenate(ts_parts)
+        device = np.concatenate(dev_parts)
+        # removal some minutes to hours later, kept inside the chunk so ids stay in time order
+        rem_ts = np.minimum(ins_ts + 30 + rng.exponential(3600, len(ins_ts)).astype(np.int64), chunk_end - 1)
+        ts = np.concatenate([ins_ts, rem_ts])
+        dev = np.concatenate([device, device])
+        is_insert = np.arange(len(ts)) < len(ins_ts)
+        order = np.argsort(ts, kind="stable")
+        ts, dev, is_insert = ts[order].tolist(), dev[order], is_insert[order]
+        blocked = ~pop.whitelisted[dev]
+        detect, decide, enforce = _timings(rng, blocked)
+        dev = dev.tolist()
+        fields = pop.fields
+        rows = (
+            fields[i] + (t,) + (BLOCKED if b else ALLOWED) + (de, dc, en) if ins else fields[i] + (t,) + REMOVED
+            for t, i, ins, b, de, dc, en in zip(ts, dev, is_insert.tolist(), blocked.tolist(), detect, decide, enforce)
+        )
+        conn.executemany(INSERT_SQL, rows)
+        written += len(ts)
+        if progress:
+            progress(written)
+    conn.commit()
+    conn.close()
+    load_s = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    if build_indexes:
+        db = DB(path)  # recreates indexes, triggers and the FTS index
+        db.conn.execute("PRAGMA optimize")
+        db.conn.close()
+    return {"events": written, "whitelist": len(listed) + pad, "devices": len(pop.vid),
+            "load_s": load_s, "index_s": time.perf_counter() - t1}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Generate a large, realistic USB Guard database.")
+    ap.add_argument("out", help="database file to create, e.g. data/usb_guard.db")
+    ap.add_argument("--events", type=int, default=1000000, help="event rows, inserts and removals (default 1M)")
+    ap.add_argument("--whitelist", type=int, default=100000, help="whitelist entries (default 100K)")
+    ap.add_argument("--days", type=int, default=1095, help="history length (default 3 years)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--force", action="store_true", help="replace OUT if it exists")
+    ap.add_argument("--no-index", action="store_true",
+                    help="stop after loading the rows; the first open of OUT builds the indexes and FTS index")
+    args = ap.parse_args(argv)
+
+    if os.path.exists(args.out):
+        if not args.force:
+            print(f"{args.out} exists; pass --force to replace it.")
+            return 1
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.out + suffix):
+                os.remove(args.out + suffix)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    stats = generate(args.out, args.events, args.whitelist, args.days, args.seed,
+                     progress=lambda n: print(f"\r{n:,} events", end="", file=sys.stderr),
+                     build_indexes=not args.no_index)
+    print(file=sys.stderr)
+    total_s = stats["load_s"] + stats["index_s"]
+    print(f"{stats['events']:,} events over {args.days} days from {stats['devices']:,} devices, "
+          f"{stats['whitelist']:,} whitelist entries")
+    print(f"load   : {stats['load_s']:.1f}s ({stats['events'] / stats['load_s'] * 60 / 1e6:.1f}M rows/min)")
+    if args.no_index:
+        print("indexes: skipped; built by the first open of the file")
+    else:
+        print(f"indexes: {stats['index_s']:.1f}s (B-tree indexes, triggers and the FTS index)")
+        print(f"total  : {total_s:.1f}s ({stats['events'] / total_s * 60 / 1e6:.1f}M rows/min)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+# bench/suite.py
+# Whole-pipeline benchmark suite with stored baselines and a regression check.
+# Runs anywhere: the real parsers, DB and process_event, with core.blocker.StubEnforcer
+# instead of PowerShell and a Notifier on core.notifier.CountingBackend instead of toasts.
+#
+#   python -m bench.suite                                  quick profile, print results
+#   python -m bench.suite --out results.json               ... and write them as JSON
+#   python -m bench.suite --save-baseline                  store as bench/baselines/<profile>.json
+#   python -m bench.suite --compare                        fail (exit 1) on regressions vs that baseline
+#   python -m bench.suite --profile full                   1M and 10M-row query benchmarks (slow, ~2 GB disk)
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bench.common import best_ms, fill_events
+from core.blocker import StubEnforcer
+from core.db import DB
+from core.guardian import process_event
+from core.notifier import CountingBackend, Notifier
+from core.usb_monitor import parse_ids, parse_vid_pid
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+DEFAULT_THRESHOLD = 0.25
+REPEAT = 3  # rates are the best of this many runs, to keep scheduler noise out of comparisons
+
+PROFILES = {
+    "quick": {"parse": 50000, "lookup_sizes": (1000, 100000), "log_rows": 5000, "query_sizes": (100000,),
+              "e2e": 3000},
+    "full": {"parse": 500000, "lookup_sizes": (1000, 100000, 1000000), "log_rows": 50000,
+             "query_sizes": (1000000, 10000000), "e2e": 20000},
+}
+
+
+def _pnp_ids(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    ids = []
+    for i in range(n):
+        serial = "%016X" % rnd.getrandbits(64)
+        if i % 2:
+            ids.append(f"USB\\VID_{rnd.randrange(0x10000):04X}&PID_{rnd.randrange(0x10000):04X}\\{serial}")
+        else:
+            ids.append(f"USBSTOR\\DISK&VEN_SANDISK&PROD_ULTRA&REV_1.00\\{serial}&0")
+    return ids
+
+
+def _rate(n: int, seconds: float) -> float:
+    return round(n / seconds, 1)
+
+
+# ---------- benchmarks: each returns {name: (value, unit, "higher"|"lower")} ----------
+def bench_parse(n: int, tmp: str) -> dict:
+    ids = _pnp_ids(n)
+
+    def parse_all():
+        for pnp_id in ids:
+            parse_vid_pid(pnp_id)
+            parse_ids(pnp_id)
+
+    return {"parse": (_rate(n, best_ms(parse_all, REPEAT) / 1000), "ids/s", "higher")}
+
+
+def bench_whitelist_lookup(sizes, tmp: str) -> dict:
+    """Per-lookup cost for devices on the whitelist (hit) and not on it (miss)."""
+    out = {}
+    db = DB(os.path.join(tmp, "lookup.db"))
+    rnd = random.Random(2)
+    entries = []
+    for target in sizes:
+        added = [("%04X" % rnd.randrange(0x10000), "%04X" % rnd.randrange(0x10000), "%016X" % rnd.getrandbits(64))
+                 for _ in range(target - len(entries))]
+        db.whitelist_add_many([[("L", *e) for e in added]])
+        entries.extend(added)
+        probes = {
+            "hit": rnd.sample(entries, min(2000, len(entries))),
+            "miss": [("%04X" % rnd.randrange(0x10000), "%04X" % rnd.randrange(0x10000), "%016X" % rnd.getrandbits(64))
+                     for _ in range(2000)],
+        }
+        for kind, batch in probes.items():
+            ms = best_ms(lambda: [db.whitelist_contains(*p) for p in batch], repeat=3)
+            out[f"whitelist_{kind}_{target}"] = (round(ms * 1000 / len(batch), 3), "us/lookup", "lower")
+    db.conn.close()
+    return out
+
+
+def bench_log_event(n: int, tmp: str) -> dict:
+    db = DB(os.path.join(tmp, "log.db"))
+    per_run = n // REPEAT
+
+    def log_some():
+        for i in range(per_run):
+            db.log_event(1700000000 + i, "insert", "Stick", f"USB\\X\\S{i}", "0781", "5567", f"S{i}", "blocked", "x")
+
+    rate = _rate(per_run, best_ms(log_some, REPEAT) / 1000)
+    db.conn.close()
+    return {"log_event": (rate, "rows/s", "higher")}
+
+
+def bench_gui_query(sizes, tmp: str) -> dict:
+    out = {}
+    db = DB(os.path.join(tmp, "query.db"))
+    size = 0
+    for target in sizes:
+        fill_events(db, target - size, seed=target)
+        size = target
+        deep = db.conn.execute("SELECT ts, id FROM events ORDER BY ts DESC, id DESC LIMIT 1 OFFSET ?",
+                               (size // 2,)).fetchone()
+        label = f"{size // 1000000}m" if size >= 1000000 else f"{size // 1000}k"
+        out[f"query_first_page_{label}"] = (round(best_ms(lambda: db.query_events(limit=200)), 3), "ms", "lower")
+        out[f"query_deep_page_{label}"] = (
+            round(best_ms(lambda: db.query_events(after_cursor=deep, limit=200)), 3), "ms", "lower")
+        out[f"query_blocked_page_{label}"] = (
+            round(best_ms(lambda: db.query_events({"decision": "blocked"}, deep, limit=200)), 3), "ms", "lower")
+        out[f"search_serial_{label}"] = (round(best_ms(lambda: db.search_events("ABCDEF", limit=200)), 3), "ms", "lower")
+    db.conn.close()
+    return out
+
+
+def bench_end_to_end(n: int, tmp: str) -> dict:
+    db = DB(os.path.join(tmp, "e2e.db"))
+    ids = _pnp_ids(n, seed=3)
+    db.whitelist_add_many([[("L", *parse_vid_pid(p), parse_ids(p)["serial"]) for p in ids[::3]]])
+    enforcer = StubEnforcer()
+    notifier = Notifier(CountingBackend()).start()
+    per_run = n // REPEAT
+
+    def handle_some():
+        for pnp_id in ids[:per_run]:
+            vid, pid = parse_vid_pid(pnp_id)
+            evt = {"action": "insert", "model": "Stick", "pnp_id": pnp_id, "vid": vid, "pid": pid,
+                   "serial": parse_ids(pnp_id)["serial"], "timestamp": time.time(), "trace_ns": time.perf_counter_ns()}
+            process_event(evt, db, notifier=notifier, enforcer=enforcer)
+
+    rate = _rate(per_run, best_ms(handle_some, REPEAT) / 1000)
+    notifier.stop()
+    db.conn.close()
+    return {"end_to_end": (rate, "events/s", "higher")}
+
+
+def run(profile: str) -> dict:
+    p = PROFILES[profile]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn, arg in (
+            ("parse", bench_parse, p["parse"]),
+            ("whitelist_lookup", bench_whitelist_lookup, p["lookup_sizes"]),
+            ("log_event", bench_log_event, p["log_rows"]),
+            ("gui_query", bench_gui_query, p["query_sizes"]),
+            ("end_to_end", bench_end_to_end, p["e2e"]),
+        ):
+            print(f"running {name}...", file=sys.stderr)
+            for key, (value, unit, better) in fn(arg, tmp).items():
+                results[key] = {"value": value, "unit": unit, "better": better}
+    return {
+        "meta": {"profile": profile, "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "platform": platform.platform(), "time": int(time.time())},
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """Names of results worse than the baseline by more than `threshold` (a fraction)."""
+    regressions = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        if base["better"] == "higher":
+            worse = cur["value"] < base["value"] * (1 - threshold)
+        else:
+            worse = cur["value"] > base["value"] * (1 + threshold)
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def _print(current: dict, baseline: dict | None, regressions: list):
+    for name, r in current["results"].items():
+        line = f"{name:<28}{r['value']:>14,.3f} {r['unit']:<10}"
+        base = (baseline or {}).get("results", {}).get(name)
+        if base:
+            change = (r["value"] - base["value"]) / base["value"] * 100 if base["value"] else 0.0
+            line += f" baseline {base['value']:>12,.3f} ({change:+.1f}%)"
+            if name in regressions:
+                line += "  REGRESSION"
+        print(line)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="USB Guard pipeline benchmarks.")
+    ap.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    ap.add_argument("--out", metavar="PATH", help="write results as JSON")
+    ap.add_argument("--save-baseline", action="store_true", help="store results as bench/baselines/<profile>.json")
+    ap.add_argument("--compare", nargs="?", const="", metavar="BASELINE",
+                    help="compare with a baseline JSON (default bench/baselines/<profile>.json); exit 1 on regression")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                    help=f"allowed slowdown as a fraction (default {DEFAULT_THRESHOLD})")
+    args = ap.parse_args(argv)
+
+    current = run(args.profile)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    baseline, regressions = None, []
+    if args.compare is not None:
+        path = args.compare or os.path.join(BASELINE_DIR, f"{args.profile}.json")
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+    _print(current, baseline, regressions)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(os.path.join(BASELINE_DIR, f"{args.profile}.json"), "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
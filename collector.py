@@ -0,0 +1,30 @@
+# collector.py
+# Reference fleet collector: agents started with `main.py --ship-to http://HOST:PORT` send their events here.
+import argparse
+import json
+
+from core.collector import DEFAULT_COLLECTOR_DB, Collector, make_server
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Collect USB Guard events from many agents into one SQLite DB.")
+    ap.add_argument("--db", default=DEFAULT_COLLECTOR_DB)
+    ap.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1; 0.0.0.0 for all)")
+    ap.add_argument("--port", type=int, default=8740)
+    ap.add_argument("--enroll", metavar="AGENT_ID",
+                    help="create or rotate AGENT_ID's key, print its credentials file (main.py --ship-credentials) and exit")
+    args = ap.parse_args()
+
+    collector = Collector(args.db)
+    if args.enroll:
+        print(json.dumps({"agent_id": args.enroll, "key": collector.enroll(args.enroll)}))
+        collector.close()
+        raise SystemExit
+    server = make_server(collector, args.host, args.port)
+    print(f"Collector listening on http://{args.host}:{args.port}/ingest -> {args.db}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        collector.close()
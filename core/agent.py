@@ -0,0 +1,401 @@
+# core/agent.py
+# The single long-running process that owns the USB monitor, enforcement and
+# the DB writer. GUIs and tools talk to it over core/ipc.py.
+import os
+import threading
+import time
+
+from core.db import DB
+from core.events import EventBus
+from core.guardian import process_event
+from core import log, notifier, startup
+from core.blocker import is_admin, enable_device
+from core.ipc import IpcServer, IpcClient, IpcError, AgentUnavailable
+from core.metrics import REGISTRY
+from core.profiling import Profiler
+from core.trace import LatencyRecorder
+
+DEFAULT_RUNTIME_DIR = "data"
+LOCK_NAME = "agent.lock"
+
+# DB methods a client may call by name. Anything else is rejected.
+# Whitelist edits among them are announced to subscribers as {"kind": "whitelist"}.
+# Account changes are not here: they go through Agent.add_user / Agent.change_password,
+# which only create the first account and require the current password.
+DB_OPS = frozenset({
+    "query_events", "search_events", "count_events", "list_recent_blocked",
+    "query_whitelist", "count_whitelist", "list_whitelist",
+    "whitelist_add", "whitelist_add_serial", "whitelist_add_vendor", "whitelist_remove", "whitelist_remove_id",
+    "remove_whitelist", "whitelist_contains",
+    "data_version", "whitelist_version", "policy_version", "stage_timings",
+    "count_users", "verify_user",
+})
+WHITELIST_OPS = frozenset({
+    "whitelist_add", "whitelist_add_serial", "whitelist_add_vendor", "whitelist_remove", "whitelist_remove_id",
+    "remove_whitelist",
+})
+
+
+class InstanceLock:
+    """Exclusive, non-blocking lock on a file; released automatically if the process dies."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = None
+
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self.f = f
+        return True
+
+    def release(self):
+        if self.f is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self.f.seek(0)
+                msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.f.close()
+            self.f = None
+
+
+class Agent:
+    """
+    Owns the monitor -> decide/enforce -> log path and serves it over IPC.
+
+    monitor(on_event) starts event intake (default: core.usb_monitor.monitor_usb_storage,
+    imported lazily since it needs WMI); pass monitor=False for none.
+    process(evt, db, bus) is the enforcement step (default: core.guardian.process_event);
+    it publishes decided events on self.bus, which IPC subscribers are fed from, and the
+    stage durations it returns (stages_us) are collected in self.latency.
+    alerts: an optional core.sinks.AlertDispatcher, fed from the bus as well.
+    shipper: an optional core.shipper.Shipper, shipping logged events to a fleet collector.
+    policy: an optional core.policy.PolicySync, pulling whitelist changes from a policy server.
+    metrics: an optional core.metrics.MetricsExporter (Prometheus /metrics and/or textfile).
+    detector: an optional core.anomaly.AnomalyDetector; its findings ride on the event as
+    evt["anomalies"] into process (see process_event).
+    self.profiler (core/profiling.py) captures CPU profiles and allocation diffs on request,
+    written under <runtime_dir>/profiles.
+    runtime: options for core.runtime.Runtime ({} for the defaults) to run the event path on
+    an asyncio loop instead. monitor is then a blocking watch(on_event, stopped) (default
+    core.usb_monitor.watch_usb_storage) and process is not used; cprofile captures then see
+    the event work through the runtime's executor calls.
+    """
+
+    def __init__(self, db: DB | None = None, runtime_dir: str = DEFAULT_RUNTIME_DIR,
+                 monitor=None, process=process_event, transport: str | None = None, alerts=None,
+                 shipper=None, policy=None, metrics=None, detector=None, runtime: dict | None = None):
+        self.db = db
+        self.runtime_dir = runtime_dir
+        self.monitor = monitor
+        self.process = process
+        self.lock = InstanceLock(os.path.join(runtime_dir, LOCK_NAME))
+        self.bus = EventBus()
+        self.ipc = IpcServer(self.handle_request, runtime_dir, transport, bus=self.bus)
+        self.alerts = alerts
+        self.shipper = shipper
+        self.policy = policy
+        self.metrics = metrics
+        self.detector = detector
+        self.runtime_options = runtime
+        self.runtime = None
+        if policy is not None:
+            policy.on_change = lambda: self.bus.publish({"kind": "whitelist"})
+        self.stopped = threading.Event()
+        self.started_at = None
+        self.events_handled = 0
+        self.latency = LatencyRecorder()
+        self.profiler = Profiler(os.path.join(runtime_dir, "profiles"))
+        self.users_lock = threading.Lock()
+
+    def start(self, foreground: bool = False) -> bool:
+        """
+        Take the instance lock and start serving. False if another agent is running.
+        With a runtime, foreground=True leaves its loop for run_forever() to run on this thread.
+        """
+        if not self.lock.acquire():
+            return False
+        if self.db is None:
+            self.db = DB()
+        startup.mark("db open", once=True)
+        self.ipc.start()
+        if self.alerts is not None:
+            self.alerts.start()
+            self.alerts.attach(self.bus)
+        if self.shipper is not None:
+            self.shipper.start()
+        if self.policy is not None:
+            self.policy.start()
+        self.started_at = time.time()
+        self._register_metrics()
+        if self.metrics is not None:
+            self.metrics.start()
+        if self.runtime_options is not None:
+            from core.runtime import Runtime
+            if self.monitor is None:
+                from core.usb_monitor import watch_usb_storage
+                self.monitor = watch_usb_storage
+            self.runtime = Runtime(self.db, self.bus, watch=self.monitor or None, detector=self.detector,
+                                   on_result=self._handled, profiler=self.profiler, **self.runtime_options)
+            if not foreground:
+                self.runtime.start()
+        else:
+            if self.monitor is None:
+                from core.usb_monitor import monitor_usb_storage
+                self.monitor = monitor_usb_storage
+            if self.monitor:
+                self.monitor(self.handle_event)
+        startup.mark("agent started", once=True)
+        startup.report()
+        return True
+
+    def stop(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        if self.runtime is not None:
+            self.runtime.stop()  # drains while the bus and IPC are still up
+        self.profiler.stop()
+        if self.metrics is not None:
+            self.metrics.stop()
+        self.ipc.stop()
+        if self.alerts is not None:
+            self.alerts.stop()
+        if self.shipper is not None:
+            self.shipper.stop()
+        if self.policy is not None:
+            self.policy.stop()
+        self.lock.release()
+
+    def run_forever(self):
+        if self.runtime is not None and self.runtime.thread is None:
+            try:
+                self.runtime.run()  # returns after stop() or Ctrl+C, once drained
+            finally:
+                self.stop()
+            return
+        try:
+            while not self.stopped.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    # ---------- metrics ----------
+    def _register_metrics(self):
+        """Scrape-time readings of this agent's state (hot-path counters live in core/metrics.py)."""
+        REGISTRY.gauge("usbguard_agent_start_time_seconds", "When the agent started (unix time).").set_function(
+            lambda: self.started_at)
+        REGISTRY.gauge("usbguard_whitelist_entries", "Entries in the local whitelist.").set_function(
+            self.db.count_whitelist)
+        REGISTRY.gauge("usbguard_subscribers", "Connected IPC subscribers.").set_function(
+            lambda: len(self.bus.subscribers))
+        REGISTRY.counter("usbguard_subscriber_dropped_total", "Pushed records dropped for slow subscribers.").set_function(
+            lambda: self.ipc.dropped)
+        REGISTRY.gauge("usbguard_queue_depth", "Records waiting in internal queues.", ("queue",)).set_function(
+            self._queue_depths)
+        REGISTRY.summary("usbguard_stage_seconds", "Per-event stage latency since the agent started (core/trace.py).",
+                         ("stage",)).set_function(self._stage_summary)
+
+    def _queue_depths(self) -> dict:
+        depths = {("subscribers",): sum(len(s.buf) for s in list(self.bus.subscribers)),
+                  ("log",): log.stats()["queued"]}
+        toasts = notifier.current()
+        if toasts is not None:
+            depths[("notifier",)] = toasts.stats()["queued"]
+        if self.alerts is not None:
+            depths[("alerts",)] = sum(s["queued"] for s in self.alerts.stats().values())
+        if self.shipper is not None:
+            depths[("shipper_batches",)] = len(self.shipper.pending())
+        if self.runtime is not None:
+            snap = self.runtime.snapshot()
+            depths[("runtime_intake",)] = snap["queued"]
+            depths[("runtime_log",)] = snap["log_queued"]
+        return depths
+
+    def _stage_summary(self) -> dict:
+        out = {}
+        for stage, s in self.latency.summary().items():
+            out[(stage,)] = {"count": s["count"], "sum": s["total"] / 1e6,
+                             0.5: s["p50"] / 1e6, 0.9: s["p90"] / 1e6, 0.99: s["p99"] / 1e6}
+        return out
+
+    # ---------- event path ----------
+    def handle_event(self, evt: dict):
+        if self.detector is not None:
+            findings = self.detector.observe(evt)
+            if findings:
+                evt["anomalies"] = findings
+        return self._handled(self.profiler.call(self.process, evt, self.db, self.bus))
+
+    def _handled(self, result):
+        if not self.events_handled:
+            startup.log.info("first event handled %.0f ms after startup", startup.mark("first event", once=True))
+        self.events_handled += 1
+        if isinstance(result, dict) and result.get("stages_us"):
+            self.latency.record(result["stages_us"])
+        return result
+
+    # ---------- IPC ----------
+    def handle_request(self, op: str, args: dict):
+        if op in DB_OPS:
+            result = self.profiler.call(getattr(self.db, op), **args)
+            if op in WHITELIST_OPS:
+                self.bus.publish({"kind": "whitelist"})
+            return result
+        if op == "ping":
+            return "pong"
+        if op == "status":
+            return {
+                "pid": os.getpid(),
+                "started_at": self.started_at,
+                "events_handled": self.events_handled,
+                "subscribers": len(self.ipc.subscribers),
+                "published_events": self.bus.published,
+                "dropped_events": self.ipc.dropped,
+                "admin": is_admin(),
+                "logging": log.stats(),
+                "alerts": self.alerts.stats() if self.alerts is not None else None,
+                "shipper": dict(self.shipper.stats, pending=len(self.shipper.pending()),
+                                last_error=self.shipper.last_error) if self.shipper is not None else None,
+                "anomaly": self.detector.snapshot() if self.detector is not None else None,
+                "runtime": self.runtime.snapshot() if self.runtime is not None else None,
+                "startup": startup.timeline(),
+                "profiling": self.profiler.status(),
+                "metrics_port": self.metrics.port if self.metrics is not None else None,
+                "policy": dict(self.policy.stats, version=self.db.policy_version(),
+                               last_error=self.policy.last_error) if self.policy is not None else None,
+            }
+        if op == "whitelist_and_enable":
+            return self.whitelist_and_enable(**args)
+        if op == "add_user":
+            return self.add_user(**args)
+        if op == "change_password":
+            return self.change_password(**args)
+        if op == "latency":
+            return self.latency.summary()
+        if op == "log_level":
+            return log.set_level(**args)
+        if op == "profile":
+            return self.profiler.handle(**args)
+        raise ValueError(f"unknown op: {op}")
+
+    def whitelist_and_enable(self, label: str, serial: str, pnp_id: str | None = None):
+        """Whitelist a serial and try to re-enable the device. Returns [ok, msg], or None if not attempted."""
+        self.db.whitelist_add_serial(label, serial)
+        self.bus.publish({"kind": "whitelist"})
+        if is_admin() and pnp_id:
+            return list(enable_device(pnp_id))
+        return None
+
+    def add_user(self, username: str, password: str) -> bool:
+        """First-run setup only: creates the first account, refuses once any account exists."""
+        with self.users_lock:
+            if self.db.count_users():
+                raise PermissionError("an account already exists")
+            return self.db.add_user(username, password)
+
+    def change_password(self, username: str, current_password: str, new_password: str) -> bool:
+        """Change a password, given the current one."""
+        if not self.db.verify_user(username, current_password):
+            raise PermissionError("current password is incorrect")
+        return self.db.change_password(username, new_password)
+
+
+class AgentClient(IpcClient):
+    """
+    IPC client that mirrors the DB read/write API (see DB_OPS), so GUI code can
+    use it wherever it used a DB: client.query_events(filters, cursor, limit=200).
+    """
+
+    def __getattr__(self, name):
+        if name not in DB_OPS:
+            raise AttributeError(name)
+        import inspect  # ~20 ms to import; only clients need it
+        sig = inspect.signature(getattr(DB, name))
+
+        def method(*args, **kwargs):
+            bound = sig.bind(None, *args, **kwargs)
+            bound.arguments.pop("self")
+            return self.call(name, **bound.arguments)
+
+        method.__name__ = name
+        return method
+
+    def whitelist_and_enable(self, label: str, serial: str, pnp_id: str | None = None):
+        return self.call("whitelist_and_enable", label=label, serial=serial, pnp_id=pnp_id)
+
+    def add_user(self, username: str, password: str) -> bool:
+        return self.call("add_user", username=username, password=password)
+
+    def change_password(self, username: str, current_password: str, new_password: str) -> bool:
+        return self.call("change_password", username=username, current_password=current_password,
+                         new_password=new_password)
+
+    def status(self) -> dict:
+        return self.call("status")
+
+    def latency(self) -> dict:
+        """Per-stage latency histograms of events handled since the agent started (core/trace.py)."""
+        return self.call("latency")
+
+    def log_level(self, level: str | None = None) -> str:
+        """The agent's log level; pass e.g. "DEBUG" to change it."""
+        return self.call("log_level", level=level)
+
+    def profile(self, action: str = "status", **kwargs) -> dict:
+        """
+        Drive the agent's profiler (core/profiling.py): action is "cpu" (seconds=, mode="cprofile"|"sample"),
+        "stop", "mem_start", "mem_snapshot", "mem_stop" or "status".
+        """
+        return self.call("profile", action=action, **kwargs)
+
+
+def connect(runtime_dir: str = DEFAULT_RUNTIME_DIR) -> AgentClient | None:
+    """Client for the running agent, or None if there isn't one."""
+    client = AgentClient(runtime_dir)
+    try:
+        client.call("ping")
+    except IpcError:
+        client.close()
+        return None
+    return client
+
+
+def connect_or_start(runtime_dir: str = DEFAULT_RUNTIME_DIR, **agent_kwargs):
+    """
+    Used by the GUIs: attach to the running agent, or host one in this process
+    if none is running. Returns (client, agent); agent is None when attached
+    to another process.
+    """
+    for _ in range(3):
+        client = connect(runtime_dir)
+        if client is not None:
+            return client, None
+        agent = Agent(runtime_dir=runtime_dir, **agent_kwargs)
+        if agent.start():
+            return AgentClient(runtime_dir), agent
+        time.sleep(0.5)  # another process won the lock and is still starting
+    raise AgentUnavailable("could not start or reach the USB Guard agent")
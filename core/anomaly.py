@@ -0,0 +1,96 @@
+# core/anomaly.py
+# Streaming detection of insert patterns typical of keystroke-injection devices
+# and cloned serials, run by the agent on every event before the decision:
+#
+#   rapid_reconnect    `burst` or more inserts of one device (pnp_id) within `window` seconds
+#   identity_mismatch  a serial seen before under a different VID/PID pair
+#
+# Each event costs O(1): a fixed-length deque of insert times per device, and a
+# serial -> "VID:PID" map. Both are LRU-bounded (max_devices, max_serials), so
+# memory has a fixed ceiling however long the agent runs. Time is the event's
+# own timestamp, which makes replays of logged history behave like live traffic.
+#
+# Live events come from Win32_DiskDrive (core/usb_monitor.py), whose USBSTOR ids carry
+# no VID/PID: identity_mismatch relies on the monitor resolving them from the parent USB
+# device, and skips disks whose serial Windows made up. Keystroke-injection devices that
+# enumerate only as HID (no mass-storage interface) never produce a disk event, so neither
+# check sees them; composite devices are covered through their storage interface only.
+import collections
+import threading
+
+from core.db import _norm
+from core.metrics import ANOMALIES
+
+# serials shared by whole product lines of cheap sticks; a mismatch on them means nothing
+GENERIC_SERIALS = frozenset({"0123456789ABCDEF", "123456789ABCDEF0", "0000000000000001", "AAAAAAAAAAAA"})
+
+
+def _distinctive(serial: str) -> bool:
+    return len(serial) >= 6 and len(set(serial)) > 2 and serial not in GENERIC_SERIALS
+
+
+class AnomalyDetector:
+    """
+    observe(evt) -> findings, each {"kind", "detail", "block"}; process_event adds them to
+    the note and, when block is set (force_block=True), blocks the device even if whitelisted.
+    """
+
+    def __init__(self, window: float = 10.0, burst: int = 5, max_devices: int = 10000,
+                 max_serials: int = 100000, force_block: bool = False):
+        if burst < 2:
+            raise ValueError("burst must be at least 2")
+        self.window = window
+        self.burst = burst
+        self.max_devices = max_devices
+        self.max_serials = max_serials
+        self.force_block = force_block
+        self.lock = threading.Lock()
+        self.recent = collections.OrderedDict()      # pnp_id -> deque of the last `burst` insert times
+        self.identities = collections.OrderedDict()  # serial -> "VID:PID" first seen
+        self.stats = {"events": 0, "rapid_reconnect": 0, "identity_mismatch": 0}
+
+    def observe(self, evt: dict) -> list:
+        if evt.get("action") != "insert":
+            return []
+        ts = float(evt["timestamp"])
+        findings = []
+        with self.lock:
+            self.stats["events"] += 1
+            device = evt.get("pnp_id") or evt.get("serial")
+            if device:
+                times = self.recent.get(device)
+                if times is None:
+                    times = self.recent[device] = collections.deque(maxlen=self.burst)
+                    if len(self.recent) > self.max_devices:
+                        self.recent.popitem(last=False)
+                else:
+                    self.recent.move_to_end(device)
+                times.append(ts)
+                if len(times) == self.burst and ts - times[0] <= self.window:
+                    findings.append(self._finding(
+                        "rapid_reconnect", f"{self.burst} inserts in {ts - times[0]:.1f}s"))
+
+            serial, vid, pid = _norm(evt.get("serial")), _norm(evt.get("vid")), _norm(evt.get("pid"))
+            if serial and vid and pid and _distinctive(serial):
+                identity = f"{vid}:{pid}"
+                seen = self.identities.get(serial)
+                if seen is None:
+                    self.identities[serial] = identity
+                    if len(self.identities) > self.max_serials:
+                        self.identities.popitem(last=False)
+                else:
+                    self.identities.move_to_end(serial)
+                    if seen != identity:
+                        findings.append(self._finding(
+                            "identity_mismatch", f"serial {serial} was VID:PID {seen}, now {identity}"))
+        return findings
+
+    def _finding(self, kind: str, detail: str) -> dict:
+        self.stats[kind] += 1
+        ANOMALIES.inc(kind)
+        return {"kind": kind, "detail": detail, "block": self.force_block}
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.stats, devices=len(self.recent), serials=len(self.identities),
+                        force_block=self.force_block)
@@ -0,0 +1,234 @@
+# core/archive.py
+# Columnar, compressed archive of the events table for long-term analytics. Needs NumPy.
+#
+# Layout (little-endian):
+#   header   MAGIC, u32 version
+#   blocks   up to `block_rows` events each; per column: u8 dtype code, u32 length, zlib data
+#   index    one INDEX_DTYPE record per block (offset, rows, min/max ts, first id/ts)
+#   meta     zlib JSON: column names, row count, string dictionaries
+#   trailer  u64 index offset, u64 block count, u64 meta offset, MAGIC
+#
+# id and ts are stored as deltas from the previous row (the first row of a block is
+# in the index), narrowed to the smallest integer type that holds them. String
+# columns are codes into one dictionary per column for the whole file; code 0 is
+# NULL. Stage timings are int32 with -1 for NULL. Archive memory-maps the file,
+# uses the index to skip blocks outside a time range, and returns NumPy arrays.
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"USBGARC1"
+VERSION = 1
+HEADER = struct.Struct("<8sI")
+TRAILER = struct.Struct("<QQQ8s")
+COLUMN = struct.Struct("<BI")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("rows", "<u4"), ("ts_min", "<i8"), ("ts_max", "<i8"),
+                        ("id_first", "<i8"), ("ts_first", "<i8")])
+
+DELTA_COLUMNS = ("id", "ts")
+STRING_COLUMNS = ("action", "decision", "model", "pnp_id", "vid", "pid", "serial", "note")
+STAGE_COLUMNS = ("detect_us", "decide_us", "enforce_us")
+COLUMNS = DELTA_COLUMNS + STRING_COLUMNS + STAGE_COLUMNS
+DTYPES = [np.dtype(t) for t in ("<i1", "<i2", "<i4", "<i8", "<u1", "<u2", "<u4")]
+
+SELECT_SQL = (f"SELECT id, ts, {', '.join(STRING_COLUMNS)}, "
+              + ", ".join(f"COALESCE({c}, -1)" for c in STAGE_COLUMNS)
+              + " FROM events")
+
+
+class _Dictionary(dict):
+    """value -> code, assigning the next code to unseen values; NULL is always 0."""
+
+    def __init__(self):
+        super().__init__({None: 0})
+        self.values = [None]
+
+    def __missing__(self, value):
+        code = self[value] = len(self.values)
+        self.values.append(value)
+        return code
+
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    """Signed or unsigned `values` as the smallest integer dtype of that kind that holds them."""
+    lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dt in DTYPES:
+        if dt.kind == values.dtype.kind and np.iinfo(dt).min <= lo and hi <= np.iinfo(dt).max:
+            return values.astype(dt, copy=False)
+    return values
+
+
+def _column(values: np.ndarray, level: int) -> bytes:
+    data = zlib.compress(values.tobytes(), level)
+    return COLUMN.pack(DTYPES.index(values.dtype), len(data)) + data
+
+
+def write_archive(conn: sqlite3.Connection, path: str, since: int | None = None, until: int | None = None,
+                  block_rows: int = 65536, level: int = 6, progress=None) -> dict:
+    """
+    Write events with since <= ts <= until (all by default) to `path` in id order.
+    The file is written to `path + ".part"` and renamed when complete.
+    progress(rows) is called after each block. Returns {"rows", "blocks", "bytes"}.
+    """
+    dicts = {c: _Dictionary() for c in STRING_COLUMNS}
+    index = []
+    rows_total = 0
+    tmp = path + ".part"
+    # no range: a plain rowid scan, already in id order (a ts range goes through idx_events_ts and a sort)
+    terms, params = [], []
+    if since is not None:
+        terms.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        terms.append("ts <= ?")
+        params.append(until)
+    where = f" WHERE {' AND '.join(terms)}" if terms else ""
+    cur = conn.execute(f"{SELECT_SQL}{where} ORDER BY id", params)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION))
+            while True:
+                rows = cur.fetchmany(block_rows)
+                if not rows:
+                    break
+                cols = list(zip(*rows))
+                n = len(rows)
+                ids = np.array(cols[0], dtype=np.int64)
+                ts = np.array(cols[1], dtype=np.int64)
+                index.append((f.tell(), n, ts.min(), ts.max(), ids[0], ts[0]))
+                parts = [_column(_narrow(np.diff(ids)), level), _column(_narrow(np.diff(ts)), level)]
+                for name, values in zip(STRING_COLUMNS, cols[2:2 + len(STRING_COLUMNS)]):
+                    codes = np.fromiter(map(dicts[name].__getitem__, values), dtype=np.uint32, count=n)
+                    parts.append(_column(_narrow(codes), level))
+                for values in cols[2 + len(STRING_COLUMNS):]:
+                    parts.append(_column(np.array(values, dtype=np.int64).clip(-1, 2 ** 31 - 1).astype("<i4"), level))
+                f.write(b"".join(parts))
+                rows_total += n
+                if progress:
+                    progress(rows_total)
+            index_offset = f.tell()
+            f.write(np.array(index, dtype=INDEX_DTYPE).tobytes())
+            meta_offset = f.tell()
+            meta = {"version": VERSION, "columns": COLUMNS, "rows": rows_total,
+                    "dicts": {c: d.values for c, d in dicts.items()}}
+            f.write(zlib.compress(json.dumps(meta).encode("utf-8"), level))
+            f.write(TRAILER.pack(index_offset, len(index), meta_offset, MAGIC))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return {"rows": rows_total, "blocks": len(index), "bytes": os.path.getsize(path)}
+
+
+class Archive:
+    """Read-only view of an archive file; scan() returns NumPy arrays of the rows in a time range."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self.mm) < HEADER.size + TRAILER.size or HEADER.unpack_from(self.mm, 0) != (MAGIC, VERSION):
+                raise ValueError(f"{path}: not a USB Guard event archive")
+            index_offset, blocks, meta_offset, magic = TRAILER.unpack_from(self.mm, len(self.mm) - TRAILER.size)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: truncated archive")
+            self.index = np.frombuffer(self.mm, INDEX_DTYPE, blocks, index_offset).copy()
+            meta = json.loads(zlib.decompress(self.mm[meta_offset:len(self.mm) - TRAILER.size]))
+        except BaseException:
+            self.close()
+            raise
+        self.rows = meta["rows"]
+        self.columns = tuple(meta["columns"])
+        self._dicts = meta["dicts"]
+        self._arrays = {}
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def dictionary(self, column: str) -> np.ndarray:
+        """Values of a string column as an object array; codes from scan() index into it (0 is None)."""
+        if column not in self._arrays:
+            self._arrays[column] = np.array(self._dicts[column], dtype=object)
+        return self._arrays[column]
+
+    def time_range(self) -> tuple:
+        if not len(self.index):
+            return None, None
+        return int(self.index["ts_min"].min()), int(self.index["ts_max"].max())
+
+    def blocks(self, since: int | None = None, until: int | None = None) -> np.ndarray:
+        """Numbers of the blocks that may hold rows with since <= ts <= until."""
+        keep = np.ones(len(self.index), dtype=bool)
+        if since is not None:
+            keep &= self.index["ts_max"] >= since
+        if until is not None:
+            keep &= self.index["ts_min"] <= until
+        return np.flatnonzero(keep)
+
+    def _read_block(self, b: int, wanted: set) -> dict:
+        entry = self.index[b]
+        pos = int(entry["offset"])
+        out = {}
+        for name in self.columns:
+            code, length = COLUMN.unpack_from(self.mm, pos)
+            pos += COLUMN.size
+            if name in wanted:
+                values = np.frombuffer(zlib.decompress(self.mm[pos:pos + length]), DTYPES[code])
+                if name in DELTA_COLUMNS:
+                    first = int(entry[f"{name}_first"])
+                    values = np.concatenate(([first], first + np.cumsum(values, dtype=np.int64)))
+                out[name] = values
+            pos += length
+        return out
+
+    def scan(self, columns=("ts", "decision"), since: int | None = None, until: int | None = None,
+             decode: bool = False) -> dict:
+        """
+        {column: array} for rows with since <= ts <= until, in id order. String columns are
+        uint32 codes into dictionary(column), or the strings themselves with decode=True.
+        Only the blocks that overlap the range are decompressed, and only the wanted columns.
+        """
+        unknown = set(columns) - set(self.columns)
+        if unknown:
+            raise ValueError(f"unknown columns: {sorted(unknown)}")
+        wanted = set(columns) | ({"ts"} if since is not None or until is not None else set())
+        parts = {c: [] for c in columns}
+        for b in self.blocks(since, until):
+            block = self._read_block(b, wanted)
+            entry = self.index[b]
+            mask = None
+            if (since is not None and entry["ts_min"] < since) or (until is not None and entry["ts_max"] > until):
+                ts = block["ts"]
+                mask = np.ones(len(ts), dtype=bool)
+                if since is not None:
+                    mask &= ts >= since
+                if until is not None:
+                    mask &= ts <= until
+            for c in columns:
+                parts[c].append(block[c] if mask is None else block[c][mask])
+        out = {}
+        for c in columns:
+            dtype = np.int64 if c in DELTA_COLUMNS else np.uint32 if c in STRING_COLUMNS else np.int32
+            values = np.concatenate(parts[c]).astype(dtype, copy=False) if parts[c] else np.zeros(0, dtype)
+            out[c] = self.dictionary(c)[values] if decode and c in STRING_COLUMNS else values
+        return out
+
+    def code(self, column: str, value) -> int | None:
+        """Code of `value` in a string column, or None if it never occurs (for filtering scanned codes)."""
+        try:
+            return self._dicts[column].index(value)
+        except ValueError:
+            return None
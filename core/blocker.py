@@ -1,6 +1,9 @@
 # core/blocker.py
 import subprocess
 import ctypes
+import time
+
+from core.metrics import POWERSHELL_SECONDS
 
 def is_admin() -> bool:
     """Return True if the current process has Administrator rights."""
@@ -20,12 +23,16 @@ def _run_powershell(cmd: str, timeout: int = 8):
     Run a short PowerShell command with safe defaults.
     Returns (returncode, stdout, stderr).
     """
-    completed = subprocess.run(
-        ["powershell.exe", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", cmd],
-        capture_output=True,
-        text=True,
-        timeout=timeout
-    )
+    t0 = time.perf_counter()
+    try:
+        completed = subprocess.run(
+            ["powershell.exe", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command", cmd],
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    finally:
+        POWERSHELL_SECONDS.observe(time.perf_counter() - t0)
     return completed.returncode, (completed.stdout or "").strip(), (completed.stderr or "").strip()
 
 def disable_device(instance_id: str):
@@ -63,3 +70,23 @@ def enable_device(instance_id: str):
     if code == 0 and "OK" in out:
         return True, "Device enabled."
     return False, (err or out or "Enable-PnpDevice failed.")
+
+
+class StubEnforcer:
+    """Stand-in for the PowerShell calls above that records them instead (tests, benchmarks, non-Windows runs)."""
+
+    def __init__(self, admin: bool = True, ok: bool = True):
+        self.admin = admin
+        self.ok = ok
+        self.calls = []
+
+    def is_admin(self) -> bool:
+        return self.admin
+
+    def disable_device(self, instance_id: str):
+        self.calls.append(("disable", instance_id))
+        return (True, "Device disabled.") if self.ok else (False, "stub failure")
+
+    def enable_device(self, instance_id: str):
+        self.calls.append(("enable", instance_id))
+        return (True, "Device enabled.") if self.ok else (False, "stub failure")
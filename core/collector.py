@@ -0,0 +1,191 @@
+# core/collector.py
+# Reference fleet collector: receives batches from core/shipper.py agents and
+# bulk-inserts them into one central SQLite database.
+#
+# POST /ingest   body: gzip JSON {"agent_id", "seq", "columns", "rows"}
+#                headers: X-Agent-Id, and the body's HMAC under that agent's key (core/signing.py)
+#   200 {"status": "ok", "rows": n}        applied
+#   200 {"status": "duplicate"}            seq already applied (resend after a lost ack)
+#
+# Rows are keyed on (agent_id, event_id) and inserted with OR IGNORE, so a batch
+# overlapping rows already stored (an agent that lost its shipper state and
+# re-cut its batches from the start) stores only its new rows, under any seq.
+#   401 {"error": "unauthorized"}          unknown agent or bad signature; nothing applied
+#   409 {"error": ..., "expected": n}      seq skips ahead; the agent must send n first
+# GET /stats     per-agent last seq and row counts
+#
+# Agents are enrolled with `collector.py --enroll AGENT_ID`, which prints the
+# credentials file the agent is started with (main.py --ship-credentials).
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.db import EVENT_COLUMNS
+from core.signing import SIGNATURE_HEADER, new_key, verify
+
+DEFAULT_COLLECTOR_DB = os.path.join("data", "fleet.db")
+MAX_BODY = 64 * 1024 * 1024
+
+
+class CollectorError(Exception):
+    def __init__(self, status: int, error: str, **extra):
+        super().__init__(error)
+        self.status = status
+        self.body = {"error": error, **extra}
+
+
+class Collector:
+    def __init__(self, path: str = DEFAULT_COLLECTOR_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS agents (
+                  agent_id  TEXT PRIMARY KEY,
+                  last_seq  INTEGER NOT NULL,
+                  rows      INTEGER NOT NULL DEFAULT 0,
+                  last_seen INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS fleet_events (
+                  agent_id TEXT NOT NULL,
+                  event_id INTEGER NOT NULL,
+                  ts       INTEGER NOT NULL,
+                  action   TEXT NOT NULL,
+                  decision TEXT NOT NULL,
+                  model    TEXT,
+                  serial   TEXT,
+                  vid      TEXT,
+                  pid      TEXT,
+                  pnp_id   TEXT,
+                  note     TEXT,
+                  PRIMARY KEY (agent_id, event_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_fleet_events_ts ON fleet_events(ts);
+                CREATE INDEX IF NOT EXISTS idx_fleet_events_serial ON fleet_events(serial, ts);
+                CREATE TABLE IF NOT EXISTS agent_keys (
+                  agent_id   TEXT PRIMARY KEY,
+                  key        TEXT NOT NULL,
+                  created_at INTEGER NOT NULL
+                );
+                """
+            )
+        cols = ("agent_id", "event_id") + EVENT_COLUMNS[1:]
+        self.insert_sql = f"INSERT OR IGNORE INTO fleet_events({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+
+    def enroll(self, agent_id: str) -> str:
+        """Create (or rotate) the signing key of agent_id and return it."""
+        key = new_key()
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO agent_keys(agent_id, key, created_at) VALUES (?, ?, ?)",
+                              (agent_id, key, int(time.time())))
+        return key
+
+    def authenticate(self, agent_id: str, body: bytes, signature: str | None):
+        """Raise CollectorError(401) unless body is signed with agent_id's key."""
+        with self.lock:
+            row = self.conn.execute("SELECT key FROM agent_keys WHERE agent_id = ?", (agent_id,)).fetchone()
+        if row is None or not verify(row[0], body, signature):
+            raise CollectorError(401, "unauthorized")
+
+    def ingest(self, doc: dict, agent_id: str | None = None) -> dict:
+        """
+        Apply one batch exactly once: rows and the agent's seq are committed together.
+        agent_id: the authenticated sender; the batch must be its own.
+        Rows already stored are skipped, also in a batch with an old seq.
+        """
+        try:
+            seq, columns, rows = int(doc["seq"]), doc["columns"], doc["rows"]
+            if agent_id is None:
+                agent_id = doc["agent_id"]
+            elif doc["agent_id"] != agent_id:
+                raise CollectorError(401, "unauthorized")
+        except (KeyError, TypeError, ValueError):
+            raise CollectorError(400, "malformed batch")
+        if tuple(columns) != EVENT_COLUMNS:
+            raise CollectorError(400, f"unexpected columns: {columns}")
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT last_seq FROM agents WHERE agent_id = ?", (agent_id,)).fetchone()
+            last = row[0] if row else 0
+            if seq > last + 1:
+                raise CollectorError(409, "sequence gap", expected=last + 1)
+            before = self.conn.total_changes
+            try:
+                self.conn.executemany(self.insert_sql, ((agent_id, *r) for r in rows))
+            except (sqlite3.Error, TypeError):
+                raise CollectorError(400, "malformed rows") from None  # rolled back with the seq
+            inserted = self.conn.total_changes - before
+            if seq <= last:
+                if inserted:
+                    self.conn.execute("UPDATE agents SET rows = rows + ?, last_seen = ? WHERE agent_id = ?",
+                                      (inserted, int(time.time()), agent_id))
+                return {"status": "duplicate"}
+            self.conn.execute(
+                """
+                INSERT INTO agents(agent_id, last_seq, rows, last_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT(agent_id) DO UPDATE SET last_seq = excluded.last_seq,
+                  rows = rows + excluded.rows, last_seen = excluded.last_seen
+                """,
+                (agent_id, seq, inserted, int(time.time())),
+            )
+        return {"status": "ok", "rows": inserted}
+
+    def stats(self) -> dict:
+        cur = self.conn.execute("SELECT agent_id, last_seq, rows, last_seen FROM agents ORDER BY agent_id")
+        return {a: {"last_seq": s, "rows": n, "last_seen": t} for a, s, n, t in cur.fetchall()}
+
+    def close(self):
+        self.conn.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != "/ingest":
+            return self._reply(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            return self._reply(413, {"error": "batch too large"})
+        body = self.rfile.read(length)
+        agent_id = self.headers.get("X-Agent-Id", "")
+        try:
+            self.server.collector.authenticate(agent_id, body, self.headers.get(SIGNATURE_HEADER))
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            result = self.server.collector.ingest(json.loads(body), agent_id)
+        except CollectorError as e:
+            return self._reply(e.status, e.body)
+        except (OSError, EOFError, ValueError):
+            return self._reply(400, {"error": "bad body"})
+        self._reply(200, result)
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, self.server.collector.stats())
+
+    def log_message(self, *args):
+        pass
+
+
+def make_server(collector: Collector, host: str = "127.0.0.1", port: int = 8740) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.collector = collector
+    return server
@@ -3,10 +3,26 @@ import os
 import time
 import sqlite3
 import threading
-import bcrypt  # make sure to install: pip install bcrypt
+
+from core.metrics import DB_COMMIT_SECONDS
 
 DEFAULT_DB_PATH = os.path.join("data", "usb_guard.db")
 
+# Columns indexed by the events full-text index (kept in sync by triggers).
+FTS_COLUMNS = ("model", "serial", "pnp_id", "note")
+
+# Column order returned by the whitelist query APIs.
+WHITELIST_COLUMNS = ("id", "label", "vid", "pid", "serial", "created_at")
+
+# Column order returned by the event query APIs.
+EVENT_COLUMNS = ("id", "ts", "action", "decision", "model", "serial", "vid", "pid", "pnp_id", "note")
+# Stage durations stored with each event by process_event (core/trace.py STORED_STAGES).
+STAGE_COLUMNS = ("detect_us", "decide_us", "enforce_us")
+
+# Stored in PRAGMA user_version once _migrate() has run; opening a current file skips it.
+# Bump whenever _migrate() changes.
+SCHEMA_VERSION = 3
+
 def _norm(x: str | None) -> str | None:
     if x is None:
         return None
@@ -14,13 +30,84 @@ def _norm(x: str | None) -> str | None:
     return x.upper() if x else None
 
 
+def _event_where(filters: dict | None):
+    """WHERE terms + params for the event filters shared by query_events/count_events."""
+    filters = filters or {}
+    where, params = [], []
+    if filters.get("since") is not None:
+        where.append("ts >= ?")
+        params.append(int(filters["since"]))
+    if filters.get("until") is not None:
+        where.append("ts <= ?")
+        params.append(int(filters["until"]))
+    for key in ("decision", "action"):
+        if filters.get(key):
+            where.append(f"{key} = ?")
+            params.append(filters[key])
+    for key in ("vid", "pid", "serial"):
+        value = _norm(filters.get(key))
+        if value:
+            where.append(f"{key} = ?")
+            params.append(value)
+    if filters.get("min_id") is not None:
+        where.append("id > ?")
+        params.append(int(filters["min_id"]))
+    return where, params
+
+
+def event_matches(row: dict, filters: dict | None) -> bool:
+    """True if an event row passes the same filters _event_where() applies in SQL."""
+    filters = filters or {}
+    if filters.get("since") is not None and row["ts"] < int(filters["since"]):
+        return False
+    if filters.get("until") is not None and row["ts"] > int(filters["until"]):
+        return False
+    for key in ("decision", "action"):
+        if filters.get(key) and row[key] != filters[key]:
+            return False
+    for key in ("vid", "pid", "serial"):
+        value = _norm(filters.get(key))
+        if value and _norm(row[key]) != value:
+            return False
+    if filters.get("min_id") is not None and row["id"] <= int(filters["min_id"]):
+        return False
+    return True
+
+
+def _like_prefix(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _whitelist_where(search: str | None, vid: str | None, pid: str | None):
+    """WHERE terms + params for query_whitelist/count_whitelist."""
+    where, params = [], []
+    search = (search or "").strip()
+    if search:
+        # label: LIKE prefix served by the NOCASE index; serial (stored upper-case): range scan.
+        # Written as an IN-subquery so both indexes are used even with ORDER BY id.
+        serial = search.upper()
+        where.append(
+            "id IN (SELECT id FROM whitelist WHERE label LIKE ? ESCAPE '\\'"
+            " UNION ALL SELECT id FROM whitelist WHERE serial >= ? AND serial < ?)"
+        )
+        params.extend((_like_prefix(search), serial, serial + "\uffff"))
+    for key, value in (("vid", vid), ("pid", pid)):
+        value = _norm(value)
+        if value:
+            where.append(f"{key} = ?")
+            params.append(value)
+    return where, params
+
+
 class DB:
     def __init__(self, path: str = DEFAULT_DB_PATH):
         os.makedirs(os.path.dirname(path), exist_ok=True)
         self.conn = sqlite3.connect(path, check_same_thread=False)
         self.conn.execute("PRAGMA journal_mode=WAL;")
         self.lock = threading.Lock()
-        self._migrate()
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version < SCHEMA_VERSION:
+            self._migrate()
 
     def _migrate(self):
         with self.lock, self.conn:
@@ -35,6 +122,8 @@ class DB:
                   created_at INTEGER
                 );
                 CREATE INDEX IF NOT EXISTS idx_whitelist_serial ON whitelist(serial);
+                CREATE INDEX IF NOT EXISTS idx_whitelist_vid_pid ON whitelist(vid, pid);
+                CREATE INDEX IF NOT EXISTS idx_whitelist_label ON whitelist(label COLLATE NOCASE);
 
                 CREATE TABLE IF NOT EXISTS events (
                   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -49,18 +138,108 @@ class DB:
                   note     TEXT
                 );
                 CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+                CREATE INDEX IF NOT EXISTS idx_events_decision_ts ON events(decision, ts);
+                CREATE INDEX IF NOT EXISTS idx_events_serial_ts ON events(serial, ts);
+                CREATE INDEX IF NOT EXISTS idx_events_vid_pid_ts ON events(vid, pid, ts);
+                CREATE INDEX IF NOT EXISTS idx_events_vid_ts ON events(vid, ts);
+                CREATE INDEX IF NOT EXISTS idx_events_pid_ts ON events(pid, ts);
+                CREATE INDEX IF NOT EXISTS idx_events_action_ts ON events(action, ts);
 
                 CREATE TABLE IF NOT EXISTS users (
                   id INTEGER PRIMARY KEY AUTOINCREMENT,
                   username TEXT UNIQUE NOT NULL,
                   password_hash BLOB NOT NULL
                 );
+
+                -- Small key/value counters shared by every process using the file.
+                CREATE TABLE IF NOT EXISTS meta (
+                  key   TEXT PRIMARY KEY,
+                  value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO meta(key, value) VALUES ('whitelist_version', 0);
+
+                -- Bump whitelist_version on any whitelist change so views and caches
+                -- can tell cheaply whether they are stale.
+                CREATE TRIGGER IF NOT EXISTS whitelist_version_ai AFTER INSERT ON whitelist BEGIN
+                  UPDATE meta SET value = value + 1 WHERE key = 'whitelist_version';
+                END;
+                CREATE TRIGGER IF NOT EXISTS whitelist_version_ad AFTER DELETE ON whitelist BEGIN
+                  UPDATE meta SET value = value + 1 WHERE key = 'whitelist_version';
+                END;
+                CREATE TRIGGER IF NOT EXISTS whitelist_version_au AFTER UPDATE ON whitelist BEGIN
+                  UPDATE meta SET value = value + 1 WHERE key = 'whitelist_version';
+                END;
                 """
             )
+            self._migrate_fts()
+            self._migrate_stage_columns()
+            self._migrate_whitelist_source()
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_fts(self):
+        """
+        Create the events_fts index (external-content FTS5 over events) and its
+        sync triggers. Uses the trigram tokenizer so substrings of serials and
+        InstanceIds match; falls back to unicode61 on older SQLite builds.
+        Caller must hold self.lock.
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='events_fts'"
+        ).fetchone()
+        if exists:
+            return
+        cols = ", ".join(FTS_COLUMNS)
+        try:
+            self.conn.execute(
+                f"CREATE VIRTUAL TABLE events_fts USING fts5({cols}, "
+                f"content='events', content_rowid='id', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            self.conn.execute(
+                f"CREATE VIRTUAL TABLE events_fts USING fts5({cols}, "
+                f"content='events', content_rowid='id')"
+            )
+        new_vals = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+        old_vals = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+        self.conn.executescript(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS events_fts_ai AFTER INSERT ON events BEGIN
+              INSERT INTO events_fts(rowid, {cols}) VALUES (new.id, {new_vals});
+            END;
+            CREATE TRIGGER IF NOT EXISTS events_fts_ad AFTER DELETE ON events BEGIN
+              INSERT INTO events_fts(events_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals});
+            END;
+            CREATE TRIGGER IF NOT EXISTS events_fts_au AFTER UPDATE ON events BEGIN
+              INSERT INTO events_fts(events_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals});
+              INSERT INTO events_fts(rowid, {cols}) VALUES (new.id, {new_vals});
+            END;
+            """
+        )
+        # Index any history logged before the FTS table existed. For a large history, one
+        # merge at the end ('optimize') is cheaper than the incremental merges FTS5 does as
+        # segments pile up, so those are off during the rebuild (4 is the FTS5 default).
+        self.conn.execute("INSERT INTO events_fts(events_fts, rank) VALUES ('automerge', 0)")
+        self.conn.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+        self.conn.execute("INSERT INTO events_fts(events_fts) VALUES ('optimize')")
+        self.conn.execute("INSERT INTO events_fts(events_fts, rank) VALUES ('automerge', 4)")
+
+    def _migrate_stage_columns(self):
+        """Per-stage latency columns on events (microseconds; see core/trace.py). Caller must hold self.lock."""
+        have = {row[1] for row in self.conn.execute("PRAGMA table_info(events)")}
+        for col in STAGE_COLUMNS:
+            if col not in have:
+                self.conn.execute(f"ALTER TABLE events ADD COLUMN {col} INTEGER")
+
+    def _migrate_whitelist_source(self):
+        """whitelist.source: 'policy' on rows applied by apply_policy, NULL on local ones. Caller must hold self.lock."""
+        have = {row[1] for row in self.conn.execute("PRAGMA table_info(whitelist)")}
+        if "source" not in have:
+            self.conn.execute("ALTER TABLE whitelist ADD COLUMN source TEXT")
 
     # ---------- User / Password ops ----------
     def add_user(self, username: str, password: str) -> bool:
         """Add a new user. Returns False if user exists."""
+        import bcrypt  # imported on first use: only the login path needs it
         pw_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
         try:
             with self.lock, self.conn:
@@ -72,6 +251,10 @@ class DB:
         except sqlite3.IntegrityError:
             return False  # username already exists
 
+    def count_users(self) -> int:
+        (n,) = self.conn.execute("SELECT COUNT(*) FROM users").fetchone()
+        return int(n or 0)
+
     def verify_user(self, username: str, password: str) -> bool:
         """Verify credentials."""
         cur = self.conn.cursor()
@@ -80,10 +263,12 @@ class DB:
         if not row:
             return False
         stored_hash = row[0]
+        import bcrypt
         return bcrypt.checkpw(password.encode(), stored_hash)
 
     def change_password(self, username: str, new_password: str) -> bool:
         """Change user password. Returns False if user not found."""
+        import bcrypt
         pw_hash = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt())
         with self.lock, self.conn:
             cur = self.conn.execute(
@@ -109,6 +294,112 @@ class DB:
     def whitelist_add_serial(self, label: str, serial: str):
         self.whitelist_add(label=label, vid=None, pid=None, serial=serial)
 
+    def whitelist_add_vendor(self, label: str, vid: str):
+        """Vendor-level rule: allows every device with this VID (stored with pid and serial NULL)."""
+        self.whitelist_add(label=label, vid=vid, pid=None, serial=None)
+
+    def whitelist_add_many(self, chunks) -> tuple[int, int]:
+        """
+        Bulk insert. `chunks` yields lists of (label, vid, pid, serial) tuples.
+        Each chunk is normalized column-wise, deduplicated against existing rows
+        and earlier input, and inserted with executemany -- all inside a single
+        transaction. Returns (inserted, duplicates).
+        """
+        now = int(time.time())
+        inserted = duplicates = 0
+        with self.lock, self.conn:
+            seen = set(self.conn.execute("SELECT vid, pid, serial FROM whitelist"))
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                labels, vids, pids, serials = zip(*chunk)
+                vids = map(_norm, vids)
+                pids = map(_norm, pids)
+                serials = map(_norm, serials)
+                batch = []
+                for label, key in zip(labels, zip(vids, pids, serials)):
+                    if key in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                    batch.append((label, *key, now))
+                self.conn.executemany(
+                    "INSERT INTO whitelist(label, vid, pid, serial, created_at) VALUES (?, ?, ?, ?, ?)",
+                    batch,
+                )
+                inserted += len(batch)
+        return inserted, duplicates
+
+    def apply_policy(self, upserts, deletes, version: int, full: bool = False,
+                     epoch: int = 0) -> tuple[int, int, int]:
+        """
+        Apply a policy delta in one transaction and record `version` and `epoch` as applied.
+        upserts: (label, vid, pid, serial) -- inserted, or relabelled if the key exists;
+        either way the row is marked as coming from the policy.
+        deletes: (vid, pid, serial) keys to remove.
+        full: upserts is the whole policy, so policy rows not in it are removed as well.
+        Entries added locally are left alone. Returns (inserted, updated, removed).
+        """
+        now = int(time.time())
+        ups = [(label, _norm(vid), _norm(pid), _norm(serial)) for label, vid, pid, serial in upserts]
+        dels = [(_norm(vid), _norm(pid), _norm(serial)) for vid, pid, serial in deletes]
+        with self.lock, self.conn:
+            removed = max(self.conn.executemany(
+                "DELETE FROM whitelist WHERE vid IS ? AND pid IS ? AND serial IS ?", dels
+            ).rowcount, 0)
+            if full:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS policy_keep(key TEXT PRIMARY KEY)")
+                self.conn.executemany("INSERT OR IGNORE INTO policy_keep(key) VALUES (?)",
+                                      ((f"{v or ''}|{p or ''}|{s or ''}",) for _l, v, p, s in ups))
+                removed += self.conn.execute(
+                    """
+                    DELETE FROM whitelist WHERE source = 'policy'
+                      AND COALESCE(vid, '') || '|' || COALESCE(pid, '') || '|' || COALESCE(serial, '')
+                          NOT IN (SELECT key FROM policy_keep)
+                    """
+                ).rowcount
+                self.conn.execute("DELETE FROM policy_keep")
+            updated = self.conn.executemany(
+                """
+                UPDATE whitelist SET label = ?, source = 'policy'
+                WHERE vid IS ? AND pid IS ? AND serial IS ? AND (label IS NOT ? OR source IS NOT 'policy')
+                """,
+                ((label, vid, pid, serial, label) for label, vid, pid, serial in ups),
+            ).rowcount
+            inserted = self.conn.executemany(
+                """
+                INSERT INTO whitelist(label, vid, pid, serial, created_at, source)
+                SELECT ?, ?, ?, ?, ?, 'policy'
+                WHERE NOT EXISTS (SELECT 1 FROM whitelist WHERE vid IS ? AND pid IS ? AND serial IS ?)
+                """,
+                ((label, vid, pid, serial, now, vid, pid, serial) for label, vid, pid, serial in ups),
+            ).rowcount
+            self.conn.executemany(
+                "INSERT INTO meta(key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (("policy_version", version), ("policy_epoch", epoch)),
+            )
+        return max(inserted, 0), max(updated, 0), removed
+
+    def policy_version(self) -> int:
+        """Last central policy version applied by apply_policy (0 = never synced)."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'policy_version'").fetchone()
+        return row[0] if row else 0
+
+    def policy_epoch(self) -> int:
+        """Epoch of the policy store that policy_version() came from (core/policy.py)."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'policy_epoch'").fetchone()
+        return row[0] if row else 0
+
+    def iter_whitelist(self, chunk_size: int = 5000):
+        """Yield (label, vid, pid, serial) for every whitelist row, in id order, without loading them all."""
+        cur = self.conn.cursor()
+        cur.execute("SELECT label, vid, pid, serial FROM whitelist ORDER BY id")
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield from rows
+
     def whitelist_remove(self, vid: str | None, pid: str | None, serial: str | None):
         vid = _norm(vid)
         pid = _norm(pid)
@@ -124,6 +415,8 @@ class DB:
                 )
             elif serial:
                 self.conn.execute("DELETE FROM whitelist WHERE serial = ?", (serial,))
+            elif vid:
+                self.conn.execute("DELETE FROM whitelist WHERE vid = ? AND pid IS NULL AND serial IS NULL", (vid,))
 
     def whitelist_contains(self, vid: str | None, pid: str | None, serial: str | None) -> bool:
         vid = _norm(vid)
@@ -135,14 +428,21 @@ class DB:
                     return False
                 cur = self.conn.execute("SELECT 1 FROM whitelist WHERE serial = ? LIMIT 1", (serial,))
                 return cur.fetchone() is not None
+            # exact device, or a vendor-level rule (whitelist_add_vendor); both via idx_whitelist_vid_pid.
+            # A serial-only entry (whitelist_add_serial) still matches: USBSTOR disks only gained
+            # VID/PID once the monitor resolved their parent USB device.
             cur = self.conn.execute(
                 """
                 SELECT 1
                 FROM whitelist
                 WHERE vid=? AND pid=? AND (serial = ? OR (serial IS NULL AND ? IS NULL))
+                UNION ALL
+                SELECT 1 FROM whitelist WHERE vid=? AND pid IS NULL AND serial IS NULL
+                UNION ALL
+                SELECT 1 FROM whitelist WHERE serial=? AND vid IS NULL AND pid IS NULL
                 LIMIT 1
                 """,
-                (vid, pid, serial, serial),
+                (vid, pid, serial, serial, vid, serial),
             )
             return cur.fetchone() is not None
 
@@ -158,38 +458,198 @@ class DB:
         serial: str | None,
         decision: str,
         note: str | None = None,
+        stages: dict | None = None,
     ):
+        """stages: {"detect": us, "decide": us, "enforce": us}, any subset, stored in STAGE_COLUMNS."""
+        stages = stages or {}
+        t0 = time.perf_counter()
         with self.lock, self.conn:
-            self.conn.execute(
+            cur = self.conn.execute(
                 """
-                INSERT INTO events(ts, action, model, pnp_id, vid, pid, serial, decision, note)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO events(ts, action, model, pnp_id, vid, pid, serial, decision, note,
+                                   detect_us, decide_us, enforce_us)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (int(ts), action, model, pnp_id, _norm(vid), _norm(pid), _norm(serial), decision, note),
+                (int(ts), action, model, pnp_id, _norm(vid), _norm(pid), _norm(serial), decision, note,
+                 stages.get("detect"), stages.get("decide"), stages.get("enforce")),
             )
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - t0)
+        return cur.lastrowid
+
+    def log_events(self, events: list) -> list:
+        """
+        log_event for many events in one transaction (one commit). Each item is a tuple of
+        log_event's arguments in order. Returns the new ids, in the same order.
+        """
+        t0 = time.perf_counter()
+        ids = []
+        with self.lock, self.conn:
+            for ts, action, model, pnp_id, vid, pid, serial, decision, note, stages in events:
+                stages = stages or {}
+                cur = self.conn.execute(
+                    """
+                    INSERT INTO events(ts, action, model, pnp_id, vid, pid, serial, decision, note,
+                                       detect_us, decide_us, enforce_us)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (int(ts), action, model, pnp_id, _norm(vid), _norm(pid), _norm(serial), decision, note,
+                     stages.get("detect"), stages.get("decide"), stages.get("enforce")),
+                )
+                ids.append(cur.lastrowid)
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - t0)
+        return ids
+
+    def stage_timings(self, limit: int = 10000) -> list:
+        """(decision, detect_us, decide_us, enforce_us) of the most recent traced inserts."""
+        cur = self.conn.execute(
+            """
+            SELECT decision, detect_us, decide_us, enforce_us FROM events
+            WHERE action = 'insert' AND decide_us IS NOT NULL
+            ORDER BY id DESC LIMIT ?
+            """,
+            (limit,),
+        )
+        return cur.fetchall()
+
+    def search_events(self, text: str, limit: int = 100, offset: int = 0):
+        """
+        Full-text search over model, serial, pnp_id and note.
+        Returns one page of matching events, best match first (bm25), then newest.
+        Terms shorter than 3 characters can't use the trigram index and fall back
+        to a LIKE scan.
+        """
+        text = (text or "").strip()
+        if not text:
+            return []
+        cols = ", ".join(f"e.{c}" for c in EVENT_COLUMNS)
+        cur = self.conn.cursor()
+        if len(text) >= 3:
+            match = '"' + text.replace('"', '""') + '"'
+            cur.execute(
+                f"""
+                SELECT {cols}
+                FROM events_fts f JOIN events e ON e.id = f.rowid
+                WHERE events_fts MATCH ?
+                ORDER BY f.rank, e.id DESC
+                LIMIT ? OFFSET ?
+                """,
+                (match, limit, offset),
+            )
+        else:
+            like = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where = " OR ".join(f"e.{c} LIKE ? ESCAPE '\\'" for c in FTS_COLUMNS)
+            cur.execute(
+                f"SELECT {cols} FROM events e WHERE {where} ORDER BY e.id DESC LIMIT ? OFFSET ?",
+                (*([like] * len(FTS_COLUMNS)), limit, offset),
+            )
+        return [dict(zip(EVENT_COLUMNS, r)) for r in cur.fetchall()]
+
+    def query_events(self, filters: dict | None = None, after_cursor: tuple | None = None, limit: int = 200):
+        """
+        One page of events, newest first, using keyset pagination on (ts, id).
+
+        filters (all optional): since, until (epoch seconds, inclusive),
+        decision, action, vid, pid, serial, min_id (only ids greater than this).
+        after_cursor: the cursor returned with the previous page, or None for the first page.
+        Returns (rows, next_cursor); next_cursor is None when there are no more rows.
+        Each page is an index range scan, so its cost doesn't grow with the table.
+        """
+        where, params = _event_where(filters)
+        if after_cursor is not None:
+            where.append("(ts, id) < (?, ?)")
+            params.extend(after_cursor)
+
+        query = f"SELECT {', '.join(EVENT_COLUMNS)} FROM events"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        cur = self.conn.cursor()
+        cur.execute(query, params)
+        rows = [dict(zip(EVENT_COLUMNS, r)) for r in cur.fetchall()]
+        next_cursor = (rows[-1]["ts"], rows[-1]["id"]) if len(rows) == limit else None
+        return rows, next_cursor
+
+    def events_after(self, after_id: int, limit: int = 1000) -> list:
+        """Up to `limit` event rows with id > after_id, oldest first, as tuples in EVENT_COLUMNS order."""
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT {', '.join(EVENT_COLUMNS)} FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit),
+        )
+        return cur.fetchall()
+
+    def count_events(self, filters: dict | None = None) -> int:
+        """Number of events matching the query_events filters (used for progress totals)."""
+        where, params = _event_where(filters)
+        query = "SELECT COUNT(*) FROM events"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        (n,) = self.conn.execute(query, params).fetchone()
+        return n
 
     def list_whitelist(self):
         cur = self.conn.cursor()
-        cur.execute("SELECT serial FROM whitelist")
+        cur.execute(f"SELECT {', '.join(WHITELIST_COLUMNS)} FROM whitelist")
         rows = cur.fetchall()
-        return [{"serial": row[0]} for row in rows]
+        return [dict(zip(WHITELIST_COLUMNS, row)) for row in rows]
+
+    def query_whitelist(
+        self,
+        search: str | None = None,
+        vid: str | None = None,
+        pid: str | None = None,
+        after_id: int = 0,
+        limit: int = 100,
+    ):
+        """
+        One page of whitelist entries in id order (keyset on id).
+        search: case-insensitive prefix of label or serial; vid/pid: exact match.
+        Returns (rows, next_after_id); next_after_id is None on the last page.
+        """
+        where, params = _whitelist_where(search, vid, pid)
+        where.append("id > ?")
+        params.append(after_id)
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT {', '.join(WHITELIST_COLUMNS)} FROM whitelist WHERE {' AND '.join(where)} ORDER BY id LIMIT ?",
+            (*params, limit),
+        )
+        rows = [dict(zip(WHITELIST_COLUMNS, r)) for r in cur.fetchall()]
+        return rows, (rows[-1]["id"] if len(rows) == limit else None)
+
+    def count_whitelist(self, search: str | None = None, vid: str | None = None, pid: str | None = None) -> int:
+        where, params = _whitelist_where(search, vid, pid)
+        query = "SELECT COUNT(*) FROM whitelist"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        (n,) = self.conn.execute(query, params).fetchone()
+        return n
+
+    def whitelist_remove_id(self, entry_id: int) -> bool:
+        """Remove one whitelist entry by primary key."""
+        with self.lock, self.conn:
+            cur = self.conn.execute("DELETE FROM whitelist WHERE id = ?", (entry_id,))
+        return cur.rowcount > 0
 
     def remove_whitelist(self, serial):
         cur = self.conn.cursor()
         cur.execute("DELETE FROM whitelist WHERE serial=?", (serial,))
         self.conn.commit()
 
-    def list_recent_blocked(self, since_minutes: int = 60, limit: int = 100):
+    def list_recent_blocked(self, since_minutes: int = 60, limit: int = 100, after_id: int = 0):
+        """Blocked inserts from the last `since_minutes`, newest first; only ids > after_id."""
         cur = self.conn.cursor()
         cur.execute(
             """
-            SELECT ts, model, pnp_id, vid, pid, serial, note
+            SELECT ts, model, pnp_id, vid, pid, serial, note, id
             FROM events
-            WHERE action='insert' AND decision='blocked' AND ts >= strftime('%s','now') - ?
+            WHERE action='insert' AND decision='blocked' AND ts >= strftime('%s','now') - ? AND id > ?
             ORDER BY id DESC
             LIMIT ?
             """,
-            (since_minutes * 60, limit),
+            (since_minutes * 60, after_id, limit),
         )
         rows = cur.fetchall()
         return [
@@ -201,6 +661,22 @@ class DB:
                 "pid": r[4],
                 "serial": r[5],
                 "note": r[6],
+                "id": r[7],
             }
             for r in rows
         ]
+
+    # ---------- Change detection ----------
+    def data_version(self) -> tuple:
+        """
+        Token that changes whenever the database content may have changed.
+        PRAGMA data_version only moves for commits from *other* connections, so it
+        is paired with this connection's own total_changes.
+        """
+        (v,) = self.conn.execute("PRAGMA data_version").fetchone()
+        return v, self.conn.total_changes
+
+    def whitelist_version(self) -> int:
+        """Counter bumped by triggers on every whitelist insert/update/delete."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'whitelist_version'").fetchone()
+        return row[0] if row else 0
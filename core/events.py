@@ -0,0 +1,109 @@
+# core/events.py
+# In-process publish/subscribe for decided USB events.
+#
+# process_event() publishes one record per event; the agent forwards them to
+# IPC subscribers and GUIs render from them. Every subscriber has its own
+# bounded buffer: when it is full the oldest record is dropped, so a slow
+# reader never blocks the publisher. Each record carries a bus-wide "seq";
+# a gap in seq tells the reader it missed something and should re-read the DB.
+import collections
+import itertools
+import threading
+import time
+
+from core.db import _norm
+
+DEFAULT_BUFFER = 1000
+
+
+def event_record(evt: dict, decision: str, note: str, event_id: int | None) -> dict:
+    """The published form of a decided event: the events row (core.db.EVENT_COLUMNS) plus kind and detection time."""
+    row = {
+        "id": event_id,
+        "ts": int(evt["timestamp"]),
+        "action": evt["action"],
+        "decision": decision,
+        "model": evt.get("model"),
+        "serial": _norm(evt.get("serial")),
+        "vid": _norm(evt.get("vid")),
+        "pid": _norm(evt.get("pid")),
+        "pnp_id": evt.get("pnp_id"),
+        "note": note,
+    }
+    # float time the monitor saw the device; lets viewers measure insert-to-screen latency
+    row["kind"] = "event"
+    row["detected_at"] = float(evt["timestamp"])
+    if evt.get("anomalies"):
+        row["anomalies"] = evt["anomalies"]  # core/anomaly.py findings; alert sinks forward these at high priority
+    return row
+
+
+class Subscription:
+    """Bounded drop-oldest buffer. Also usable on its own (e.g. as an IPC on_event callback target)."""
+
+    def __init__(self, maxsize: int = DEFAULT_BUFFER, bus=None):
+        self.buf = collections.deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+        self.bus = bus
+
+    def put(self, record: dict):
+        with self.cond:
+            if self.closed:
+                return
+            if len(self.buf) == self.buf.maxlen:
+                self.dropped += 1
+            self.buf.append(record)
+            self.cond.notify()
+
+    def get(self, timeout: float | None = None):
+        """Next record, or None on timeout or once closed."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.buf or self.closed, timeout):
+                return None
+            return self.buf.popleft() if self.buf else None
+
+    def drain(self) -> list:
+        """All buffered records, oldest first, without waiting."""
+        with self.cond:
+            records = list(self.buf)
+            self.buf.clear()
+            return records
+
+    def close(self):
+        if self.bus is not None:
+            self.bus.unsubscribe(self)
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class EventBus:
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.seq = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, maxsize: int = DEFAULT_BUFFER) -> Subscription:
+        sub = Subscription(maxsize, bus=self)
+        with self.lock:
+            self.subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self.lock:
+            if sub in self.subscribers:
+                self.subscribers.remove(sub)
+
+    def publish(self, record: dict) -> dict:
+        """Stamp seq/published_at and hand the record to every subscriber. Never blocks on readers."""
+        record["published_at"] = time.time()
+        # under the lock so every subscriber sees records in seq order; put() only appends
+        with self.lock:
+            record["seq"] = next(self.seq)
+            self.published += 1
+            for sub in self.subscribers:
+                sub.put(record)
+        return record
@@ -0,0 +1,96 @@
+# core/export.py
+import csv
+import gzip
+import json
+import os
+from datetime import datetime
+
+from core.db import DB
+
+FORMATS = ("csv", "jsonl", "csv.gz", "jsonl.gz")
+
+CSV_HEADER = ["Timestamp", "Action", "Decision", "Model", "Serial", "VID", "PID", "InstanceId", "Note"]
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def format_for_path(path: str) -> str:
+    """Guess the export format from the file name (defaults to csv)."""
+    name = path.lower()
+    for fmt in sorted(FORMATS, key=len, reverse=True):
+        if name.endswith("." + fmt):
+            return fmt
+    if name.endswith(".json"):
+        return "jsonl"
+    return "csv"
+
+
+def iter_event_chunks(db: DB, filters: dict | None = None, chunk_size: int = 5000):
+    """Yield lists of event dicts, newest first, one keyset page at a time."""
+    cursor = None
+    while True:
+        rows, cursor = db.query_events(filters, cursor, limit=chunk_size)
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+
+def export_events(
+    db: DB,
+    path: str,
+    fmt: str | None = None,
+    filters: dict | None = None,
+    chunk_size: int = 5000,
+    progress=None,
+    cancelled=None,
+) -> int:
+    """
+    Stream events matching `filters` (same keys as DB.query_events) to `path`
+    as csv, jsonl, csv.gz or jsonl.gz. Memory use is one chunk regardless of
+    table size. The file is written to `path + ".part"` and renamed when complete.
+
+    progress(done, total) is called after each chunk; cancelled() is polled
+    between chunks and aborts with ExportCancelled (the partial file is removed).
+    Returns the number of rows written.
+    """
+    fmt = fmt or format_for_path(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    total = db.count_events(filters) if progress else 0
+
+    tmp = path + ".part"
+    opener = gzip.open if fmt.endswith(".gz") else open
+    done = 0
+    try:
+        with opener(tmp, "wt", newline="", encoding="utf-8") as f:
+            if fmt.startswith("csv"):
+                writer = csv.writer(f)
+                writer.writerow(CSV_HEADER)
+            for rows in iter_event_chunks(db, filters, chunk_size):
+                if cancelled and cancelled():
+                    raise ExportCancelled()
+                if fmt.startswith("csv"):
+                    writer.writerows(
+                        (fmt_ts(r["ts"]), r["action"], r["decision"], r["model"], r["serial"],
+                         r["vid"], r["pid"], r["pnp_id"], r["note"])
+                        for r in rows
+                    )
+                else:
+                    f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+                done += len(rows)
+                if progress:
+                    progress(done, total)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return done
+
+
+def fmt_ts(ts) -> str:
+    """Local-time "YYYY-MM-DD HH:MM:SS" for an epoch timestamp (export files and the GUI tables)."""
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
@@ -1,61 +1,118 @@
 # core/guardian.py
+import logging
+
 from core.db import DB
-from core.notifier import notify
-from core.blocker import is_admin, disable_device, enable_device
+from core.notifier import Notifier, default_notifier
+from core import blocker
+from core.events import EventBus, event_record
+from core.metrics import ENFORCEMENT, EVENTS
+from core.trace import Trace
+
+log = logging.getLogger("usb_guard.guardian")
+
+def decide(evt: dict, whitelisted: bool):
+    """(decision, reason) for an insert, given whether the device is on the whitelist."""
+    # findings from core.anomaly.AnomalyDetector, attached by the agent before this runs
+    anomalies = evt.get("anomalies") or ()
+    overridden = whitelisted and any(a.get("block") for a in anomalies)
+    if whitelisted and not overridden:
+        return "allowed", "on whitelist"
+    return "blocked", "on whitelist but anomalous" if overridden else "not on whitelist"
+
+
+def enforce(enforcer, decision: str, reason: str, pnp_id: str | None, anomalies=None):
+    """Disable (blocked) or re-enable (allowed) the device. Returns (note, enforced: bool | None)."""
+    enforced = None
+    if decision == "blocked":
+        if enforcer.is_admin():
+            ok, msg = enforcer.disable_device(pnp_id)
+            enforced = ok
+            ENFORCEMENT.inc("disable", "ok" if ok else "failed")
+            note = f"{reason}; {'disabled' if ok else 'disable failed: ' + msg}"
+        else:
+            note = f"{reason}; NOT disabled (needs admin)"
+    else:
+        # Best-effort enable
+        if enforcer.is_admin():
+            ok, msg = enforcer.enable_device(pnp_id)
+            enforced = ok
+            ENFORCEMENT.inc("enable", "ok" if ok else "failed")
+            note = f"on whitelist; {'enabled' if ok else 'enable attempt: ' + msg}"
+        else:
+            note = "on whitelist"
+    if anomalies:
+        note += "; ANOMALY: " + "; ".join(a["detail"] for a in anomalies)
+    return note, enforced
 
-def process_event(evt: dict, db: DB):
+
+def log_decision(evt: dict, decision: str, note: str, event_id, enforced, stages: dict):
+    """The structured INFO record for a handled event (see core/log.py)."""
+    if not log.isEnabledFor(logging.INFO):
+        return
+    vid, pid, serial, model = evt.get("vid"), evt.get("pid"), evt.get("serial"), evt.get("model")
+    key = f"VID:{vid} PID:{pid}" if (vid and pid) else "SERIAL-ONLY"
+    log.info(
+        "[%s] %s | %s S/N:%s -> %s (%s)",
+        evt["action"].upper(), model or "Unknown Model", key, serial or "—", decision.upper(), note,
+        extra={"fields": {
+            "event_id": event_id, "action": evt["action"], "decision": decision, "note": note,
+            "enforced": enforced, "model": model, "vid": vid, "pid": pid, "serial": serial,
+            "pnp_id": evt.get("pnp_id"), "event_ts": evt["timestamp"], "stages_us": stages,
+        }},
+    )
+
+
+def process_event(evt: dict, db: DB, bus: EventBus | None = None, notifier: Notifier | None = None,
+                  enforcer=None):
     """
-    Decide + enforce + log + notify.
-    Returns a dict with decision and note.
+    Decide + enforce + log + publish (to bus, if given) + notify.
+    enforcer provides is_admin/disable_device/enable_device (default: core.blocker, i.e. PowerShell;
+    core.blocker.StubEnforcer stands in for it off Windows).
+    Toasts are queued on notifier (default: core.notifier.default_notifier()), never shown inline;
+    the structured log record (see core/log.py) is queued the same way.
+    Returns a dict with decision, note, the logged event id and the stage durations
+    (stages_us, see core/trace.py; the trace starts at evt["trace_ns"] if the monitor set it).
+    core/runtime.py runs the same steps as an asyncio pipeline.
     """
     action = evt["action"]
-    model = evt.get("model")
-    pnp_id = evt.get("pnp_id")
-    vid = evt.get("vid")
-    pid = evt.get("pid")
-    serial = evt.get("serial")
+    trace = Trace(evt.get("trace_ns"))
+    if "trace_ns" in evt:
+        trace.mark("detect")
+    enforced = None
 
     if action == "insert":
-        whitelisted = db.whitelist_contains(vid, pid, serial)
-        decision = "allowed" if whitelisted else "blocked"
-
-        if decision == "blocked":
-            if is_admin():
-                ok, msg = disable_device(pnp_id)
-                note = f"not on whitelist; {'disabled' if ok else 'disable failed: ' + msg}"
-            else:
-                note = "not on whitelist; NOT disabled (needs admin)"
-        else:
-            # Best-effort enable
-            if is_admin():
-                ok, msg = enable_device(pnp_id)
-                note = f"on whitelist; {'enabled' if ok else 'enable attempt: ' + msg}"
-            else:
-                note = "on whitelist"
+        whitelisted = db.whitelist_contains(evt.get("vid"), evt.get("pid"), evt.get("serial"))
+        decision, reason = decide(evt, whitelisted)
+        trace.mark("decide")
+        note, enforced = enforce(enforcer or blocker, decision, reason, evt.get("pnp_id"), evt.get("anomalies"))
+        trace.mark("enforce")
     else:
         decision = "observe"
         note = "device removed"
 
-    db.log_event(
+    event_id = db.log_event(
         ts=evt["timestamp"],
         action=action,
-        model=model,
-        pnp_id=pnp_id,
-        vid=vid,
-        pid=pid,
-        serial=serial,
+        model=evt.get("model"),
+        pnp_id=evt.get("pnp_id"),
+        vid=evt.get("vid"),
+        pid=evt.get("pid"),
+        serial=evt.get("serial"),
         decision=decision,
         note=note,
+        stages=trace.spans,
     )
+    trace.mark("log")
+    EVENTS.inc(action, decision)
 
-    # Console + toast
-    key = f"VID:{vid} PID:{pid}" if (vid and pid) else "SERIAL-ONLY"
-    serial_str = serial or "—"
-    print(f"[{action.upper()}] {model or 'Unknown Model'} | {key} S/N:{serial_str} -> {decision.upper()} ({note})")
+    if bus is not None:
+        bus.publish(event_record(evt, decision, note, event_id))
+        trace.mark("publish")
 
-    if action == "insert":
-        notify(f"USB {decision.upper()}", f"{model or 'Unknown'}\n{key} S/N:{serial_str}\n{note}", duration=7)
-    elif action == "remove":
-        notify("USB Removed", f"{model or 'Unknown'}\nS/N:{serial_str}", duration=4)
+    if action in ("insert", "remove"):
+        (notifier or default_notifier()).device_event(evt, decision, note)
+        trace.mark("notify")
+    stages = trace.finish(blocked=decision == "blocked")
+    log_decision(evt, decision, note, event_id, enforced, stages)
 
-    return {"decision": decision, "note": note}
+    return {"decision": decision, "note": note, "id": event_id, "stages_us": stages}
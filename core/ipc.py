@@ -0,0 +1,323 @@
+# core/ipc.py
+# Local IPC between the agent and its clients (GUIs, CLI tools).
+#
+# Wire format: one JSON object per line over a stream socket.
+#   request   {"id": 1, "op": "query_events", "args": {...}}
+#   response  {"id": 1, "ok": true, "result": ...}  or  {"id": 1, "ok": false, "error": "..."}
+#   push      {"event": {...}}   (only on connections that sent op "subscribe"; records from core/events.py)
+# The first request on every connection must be {"op": "hello", "args": {"token": ...}}.
+#
+# Transport: a Unix socket (<runtime_dir>/agent.sock, mode 0600) where available,
+# otherwise TCP on 127.0.0.1 with an ephemeral port written to <runtime_dir>/agent.port.
+# The token and port files are readable by the agent's user only: mode 0600, and on
+# Windows (which ignores the mode) an ACL granting just that user and SYSTEM.
+import itertools
+import json
+import os
+import secrets
+import socket
+import socketserver
+import subprocess
+import threading
+
+from core.events import EventBus
+
+SOCK_NAME = "agent.sock"
+PORT_NAME = "agent.port"
+TOKEN_NAME = "agent.token"
+SUBSCRIBER_QUEUE = 1000
+
+
+class IpcError(Exception):
+    pass
+
+
+class AgentUnavailable(IpcError):
+    """No agent is listening, or the connection to it broke."""
+
+
+def default_transport() -> str:
+    return "unix" if hasattr(socket, "AF_UNIX") and os.name != "nt" else "tcp"
+
+
+def _send(wfile, lock, obj):
+    data = (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
+    with lock:
+        wfile.write(data)
+        wfile.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+        self.events = None
+
+    def handle(self):
+        server: IpcServer = self.server.ipc
+        authed = False
+        for line in self.rfile:
+            try:
+                msg = json.loads(line)
+                op, args, msg_id = msg.get("op"), msg.get("args") or {}, msg.get("id")
+            except (ValueError, AttributeError):
+                return
+            if not authed:
+                if op != "hello" or not secrets.compare_digest(str(args.get("token", "")), server.token):
+                    _send(self.wfile, self.write_lock, {"id": msg_id, "ok": False, "error": "unauthorized"})
+                    return
+                authed = True
+                _send(self.wfile, self.write_lock, {"id": msg_id, "ok": True, "result": "hello"})
+                continue
+            if op == "subscribe":
+                self._start_stream(server)
+                _send(self.wfile, self.write_lock, {"id": msg_id, "ok": True, "result": "subscribed"})
+                continue
+            try:
+                result = server.handler(op, args)
+                reply = {"id": msg_id, "ok": True, "result": result}
+            except Exception as e:
+                reply = {"id": msg_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+            try:
+                _send(self.wfile, self.write_lock, reply)
+            except OSError:
+                return
+
+    def _start_stream(self, server):
+        if self.events is not None:
+            return
+        self.events = server._subscribe()
+        threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pump(self):
+        # dedicated writer so a slow client never blocks whoever publishes
+        while True:
+            evt = self.events.get()
+            if evt is None:
+                return
+            try:
+                _send(self.wfile, self.write_lock, {"event": evt})
+            except OSError:
+                return
+
+    def finish(self):
+        if self.events is not None:
+            self.server.ipc._unsubscribe(self.events)
+        super().finish()
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class IpcServer:
+    """
+    Serves handler(op, args) -> result for authenticated local clients and
+    streams everything published on `bus` to subscribers. Each subscriber
+    has a bounded drop-oldest buffer (core/events.py), so a slow client only
+    loses its own oldest events.
+    """
+
+    def __init__(self, handler, runtime_dir: str, transport: str | None = None, bus: EventBus | None = None):
+        self.handler = handler
+        self.runtime_dir = runtime_dir
+        self.transport = transport or default_transport()
+        self.bus = bus or EventBus()
+        self.token = secrets.token_hex(16)
+        self.subscribers = []
+        self.sub_lock = threading.Lock()
+        self.closed_dropped = 0
+        self.server = None
+
+    def start(self):
+        os.makedirs(self.runtime_dir, exist_ok=True)
+        _write_private(os.path.join(self.runtime_dir, TOKEN_NAME), self.token)
+        if self.transport == "unix":
+            path = os.path.join(self.runtime_dir, SOCK_NAME)
+            if os.path.exists(path):
+                os.remove(path)  # stale socket; the instance lock guarantees we own it
+            old_umask = os.umask(0o177)
+            try:
+                self.server = _ThreadingUnixServer(path, _Handler)
+            finally:
+                os.umask(old_umask)
+        else:
+            self.server = _ThreadingTCPServer(("127.0.0.1", 0), _Handler)
+            _write_private(os.path.join(self.runtime_dir, PORT_NAME), str(self.server.server_address[1]))
+        self.server.ipc = self
+        threading.Thread(target=self.server.serve_forever, name="ipc-server", daemon=True).start()
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        with self.sub_lock:
+            subs = list(self.subscribers)
+        for sub in subs:
+            self._unsubscribe(sub)
+        for name in (SOCK_NAME, PORT_NAME, TOKEN_NAME):
+            try:
+                os.remove(os.path.join(self.runtime_dir, name))
+            except OSError:
+                pass
+        self.server = None
+
+    @property
+    def dropped(self) -> int:
+        """Events dropped for slow subscribers since start."""
+        with self.sub_lock:
+            return self.closed_dropped + sum(sub.dropped for sub in self.subscribers)
+
+    def _subscribe(self):
+        sub = self.bus.subscribe(SUBSCRIBER_QUEUE)
+        with self.sub_lock:
+            self.subscribers.append(sub)
+        return sub
+
+    def _unsubscribe(self, sub):
+        sub.close()  # wakes the pump thread with None
+        with self.sub_lock:
+            if sub in self.subscribers:
+                self.subscribers.remove(sub)
+                self.closed_dropped += sub.dropped
+
+
+def _write_private(path: str, text: str):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        if os.name == "nt":
+            _restrict_to_owner(path)  # before anything secret is in the file
+        f.write(text)
+
+
+def _restrict_to_owner(path: str):
+    """Replace the file's inherited ACL with full control for the current user and SYSTEM only."""
+    user = os.environ["USERNAME"]
+    if os.environ.get("USERDOMAIN"):
+        user = f"{os.environ['USERDOMAIN']}\\{user}"
+    try:
+        subprocess.run(["icacls", path, "/inheritance:r", "/grant:r", f"{user}:F", "*S-1-5-18:F"],
+                       capture_output=True, text=True, timeout=10, check=True)
+    except (OSError, subprocess.SubprocessError) as e:
+        raise IpcError(f"cannot restrict access to {path}: {e}") from e
+
+
+class IpcClient:
+    """
+    Client for IpcServer. call() is thread-safe: each thread gets its own
+    connection, so concurrent GUI workers don't queue behind each other.
+    """
+
+    def __init__(self, runtime_dir: str, timeout: float = 30.0):
+        self.runtime_dir = runtime_dir
+        self.timeout = timeout
+        self._local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _address(self):
+        sock_path = os.path.join(self.runtime_dir, SOCK_NAME)
+        if default_transport() == "unix" and os.path.exists(sock_path):
+            return socket.AF_UNIX, sock_path
+        port_path = os.path.join(self.runtime_dir, PORT_NAME)
+        try:
+            with open(port_path) as f:
+                return socket.AF_INET, ("127.0.0.1", int(f.read().strip()))
+        except (OSError, ValueError):
+            raise AgentUnavailable("agent is not running")
+
+    def _open(self):
+        family, address = self._address()
+        try:
+            with open(os.path.join(self.runtime_dir, TOKEN_NAME)) as f:
+                token = f.read().strip()
+        except OSError:
+            raise AgentUnavailable("agent is not running")
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError as e:
+            sock.close()
+            raise AgentUnavailable(f"cannot connect to agent: {e}")
+        conn = (sock, sock.makefile("rb"), sock.makefile("wb"), threading.Lock())
+        self._request(conn, "hello", {"token": token})
+        with self._conns_lock:
+            self._conns.append(conn)
+        return conn
+
+    def _request(self, conn, op, args):
+        sock, rfile, wfile, lock = conn
+        msg_id = next(self._ids)
+        try:
+            _send(wfile, lock, {"id": msg_id, "op": op, "args": args})
+            while True:
+                line = rfile.readline()
+                if not line:
+                    raise AgentUnavailable("agent closed the connection")
+                reply = json.loads(line)
+                if reply.get("id") == msg_id:
+                    break
+        except OSError as e:
+            raise AgentUnavailable(f"agent connection failed: {e}")
+        if not reply.get("ok"):
+            raise IpcError(reply.get("error", "request failed"))
+        return reply.get("result")
+
+    def call(self, op: str, **args):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        try:
+            return self._request(conn, op, args)
+        except AgentUnavailable:
+            self._local.conn = None  # reconnect on the next call
+            raise
+
+    def subscribe(self, on_event):
+        """
+        Open a dedicated connection and call on_event(evt) from a background
+        thread for every pushed event. Returns the thread; it exits when the
+        agent goes away or close() is called.
+        """
+        conn = self._open()
+        self._request(conn, "subscribe", {})
+        sock, rfile = conn[0], conn[1]
+        sock.settimeout(None)
+
+        def reader():
+            try:
+                for line in rfile:
+                    msg = json.loads(line)
+                    if "event" in msg:
+                        on_event(msg["event"])
+            except (OSError, ValueError):
+                pass
+
+        t = threading.Thread(target=reader, name="ipc-subscriber", daemon=True)
+        t.start()
+        return t
+
+    def close(self):
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for sock, rfile, wfile, _ in conns:
+            # shut down first: it wakes a subscriber thread blocked reading rfile,
+            # which would otherwise hold rfile's lock and block close()
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            for f in (rfile, wfile):
+                try:
+                    f.close()
+                except OSError:
+                    pass
+            sock.close()
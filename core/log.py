@@ -0,0 +1,118 @@
+# core/log.py
+# Structured logging for the agent. Modules log to "usb_guard.*" loggers with
+# their fields in extra={"fields": {...}}. setup_logging() routes them through a
+# bounded queue to a writer thread, so the caller (e.g. the USB watcher thread)
+# never waits on disk or console I/O. Files get one JSON object per line and are
+# rotated by size; the console keeps the familiar one-line text.
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+LOGGER_NAME = "usb_guard"
+DEFAULT_LOG_PATH = os.path.join("data", "logs", "usb_guard.log")
+
+_listener = None
+_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg and the record's `fields`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        doc.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # render the message in the caller so args are not shared with the writer thread;
+        # `fields` stays a dict for JsonFormatter
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # wait for room rather than lose the stop signal
+
+
+def setup_logging(path: str | None = DEFAULT_LOG_PATH, level: str = "INFO", max_bytes: int = 10 * 1024 * 1024,
+                  backups: int = 5, console: bool = True, max_queue: int = 10000):
+    """
+    Configure the "usb_guard" logger. path=None: no log file. Safe to call again
+    (the previous writer thread is flushed and replaced). Returns the queue handler.
+    """
+    global _listener, _handler
+    shutdown_logging()
+    targets = []
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                            encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        targets.append(file_handler)
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter("%(message)s"))
+        targets.append(stream)
+    q = queue.Queue(max_queue)
+    _handler = DroppingQueueHandler(q)
+    _listener = _Listener(q, *targets, respect_handler_level=True)
+    _listener.start()
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.addHandler(_handler)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    return _handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener, _handler
+    if _listener is None:
+        return
+    logging.getLogger(LOGGER_NAME).removeHandler(_handler)
+    _listener.stop()
+    for h in _listener.handlers:
+        h.close()
+    _listener = _handler = None
+
+
+def set_level(level: str | None = None) -> str:
+    """Change the level at runtime (e.g. "DEBUG"). Returns the level now in effect."""
+    logger = logging.getLogger(LOGGER_NAME)
+    if level:
+        logger.setLevel(level.upper())
+    return logging.getLevelName(logger.getEffectiveLevel())
+
+
+def stats() -> dict:
+    return {
+        "level": set_level(),
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
+
@@ -0,0 +1,263 @@
+# core/metrics.py
+# Agent metrics in the Prometheus text exposition format (version 0.0.4).
+#
+# Hot-path updates (process_event, DB.log_event, PowerShell calls) are one
+# uncontended per-metric lock around a dict update. Everything that is a
+# reading of some other object's state -- queue depths, whitelist size, the
+# trace histograms -- is a callback evaluated only when scraped.
+#
+# Served by MetricsExporter on http://127.0.0.1:PORT/metrics, and/or written
+# atomically every `interval` seconds to a node_exporter textfile-collector path.
+import bisect
+import logging
+import os
+import threading
+
+log = logging.getLogger("usb_guard.metrics")
+
+# seconds; PowerShell spawns take 100s of ms, commits a few ms
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_esc(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        self.fn = None
+
+    def set_function(self, fn):
+        """Read the value at scrape time: fn() returns a number, or {label values tuple: number}."""
+        self.fn = fn
+        return self
+
+    def samples(self):
+        if self.fn is not None:
+            v = self.fn()
+            items = v.items() if isinstance(v, dict) else [((), v)]
+        else:
+            with self.lock:
+                items = list(self.values.items())
+        return [(self.name, _labels(self.labelnames, k), v) for k, v in sorted(items, key=lambda kv: kv[0])]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{n}{lbl} {_fmt(v)}" for n, lbl, v in self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        return self.values.get(labels, 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self.lock:
+            items = [(k, (list(c), s, n)) for k, (c, s, n) in self.values.items()]
+        out = []
+        for key, (counts, total, n) in sorted(items):
+            cum = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cum += c
+                out.append((f"{self.name}_bucket", _labels(self.labelnames, key, [("le", _fmt(bound))]), cum))
+            out.append((f"{self.name}_sum", _labels(self.labelnames, key), total))
+            out.append((f"{self.name}_count", _labels(self.labelnames, key), n))
+        return out
+
+
+class Summary(_Metric):
+    """Callback-only: fn() returns {label values tuple: {"count", "sum", quantile: value}}."""
+    kind = "summary"
+
+    def samples(self):
+        out = []
+        for key, s in sorted((self.fn() if self.fn else {}).items()):
+            for q in sorted(k for k in s if isinstance(k, float)):
+                out.append((self.name, _labels(self.labelnames, key, [("quantile", _fmt(q))]), s[q]))
+            out.append((f"{self.name}_sum", _labels(self.labelnames, key), s["sum"]))
+            out.append((f"{self.name}_count", _labels(self.labelnames, key), s["count"]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _get(self, cls, name, help, labels=(), **kw):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labels, **kw)
+            return metric
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels=()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def summary(self, name: str, help: str, labels=()) -> Summary:
+        return self._get(Summary, name, help, labels)
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        parts = []
+        for m in metrics:
+            try:
+                parts.append(m.render())
+            except Exception:
+                # a callback whose owner has gone away; skip it rather than fail the scrape
+                log.debug("metric %s not rendered", m.name, exc_info=True)
+                continue
+        return "\n".join(parts) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------- hot-path metrics ----------
+EVENTS = REGISTRY.counter("usbguard_events_total", "Device events handled, by action and decision.",
+                          ("action", "decision"))
+ENFORCEMENT = REGISTRY.counter("usbguard_enforcement_total", "Disable/enable attempts, by operation and result.",
+                               ("op", "result"))
+POWERSHELL_SECONDS = REGISTRY.histogram("usbguard_powershell_seconds", "Wall time of PowerShell invocations.")
+DB_COMMIT_SECONDS = REGISTRY.histogram("usbguard_db_commit_seconds",
+                                       "Time to insert and commit one event row, or one batch of them (runtime).")
+ANOMALIES = REGISTRY.counter("usbguard_anomalies_total", "Suspicious insert patterns detected (core/anomaly.py), by kind.",
+                             ("kind",))
+
+
+def _http_server(host: str, port: int, registry: Registry):
+    """A ThreadingHTTPServer for /metrics. http.server is imported here, so agents without --metrics-port never load it."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = self.server.registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.registry = registry
+    return server
+
+
+class MetricsExporter:
+    """
+    port: serve /metrics on host:port (port=0 picks a free one; see .port).
+    textfile: also rewrite this *.prom file every `interval` seconds.
+    """
+
+    def __init__(self, port: int | None = None, textfile: str | None = None, host: str = "127.0.0.1",
+                 interval: float = 15.0, registry: Registry = REGISTRY):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.textfile = textfile
+        self.interval = interval
+        self.server = None
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def start(self):
+        if self.port is not None:
+            self.server = _http_server(self.host, self.port, self.registry)
+            self.port = self.server.server_address[1]
+            self.threads.append(threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True))
+        if self.textfile:
+            self.write_textfile()
+            self.threads.append(threading.Thread(target=self._write_loop, name="metrics-textfile", daemon=True))
+        for t in self.threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for t in self.threads:
+            t.join(5)
+        self.threads = []
+
+    def write_textfile(self):
+        """Write atomically, as the textfile collector may read at any moment."""
+        os.makedirs(os.path.dirname(self.textfile) or ".", exist_ok=True)
+        tmp = f"{self.textfile}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.registry.render())
+        os.replace(tmp, self.textfile)
+
+    def _write_loop(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.write_textfile()
+            except OSError:
+                pass
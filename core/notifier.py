@@ -1,16 +1,282 @@
 # core/notifier.py
-from plyer import notification
+# Desktop toasts for device events.
+#
+# notify() shows one toast synchronously through plyer. Event code goes through a
+# Notifier instead: submitting never blocks, and a worker thread coalesces bursts
+# ("5 devices blocked in 2 s"), rate-limits per device and globally, and can
+# suppress removal toasts before calling the backend.
+import logging
+import queue
+import threading
+import time
+
+log = logging.getLogger("usb_guard.notifier")
 
 def notify(title: str, message: str, duration: int = 5):
     """
     Show a desktop notification using plyer.
     duration ignored on Windows (handled by OS).
+    Errors propagate; Notifier logs them on usb_guard.notifier.
+    """
+    from plyer import notification  # imported on the first toast, not at startup
+    notification.notify(
+        title=title,
+        message=message,
+        timeout=duration
+    )
+
+
+class CountingBackend:
+    """Stand-in for notify() that records calls instead of showing toasts (tests, benchmarks, headless runs)."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay  # simulate a slow toast API
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, title: str, message: str, duration: int = 5):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((title, message, duration))
+
+    @property
+    def count(self) -> int:
+        with self.lock:
+            return len(self.calls)
+
+
+class Toast:
+    __slots__ = ("group", "device", "label", "title", "message", "duration", "at")
+
+    def __init__(self, group, device, label, title, message, duration, at=0.0):
+        self.group = group        # "blocked", "allowed", "anomalous" or "removed"; bursts are summarised per group
+        self.device = device      # per-device rate limit key
+        self.label = label        # short device description for summaries
+        self.title = title
+        self.message = message
+        self.duration = duration
+        self.at = at
+
+
+def device_toast(evt: dict, decision: str, note: str) -> Toast:
+    """The toast process_event has always shown for an event."""
+    model, vid, pid, serial = evt.get("model"), evt.get("vid"), evt.get("pid"), evt.get("serial")
+    key = f"VID:{vid} PID:{pid}" if (vid and pid) else "SERIAL-ONLY"
+    serial_str = serial or "—"
+    device = evt.get("pnp_id") or serial or key
+    if evt["action"] == "insert" and evt.get("anomalies"):
+        # summarised apart from plain blocks so an attack is not lost in "5 devices blocked"
+        return Toast("anomalous", device, model or "Unknown", f"USB ANOMALY ({decision.upper()})",
+                     f"{model or 'Unknown'}\n{key} S/N:{serial_str}\n{note}", 10)
+    if evt["action"] == "insert":
+        return Toast(decision, device, model or "Unknown", f"USB {decision.upper()}",
+                     f"{model or 'Unknown'}\n{key} S/N:{serial_str}\n{note}", 7)
+    return Toast("removed", device, model or "Unknown", "USB Removed",
+                 f"{model or 'Unknown'}\nS/N:{serial_str}", 4)
+
+
+class Coalescer:
+    """
+    Clock-driven rate limiting and aggregation; no threads, so it can be tested with a fake clock.
+
+    The first toast after a quiet period is due at once. Toasts arriving in the following
+    `window` seconds are held and then shown as one summary per group, and the window
+    repeats while the flood lasts. A device toasting again (same group) within
+    `device_interval` seconds is dropped. Across all toasts at most `burst` are shown at once,
+    refilled at `rate` per second; the excess is counted in the next toast shown.
+    """
+
+    SUMMARY_LABELS = 3
+
+    def __init__(self, window: float = 2.0, device_interval: float = 30.0, rate: float = 0.5,
+                 burst: int = 3, show_removals: bool = True):
+        self.window = window
+        self.device_interval = device_interval
+        self.rate = rate
+        self.burst = burst
+        self.show_removals = show_removals
+        self.pending = []
+        self.window_end = None
+        self.last_by_device = {}
+        self.tokens = float(burst)
+        self.refilled_at = None
+        self.held = 0
+        self.stats = {"offered": 0, "shown": 0, "coalesced": 0, "suppressed_device": 0,
+                      "suppressed_removal": 0, "rate_limited": 0}
+
+    def offer(self, toast: Toast, now: float):
+        self.stats["offered"] += 1
+        if toast.group == "removed" and not self.show_removals:
+            self.stats["suppressed_removal"] += 1
+            return
+        key = (toast.group, toast.device)
+        last = self.last_by_device.get(key)
+        if last is not None and now - last < self.device_interval:
+            self.stats["suppressed_device"] += 1
+            return
+        self.last_by_device[key] = now
+        if len(self.last_by_device) > 10000:
+            self._prune(now)
+        toast.at = now
+        self.pending.append(toast)
+        if self.window_end is None:
+            self.window_end = now
+
+    def deadline(self):
+        """Monotonic time the next due() call can return something, or None if nothing is pending."""
+        return self.window_end if self.pending else None
+
+    def due(self, now: float) -> list:
+        """(title, message, duration) tuples to show now."""
+        if self.window_end is None or now < self.window_end:
+            return []
+        if not self.pending:
+            self.window_end = None  # quiet for a whole window; the next toast goes out at once
+            return []
+        items, self.pending = self.pending, []
+        self.window_end = now + self.window
+        return self._limit(self._summarize(items), now)
+
+    def _summarize(self, items):
+        groups = {}
+        for t in items:
+            groups.setdefault(t.group, []).append(t)
+        out = []
+        for group, ts in groups.items():
+            if len(ts) == 1:
+                out.append([ts[0].title, ts[0].message, ts[0].duration])
+                continue
+            self.stats["coalesced"] += len(ts) - 1
+            span = ts[-1].at - ts[0].at
+            labels = ", ".join(t.label for t in ts[:self.SUMMARY_LABELS])
+            if len(ts) > self.SUMMARY_LABELS:
+                labels += f" and {len(ts) - self.SUMMARY_LABELS} more"
+            out.append([f"USB {group.upper()} ×{len(ts)}",
+                        f"{len(ts)} devices {group} in {max(span, 1.0):.0f} s\n{labels}",
+                        max(t.duration for t in ts)])
+        return out
+
+    def _limit(self, toasts, now):
+        if self.refilled_at is not None:
+            self.tokens = min(float(self.burst), self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        shown = []
+        for title, message, duration in toasts:
+            if self.tokens < 1.0:
+                self.stats["rate_limited"] += 1
+                self.held += 1
+                continue
+            self.tokens -= 1.0
+            if self.held:
+                message += f"\n(+{self.held} more notifications suppressed)"
+                self.held = 0
+            shown.append((title, message, duration))
+        self.stats["shown"] += len(shown)
+        return shown
+
+    def _prune(self, now):
+        cutoff = now - self.device_interval
+        self.last_by_device = {k: v for k, v in self.last_by_device.items() if v >= cutoff}
+
+
+class Notifier:
+    """
+    Asynchronous toast dispatcher: submit() queues and returns, a worker thread runs the
+    Coalescer and calls backend(title, message, duration). Options go to Coalescer.
     """
-    try:
-        notification.notify(
-            title=title,
-            message=message,
-            timeout=duration
-        )
-    except Exception as e:
-        print(f"[Notifier Error] {e}")
+
+    def __init__(self, backend=None, max_queue: int = 1000, clock=time.monotonic, **options):
+        self.backend = backend or notify
+        self.clock = clock
+        self.coalescer = Coalescer(**options)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """Flush what is due and stop the worker."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout)
+            self.thread = None
+
+    def submit(self, toast: Toast) -> bool:
+        try:
+            self.queue.put_nowait(toast)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def device_event(self, evt: dict, decision: str, note: str) -> bool:
+        return self.submit(device_toast(evt, decision, note))
+
+    def stats(self) -> dict:
+        return dict(self.coalescer.stats, dropped=self.dropped, queued=self.queue.qsize())
+
+    def _run(self):
+        while True:
+            deadline = self.coalescer.deadline()
+            timeout = None if deadline is None else max(0.0, deadline - self.clock())
+            try:
+                batch = [self.queue.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            # take everything that queued up while the backend was busy before deciding
+            while batch and batch[-1] is not None:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for toast in batch:
+                if toast is not None:
+                    self.coalescer.offer(toast, self.clock())
+            if batch and batch[-1] is None:
+                # final flush: show whatever is held, ignoring the window
+                if self.coalescer.window_end is not None:
+                    self.coalescer.window_end = self.clock()
+                self._show(self.coalescer.due(self.clock()))
+                return
+            self._show(self.coalescer.due(self.clock()))
+
+    def _show(self, toasts):
+        for title, message, duration in toasts:
+            try:
+                self.backend(title, message, duration)
+            except Exception as e:
+                log.warning("[Notifier Error] %s", e)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_notifier() -> Notifier:
+    """The process-wide Notifier (plyer backend, default limits), started on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Notifier().start()
+        return _default
+
+
+def current() -> Notifier | None:
+    """The process-wide Notifier if one has been started, without starting it."""
+    return _default
+
+
+def configure(**options) -> Notifier:
+    """Replace the process-wide Notifier, e.g. configure(show_removals=False)."""
+    global _default
+    with _default_lock:
+        old, _default = _default, Notifier(**options).start()
+    if old is not None:
+        old.stop()
+    return _default
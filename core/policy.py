@@ -0,0 +1,367 @@
+# core/policy.py
+# Central whitelist policy: a versioned store on the policy server and the
+# agent-side client that keeps a machine's local whitelist in sync with it.
+#
+# Every edit on the server bumps the policy version; each entry remembers the
+# version that last touched it, and removals are kept as tombstones. Each version
+# also gets a random epoch, so (version, epoch) names one point in one store's
+# history: a store that was reset or restored from a backup reuses version
+# numbers but not epochs. An agent polls with the version and epoch it last
+# applied and gets back only what changed since, or a full snapshot if the store
+# doesn't have that (version, epoch). Agents remove policy entries missing from a
+# full snapshot (core/db.py DB.apply_policy).
+#
+# GET  /policy?since=N&epoch=E&agent=ID&nonce=R
+#   304                                    already at the current version; signed over
+#                                          not_modified_body(request path), so it can't be forged
+#                                          or replayed (the agent's nonce is new every poll)
+#   200 gzip JSON {"version", "epoch", "full", "upserts": [[label, vid, pid, serial]],
+#                  "deletes": [[vid, pid, serial]], "request": {"since", "epoch"}}
+# POST /ack      body: {"agent_id", "version"}   agent applied `version`
+# GET  /acks     per-agent applied version
+#
+# Requests (path and query for GET, body for POST) and response bodies are signed
+# with a key shared by the server and its agents (core/signing.py); anything
+# unsigned or badly signed is refused with 401 / discarded by the agent.
+import gzip
+import json
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.db import DB, _norm
+from core.signing import SIGNATURE_HEADER, new_key, sign, verify
+
+DEFAULT_POLICY_DB = os.path.join("data", "policy.db")
+DEFAULT_KEY_FILE = os.path.join("data", "policy.key")  # agent side
+
+
+def _key(vid, pid, serial) -> str:
+    return f"{vid or ''}|{pid or ''}|{serial or ''}"
+
+
+def not_modified_body(path: str) -> bytes:
+    """What a 304 reply to the GET of `path` (path and query) is signed over."""
+    return b"304 " + path.encode("utf-8")
+
+
+class PolicyStore:
+    def __init__(self, path: str = DEFAULT_POLICY_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS policy_whitelist (
+                  key     TEXT PRIMARY KEY,
+                  label   TEXT,
+                  vid     TEXT,
+                  pid     TEXT,
+                  serial  TEXT,
+                  version INTEGER NOT NULL,
+                  deleted INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_policy_whitelist_version ON policy_whitelist(version);
+                CREATE TABLE IF NOT EXISTS policy_meta (
+                  key   TEXT PRIMARY KEY,
+                  value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO policy_meta(key, value) VALUES ('version', 0);
+                CREATE TABLE IF NOT EXISTS policy_epochs (
+                  version INTEGER PRIMARY KEY,
+                  epoch   INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS policy_secrets (
+                  name  TEXT PRIMARY KEY,
+                  value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS policy_acks (
+                  agent_id TEXT PRIMARY KEY,
+                  version  INTEGER NOT NULL,
+                  acked_at INTEGER NOT NULL
+                );
+                """
+            )
+
+    def version(self) -> int:
+        return self.conn.execute("SELECT value FROM policy_meta WHERE key = 'version'").fetchone()[0]
+
+    def epoch(self, version: int) -> int:
+        """Epoch recorded for `version` (0 if this store never had it)."""
+        row = self.conn.execute("SELECT epoch FROM policy_epochs WHERE version = ?", (version,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self) -> int:
+        version = self.version() + 1
+        self.conn.execute("UPDATE policy_meta SET value = ? WHERE key = 'version'", (version,))
+        self.conn.execute("INSERT OR REPLACE INTO policy_epochs(version, epoch) VALUES (?, ?)",
+                          (version, secrets.randbelow(2 ** 62) + 1))
+        return version
+
+    def signing_key(self, rotate: bool = False) -> str:
+        """The key agents must share (created on first use; rotate=True replaces it)."""
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT value FROM policy_secrets WHERE name = 'signing_key'").fetchone()
+            if row is None or rotate:
+                key = new_key()
+                self.conn.execute("INSERT OR REPLACE INTO policy_secrets(name, value) VALUES ('signing_key', ?)",
+                                  (key,))
+                return key
+        return row[0]
+
+    # ---------- edits ----------
+    def put_many(self, entries) -> int:
+        """Add or relabel (label, vid, pid, serial) entries as one new version. Returns the version."""
+        rows = []
+        for label, vid, pid, serial in entries:
+            vid, pid, serial = _norm(vid), _norm(pid), _norm(serial)
+            rows.append((_key(vid, pid, serial), label, vid, pid, serial))
+        with self.lock, self.conn:
+            version = self._bump()
+            self.conn.executemany(
+                """
+                INSERT INTO policy_whitelist(key, label, vid, pid, serial, version, deleted)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                ON CONFLICT(key) DO UPDATE SET label = excluded.label, version = excluded.version, deleted = 0
+                """,
+                ((*r, version) for r in rows),
+            )
+        return version
+
+    def put(self, label: str, vid: str | None, pid: str | None, serial: str | None) -> int:
+        return self.put_many([(label, vid, pid, serial)])
+
+    def remove(self, vid: str | None, pid: str | None, serial: str | None) -> int | None:
+        """Tombstone one entry as a new version. Returns the version, or None if it wasn't there."""
+        key = _key(_norm(vid), _norm(pid), _norm(serial))
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT 1 FROM policy_whitelist WHERE key = ? AND deleted = 0", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            version = self._bump()
+            self.conn.execute(
+                "UPDATE policy_whitelist SET deleted = 1, version = ? WHERE key = ?", (version, key)
+            )
+        return version
+
+    # ---------- sync ----------
+    def changes_since(self, since: int, epoch: int = 0) -> dict | None:
+        """
+        Delta for an agent at version `since` of epoch `epoch`, or None if it is current.
+        An agent that never synced, or whose (since, epoch) this store doesn't have (it
+        was reset or restored), gets a full snapshot of live entries instead.
+        """
+        with self.lock:
+            version = self.version()
+            known = self.epoch(since) == epoch  # version 0 (nothing yet) has epoch 0 everywhere
+            if known and since == version:
+                return None
+            full = since <= 0 or not known
+            if full:
+                cur = self.conn.execute(
+                    "SELECT label, vid, pid, serial, deleted FROM policy_whitelist WHERE deleted = 0"
+                )
+            else:
+                cur = self.conn.execute(
+                    "SELECT label, vid, pid, serial, deleted FROM policy_whitelist WHERE version > ?", (since,)
+                )
+            upserts, deletes = [], []
+            for label, vid, pid, serial, deleted in cur:
+                if deleted:
+                    deletes.append([vid, pid, serial])
+                else:
+                    upserts.append([label, vid, pid, serial])
+            current = self.epoch(version)
+        return {"version": version, "epoch": current, "full": full, "upserts": upserts, "deletes": deletes,
+                "request": {"since": since, "epoch": epoch}}
+
+    def ack(self, agent_id: str, version: int):
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO policy_acks(agent_id, version, acked_at) VALUES (?, ?, ?)
+                ON CONFLICT(agent_id) DO UPDATE SET version = excluded.version, acked_at = excluded.acked_at
+                """,
+                (agent_id, int(version), int(time.time())),
+            )
+
+    def acks(self) -> dict:
+        cur = self.conn.execute("SELECT agent_id, version, acked_at FROM policy_acks ORDER BY agent_id")
+        return {a: {"version": v, "acked_at": t} for a, v, t in cur.fetchall()}
+
+    def close(self):
+        self.conn.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, body: dict | None = None):
+        data = gzip.compress(json.dumps(body, separators=(",", ":")).encode("utf-8")) if body is not None else b""
+        self.send_response(status)
+        if data:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header(SIGNATURE_HEADER, sign(self.server.key, data))
+        elif status == 304:
+            self.send_header(SIGNATURE_HEADER, sign(self.server.key, not_modified_body(self.path)))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not verify(self.server.key, self.path.encode("utf-8"), self.headers.get(SIGNATURE_HEADER)):
+            return self._reply(401, {"error": "unauthorized"})
+        url = urllib.parse.urlsplit(self.path)
+        store = self.server.store
+        if url.path == "/acks":
+            return self._reply(200, store.acks())
+        if url.path != "/policy":
+            return self._reply(404, {"error": "not found"})
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            since = int(query.get("since", ["0"])[0])
+            epoch = int(query.get("epoch", ["0"])[0])
+        except ValueError:
+            return self._reply(400, {"error": "bad since"})
+        delta = store.changes_since(since, epoch)
+        if delta is None:
+            return self._reply(304)
+        self._reply(200, delta)
+
+    def do_POST(self):
+        if self.path != "/ack":
+            return self._reply(404, {"error": "not found"})
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not verify(self.server.key, body, self.headers.get(SIGNATURE_HEADER)):
+            return self._reply(401, {"error": "unauthorized"})
+        try:
+            doc = json.loads(body)
+            self.server.store.ack(str(doc["agent_id"]), int(doc["version"]))
+        except (KeyError, TypeError, ValueError):
+            return self._reply(400, {"error": "bad ack"})
+        self._reply(200, {"status": "ok"})
+
+    def log_message(self, *args):
+        pass
+
+
+def make_server(store: PolicyStore, host: str = "127.0.0.1", port: int = 8741) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.store = store
+    server.key = store.signing_key()
+    return server
+
+
+class PolicySync:
+    """
+    Agent side: poll server_url for changes since db.policy_version(), apply them
+    to the local whitelist in one transaction and acknowledge the version.
+    key: the server's signing key (`policy_server.py key`); responses that are not
+    signed with it, or that answer a different request, are discarded.
+
+    on_change() is called after a delta was applied (the agent uses it to tell
+    subscribers the whitelist changed).
+    """
+
+    def __init__(self, db: DB, server_url: str, key: str, agent_id: str | None = None, interval: float = 60.0,
+                 timeout: float = 30.0, on_change=None):
+        self.db = db
+        self.url = server_url.rstrip("/")
+        self.key = key
+        self.agent_id = agent_id or socket.gethostname()
+        self.interval = interval
+        self.timeout = timeout
+        self.on_change = on_change
+        self.stopped = threading.Event()
+        self.thread = None
+        self.last_error = None
+        self.stats = {"polls": 0, "not_modified": 0, "applied": 0, "bytes": 0, "errors": 0}
+
+    def _request(self, path: str, data: bytes | None = None) -> tuple[int, bytes]:
+        """(status, body) of a signed request; ValueError if a reply (body, or a 304) isn't signed with our key."""
+        req = urllib.request.Request(self.url + path, data=data, method="POST" if data is not None else "GET",
+                                     headers={SIGNATURE_HEADER: sign(self.key, data if data is not None
+                                                                     else path.encode("utf-8"))})
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                body = resp.read()
+                if not verify(self.key, body, resp.headers.get(SIGNATURE_HEADER)):
+                    raise ValueError("policy server reply is not signed with our key")
+                return resp.status, body
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            if data is not None or not verify(self.key, not_modified_body(path), e.headers.get(SIGNATURE_HEADER)):
+                raise ValueError("policy server 304 is not signed for this request") from None
+            return 304, b""
+
+    def sync_once(self) -> dict:
+        """
+        One conditional poll. Returns {"status": "current"} or
+        {"status": "applied", "version", "full", "inserted", "updated", "removed", "bytes"}.
+        Raises OSError/ValueError if the server is unreachable or replies badly.
+        """
+        since, epoch = self.db.policy_version(), self.db.policy_epoch()
+        query = urllib.parse.urlencode({"since": since, "epoch": epoch, "agent": self.agent_id,
+                                        "nonce": secrets.token_hex(8)})
+        self.stats["polls"] += 1
+        status, body = self._request(f"/policy?{query}")
+        self.stats["bytes"] += len(body)
+        if status == 304:
+            self.stats["not_modified"] += 1
+            return {"status": "current", "version": since}
+        delta = json.loads(gzip.decompress(body))
+        if delta.get("request") != {"since": since, "epoch": epoch}:
+            raise ValueError("policy reply answers a different request")  # replayed
+        inserted, updated, removed = self.db.apply_policy(delta["upserts"], delta["deletes"], delta["version"],
+                                                          full=delta["full"], epoch=delta["epoch"])
+        self.stats["applied"] += 1
+        ack = json.dumps({"agent_id": self.agent_id, "version": delta["version"]}).encode("utf-8")
+        self._request("/ack", ack)
+        if self.on_change is not None and (inserted or updated or removed):
+            self.on_change()
+        return {"status": "applied", "version": delta["version"], "full": delta["full"], "inserted": inserted,
+                "updated": updated, "removed": removed, "bytes": len(body)}
+
+    def run_once(self):
+        try:
+            return self.sync_once()
+        except (OSError, ValueError, KeyError) as e:
+            self.stats["errors"] += 1
+            self.last_error = str(e)
+            return None
+
+    # ---------- background ----------
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name="policy-sync", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.run_once()
+            self.stopped.wait(self.interval)
@@ -0,0 +1,212 @@
+# core/profiling.py
+# On-demand CPU and memory profiling of the running agent (driven by
+# agent_profile.py over IPC). Nothing is hooked while idle: the agent's entry
+# points check one attribute, and tracemalloc is only running between
+# mem_start() and mem_stop().
+#
+# CPU, for N seconds, dumped to <out_dir>/cpu-<time>.*:
+#   "cprofile"  deterministic, per thread, for agent requests and events (.prof, pstats format);
+#               with core/runtime.py, events are covered through its executor calls
+#   "sample"    every thread's stack every `interval` seconds (.folded, flamegraph input)
+# Memory: tracemalloc snapshots; each mem_snapshot()/mem_stop() writes the top
+# allocation growth since mem_start() to <out_dir>/mem-<time>.txt.
+# cProfile and pstats are imported on first capture, keeping them off agent startup.
+import collections
+import glob
+import io
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+DEFAULT_PROFILE_DIR = os.path.join("data", "profiles")
+TOP = 40
+
+
+def _stamp() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+
+
+class Profiler:
+    def __init__(self, out_dir: str = DEFAULT_PROFILE_DIR):
+        self.out_dir = out_dir
+        self.lock = threading.Lock()
+        self.active = False  # checked by call() on every request: the only cost while idle
+        self.mode = None
+        self.until = None
+        self.stopped = threading.Event()
+        self.thread = None
+        self.profiles = []
+        self.local = threading.local()
+        self.mem_baseline = None
+
+    # ---------- CPU ----------
+    def call(self, fn, *args, **kwargs):
+        """Run fn, under this thread's cProfile while a "cprofile" capture is on."""
+        if not self.active or self.mode != "cprofile":
+            return fn(*args, **kwargs)
+        import cProfile
+        prof = getattr(self.local, "prof", None)
+        if prof is None or prof not in self.profiles:
+            prof = self.local.prof = cProfile.Profile()
+            with self.lock:
+                self.profiles.append(prof)
+        if getattr(self.local, "depth", 0):
+            return fn(*args, **kwargs)  # already inside a profiled call on this thread
+        self.local.depth = 1
+        prof.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            prof.disable()
+            self.local.depth = 0
+
+    def cpu(self, seconds: float = 10.0, mode: str = "cprofile", interval: float = 0.005) -> dict:
+        """Start a capture in the background. Returns {"path", "until"}; the file appears when it ends."""
+        if mode not in ("cprofile", "sample"):
+            raise ValueError(f"unknown profiling mode: {mode}")
+        with self.lock:
+            if self.active:
+                raise RuntimeError(f"a {self.mode} capture is already running")
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = os.path.join(self.out_dir, f"cpu-{_stamp()}" + (".prof" if mode == "cprofile" else ".folded"))
+            self.mode, self.until, self.profiles = mode, time.time() + seconds, []
+            self.stopped.clear()
+            self.active = True
+        target = self._sample if mode == "sample" else self._wait
+        self.thread = threading.Thread(target=target, args=(seconds, interval, path), name="profiler", daemon=True)
+        self.thread.start()
+        return {"path": path, "until": self.until}
+
+    def stop(self):
+        """End a running CPU capture early (it is still written)."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(10)
+            self.thread = None
+
+    def _wait(self, seconds, interval, path):
+        import cProfile
+        import pstats
+        self.stopped.wait(seconds)
+        self.active = False
+        with self.lock:
+            profiles, self.profiles = self.profiles, []
+        stats = None
+        for prof in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(prof)
+                else:
+                    stats.add(prof)
+            except TypeError:
+                continue  # a thread that never got to run anything
+        if stats is None:
+            stats = pstats.Stats(cProfile.Profile())
+        stats.dump_stats(path)
+        self.mode = None
+
+    def _sample(self, seconds, interval, path):
+        me = threading.get_ident()
+        names = {}
+        stacks = collections.Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self.stopped.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                parts.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(parts))] += 1
+        self.active = False
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for stack, n in stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        os.replace(path + ".tmp", path)
+        self.mode = None
+
+    # ---------- memory ----------
+    def mem_start(self, frames: int = 5) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.mem_baseline = tracemalloc.take_snapshot()
+        return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+    def mem_snapshot(self) -> dict:
+        """Write the top allocation growth since mem_start(). Returns {"path", "traced", "peak"}."""
+        if not tracemalloc.is_tracing() or self.mem_baseline is None:
+            raise RuntimeError("memory tracing is off; start it first")
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"mem-{_stamp()}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"traced {current / 1024:,.0f} KiB now, peak {peak / 1024:,.0f} KiB\n")
+            f.write(f"top {TOP} allocation sites by growth since tracing started:\n\n")
+            for stat in snap.compare_to(self.mem_baseline, "traceback")[:TOP]:
+                f.write(f"{stat.size_diff / 1024:+12,.1f} KiB {stat.count_diff:+8d} blocks"
+                        f"  (now {stat.size / 1024:,.1f} KiB)\n")
+                for line in stat.traceback.format(most_recent_first=True):
+                    f.write(f"    {line}\n")
+        return {"path": path, "traced": current, "peak": peak}
+
+    def mem_stop(self) -> dict:
+        result = self.mem_snapshot()
+        tracemalloc.stop()
+        self.mem_baseline = None
+        return result
+
+    def status(self) -> dict:
+        return {"cpu": self.mode, "until": self.until if self.active else None,
+                "tracemalloc": tracemalloc.is_tracing(), "out_dir": self.out_dir}
+
+    def handle(self, action: str, **kwargs):
+        """IPC entry point: action is cpu, stop, mem_start, mem_snapshot, mem_stop or status."""
+        if action not in ("cpu", "stop", "mem_start", "mem_snapshot", "mem_stop", "status"):
+            raise ValueError(f"unknown profiling action: {action}")
+        result = getattr(self, action)(**kwargs)
+        return self.status() if result is None else result
+
+
+# ---------- viewer ----------
+def latest_dump(out_dir: str = DEFAULT_PROFILE_DIR, kind: str = "*") -> str | None:
+    paths = glob.glob(os.path.join(out_dir, f"{kind}-*"))
+    paths = [p for p in paths if not p.endswith(".tmp")]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def render_dump(path: str, limit: int = 30, sort: str = "cumulative") -> str:
+    """Human-readable view of a dump written by Profiler."""
+    if path.endswith(".prof"):
+        import pstats
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        if not stats.stats:
+            return f"{path}: no calls were profiled"
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+    if path.endswith(".folded"):
+        own = collections.Counter()
+        total = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                stack, n = line.rsplit(" ", 1)
+                own[stack.rsplit(";", 1)[-1]] += int(n)
+                total += int(n)
+        if not total:
+            return f"{path}: no samples"
+        lines = [f"{path}: {total} samples; functions on top of the stack (self time):"]
+        lines += [f"{n / total:7.1%}  {fn}" for fn, n in own.most_common(limit)]
+        return "\n".join(lines)
+    with open(path, encoding="utf-8") as f:
+        return f.read()
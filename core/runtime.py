@@ -0,0 +1,372 @@
+# core/runtime.py
+# asyncio runtime for the agent's event path: intake -> decide -> enforce -> batched
+# DB write -> publish/notify, all owned by one event loop.
+#
+# Blocking backends never run on the loop. Each kind has its own bounded thread pool:
+#   wmi         the device watcher (core.usb_monitor.watch_usb_storage), for the runtime's life
+#   powershell  Disable-/Enable-PnpDevice (core.blocker), several devices at once
+#   sqlite      whitelist lookups and the batched event writes (one connection, one thread)
+#   notify      flushing toasts (plyer) at shutdown; core.notifier queues them meanwhile
+# Executor calls run through `profiler` (core/profiling.py Profiler.call) when given, so a
+# "cprofile" capture records the lookups, enforcement and DB writes on those threads; the
+# loop's own steps (decide, publish, queueing toasts) only show up in "sample" captures.
+# Intake is a bounded queue and at most `max_inflight` events are in the pipeline, so
+# a flood of events waits in the queue (or in the watcher) instead of growing latency
+# for everything. Events of one device are handled in arrival order. stop() drains:
+# the watcher is stopped, queued and in-flight events finish (within drain_timeout),
+# the last batch is written and held toasts are shown.
+#
+# VirtualClockLoop runs the same code on a fake clock for tests.
+import asyncio
+import logging
+import selectors
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core import blocker, notifier
+from core.events import event_record
+from core.guardian import decide, enforce, log_decision
+from core.metrics import EVENTS
+from core.trace import Trace
+
+log = logging.getLogger("usb_guard.runtime")
+
+DEFAULT_WORKERS = {"wmi": 1, "powershell": 4, "sqlite": 1, "notify": 1}
+
+
+class Runtime:
+    """
+    Runs the decide/enforce/log pipeline of core.guardian.process_event on an asyncio loop.
+
+    watch(on_event, stopped) is a blocking device watcher run on the WMI executor
+    (e.g. core.usb_monitor.watch_usb_storage); None for none. on_result(result) is
+    called on the loop with each handled event's process_event-style result.
+    profiler: a core.profiling.Profiler whose call() wraps every executor call; None for none.
+    Start with start() (own thread) or run() (this thread); feed it with submit()
+    from other threads or `await put()` on the loop.
+    """
+
+    def __init__(self, db, bus=None, watch=None, enforcer=None, notifier=None, detector=None, on_result=None,
+                 profiler=None, workers: dict | None = None, max_queue: int = 10000, max_inflight: int = 1024,
+                 batch_size: int = 256, batch_window: float = 0.02, drain_timeout: float = 10.0):
+        self.db = db
+        self.bus = bus
+        self.watch = watch
+        self.enforcer = enforcer or blocker
+        self.notifier = notifier
+        self.detector = detector
+        self.on_result = on_result
+        self.profiler = profiler
+        self.workers = dict(DEFAULT_WORKERS, **(workers or {}))
+        self.max_queue = max_queue
+        self.max_inflight = max_inflight
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.drain_timeout = drain_timeout
+        self.loop = None
+        self.thread = None
+        self.executors = {}
+        self.stopped = threading.Event()  # tells the watcher to return
+        self.accepting = False
+        self._stop_requested = None
+        self.executing = 0  # executor calls in progress (VirtualClockLoop waits for these in real time)
+        self.by_device = {}
+        self.tasks = set()
+        self.stats = {"submitted": 0, "handled": 0, "failed": 0, "rejected": 0, "abandoned": 0,
+                      "batches": 0, "max_batch": 0, "max_inflight": 0}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        """Run the loop on a background thread; returns once it accepts events."""
+        if self.thread is not None:
+            return self
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, kwargs={"ready": ready}, name="agent-runtime", daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def run(self, loop: asyncio.AbstractEventLoop | None = None, ready: threading.Event | None = None):
+        """Run the loop on this thread until stop() (or Ctrl+C), then drain."""
+        self.loop = loop or asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        main = self.loop.create_task(self.serve(ready))
+        try:
+            try:
+                self.loop.run_until_complete(main)
+            except KeyboardInterrupt:
+                self.request_stop()
+                self.loop.run_until_complete(main)
+        finally:
+            self.loop.close()
+
+    def stop(self, timeout: float | None = None):
+        """Thread-safe: stop intake, drain, and wait (from another thread) for the loop to finish."""
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.request_stop)
+        except RuntimeError:
+            return  # loop already closed
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout if timeout is not None else self.drain_timeout + 5)
+            self.thread = None
+
+    def request_stop(self):
+        """On the loop: stop accepting events; serve() drains and returns."""
+        self.accepting = False
+        if self._stop_requested is not None:
+            self._stop_requested.set()
+
+    async def serve(self, ready: threading.Event | None = None):
+        """The runtime: accept events until request_stop(), then drain. Also usable as a task on any loop."""
+        self.loop = asyncio.get_running_loop()
+        self._stop_requested = asyncio.Event()
+        self.intake = asyncio.Queue(maxsize=self.max_queue)
+        self.writes = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.max_inflight)
+        self.executors = {name: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"runtime-{name}")
+                          for name, n in self.workers.items()}
+        self.stopped.clear()
+        self.accepting = True
+        self._dispatcher = self.loop.create_task(self._dispatch())
+        self._writer = self.loop.create_task(self._write())
+        self._watcher = None
+        if self.watch:
+            self._watcher = self.loop.run_in_executor(self.executors["wmi"], self.watch, self.submit, self.stopped)
+        if ready is not None:
+            ready.set()
+        try:
+            await self._stop_requested.wait()
+        finally:
+            await self._drain()
+
+    async def _drain(self):
+        if not self.executors:
+            return
+        self.accepting = False
+        self.stopped.set()
+        if self._watcher is not None:
+            self.executing += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(self._watcher), 2.0)
+            except Exception as e:  # failed, or stuck in a WMI call; the pool thread is left behind
+                log.warning("[Runtime] watcher did not stop cleanly: %r", e)
+            finally:
+                self.executing -= 1
+        try:
+            await asyncio.wait_for(self.intake.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("[Runtime] drain timed out with %d event(s) unfinished",
+                        self.intake.qsize() + len(self.tasks))
+        for task in list(self.tasks):
+            task.cancel()
+        self._dispatcher.cancel()
+        while not self.intake.empty():
+            _evt, fut = self.intake.get_nowait()
+            fut.cancel()
+            self.stats["abandoned"] += 1
+        await asyncio.gather(self._dispatcher, *self.tasks, return_exceptions=True)
+        self.writes.put_nowait(None)  # the writer commits what it holds and returns
+        await self._writer
+        toasts = self.notifier or notifier.current()
+        if toasts is not None:
+            await self._call("notify", toasts.stop)  # shows what the coalescer still holds
+        for pool in self.executors.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.executors = {}
+
+    # ---------- intake ----------
+    def submit(self, evt: dict):
+        """
+        From any thread but the loop's: queue evt, waiting while the intake queue is full.
+        Returns an asyncio future of the result, or None if the runtime is stopping.
+        """
+        return asyncio.run_coroutine_threadsafe(self.put(evt), self.loop).result()
+
+    async def put(self, evt: dict):
+        """On the loop: queue evt (waits for room). Returns a future of its result, or None when stopping."""
+        if not self.accepting:
+            self.stats["rejected"] += 1
+            return None
+        fut = self.loop.create_future()
+        await self.intake.put((evt, fut))
+        self.stats["submitted"] += 1
+        return fut
+
+    async def _dispatch(self):
+        while True:
+            evt, fut = await self.intake.get()
+            await self.slots.acquire()
+            if self.detector is not None:
+                # in arrival order, before anything else can reorder events
+                findings = self.detector.observe(evt)
+                if findings:
+                    evt["anomalies"] = findings
+            task = self.loop.create_task(self._handle(evt, fut))
+            self.tasks.add(task)
+            self.stats["max_inflight"] = max(self.stats["max_inflight"], len(self.tasks))
+            task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self.tasks.discard(task)
+        self.slots.release()
+        self.intake.task_done()
+
+    async def _handle(self, evt: dict, fut):
+        device = evt.get("pnp_id") or evt.get("serial")
+        previous = self.by_device.get(device)
+        current = self.by_device[device] = asyncio.current_task()
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])  # same device: keep arrival order
+            result = await self._process(evt)
+            self.stats["handled"] += 1
+            if not fut.done():
+                fut.set_result(result)
+            if self.on_result is not None:
+                self.on_result(result)
+        except Exception as e:
+            self.stats["failed"] += 1
+            log.exception("[Runtime] event failed: %s", e)
+            if not fut.done():
+                fut.set_exception(e)
+        finally:
+            if not fut.done():
+                fut.cancel()
+            if self.by_device.get(device) is current:
+                del self.by_device[device]
+
+    # ---------- pipeline ----------
+    async def _call(self, executor: str, fn, *args):
+        self.executing += 1
+        if self.profiler is not None:
+            fn, args = self.profiler.call, (fn, *args)
+        try:
+            return await self.loop.run_in_executor(self.executors[executor], fn, *args)
+        finally:
+            self.executing -= 1
+
+    async def _process(self, evt: dict) -> dict:
+        """core.guardian.process_event, one awaited step per backend."""
+        action = evt["action"]
+        trace = Trace(evt.get("trace_ns"))
+        if "trace_ns" in evt:
+            trace.mark("detect")
+        enforced = None
+        if action == "insert":
+            whitelisted = await self._call("sqlite", self.db.whitelist_contains,
+                                           evt.get("vid"), evt.get("pid"), evt.get("serial"))
+            decision, reason = decide(evt, whitelisted)
+            trace.mark("decide")
+            note, enforced = await self._call("powershell", enforce, self.enforcer, decision, reason,
+                                              evt.get("pnp_id"), evt.get("anomalies"))
+            trace.mark("enforce")
+        else:
+            decision = "observe"
+            note = "device removed"
+
+        event_id = await self._log((evt["timestamp"], action, evt.get("model"), evt.get("pnp_id"), evt.get("vid"),
+                                    evt.get("pid"), evt.get("serial"), decision, note, dict(trace.spans)))
+        trace.mark("log")
+        EVENTS.inc(action, decision)
+        if self.bus is not None:
+            self.bus.publish(event_record(evt, decision, note, event_id))
+            trace.mark("publish")
+        if action in ("insert", "remove"):
+            (self.notifier or notifier.default_notifier()).device_event(evt, decision, note)
+            trace.mark("notify")
+        stages = trace.finish(blocked=decision == "blocked")
+        log_decision(evt, decision, note, event_id, enforced, stages)
+        return {"decision": decision, "note": note, "id": event_id, "stages_us": stages}
+
+    # ---------- batched DB writes ----------
+    async def _log(self, row: tuple) -> int:
+        fut = self.loop.create_future()
+        self.writes.put_nowait((row, fut))
+        return await fut
+
+    async def _write(self):
+        """Collect rows for up to batch_window (or batch_size rows) and write them in one transaction."""
+        while True:
+            item = await self.writes.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = self.loop.time() + self.batch_window
+            while len(batch) < self.batch_size and item is not None:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.writes.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is not None:
+                    batch.append(item)
+            await self._commit(batch)
+            if item is None:
+                return
+
+    async def _commit(self, batch: list):
+        try:
+            ids = await self._call("sqlite", self.db.log_events, [row for row, _fut in batch])
+        except Exception as e:
+            for _row, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.stats["batches"] += 1
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+        for (_row, fut), event_id in zip(batch, ids):
+            if not fut.done():
+                fut.set_result(event_id)
+
+    def snapshot(self) -> dict:
+        """Counters and queue depths (agent status / metrics)."""
+        return dict(self.stats, queued=self.intake.qsize() if self.executors else 0, inflight=len(self.tasks),
+                    log_queued=self.writes.qsize() if self.executors else 0, workers=self.workers,
+                    accepting=self.accepting)
+
+
+# ---------- fake clock ----------
+class _VirtualSelector(selectors.DefaultSelector):
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        while self.loop.busy():
+            # work is out on a real thread: wait for it in real time, without moving the clock
+            events = super().select(0.005)
+            if events:
+                return events
+        if timeout is None:
+            return super().select(None)  # no timers: only another thread can wake us
+        self.loop.advance(timeout)  # nothing to do until the next timer: jump to it
+        return []
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose time() only moves when the loop would otherwise sleep: it jumps
+    straight to the next timer, so a test of a 10 s timeout takes no real time and
+    the timings it sees are exact. busy() -> True while the code under test has work
+    on real threads (e.g. lambda: runtime.executing); the loop then waits for it.
+    """
+
+    def __init__(self, start: float = 0.0):
+        selector = _VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+        self.now = start
+        self.busy = lambda: False
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
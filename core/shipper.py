@@ -0,0 +1,233 @@
+# core/shipper.py
+# Agent side of fleet event shipping (the collector is core/collector.py).
+#
+# New `events` rows are read by id watermark and cut into batches. Each batch gets
+# the next per-agent sequence number and is written to the spool directory as
+# <seq>.json.gz before the watermark moves past it. Spool files are uploaded in
+# seq order and deleted once the collector acknowledges them. The collector applies
+# a seq only once, so a batch resent after a lost acknowledgement is not
+# duplicated: the result is exactly-once delivery across crashes and outages.
+# If the collector expects an earlier seq than the oldest spooled batch (its DB was
+# restored or reset), the spool is renumbered from the seq it asks for.
+#
+# Every upload is signed with the agent's key from the collector (core/signing.py);
+# load_credentials() reads the file `collector.py --enroll` prints.
+import gzip
+import json
+import logging
+import os
+import socket
+import threading
+import urllib.error
+import urllib.request
+import uuid
+
+from core.db import DB, EVENT_COLUMNS
+from core.signing import SIGNATURE_HEADER, sign
+
+DEFAULT_SPOOL_DIR = os.path.join("data", "spool")
+DEFAULT_CREDENTIALS = os.path.join("data", "ship_credentials.json")
+STATE_NAME = "shipper.json"
+
+log = logging.getLogger("usb_guard.shipper")
+
+
+class ShipError(Exception):
+    def __init__(self, message: str, expected: int | None = None):
+        super().__init__(message)
+        self.expected = expected  # the seq the collector wants next, on a sequence gap
+
+
+def load_credentials(path: str = DEFAULT_CREDENTIALS) -> tuple:
+    """(agent_id, key) from a credentials file printed by `collector.py --enroll`."""
+    with open(path, encoding="utf-8") as f:
+        doc = json.load(f)
+    return doc["agent_id"], doc["key"]
+
+
+def encode_batch(agent_id: str, seq: int, rows: list) -> bytes:
+    """Columnar JSON (column names once, rows as arrays), gzip-compressed."""
+    doc = {"agent_id": agent_id, "seq": seq, "columns": list(EVENT_COLUMNS), "rows": [list(r) for r in rows]}
+    return gzip.compress(json.dumps(doc, separators=(",", ":")).encode("utf-8"), compresslevel=6)
+
+
+class Shipper:
+    """
+    Tail `events` from db and ship them to collector_url, signed with `key`.
+
+    The spool state is only written once something is spooled, so constructing a
+    Shipper (e.g. before the agent's instance lock is taken) leaves the spool alone.
+    batch_size: rows per spooled batch.
+    max_spool_bytes: stop reading new rows while the spool is this large; they stay
+    in the local DB and the watermark simply waits, so nothing is dropped.
+    """
+
+    def __init__(self, db: DB, collector_url: str, key: str, spool_dir: str = DEFAULT_SPOOL_DIR,
+                 agent_id: str | None = None, batch_size: int = 1000, interval: float = 5.0,
+                 max_spool_bytes: int = 256 * 1024 * 1024, timeout: float = 30.0):
+        self.db = db
+        self.url = collector_url.rstrip("/") + "/ingest"
+        self.key = key
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_spool_bytes = max_spool_bytes
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.last_error = None
+        self.stats = {"spooled_rows": 0, "shipped_batches": 0, "shipped_rows": 0, "duplicates": 0, "errors": 0,
+                      "resyncs": 0}
+        os.makedirs(spool_dir, exist_ok=True)
+        self.state = self._load_state()
+        if agent_id is not None:
+            self.state["agent_id"] = agent_id
+
+    # ---------- state ----------
+    def _load_state(self) -> dict:
+        try:
+            with open(os.path.join(self.spool_dir, STATE_NAME), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"agent_id": f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}", "watermark": 0, "next_seq": 1}
+
+    def _save_state(self):
+        path = os.path.join(self.spool_dir, STATE_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    @property
+    def agent_id(self) -> str:
+        return self.state["agent_id"]
+
+    def pending(self) -> list:
+        """Spooled batch files not yet acknowledged, oldest first."""
+        return sorted(n for n in os.listdir(self.spool_dir) if n.endswith(".json.gz"))
+
+    def spool_bytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.spool_dir, n)) for n in self.pending())
+
+    # ---------- spool ----------
+    def spool_new(self) -> int:
+        """Cut new events into spooled batches. Returns the number of rows spooled."""
+        total = 0
+        with self.lock:
+            while self.spool_bytes() < self.max_spool_bytes:
+                rows = self.db.events_after(self.state["watermark"], self.batch_size)
+                if not rows:
+                    break
+                seq = self.state["next_seq"]
+                self._write_batch(seq, rows)
+                # the batch is durable before the watermark moves past its rows
+                self.state["watermark"] = rows[-1][0]
+                self.state["next_seq"] = seq + 1
+                self._save_state()
+                total += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+        self.stats["spooled_rows"] += total
+        return total
+
+    def _write_batch(self, seq: int, rows: list) -> str:
+        name = f"{seq:012d}.json.gz"
+        path = os.path.join(self.spool_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(encode_batch(self.agent_id, seq, rows))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        return name
+
+    def resync(self, first_seq: int):
+        """Renumber the spooled batches first_seq, first_seq + 1, ... in their current order."""
+        with self.lock:
+            names = self.pending()
+            for i, name in enumerate(names):
+                path = os.path.join(self.spool_dir, name)
+                with open(path, "rb") as f:
+                    doc = json.loads(gzip.decompress(f.read()))
+                # new numbers are below the old ones, so no batch is overwritten before it is read
+                if self._write_batch(first_seq + i, doc["rows"]) != name:
+                    os.remove(path)
+            self.state["next_seq"] = first_seq + len(names)
+            self._save_state()
+        self.stats["resyncs"] += 1
+        log.warning("collector expects seq %d; renumbered %d spooled batches", first_seq, len(names))
+
+    # ---------- upload ----------
+    def _post(self, body: bytes) -> dict:
+        req = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json", "Content-Encoding": "gzip", "X-Agent-Id": self.agent_id,
+            SIGNATURE_HEADER: sign(self.key, body),
+        })
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.loads(e.read())
+            except ValueError:
+                detail = {}
+            expected = detail.get("expected") if e.code == 409 else None
+            raise ShipError(f"collector returned HTTP {e.code}: {detail.get('error', e.reason)}", expected)
+        except (OSError, ValueError) as e:
+            raise ShipError(f"collector unreachable: {e}")
+
+    def ship_pending(self, resync: bool = True) -> int:
+        """
+        Upload spooled batches in order until one fails. Returns the number of batches acknowledged.
+        On a sequence gap the spool is renumbered from the collector's expected seq and retried once.
+        """
+        shipped = 0
+        for name in self.pending():
+            path = os.path.join(self.spool_dir, name)
+            with open(path, "rb") as f:
+                body = f.read()
+            try:
+                reply = self._post(body)
+            except ShipError as e:
+                if e.expected is None or not resync:
+                    raise
+                self.resync(int(e.expected))
+                return shipped + self.ship_pending(resync=False)
+            if reply.get("status") == "duplicate":
+                self.stats["duplicates"] += 1
+            else:
+                self.stats["shipped_rows"] += reply.get("rows", 0)
+            os.remove(path)
+            self.stats["shipped_batches"] += 1
+            shipped += 1
+        return shipped
+
+    def run_once(self) -> int:
+        """Spool whatever is new and try to upload the spool. Returns batches acknowledged."""
+        self.spool_new()
+        try:
+            return self.ship_pending()
+        except ShipError as e:
+            self.stats["errors"] += 1
+            self.last_error = str(e)
+            return 0
+
+    # ---------- background ----------
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name="shipper", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.run_once()
+            self.stopped.wait(self.interval)
@@ -0,0 +1,22 @@
+# core/signing.py
+# HMAC-SHA256 request signing between agents and the fleet servers.
+# The signature covers the exact body bytes sent (after gzip) and travels as
+# lowercase hex in SIGNATURE_HEADER. Keys are hex strings from secrets.token_hex.
+import hashlib
+import hmac
+import secrets
+
+SIGNATURE_HEADER = "X-USBGuard-Signature"
+
+
+def new_key() -> str:
+    return secrets.token_hex(32)
+
+
+def sign(key: str, body: bytes) -> str:
+    return hmac.new(key.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify(key: str, body: bytes, signature: str | None) -> bool:
+    """True if `signature` is sign(key, body); constant-time."""
+    return bool(signature) and hmac.compare_digest(sign(key, body), signature)
@@ -0,0 +1,177 @@
+# core/simulate.py
+# What-if evaluation of a candidate whitelist against every historical insert.
+# Needs NumPy (used by what_if.py only; the agent never imports this).
+#
+# Inserts are read in chunks of two narrow columns built by SQLite: ts * 2 + (recorded
+# decision was "allowed"), and a "VID|PID|SERIAL" device key ("" for a NULL part).
+# Keys are dictionary-encoded to integer device codes as they arrive, each new device is
+# matched against the rules once, and the rest is array operations on the codes.
+# Without since/until the query is a plain table scan (no ts range on idx_events_ts).
+# The matching mirrors DB.whitelist_contains exactly:
+#   VID and PID known  -> exact (vid, pid, serial) entry, a vendor rule for the VID,
+#                         or a serial-only entry for the serial
+#   otherwise          -> any entry with that serial
+import sqlite3
+import time
+
+import numpy as np
+
+from core.db import _norm
+from core.whitelist_io import read_rows, validate_row
+
+DEFAULT_CHUNK = 262144
+
+INSERTS_SQL = (
+    "SELECT ts * 2 + (decision = 'allowed'),"
+    " COALESCE(vid, '') || '|' || COALESCE(pid, '') || '|' || COALESCE(serial, '')"
+    " FROM events WHERE action = 'insert'"
+)
+
+
+class Rules:
+    """A candidate whitelist as sets of device keys, VIDs and serials, built from (label, vid, pid, serial) rows."""
+
+    def __init__(self, rows):
+        exact, vendors, serials, loose = set(), set(), set(), set()
+        self.entries = 0
+        for _label, vid, pid, serial in rows:
+            vid, pid, serial = _norm(vid), _norm(pid), _norm(serial)
+            self.entries += 1
+            if vid and pid:
+                exact.add(f"{vid}|{pid}|{serial or ''}")
+            elif vid and not serial:
+                vendors.add(vid)
+            if serial:
+                serials.add(serial)
+                if not vid and not pid:
+                    loose.add(serial)
+        self.exact = frozenset(exact)
+        self.vendors = frozenset(vendors)
+        self.serials = frozenset(serials)
+        self.loose = frozenset(loose)  # serials of serial-only entries
+
+    @classmethod
+    def edited(cls, rows, add=(), remove=()):
+        """`rows` minus `remove` rows (matched on vid, pid, serial), plus `add` rows."""
+        drop = {(_norm(v), _norm(p), _norm(s)) for _l, v, p, s in remove}
+        return cls([r for r in rows if (_norm(r[1]), _norm(r[2]), _norm(r[3])) not in drop] + list(add))
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection, add=(), remove=()):
+        """The whitelist in conn, edited as in edited()."""
+        return cls.edited(conn.execute("SELECT label, vid, pid, serial FROM whitelist"), add, remove)
+
+
+def read_rule_file(path: str) -> list:
+    """(label, vid, pid, serial) rows of a whitelist import file (CSV / JSON / JSONL); ValueError on a bad row."""
+    rows = []
+    for line_no, row in read_rows(path):
+        try:
+            rows.append(validate_row(row))
+        except (ValueError, AttributeError) as e:
+            raise ValueError(f"{path}:{line_no}: {e}") from None
+    return rows
+
+
+def evaluate(keys, rules: Rules) -> np.ndarray:
+    """Boolean "would be allowed" per "VID|PID|SERIAL" device key ("" for a NULL part)."""
+    def allowed(key):
+        vid, pid, serial = key.split("|", 2)
+        if vid and pid:
+            return key in rules.exact or vid in rules.vendors or serial in rules.loose
+        return serial in rules.serials
+    return np.fromiter(map(allowed, keys), dtype=bool, count=len(keys))
+
+
+def _chunks(conn, sql, params, chunk_size, devices):
+    """(ts, recorded, device codes) arrays per chunk; new keys are appended to `devices` (key -> code)."""
+    code = devices.setdefault
+    cur = conn.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            return
+        packed, keys = zip(*rows)
+        packed = np.array(packed, dtype=np.int64)
+        yield packed >> 1, (packed & 1).astype(bool), np.array([code(k, len(devices)) for k in keys], dtype=np.int64)
+
+
+def simulate(conn: sqlite3.Connection, rules: Rules, since: int | None = None, until: int | None = None,
+             chunk_size: int = DEFAULT_CHUNK, utc_offset: int = 0) -> dict:
+    """
+    Compare `rules` with the recorded decision of every insert in [since, until].
+    Days are (ts + utc_offset) // 86400. Returns totals, per-day counts (arrays indexed from
+    "first_day") and per-device counts of the inserts whose outcome would change.
+    """
+    t0 = time.perf_counter()
+    where, params = [], []
+    if since is not None:
+        where.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("ts <= ?")
+        params.append(until)
+    range_sql = " AND ".join(where) or "1"
+    # day range from idx_events_ts alone (may include leading/trailing removals; those days stay zero)
+    lo, hi = conn.execute(f"SELECT (SELECT MIN(ts) FROM events WHERE {range_sql}),"
+                          f" (SELECT MAX(ts) FROM events WHERE {range_sql})", params * 2).fetchone()
+    if lo is None or hi is None or lo > hi:
+        lo = hi = 0  # nothing in range
+    first_day = (lo + utc_offset) // 86400
+    n_days = (hi + utc_offset) // 86400 - first_day + 1
+    per_day = {k: np.zeros(n_days, dtype=np.int64) for k in ("inserts", "newly_blocked", "newly_allowed")}
+    totals = dict.fromkeys(("inserts", "recorded_allowed", "simulated_allowed", "newly_blocked", "newly_allowed"), 0)
+    changed_codes, changed_dirs = [], []
+
+    devices = {}  # device key -> code, in order of first appearance
+    ok = np.zeros(0, dtype=bool)  # rules verdict per code
+    sql = INSERTS_SQL + "".join(" AND " + w for w in where)
+    for ts, recorded, codes in _chunks(conn, sql, params, chunk_size, devices):
+        if len(devices) > len(ok):
+            new = list(devices)[len(ok):]
+            ok = np.concatenate([ok, evaluate(new, rules)])
+        allowed = ok[codes]
+        day = (ts + utc_offset) // 86400 - first_day
+        blocked_now = recorded & ~allowed
+        allowed_now = ~recorded & allowed
+        per_day["inserts"] += np.bincount(day, minlength=n_days)
+        per_day["newly_blocked"] += np.bincount(day[blocked_now], minlength=n_days)
+        per_day["newly_allowed"] += np.bincount(day[allowed_now], minlength=n_days)
+        totals["inserts"] += len(ts)
+        totals["recorded_allowed"] += int(recorded.sum())
+        totals["simulated_allowed"] += int(allowed.sum())
+        totals["newly_blocked"] += int(blocked_now.sum())
+        totals["newly_allowed"] += int(allowed_now.sum())
+        changed = blocked_now | allowed_now
+        changed_codes.append(codes[changed])
+        changed_dirs.append(blocked_now[changed])
+
+    result_devices = {}
+    if changed_codes:
+        codes = np.concatenate(changed_codes)
+        blocked = np.concatenate(changed_dirs)
+        uniq, inverse = np.unique(codes, return_inverse=True)
+        keys = list(devices)
+        result_devices = {"key": np.array([keys[c] for c in uniq], dtype=str),
+                          "newly_blocked": np.bincount(inverse[blocked], minlength=len(uniq)),
+                          "newly_allowed": np.bincount(inverse[~blocked], minlength=len(uniq))}
+    return {"totals": totals, "first_day": first_day, "per_day": per_day, "devices": result_devices,
+            "rules": rules.entries, "seconds": time.perf_counter() - t0}
+
+
+def top_devices(result: dict, kind: str = "newly_blocked", n: int = 20) -> list:
+    """[(device key, count)] with the most `kind` inserts, largest first."""
+    devices = result["devices"]
+    if not devices:
+        return []
+    counts = devices[kind]
+    order = np.argsort(-counts, kind="stable")[:n]
+    return [(str(devices["key"][i]), int(counts[i])) for i in order if counts[i]]
+
+
+def changed_days(result: dict) -> list:
+    """[(day number, inserts, newly_blocked, newly_allowed)] for days where anything would change."""
+    d = result["per_day"]
+    idx = np.flatnonzero(d["newly_blocked"] + d["newly_allowed"])
+    return [(int(result["first_day"] + i), int(d["inserts"][i]), int(d["newly_blocked"][i]),
+             int(d["newly_allowed"][i])) for i in idx]
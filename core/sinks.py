@@ -0,0 +1,463 @@
+# core/sinks.py
+# Forwarding of decided events to external alert sinks (webhook, syslog, SMTP).
+#
+# AlertDispatcher runs its own asyncio loop on a background thread. submit() only
+# hands the record to that loop, so nothing here ever runs on the enforcement path.
+# Per sink, worker tasks batch records, deliver them with retry and exponential
+# backoff, and spill batches that still fail to a bounded JSON Lines file. The
+# spill is replayed after the next successful delivery.
+#
+# A sink subclasses Sink, sets `name` and `batch_size`, and implements
+#     async def send(self, records: list[dict]) -> None   (raise to have the batch retried)
+# and optionally async def close(self) -> None.
+# Blocking client libraries (http.client, smtplib) run via asyncio.to_thread.
+import abc
+import asyncio
+import http.client
+import json
+import logging
+import os
+import queue
+import random
+import smtplib
+import socket
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from email.message import EmailMessage
+
+HOSTNAME = socket.gethostname()
+log = logging.getLogger("usb_guard.alerts")
+
+
+class SinkError(Exception):
+    pass
+
+
+def _event_line(r: dict) -> str:
+    return (f"{r.get('action')} {r.get('decision')}: {r.get('model') or 'Unknown'} "
+            f"VID:{r.get('vid') or '—'} PID:{r.get('pid') or '—'} S/N:{r.get('serial') or '—'} ({r.get('note') or ''})")
+
+
+class Sink(abc.ABC):
+    name = "sink"
+    batch_size = 100
+    concurrency = 1
+
+    @abc.abstractmethod
+    async def send(self, records: list):
+        """Deliver one batch; raise to have it retried."""
+
+    async def close(self):
+        pass
+
+
+class WebhookSink(Sink):
+    """
+    POSTs {"host": ..., "events": [...]} as JSON. Keeps up to `concurrency` keep-alive
+    connections open and reuses them across batches.
+    """
+
+    def __init__(self, url: str, headers: dict | None = None, timeout: float = 10.0,
+                 batch_size: int = 100, concurrency: int = 2, name: str = "webhook"):
+        self.url = url
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"webhook url must be http(s): {url}")
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.name = name
+        self.pool = queue.LifoQueue()
+        self.connections_opened = 0
+
+    def _connection(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            self.connections_opened += 1
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            return cls(self.host, self.port, timeout=self.timeout)
+
+    def _post(self, body: bytes):
+        conn = self._connection()
+        try:
+            conn.request("POST", self.path, body=body, headers=self.headers)
+            resp = conn.getresponse()
+            resp.read()  # drain so the connection can be reused
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self.pool.put(conn)
+        if resp.status >= 300:
+            raise SinkError(f"{self.name}: HTTP {resp.status}")
+
+    async def send(self, records: list):
+        body = json.dumps({"host": HOSTNAME, "events": records}, separators=(",", ":")).encode("utf-8")
+        await asyncio.to_thread(self._post, body)
+
+    async def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SyslogSink(Sink):
+    """RFC 5424 messages over UDP (one datagram each) or TCP (octet-counted framing, one connection)."""
+
+    FACILITY_AUTH = 4
+    SEVERITY = {"blocked": 4, "allowed": 6, "observe": 6}  # warning / informational
+    SEVERITY_ANOMALY = 2  # critical: possible injection device or cloned serial
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 514, protocol: str = "udp",
+                 batch_size: int = 200, name: str = "syslog"):
+        if protocol not in ("udp", "tcp"):
+            raise ValueError(f"syslog protocol must be udp or tcp: {protocol}")
+        self.host, self.port, self.protocol = host, port, protocol
+        self.batch_size = batch_size
+        self.name = name
+        self.sock = None
+        self.writer = None
+
+    def format(self, r: dict) -> bytes:
+        severity = self.SEVERITY_ANOMALY if r.get("anomalies") else self.SEVERITY.get(r.get("decision"), 6)
+        pri = self.FACILITY_AUTH * 8 + severity
+        ts = datetime.fromtimestamp(r.get("ts") or time.time(), timezone.utc).isoformat().replace("+00:00", "Z")
+        sd = "[usbguard@32473 id=\"%s\" decision=\"%s\" vid=\"%s\" pid=\"%s\" serial=\"%s\"]" % tuple(
+            str(r.get(k) or "-").replace("\\", "\\\\").replace('"', '\\"').replace("]", "\\]")
+            for k in ("id", "decision", "vid", "pid", "serial"))
+        return f"<{pri}>1 {ts} {HOSTNAME} usbguard - usb-{r.get('action')} {sd} {_event_line(r)}".encode("utf-8")
+
+    async def send(self, records: list):
+        messages = [self.format(r) for r in records]
+        if self.protocol == "udp":
+            if self.sock is None:
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            for m in messages:
+                self.sock.sendto(m, (self.host, self.port))
+            return
+        try:
+            if self.writer is None:
+                _, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.write(b"".join(b"%d %s" % (len(m), m) for m in messages))
+            await self.writer.drain()
+        except OSError:
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.writer = None
+
+
+class SmtpSink(Sink):
+    """One email per batch. Batches are larger and slower to fill than for the other sinks."""
+
+    def __init__(self, host: str, to: list, sender: str = "usbguard@localhost", port: int = 25,
+                 starttls: bool = False, username: str | None = None, password: str | None = None,
+                 timeout: float = 20.0, batch_size: int = 500, name: str = "smtp"):
+        self.host, self.port, self.to, self.sender = host, port, list(to), sender
+        self.starttls, self.username, self.password = starttls, username, password
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.name = name
+
+    def message(self, records: list) -> EmailMessage:
+        blocked = sum(1 for r in records if r.get("decision") == "blocked")
+        anomalous = sum(1 for r in records if r.get("anomalies"))
+        msg = EmailMessage()
+        msg["Subject"] = (f"{'[ANOMALY] ' if anomalous else ''}USB Guard on {HOSTNAME}: "
+                          f"{len(records)} event(s), {blocked} blocked"
+                          + (f", {anomalous} anomalous" if anomalous else ""))
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.to)
+        msg.set_content("\n".join(
+            f"{datetime.fromtimestamp(r.get('ts') or 0):%Y-%m-%d %H:%M:%S}  {_event_line(r)}" for r in records
+        ) + "\n")
+        return msg
+
+    def _send(self, msg: EmailMessage):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(msg)
+
+    async def send(self, records: list):
+        await asyncio.to_thread(self._send, self.message(records))
+
+
+SINK_TYPES = {"webhook": WebhookSink, "syslog": SyslogSink, "smtp": SmtpSink}
+
+
+class Spill:
+    """Bounded JSON Lines file of records a sink could not deliver."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dropped = 0
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def append(self, records: list) -> bool:
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+        if self.size() + len(data) > self.max_bytes:
+            self.dropped += len(records)
+            return False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(data)
+        return True
+
+    def take(self) -> list:
+        """All spilled records; the file is removed."""
+        try:
+            with open(self.path, "rb") as f:
+                lines = f.read().splitlines()
+            os.remove(self.path)
+        except OSError:
+            return []
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+class _SinkState:
+    def __init__(self, sink: Sink, spill: Spill, max_queue: int):
+        self.sink = sink
+        self.spill = spill
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.inflight = 0  # batches taken off the queue and not yet delivered or spilled
+        self.stats = {"sent": 0, "batches": 0, "retries": 0, "failed_batches": 0, "spilled": 0, "replayed": 0}
+
+
+class AlertDispatcher:
+    """
+    Fan decided events out to sinks from a private asyncio loop.
+
+    decisions: which decisions to forward (None = all).
+    batch_window: how long a worker waits to fill a batch once it has one record.
+    retries/backoff/max_backoff: per-batch retry schedule (exponential, with jitter).
+    spill_dir/spill_max_bytes: where undeliverable batches go, per sink.
+    """
+
+    def __init__(self, sinks: list, decisions=("blocked",), batch_window: float = 1.0, retries: int = 4,
+                 backoff: float = 0.5, max_backoff: float = 30.0, max_queue: int = 10000,
+                 spill_dir: str = os.path.join("data", "spill"), spill_max_bytes: int = 10 * 1024 * 1024):
+        self.sinks = list(sinks)
+        self.decisions = set(decisions) if decisions else None
+        self.batch_window = batch_window
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_queue = max_queue
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.loop = None
+        self.thread = None
+        self.states = []
+        self.tasks = []
+        self.bus_subs = []
+        self.submitted = 0
+        self.filtered = 0
+
+    # ---------- lifecycle (any thread) ----------
+    def start(self):
+        if self.thread is not None:
+            return self
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(ready,), name="alert-sinks", daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        """Deliver what is queued (within timeout), spill the rest, and stop the loop."""
+        if self.thread is None:
+            return
+        for sub in self.bus_subs:
+            sub.close()
+        fut = asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self.loop)
+        try:
+            fut.result(timeout + 5)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(5)
+            self.thread = None
+
+    def submit(self, record: dict) -> bool:
+        """Queue a record for every sink. Thread-safe and non-blocking; False if filtered out."""
+        # anomalous events (core/anomaly.py) are always forwarded, whatever the decision
+        if (self.decisions is not None and record.get("decision") not in self.decisions
+                and not record.get("anomalies")):
+            self.filtered += 1
+            return False
+        self.submitted += 1
+        self.loop.call_soon_threadsafe(self._enqueue, record)
+        return True
+
+    def attach(self, bus):
+        """Forward "event" records published on a core.events.EventBus. Returns the subscription."""
+        sub = bus.subscribe(self.max_queue)
+        self.bus_subs.append(sub)
+
+        def pump():
+            while True:
+                record = sub.get()
+                if record is None:
+                    return
+                if record.get("kind") == "event":
+                    self.submit(record)
+
+        threading.Thread(target=pump, name="alert-sinks-bus", daemon=True).start()
+        return sub
+
+    def stats(self) -> dict:
+        return {s.sink.name: dict(s.stats, queued=s.queue.qsize(), spill_bytes=s.spill.size(),
+                                  spill_dropped=s.spill.dropped) for s in self.states}
+
+    # ---------- loop thread ----------
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        for sink in self.sinks:
+            spill = Spill(os.path.join(self.spill_dir, f"{sink.name}.jsonl"), self.spill_max_bytes)
+            state = _SinkState(sink, spill, self.max_queue)
+            self.states.append(state)
+            for _ in range(max(1, sink.concurrency)):
+                self.tasks.append(self.loop.create_task(self._worker(state)))
+        ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def _enqueue(self, record):
+        for state in self.states:
+            try:
+                state.queue.put_nowait(record)
+            except asyncio.QueueFull:
+                # sink far behind (or down for long): keep the record on disk instead
+                if state.spill.append([record]):
+                    state.stats["spilled"] += 1
+
+    async def _fill(self, state, batch: list):
+        """Add queued records to batch until it is full or batch_window has passed."""
+        deadline = self.loop.time() + self.batch_window
+        while len(batch) < state.sink.batch_size:
+            timeout = deadline - self.loop.time()
+            if timeout <= 0:
+                return
+            try:
+                batch.append(await asyncio.wait_for(state.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                return
+
+    async def _worker(self, state):
+        while True:
+            batch = [await state.queue.get()]
+            state.inflight += 1
+            try:
+                await self._fill(state, batch)
+                if await self._deliver(state, batch):
+                    batch = []
+                    await self._replay(state)
+                else:
+                    state.stats["failed_batches"] += 1
+            finally:
+                # also on cancellation at shutdown: an undelivered batch goes to disk, not away
+                if batch and state.spill.append(batch):
+                    state.stats["spilled"] += len(batch)
+                state.inflight -= 1
+
+    async def _deliver(self, state, batch) -> bool:
+        for attempt in range(self.retries + 1):
+            try:
+                await state.sink.send(batch)
+            except Exception as e:
+                if attempt == self.retries:
+                    log.warning("[Alerts] %s: giving up on %d record(s): %s", state.sink.name, len(batch), e,
+                                extra={"fields": {"sink": state.sink.name, "records": len(batch)}})
+                    return False
+                state.stats["retries"] += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                continue
+            state.stats["sent"] += len(batch)
+            state.stats["batches"] += 1
+            return True
+        return False
+
+    async def _replay(self, state):
+        if not state.spill.size():
+            return
+        records = state.spill.take()
+        size = state.sink.batch_size
+        i = 0
+        try:
+            while i < len(records):
+                chunk = records[i:i + size]
+                if not await self._deliver(state, chunk):
+                    return  # still down; the rest goes back to disk for next time
+                state.stats["replayed"] += len(chunk)
+                i += size
+        finally:
+            if i < len(records):
+                state.spill.append(records[i:])
+
+    async def _shutdown(self, timeout):
+        deadline = self.loop.time() + timeout
+        while any(s.inflight or not s.queue.empty() for s in self.states) and self.loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for state in self.states:
+            leftover = []
+            while not state.queue.empty():
+                leftover.append(state.queue.get_nowait())
+            if leftover and state.spill.append(leftover):
+                state.stats["spilled"] += len(leftover)
+            await state.sink.close()
+
+
+def load_dispatcher(path: str) -> AlertDispatcher:
+    """
+    Build an AlertDispatcher from a JSON config:
+      {"sinks": [{"type": "webhook", "url": "https://soc.example/hook"},
+                 {"type": "syslog", "host": "10.0.0.5", "port": 514, "protocol": "udp"},
+                 {"type": "smtp", "host": "mail.example", "to": ["soc@example.com"]}],
+       "decisions": ["blocked"], "spill_dir": "data/spill"}
+    Other top-level keys are AlertDispatcher options.
+    """
+    with open(path, encoding="utf-8") as f:
+        cfg = json.load(f)
+    sinks = []
+    for spec in cfg.pop("sinks", []):
+        spec = dict(spec)
+        kind = spec.pop("type")
+        if kind not in SINK_TYPES:
+            raise ValueError(f"unknown sink type: {kind}")
+        sinks.append(SINK_TYPES[kind](**spec))
+    return AlertDispatcher(sinks, **cfg)
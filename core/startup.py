@@ -0,0 +1,42 @@
+# core/startup.py
+# Startup timeline. Entry points import this first; mark("phase") records how
+# far into startup each milestone was reached, and the agent reports the list
+# in its status and logs it once the first event has been handled.
+#
+# Import budget: the agent and GUIs must come up without bcrypt, plyer, WMI,
+# http.server or NumPy loaded -- those are imported on first use
+# (tests/test_startup.py checks this).
+import logging
+import threading
+import time
+
+T0 = time.perf_counter()
+IMPORT_BUDGET_MS = 250
+
+log = logging.getLogger("usb_guard.startup")
+
+_lock = threading.Lock()
+_marks = []
+
+
+def mark(phase: str, once: bool = False) -> float:
+    """Record phase at the current time; returns ms since startup. once: keep only the first mark."""
+    ms = (time.perf_counter() - T0) * 1000
+    with _lock:
+        if once and any(p == phase for p, _ in _marks):
+            return ms
+        _marks.append((phase, round(ms, 1)))
+    return ms
+
+
+def timeline() -> list:
+    """[(phase, ms since startup), ...] in the order reached."""
+    with _lock:
+        return list(_marks)
+
+
+def report():
+    """Log the timeline so far, one "startup" record with every phase."""
+    marks = timeline()
+    log.info("startup: %s", ", ".join(f"{p} {ms:.0f} ms" for p, ms in marks),
+             extra={"fields": {"startup_ms": dict(marks)}})
@@ -0,0 +1,159 @@
+# core/tasks.py
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_local = threading.local()
+log = logging.getLogger("usb_guard.tasks")
+
+
+def current_task():
+    """The Task running on this worker thread (None outside a TaskRunner worker)."""
+    return getattr(_local, "task", None)
+
+
+def cancelled() -> bool:
+    """True if the task running on this worker thread has been cancelled or superseded."""
+    task = current_task()
+    return task is not None and task.cancelled
+
+
+def report_progress(*args):
+    """From a worker: deliver on_progress(*args) for the current task on the main thread."""
+    task = current_task()
+    if task is not None and task.on_progress is not None and task.runner is not None:
+        task.runner.results.put(("progress", task, args))
+
+
+class Task:
+    def __init__(self, fn, args, kwargs, on_done, on_error, key, on_progress=None, runner=None):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.key = key
+        self.runner = runner
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Skip the task if it hasn't started; drop its result if it has."""
+        self._cancel.set()
+
+
+class TaskRunner:
+    """
+    Runs blocking jobs (DB queries, PowerShell, bcrypt) on worker threads and
+    hands their results back to the Tk main thread.
+
+    Workers never touch Tk: results go into a thread-safe queue that is drained
+    with widget.after() every poll_ms, and on_done/on_error run on the main thread.
+    Submitting with a `key` cancels any earlier pending task with the same key,
+    so a slow refresh never overwrites a newer one. submit() is main-thread only.
+    """
+
+    def __init__(self, widget, workers: int = 2, poll_ms: int = 30):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gui-task")
+        self.results = queue.Queue()
+        self.by_key = {}
+        self.pending = 0
+        self.busy_listeners = []
+        self.widget.after(self.poll_ms, self._poll)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, key=None, **kwargs) -> Task:
+        task = Task(fn, args, kwargs, on_done, on_error, key, on_progress, self)
+        if key is not None:
+            old = self.by_key.get(key)
+            if old is not None:
+                old.cancel()
+            self.by_key[key] = task
+        self._set_pending(self.pending + 1)
+        self.pool.submit(self._run, task)
+        return task
+
+    def run_and_wait(self, fn, *args, **kwargs):
+        """
+        Run fn on a worker and wait for it while keeping the UI responsive
+        (nested event loop via wait_variable). Re-raises fn's exception.
+        """
+        done = {}
+        var = self._wait_var()
+        self.submit(
+            fn, *args,
+            on_done=lambda r: (done.update(result=r), var.set(True)),
+            on_error=lambda e: (done.update(error=e), var.set(True)),
+            **kwargs,
+        )
+        self.widget.wait_variable(var)
+        if "error" in done:
+            raise done["error"]
+        return done["result"]
+
+    def add_busy_listener(self, callback):
+        """callback(busy: bool) is called on the main thread when work starts/stops."""
+        self.busy_listeners.append(callback)
+
+    def shutdown(self):
+        for task in self.by_key.values():
+            task.cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- internals ----------
+    def _wait_var(self):
+        import tkinter as tk
+        return tk.BooleanVar(master=self.widget, value=False)
+
+    def _run(self, task: Task):
+        if task.cancelled:
+            self.results.put(("done", task, (None, None)))
+            return
+        _local.task = task
+        try:
+            result = task.fn(*task.args, **task.kwargs)
+            self.results.put(("done", task, (result, None)))
+        except Exception as e:
+            self.results.put(("done", task, (None, e)))
+        finally:
+            _local.task = None
+
+    def _poll(self):
+        try:
+            while True:
+                kind, task, payload = self.results.get_nowait()
+                if kind == "progress":
+                    if not task.cancelled:
+                        task.on_progress(*payload)
+                else:
+                    self._finish(task, *payload)
+        except queue.Empty:
+            pass
+        self.widget.after(self.poll_ms, self._poll)
+
+    def _finish(self, task: Task, result, error):
+        self._set_pending(self.pending - 1)
+        if task.key is not None and self.by_key.get(task.key) is task:
+            del self.by_key[task.key]
+        if task.cancelled:
+            return
+        if error is not None:
+            if task.on_error:
+                task.on_error(error)
+            else:
+                log.exception("task %s failed", getattr(task.fn, "__name__", task.fn), exc_info=error)
+        elif task.on_done:
+            task.on_done(result)
+
+    def _set_pending(self, n: int):
+        was_busy = self.pending > 0
+        self.pending = n
+        if was_busy != (n > 0):
+            for callback in self.busy_listeners:
+                callback(n > 0)
@@ -0,0 +1,134 @@
+# core/trace.py
+# Per-event latency tracing along detect -> decide -> enforce -> log.
+#
+# The monitor stamps each event with time.perf_counter_ns() when the watcher hands
+# it over ("trace_ns"); process_event marks the end of every stage on a Trace, and
+# the agent feeds the finished spans into a LatencyRecorder of HDR-style histograms.
+# "exposure" is detect + decide + enforce: how long a blocked drive stayed usable.
+import threading
+import time
+
+SUB_BITS = 7  # exact below 128, then 64 linear sub-buckets per power of two (within ~1.6%)
+_HALF = 1 << (SUB_BITS - 1)
+
+STAGES = ("detect", "decide", "enforce", "log", "publish", "notify", "total", "exposure")
+STORED_STAGES = ("detect", "decide", "enforce")  # known before the row is written; see DB.log_event
+
+
+class Trace:
+    """Stage durations in microseconds: trace.mark("decide") closes the stage running since the last mark."""
+
+    __slots__ = ("start_ns", "last_ns", "spans")
+
+    def __init__(self, start_ns: int | None = None):
+        now = time.perf_counter_ns()
+        self.start_ns = start_ns if start_ns is not None else now
+        self.last_ns = self.start_ns
+        self.spans = {}
+
+    def mark(self, stage: str):
+        now = time.perf_counter_ns()
+        self.spans[stage] = (now - self.last_ns) // 1000
+        self.last_ns = now
+
+    def finish(self, blocked: bool = False) -> dict:
+        self.spans["total"] = (self.last_ns - self.start_ns) // 1000
+        if blocked:
+            self.spans["exposure"] = sum(self.spans.get(s, 0) for s in STORED_STAGES)
+        return self.spans
+
+
+def _index(v: int) -> int:
+    if v < 2 * _HALF:
+        return v
+    e = v.bit_length() - SUB_BITS
+    return e * _HALF + (v >> e)
+
+
+def _upper(i: int) -> int:
+    """Highest value that lands in bucket i."""
+    if i < 2 * _HALF:
+        return i
+    e = i // _HALF - 1
+    return ((i - e * _HALF + 1) << e) - 1
+
+
+class Histogram:
+    """Log-linear (HDR-style) histogram of non-negative ints with fixed relative precision."""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, v: int):
+        v = max(0, int(v))
+        i = _index(v)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.count += 1
+        self.total += v
+        self.max = max(self.max, v)
+
+    def percentile(self, p: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                return min(_upper(i), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total // self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class LatencyRecorder:
+    """Thread-safe set of histograms, one per stage, in microseconds."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def record(self, spans: dict):
+        with self.lock:
+            for stage, us in spans.items():
+                if us is not None:
+                    self.histograms.setdefault(stage, Histogram()).record(us)
+
+    def summary(self) -> dict:
+        """{stage: {"count", "mean", "p50", "p90", "p99", "max"}} in microseconds, in pipeline order."""
+        with self.lock:
+            order = sorted(self.histograms, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES))
+            return {s: self.histograms[s].summary() for s in order}
+
+    @classmethod
+    def from_rows(cls, rows) -> "LatencyRecorder":
+        """Rebuild from stored (decision, detect_us, decide_us, enforce_us) rows (see DB.stage_timings)."""
+        rec = cls()
+        for decision, *stages in rows:
+            spans = dict(zip(STORED_STAGES, stages))
+            if decision == "blocked":
+                spans["exposure"] = sum(v or 0 for v in stages)
+            rec.record(spans)
+        return rec
+
+
+def format_summary(summary: dict) -> str:
+    """Plain-text table of a LatencyRecorder summary, in milliseconds."""
+    if not summary:
+        return "no events traced yet"
+    lines = [f"{'stage':<9}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)"]
+    for stage, s in summary.items():
+        lines.append(f"{stage:<9}{s['count']:>8}" + "".join(f"{s[k] / 1000:>10.3f}" for k in ("p50", "p90", "p99", "max")))
+    return "\n".join(lines)
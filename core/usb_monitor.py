@@ -3,10 +3,9 @@ import re
 import threading
 import time
 
-import wmi
-import pythoncom
-
 VID_PID_RE = re.compile(r"VID_([0-9A-F]{4}).*PID_([0-9A-F]{4})", re.IGNORECASE)
+# last part of a USBSTOR instance id built from the device's own serial: "<serial>&<LUN>"
+USBSTOR_SERIAL_RE = re.compile(r"^([0-9A-Z]+)&\d+$", re.IGNORECASE)
 
 
 def parse_ids(pnp_id: str):
@@ -63,13 +62,84 @@ def parse_vid_pid(pnp_id: str):
         return None, None
     return m.group(1).upper(), m.group(2).upper()
 
+
+def usbstor_serial(pnp_id: str | None):
+    """
+    The USB serial number inside a USBSTOR disk id, e.g.
+    "USBSTOR\\DISK&VEN_SANDISK&PROD_ULTRA&REV_1.00\\4C5300012301&0" -> "4C5300012301".
+    None when Windows generated the id itself ("7&2A3B4C5D&0"): the device has no serial to match on.
+    """
+    m = USBSTOR_SERIAL_RE.match(parse_serial(pnp_id) or "")
+    return m.group(1) if m else None
+
+
+def parent_usb_query(pnp_id: str | None):
+    """WQL for the USB device a USBSTOR disk sits on (same serial, "USB\\VID_xxxx&PID_xxxx\\<serial>"), or None."""
+    serial = usbstor_serial(pnp_id)
+    if not serial:
+        return None
+    return f"SELECT DeviceID FROM Win32_PnPEntity WHERE DeviceID LIKE 'USB\\\\VID[_]%\\\\{serial}'"
+
+
+def parent_vid_pid(c, pnp_id: str | None):
+    """
+    (vid, pid) of the USB device behind a disk whose own id has none (USBSTOR\\...), via the
+    WMI connection `c`; (None, None) when the parent can't be found.
+    """
+    query = parent_usb_query(pnp_id)
+    if query is None:
+        return None, None
+    for dev in c.query(query):
+        vid, pid = parse_vid_pid(dev.DeviceID)
+        if vid and pid:
+            return vid, pid
+    return None, None
+
+
 def monitor_usb_storage(on_event):
     """
-    Calls on_event(dict) for insert/remove of USB Disk Drives.
-    dict keys: action ('insert'|'remove'), model, pnp_id, vid, pid, timestamp
+    Calls on_event(dict) for insert/remove of USB Disk Drives, from a daemon thread.
+    dict keys: action ('insert'|'remove'), model, pnp_id, vid, pid, timestamp,
+    trace_ns (time.perf_counter_ns() when the watcher returned it; see core/trace.py)
+    Disk ids are USBSTOR\\... without VID/PID; vid/pid then come from the parent USB device
+    (parent_vid_pid) when Windows knows its serial, else they are None. serial stays the disk id's last part.
     """
-    def _run():
-        pythoncom.CoInitialize()
+    t = threading.Thread(target=watch_usb_storage, args=(on_event,), daemon=True)
+    t.start()
+
+
+def _device_event(action: str, disk, resolve=None) -> dict:
+    """resolve(pnp_id) -> (vid, pid) fills in ids the disk's own PNPDeviceID lacks."""
+    trace_ns = time.perf_counter_ns()
+    vid, pid = parse_vid_pid(disk.PNPDeviceID)
+    if not (vid and pid) and resolve is not None:
+        vid, pid = resolve(disk.PNPDeviceID)
+    ids = parse_ids(disk.PNPDeviceID)
+    return {
+        "action": action,
+        "model": disk.Model,
+        "pnp_id": disk.PNPDeviceID,
+        "vid": vid,
+        "pid": pid,
+        "vendor": ids["vendor"],
+        "product": ids["product"],
+        "serial": ids["serial"],
+        "timestamp": time.time(),
+        "trace_ns": trace_ns,
+    }
+
+
+def watch_usb_storage(on_event, stopped: threading.Event | None = None):
+    """
+    The blocking watch loop behind monitor_usb_storage: same events, on the calling thread,
+    until `stopped` is set (checked at least every 0.5 s). core/runtime.py runs it on its WMI executor.
+    """
+    # Windows-only; imported here so the parsers above work (and can be tested) anywhere
+    import pythoncom
+    import wmi
+
+    pythoncom.CoInitialize()
+    try:
         c = wmi.WMI()
         insert_watcher = c.watch_for(
             notification_type="Creation",
@@ -81,46 +151,32 @@ def monitor_usb_storage(on_event):
             wmi_class="Win32_DiskDrive",
             InterfaceType="USB"
         )
-        while True:
+        # parent ids per disk, looked up on insert; by removal the parent is already gone
+        parents = {}
+
+        def resolve_insert(pnp_id):
+            try:
+                parents[pnp_id] = parent_vid_pid(c, pnp_id)
+            except wmi.x_wmi:
+                parents[pnp_id] = (None, None)
+            return parents[pnp_id]
+
+        def resolve_remove(pnp_id):
+            return parents.pop(pnp_id, (None, None))
+
+        while stopped is None or not stopped.is_set():
             # Wait for either insert or remove; alternate checks to keep it simple
             try:
                 inserted = insert_watcher(timeout_ms=500)
-                
                 if inserted:
-                    vid, pid = parse_vid_pid(inserted.PNPDeviceID)
-                    ids = parse_ids(inserted.PNPDeviceID)
-                    on_event({
-                        "action": "insert",
-                        "model": inserted.Model,
-                        "pnp_id": inserted.PNPDeviceID,
-                        "vid": vid,
-                        "pid": pid,
-                        "vendor": ids["vendor"],
-                        "product": ids["product"],
-                        "serial": ids["serial"],
-                        "timestamp": time.time(),
-                    })
+                    on_event(_device_event("insert", inserted, resolve_insert))
             except wmi.x_wmi_timed_out:
                 pass
             try:
                 removed = remove_watcher(timeout_ms=10)
                 if removed:
-                    vid, pid = parse_vid_pid(removed.PNPDeviceID)
-                    ids = parse_ids(removed.PNPDeviceID)
-                    on_event({
-                        "action": "remove",
-                        "model": removed.Model,
-                        "pnp_id": removed.PNPDeviceID,
-                        "vid": vid,
-                        "pid": pid,
-                        "vendor": ids["vendor"],
-                        "product": ids["product"],
-                        "serial": ids["serial"],
-                        "timestamp": time.time(),
-                    })
+                    on_event(_device_event("remove", removed, resolve_remove))
             except wmi.x_wmi_timed_out:
                 pass
-        # pythoncom.CoUninitialize()  # unreachable in this simple loop
-
-    t = threading.Thread(target=_run, daemon=True)
-    t.start()
+    finally:
+        pythoncom.CoUninitialize()
@@ -0,0 +1,180 @@
+# core/usbids.py
+# Vendor and product names for VID/PID, from the public usb.ids list
+# (http://www.linux-usb.org/usb.ids). compile_usb_ids() turns the text file into
+# a compact sorted binary index once (python usb_ids.py build usb.ids); UsbIds
+# memory-maps it and binary-searches the fixed-size records in place, so a
+# lookup costs a few microseconds and no per-entry Python objects are built.
+#
+# Index layout, little-endian:
+#   header    MAGIC, vendor count (u32), product count (u32)
+#   vendors   count x (vid u32, name offset u32), sorted by vid
+#   products  count x (vid << 16 | pid u32, name offset u32), sorted
+#   names     UTF-8 strings, each preceded by its byte length (u16); offsets are from the file start
+import mmap
+import os
+import re
+import struct
+import threading
+
+DEFAULT_INDEX_PATH = os.path.join("data", "usb.ids.idx")
+MAGIC = b"USBIDX1\0"
+_HEADER = struct.Struct("<8sII")
+_RECORD = struct.Struct("<II")
+_KEY = struct.Struct("<I")
+_LEN = struct.Struct("<H")
+
+_VENDOR_RE = re.compile(r"^([0-9a-fA-F]{4})\s+(.+?)\s*$")
+_PRODUCT_RE = re.compile(r"^\t([0-9a-fA-F]{4})\s+(.+?)\s*$")
+
+
+def parse_usb_ids(lines):
+    """Yield (vid, pid or None, name) from usb.ids text; the class/HID/language sections are skipped."""
+    vid = None
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+        if not line.startswith("\t"):
+            m = _VENDOR_RE.match(line)
+            vid = int(m.group(1), 16) if m else None  # "C 00 ..." etc. end the device list
+            if m:
+                yield vid, None, m.group(2)
+        elif vid is not None and not line.startswith("\t\t"):
+            m = _PRODUCT_RE.match(line)
+            if m:
+                yield vid, int(m.group(1), 16), m.group(2)
+
+
+def compile_usb_ids(src: str, out: str = DEFAULT_INDEX_PATH) -> tuple[int, int]:
+    """Write the binary index for usb.ids file `src` (atomically). Returns (vendors, products)."""
+    vendors, products = {}, {}
+    with open(src, encoding="utf-8", errors="replace") as f:
+        for vid, pid, name in parse_usb_ids(f):
+            if pid is None:
+                vendors[vid] = name
+            else:
+                products[(vid << 16) | pid] = name
+
+    names = bytearray()
+    offsets = {}  # name -> offset relative to the names section; repeated names are stored once
+    tables = []
+    for table in (vendors, products):
+        records = []
+        for key in sorted(table):
+            name = table[key]
+            if name not in offsets:
+                raw = name.encode("utf-8")[:0xFFFF]
+                offsets[name] = len(names)
+                names += _LEN.pack(len(raw)) + raw
+            records.append((key, offsets[name]))
+        tables.append(records)
+
+    base = _HEADER.size + _RECORD.size * (len(vendors) + len(products))
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    tmp = out + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(vendors), len(products)))
+        for records in tables:
+            f.write(b"".join(_RECORD.pack(key, base + off) for key, off in records))
+        f.write(names)
+    os.replace(tmp, out)
+    return len(vendors), len(products)
+
+
+def _hex(value) -> int | None:
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip(), 16)
+    except ValueError:
+        return None
+
+
+class UsbIds:
+    """A memory-mapped index written by compile_usb_ids(). VID/PID may be ints or hex strings ("0781")."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_vendors, self.n_products = _HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{path} is not a usb.ids index")
+        self.vendors_at = _HEADER.size
+        self.products_at = self.vendors_at + _RECORD.size * self.n_vendors
+
+    def close(self):
+        self.mm.close()
+
+    def _find(self, start: int, count: int, key: int) -> str | None:
+        mm, size = self.mm, _RECORD.size
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k = _KEY.unpack_from(mm, start + mid * size)[0]
+            if k < key:
+                lo = mid + 1
+            elif k > key:
+                hi = mid
+            else:
+                off = _KEY.unpack_from(mm, start + mid * size + 4)[0]
+                (n,) = _LEN.unpack_from(mm, off)
+                return mm[off + 2:off + 2 + n].decode("utf-8", "replace")
+        return None
+
+    def vendor(self, vid) -> str | None:
+        vid = _hex(vid)
+        if vid is None:
+            return None
+        return self._find(self.vendors_at, self.n_vendors, vid)
+
+    def product(self, vid, pid) -> str | None:
+        vid, pid = _hex(vid), _hex(pid)
+        if vid is None or pid is None:
+            return None
+        return self._find(self.products_at, self.n_products, (vid << 16) | pid)
+
+    def lookup(self, vid, pid=None) -> tuple[str | None, str | None]:
+        """(vendor name, product name); either is None when unknown."""
+        return self.vendor(vid), self.product(vid, pid)
+
+    def find_vendors(self, text: str, limit: int = 20) -> list:
+        """[(vid "0781", name)] whose name contains text (case-insensitive); a linear scan of the vendor table."""
+        text = text.strip().lower()
+        out = []
+        for i in range(self.n_vendors):
+            vid, off = _RECORD.unpack_from(self.mm, self.vendors_at + i * _RECORD.size)
+            (n,) = _LEN.unpack_from(self.mm, off)
+            name = self.mm[off + 2:off + 2 + n].decode("utf-8", "replace")
+            if text in name.lower():
+                out.append((f"{vid:04X}", name))
+                if len(out) >= limit:
+                    break
+        return out
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_index() -> UsbIds | None:
+    """The index at DEFAULT_INDEX_PATH, opened on first use; None if it has not been built."""
+    global _default
+    with _default_lock:
+        if _default is None and os.path.exists(DEFAULT_INDEX_PATH):
+            try:
+                _default = UsbIds(DEFAULT_INDEX_PATH)
+            except (OSError, ValueError):
+                return None
+        return _default
+
+
+def describe(vid, pid, index: UsbIds | None = None) -> str:
+    """ "SanDisk Corp. Cruzer Blade" style label for display; "" when unknown or no index is built."""
+    index = index or default_index()
+    if index is None:
+        return ""
+    vendor, product = index.lookup(vid, pid)
+    return " ".join(x for x in (vendor, product) if x)
@@ -0,0 +1,95 @@
+# core/whitelist_io.py
+import csv
+import json
+import re
+
+from core.db import DB
+
+FIELDS = ("label", "vid", "pid", "serial")
+HEX4_RE = re.compile(r"^[0-9A-Fa-f]{4}$")
+MAX_ERRORS = 100
+
+
+def read_rows(path: str):
+    """Yield (line_no, dict) from a CSV (with header), JSON array or JSON Lines file."""
+    lower = path.lower()
+    if lower.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    yield n, json.loads(line)
+    elif lower.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            for n, obj in enumerate(json.load(f), 1):
+                yield n, obj
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            reader.fieldnames = [(h or "").strip().lower() for h in reader.fieldnames or []]
+            for n, row in enumerate(reader, 2):
+                yield n, row
+
+
+def validate_row(row: dict):
+    """Return (label, vid, pid, serial) or raise ValueError. A vid alone is a vendor-level rule."""
+    label, vid, pid, serial = ((str(row.get(k) or "").strip() or None) for k in FIELDS)
+    if (pid and not vid) or (vid and serial and not pid):
+        raise ValueError("vid and pid must be given together")
+    if vid and not (HEX4_RE.match(vid) and HEX4_RE.match(pid or "0000")):
+        raise ValueError(f"vid/pid must be 4 hex digits (got {vid}/{pid})")
+    if not vid and not serial:
+        raise ValueError("needs a serial or a vid/pid pair")
+    return label, vid, pid, serial
+
+
+def import_whitelist(db: DB, path: str, chunk_size: int = 20000) -> dict:
+    """
+    Stream entries from `path` into the whitelist in one transaction.
+    Invalid rows are skipped and reported (first MAX_ERRORS only).
+    Returns {"read", "inserted", "duplicates", "invalid", "errors"}.
+    """
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "errors": []}
+
+    def chunks():
+        chunk = []
+        for line_no, row in read_rows(path):
+            stats["read"] += 1
+            try:
+                chunk.append(validate_row(row))
+            except (ValueError, AttributeError) as e:
+                stats["invalid"] += 1
+                if len(stats["errors"]) < MAX_ERRORS:
+                    stats["errors"].append(f"line {line_no}: {e}")
+                continue
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        yield chunk
+
+    stats["inserted"], stats["duplicates"] = db.whitelist_add_many(chunks())
+    return stats
+
+
+def export_whitelist(db: DB, path: str) -> int:
+    """Write the whitelist (label, vid, pid, serial) as CSV, JSON Lines (*.jsonl) or a JSON array (*.json)."""
+    n = 0
+    lower = path.lower()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if lower.endswith(".jsonl"):
+            for row in db.iter_whitelist():
+                f.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n")
+                n += 1
+        elif lower.endswith(".json"):
+            # written element by element so the list never sits in memory
+            f.write("[")
+            for row in db.iter_whitelist():
+                f.write(("," if n else "") + "\n  " + json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+                n += 1
+            f.write("\n]\n")
+        else:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for row in db.iter_whitelist():
+                writer.writerow(row)
+                n += 1
+    return n
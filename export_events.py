@@ -0,0 +1,69 @@
+# export_events.py
+# Scheduled / command-line export of the events table.
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from core.db import DB, DEFAULT_DB_PATH
+from core.export import FORMATS, ExportCancelled, export_events, format_for_path
+
+EPILOG = """
+Examples:
+  python export_events.py events.csv
+  python export_events.py --since 2025-01-01 --decision blocked blocked.jsonl.gz
+  python export_events.py --last-days 1 --format csv.gz daily.csv.gz
+"""
+
+
+def _parse_time(value: str) -> int:
+    """Epoch seconds, YYYY-MM-DD or YYYY-MM-DD HH:MM[:SS] (local time)."""
+    if value.isdigit():
+        return int(value)
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return int(datetime.strptime(value, fmt).timestamp())
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"bad time: {value!r}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Export USB events (streaming).", epilog=EPILOG,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("out", help="output file")
+    ap.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    ap.add_argument("--db", default=DEFAULT_DB_PATH)
+    ap.add_argument("--since", type=_parse_time)
+    ap.add_argument("--until", type=_parse_time)
+    ap.add_argument("--last-days", type=float, help="shortcut for --since now-N days")
+    ap.add_argument("--decision", choices=["allowed", "blocked", "observe"])
+    ap.add_argument("--action", choices=["insert", "remove"])
+    ap.add_argument("--vid")
+    ap.add_argument("--pid")
+    ap.add_argument("--serial")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv)
+
+    filters = {k: getattr(args, k) for k in ("since", "until", "decision", "action", "vid", "pid", "serial")}
+    if args.last_days is not None:
+        filters["since"] = int(time.time() - args.last_days * 86400)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} rows", end="", file=sys.stderr, flush=True)
+
+    db = DB(args.db)
+    t0 = time.perf_counter()
+    try:
+        n = export_events(db, args.out, args.format or format_for_path(args.out), filters,
+                          progress=None if args.quiet else progress)
+    except (KeyboardInterrupt, ExportCancelled):
+        print("\nExport cancelled.", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print(f"\nExported {n} events to {args.out} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
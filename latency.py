@@ -0,0 +1,26 @@
+# latency.py
+# Enforcement latency per stage (detect -> decide -> enforce -> log), p50/p90/p99/max.
+# Reads the running agent's live histograms, or the timings stored with logged events.
+import argparse
+
+from core.agent import connect
+from core.db import DB, DEFAULT_DB_PATH
+from core.trace import LatencyRecorder, format_summary
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Show USB Guard enforcement latency per stage.")
+    ap.add_argument("--stored", action="store_true", help="use timings stored in the DB even if an agent is running")
+    ap.add_argument("--db", default=DEFAULT_DB_PATH)
+    ap.add_argument("--limit", type=int, default=10000, help="most recent inserts to read from the DB (default 10000)")
+    args = ap.parse_args()
+
+    client = None if args.stored else connect()
+    if client is not None:
+        print("Live, since the agent started:")
+        print(format_summary(client.latency()))
+        client.close()
+    else:
+        db = DB(args.db)
+        rows = db.stage_timings(args.limit)
+        print(f"Stored with the last {len(rows)} device inserts:")
+        print(format_summary(LatencyRecorder.from_rows(rows).summary()))
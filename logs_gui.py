@@ -3,9 +3,15 @@ import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
 
+from core.agent import connect
 from core.db import DB
+from core.export import export_events
+from core.tasks import TaskRunner, report_progress
+from core.usbids import describe
 
-db = DB()
+db = None  # the running agent's AgentClient, or a local DB when no agent is up (set in __main__)
+
+PAGE_SIZE = 200
 
 class LogsGUI:
     def __init__(self, root):
@@ -23,9 +29,12 @@ class LogsGUI:
 
         ttk.Button(filter_frame, text="Apply Filter", command=self.refresh).pack(side="left", padx=10)
         ttk.Button(filter_frame, text="Export CSV", command=self.export_csv).pack(side="left", padx=10)
+        self.status = ttk.Label(filter_frame, text="")
+        self.status.pack(side="left", padx=10)
+        self.tasks = TaskRunner(root)
 
         # --- Events Table ---
-        cols = ("when", "action", "decision", "model", "serial", "vid", "pid", "pnp_id", "note")
+        cols = ("when", "action", "decision", "model", "serial", "vid", "pid", "device", "pnp_id", "note")
         self.tree = ttk.Treeview(root, columns=cols, show="headings", height=20)
 
         headers = {
@@ -36,6 +45,7 @@ class LogsGUI:
             "serial": "Serial",
             "vid": "VID",
             "pid": "PID",
+            "device": "Vendor / Product",
             "pnp_id": "InstanceId",
             "note": "Note"
         }
@@ -44,7 +54,16 @@ class LogsGUI:
             self.tree.heading(c, text=headers[c])
             self.tree.column(c, width=150 if c in ("when","decision","action") else 220, anchor="w")
 
-        self.tree.pack(fill="both", expand=True, padx=10, pady=5)
+        table = ttk.Frame(root)
+        table.pack(fill="both", expand=True, padx=10, pady=5)
+        self.scrollbar = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(in_=table, side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.cursor = None
+        self.pages_loaded = 0
+        self.load_pending = False
 
         self.refresh()
 
@@ -52,47 +71,59 @@ class LogsGUI:
         # Clear
         for i in self.tree.get_children():
             self.tree.delete(i)
-
-        # Decision filter
+        self.cursor = None
+        self.pages_loaded = 0
+        self.load_more()
+
+    def load_more(self):
+        # Next keyset page; more pages load as the user scrolls down
+        self.load_pending = False
+        if self.pages_loaded and self.cursor is None:
+            return
         dec_filter = self.decision_filter.get()
-        query = "SELECT ts, action, decision, model, serial, vid, pid, pnp_id, note FROM events"
-        params = []
-        if dec_filter != "All":
-            query += " WHERE decision = ?"
-            params.append(dec_filter)
-        query += " ORDER BY ts DESC LIMIT 500"
-
-        cur = db.conn.cursor()
-        cur.execute(query, params)
-        rows = cur.fetchall()
+        filters = {"decision": dec_filter} if dec_filter != "All" else {}
+        rows, self.cursor = db.query_events(filters, self.cursor, limit=PAGE_SIZE)
+        self.pages_loaded += 1
 
         for r in rows:
-            ts = datetime.fromtimestamp(r[0]).strftime("%Y-%m-%d %H:%M:%S")
-            self.tree.insert("", "end", values=(ts, r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[8]))
+            ts = datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+            self.tree.insert("", "end", values=(
+                ts, r["action"], r["decision"], r["model"], r["serial"],
+                r["vid"], r["pid"], describe(r["vid"], r["pid"]), r["pnp_id"], r["note"],
+            ))
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= 0.95 and self.cursor is not None and not self.load_pending:
+            self.load_pending = True
+            self.root.after_idle(self.load_more)
 
     def export_csv(self):
-        import csv
         from tkinter import filedialog, messagebox
 
-        file = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")])
+        file = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV Files", "*.csv"), ("JSON Lines", "*.jsonl"), ("Gzip", "*.gz")],
+        )
         if not file:
             return
 
-        cur = db.conn.cursor()
-        cur.execute("SELECT ts, action, decision, model, serial, vid, pid, pnp_id, note FROM events ORDER BY ts DESC")
-        rows = cur.fetchall()
-
-        with open(file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Timestamp", "Action", "Decision", "Model", "Serial", "VID", "PID", "InstanceId", "Note"])
-            for r in rows:
-                ts = datetime.fromtimestamp(r[0]).strftime("%Y-%m-%d %H:%M:%S")
-                writer.writerow([ts, r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[8]])
-
-        messagebox.showinfo("Exported", f"Logs exported to {file}")
+        dec_filter = self.decision_filter.get()
+        filters = {"decision": dec_filter} if dec_filter != "All" else {}
+        # streamed in chunks on a worker thread; the window stays responsive
+        self.tasks.submit(
+            export_events, db, file, None, filters, progress=report_progress,
+            on_progress=lambda done, total: self.status.config(text=f"Exporting… {done:,}/{total:,}"),
+            on_done=lambda n: (self.status.config(text=""),
+                               messagebox.showinfo("Exported", f"{n:,} events exported to {file}")),
+            on_error=lambda e: (self.status.config(text=""),
+                                messagebox.showerror("Export", f"Export failed:\n{e}")),
+        )
 
 
 if __name__ == "__main__":
+    # a viewer only reads, so it doesn't need to start an agent of its own
+    db = connect() or DB()
     root = tk.Tk()
     app = LogsGUI(root)
     root.mainloop()
@@ -1,73 +1,83 @@
 # main.py
-from core.usb_monitor import monitor_usb_storage
-from core.db import DB
-from core.notifier import notify
-from core.blocker import is_admin, disable_device, enable_device
-from core.guardian import process_event
-
-db = DB()
-
-def handle_event(evt: dict):
-    action = evt["action"]
-    model = evt.get("model")
-    pnp_id = evt.get("pnp_id")
-    vid = evt.get("vid")
-    pid = evt.get("pid")
-    serial = evt.get("serial")
-    process_event(evt, db)
-
-    # Decide first
-    if action == "insert":
-        whitelisted = db.whitelist_contains(vid, pid, serial)
-        decision = "allowed" if whitelisted else "blocked"
-
-        # Enforce (soft-block / enable) before logging so note reflects result
-        if decision == "blocked":
-            ok, msg = disable_device(pnp_id)
-            note = f"not on whitelist; {'disabled' if ok else 'disable failed: ' + msg}"
-        else:
-            ok, msg = enable_device(pnp_id)
-            # Enabling is best-effort; it may already be enabled
-            note = f"on whitelist; {'enabled' if ok else 'enable attempt: ' + msg}"
-    else:
-        decision = "observe"
-        note = "device removed"
+# Runs the USB Guard agent: the one process that monitors, enforces and logs.
+# The GUIs attach to it over IPC (core/agent.py); if none is running they host one themselves.
+from core import startup  # first, so the startup timeline covers every other import
+import argparse
+import sys
 
-    # Log to DB
-    db.log_event(
-        ts=evt["timestamp"],
-        action=action,
-        model=model,
-        pnp_id=pnp_id,
-        vid=vid,
-        pid=pid,
-        serial=serial,
-        decision=decision,
-        note=note,
-    )
-
-    # Console feedback
-    key = f"VID:{vid} PID:{pid}" if (vid and pid) else "SERIAL-ONLY"
-    serial_str = serial or "—"
-    print(f"[{action.upper()}] {model or 'Unknown Model'} | {key} S/N:{serial_str} -> {decision.upper()} ({note})")
-
-    # Notifications
-    if action == "insert":
-        title = f"USB {decision.upper()}"
-        msg = f"{model or 'Unknown'}\n{key} S/N:{serial_str}\n{note}"
-        notify(title, msg, duration=7)
-    elif action == "remove":
-        title = "USB Removed"
-        msg = f"{model or 'Unknown'}\nS/N:{serial_str}"
-        notify(title, msg, duration=4)
+from core import log, notifier
+from core.agent import Agent
+from core.anomaly import AnomalyDetector
+from core.blocker import is_admin
+from core.db import DB
+# optional components (core.sinks, core.shipper, core.policy, core.metrics' HTTP server)
+# are imported below only when their flags are given
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="USB Guard agent.")
+    ap.add_argument("--no-removal-toasts", action="store_true", help="don't show a toast when a device is removed")
+    ap.add_argument("--toast-window", type=float, default=2.0, metavar="SECONDS",
+                    help="toasts arriving within this window are combined into one summary (default 2)")
+    ap.add_argument("--alerts", metavar="CONFIG", help="JSON file of webhook/syslog/SMTP sinks to forward blocks to")
+    ap.add_argument("--ship-to", metavar="URL", help="fleet collector (collector.py) to ship events to")
+    ap.add_argument("--ship-credentials", metavar="PATH",
+                    help="agent id and key from `collector.py --enroll` (default data/ship_credentials.json)")
+    ap.add_argument("--policy-server", metavar="URL", help="policy server (policy_server.py) to sync the whitelist from")
+    ap.add_argument("--policy-key-file", metavar="PATH",
+                    help="the policy server's signing key (`policy_server.py key`; default data/policy.key)")
+    ap.add_argument("--metrics-port", type=int, metavar="PORT",
+                    help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    ap.add_argument("--metrics-textfile", metavar="PATH",
+                    help="also write the metrics to PATH (*.prom) for a node_exporter textfile collector")
+    ap.add_argument("--no-anomaly", action="store_true",
+                    help="turn off detection of rapid reconnects and cloned serials (core/anomaly.py)")
+    ap.add_argument("--anomaly-block", action="store_true",
+                    help="block devices showing those patterns even when whitelisted")
+    ap.add_argument("--threaded", action="store_true",
+                    help="handle events on the watcher thread instead of the asyncio runtime (core/runtime.py)")
+    ap.add_argument("--log-level", default="INFO", help="DEBUG, INFO, WARNING or ERROR (default INFO)")
+    ap.add_argument("--log-file", default=log.DEFAULT_LOG_PATH,
+                    help=f"JSON Lines log, rotated at 10 MB (default {log.DEFAULT_LOG_PATH})")
+    args = ap.parse_args()
+    startup.mark("imports")
+    log.setup_logging(args.log_file, args.log_level)
+    notifier.configure(show_removals=not args.no_removal_toasts, window=args.toast_window)
+
     if not is_admin():
         print("⚠️  WARNING: Not running as Administrator. Soft-blocking will NOT work.")
         print("    Right-click PowerShell/Terminal → ‘Run as administrator’, then start the app again.\n")
 
+    db = DB()
+    alerts = shipper = policy = metrics = None
+    if args.alerts:
+        from core.sinks import load_dispatcher
+        alerts = load_dispatcher(args.alerts)
+    if args.ship_to:
+        from core.shipper import DEFAULT_CREDENTIALS, Shipper, load_credentials
+        try:
+            agent_id, key = load_credentials(args.ship_credentials or DEFAULT_CREDENTIALS)
+        except (OSError, ValueError, KeyError) as e:
+            sys.exit(f"--ship-to needs the credentials from `collector.py --enroll`: {e}")
+        shipper = Shipper(db, args.ship_to, key, agent_id=agent_id)
+    if args.policy_server:
+        from core.policy import DEFAULT_KEY_FILE, PolicySync
+        try:
+            with open(args.policy_key_file or DEFAULT_KEY_FILE, encoding="utf-8") as f:
+                policy_key = f.read().strip()
+        except OSError as e:
+            sys.exit(f"--policy-server needs the key from `policy_server.py key`: {e}")
+        policy = PolicySync(db, args.policy_server, policy_key)
+    if args.metrics_port is not None or args.metrics_textfile:
+        from core.metrics import MetricsExporter
+        metrics = MetricsExporter(args.metrics_port, args.metrics_textfile)
+    detector = None if args.no_anomaly else AnomalyDetector(force_block=args.anomaly_block)
+    agent = Agent(db, alerts=alerts, shipper=shipper, policy=policy, metrics=metrics, detector=detector,
+                  runtime=None if args.threaded else {})
+    if not agent.start(foreground=True):
+        print("Another USB Guard agent is already running.")
+        log.shutdown_logging()
+        sys.exit(1)
+
     print("USB detector + logger running. Plug/unplug a USB storage device to test.")
-    monitor_usb_storage(handle_event)
-    import time
-    while True:
-        time.sleep(1)
+    agent.run_forever()
+    log.shutdown_logging()
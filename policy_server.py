@@ -0,0 +1,70 @@
+# policy_server.py
+# Central whitelist policy server: agents started with `main.py --policy-server http://HOST:PORT`
+# pull changes from here. Edits made with add/remove/import become new policy versions.
+import argparse
+import sys
+
+from core.policy import DEFAULT_POLICY_DB, PolicyStore, make_server
+from core.whitelist_io import read_rows, validate_row
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Publish a versioned USB whitelist to USB Guard agents.")
+    ap.add_argument("--db", default=DEFAULT_POLICY_DB)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve", help="serve the policy over HTTP")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1; 0.0.0.0 for all)")
+    serve.add_argument("--port", type=int, default=8741)
+    add = sub.add_parser("add", help="add or relabel one entry")
+    add.add_argument("label")
+    add.add_argument("--vid")
+    add.add_argument("--pid")
+    add.add_argument("--serial")
+    rm = sub.add_parser("remove", help="remove one entry")
+    rm.add_argument("--vid")
+    rm.add_argument("--pid")
+    rm.add_argument("--serial")
+    imp = sub.add_parser("import", help="add every entry of a CSV/JSON/JSONL file as one version")
+    imp.add_argument("file")
+    sub.add_parser("acks", help="show the version each agent has applied")
+    key = sub.add_parser("key", help="print the signing key agents need (main.py --policy-key-file)")
+    key.add_argument("--rotate", action="store_true", help="replace the key; every agent needs the new one")
+    args = ap.parse_args()
+
+    store = PolicyStore(args.db)
+    try:
+        if args.cmd == "serve":
+            server = make_server(store, args.host, args.port)
+            print(f"Policy server v{store.version()} listening on http://{args.host}:{args.port}/policy -> {args.db}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+        elif args.cmd == "add":
+            try:
+                entry = validate_row(vars(args))
+            except ValueError as e:
+                print(f"Invalid entry: {e}")
+                sys.exit(1)
+            print(f"Policy version {store.put(*entry)}")
+        elif args.cmd == "remove":
+            version = store.remove(args.vid, args.pid, args.serial)
+            print("No such entry." if version is None else f"Policy version {version}")
+            sys.exit(version is None)
+        elif args.cmd == "import":
+            entries, invalid = [], 0
+            for line_no, row in read_rows(args.file):
+                try:
+                    entries.append(validate_row(row))
+                except (ValueError, AttributeError) as e:
+                    invalid += 1
+                    print(f"line {line_no}: {e}")
+            print(f"Imported {len(entries)} entries ({invalid} invalid) as policy version {store.put_many(entries)}")
+        elif args.cmd == "key":
+            print(store.signing_key(rotate=args.rotate))
+        elif args.cmd == "acks":
+            for agent_id, ack in store.acks().items():
+                print(f"{agent_id}\tv{ack['version']}")
+    finally:
+        store.close()
@@ -0,0 +1,144 @@
+# tests/test_agent_ipc.py
+# Single-instance agent and its local IPC API (core/agent.py, core/ipc.py).
+
+import os
+import queue
+import tempfile
+import time
+import unittest
+
+from core.agent import Agent, AgentClient, connect
+from core.db import DB
+from core.events import event_record
+from core.ipc import IpcClient, IpcError, TOKEN_NAME, default_transport
+
+
+def fake_process(evt, db, bus):
+    """Stands in for core.guardian.process_event: log and publish only, no PowerShell or toasts."""
+    decision = "blocked" if evt["action"] == "insert" else "observe"
+    event_id = db.log_event(evt["timestamp"], evt["action"], evt.get("model"), evt.get("pnp_id"),
+                            evt.get("vid"), evt.get("pid"), evt.get("serial"), decision, "test")
+    bus.publish(event_record(evt, decision, "test", event_id))
+    return {"decision": decision, "note": "test", "id": event_id, "stages_us": {"decide": 40, "total": 900}}
+
+
+def _evt(serial, action="insert"):
+    return {"timestamp": time.time(), "action": action, "model": "Stick", "pnp_id": f"USB\\VID_0781&PID_5567\\{serial}",
+            "vid": "0781", "pid": "5567", "serial": serial}
+
+
+class AgentTestMixin:
+    transport = None
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "test.db"))
+        self.agent = Agent(self.db, runtime_dir=self.tmp.name, monitor=False,
+                           process=fake_process, transport=self.transport)
+        self.assertTrue(self.agent.start())
+        self.client = AgentClient(self.tmp.name, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.agent.stop()
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_ping_and_status(self):
+        self.assertEqual(self.client.call("ping"), "pong")
+        self.assertEqual(self.client.status()["pid"], os.getpid())
+
+    def test_whitelist_edits_and_queries(self):
+        self.client.whitelist_add("Office", "0781", "5567", "ABC")
+        self.client.whitelist_add_serial("Personal", "XYZ")
+        rows, after = self.client.query_whitelist("off", limit=10)
+        self.assertEqual([r["label"] for r in rows], ["Office"])
+        self.assertIsNone(after)
+        self.assertTrue(self.client.whitelist_contains(None, None, "XYZ"))
+        self.assertTrue(self.client.whitelist_remove_id(rows[0]["id"]))
+        self.assertEqual(self.client.count_whitelist(), 1)
+        self.assertIsNone(self.client.whitelist_and_enable("Stick", "S2", None))
+        self.assertTrue(self.db.whitelist_contains(None, None, "S2"))
+
+    def test_event_paging_round_trips_cursor(self):
+        for i in range(5):
+            self.agent.handle_event(_evt(f"S{i}"))
+        rows, cursor = self.client.query_events({"decision": "blocked"}, None, limit=3)
+        more, end = self.client.query_events({"decision": "blocked"}, cursor, limit=3)
+        self.assertEqual(len(rows) + len(more), 5)
+        self.assertIsNone(end)
+        self.assertEqual(self.client.count_events(), 5)
+
+    def test_latency_histograms(self):
+        for i in range(3):
+            self.agent.handle_event(_evt(f"S{i}"))
+        latency = self.client.latency()
+        self.assertEqual(list(latency), ["decide", "total"])
+        self.assertEqual((latency["total"]["count"], latency["total"]["p99"]), (3, 900))
+
+    def test_accounts_need_first_run_or_current_password(self):
+        self.assertTrue(self.client.add_user("alice", "pw1"))
+        with self.assertRaises(IpcError):
+            self.client.add_user("mallory", "pw")  # only the first account is created over IPC
+        with self.assertRaises(IpcError):
+            self.client.change_password("alice", "wrong", "pw2")
+        self.assertTrue(self.client.change_password("alice", "pw1", "pw2"))
+        self.assertTrue(self.client.verify_user("alice", "pw2"))
+        self.assertEqual(self.db.count_users(), 1)
+        with self.assertRaises(IpcError):
+            self.client.call("change_password", username="alice", new_password="pw3")
+
+    def test_unknown_op_rejected(self):
+        with self.assertRaises(IpcError):
+            self.client.call("log_event")
+        with self.assertRaises(AttributeError):
+            self.client.log_event
+
+    def test_subscribe_streams_events(self):
+        got = queue.Queue()
+        self.client.subscribe(got.put)
+        self.client.call("ping")  # subscription is live once subscribe() returned
+        result = self.agent.handle_event(_evt("LIVE1"))
+        evt = got.get(timeout=5)
+        self.assertEqual((evt["id"], evt["serial"], evt["decision"]), (result["id"], "LIVE1", "blocked"))
+        self.assertEqual(evt["kind"], "event")
+
+    def test_whitelist_edit_is_pushed(self):
+        got = queue.Queue()
+        self.client.subscribe(got.put)
+        self.client.whitelist_add_serial("Stick", "S9")
+        self.assertEqual(got.get(timeout=5)["kind"], "whitelist")
+
+    def test_bad_token_rejected(self):
+        with open(os.path.join(self.tmp.name, TOKEN_NAME), "w") as f:
+            f.write("wrong")
+        with self.assertRaises(IpcError):
+            IpcClient(self.tmp.name, timeout=5).call("ping")
+
+    def test_second_agent_refused(self):
+        second = Agent(self.db, runtime_dir=self.tmp.name, monitor=False, transport=self.transport)
+        self.assertFalse(second.start())
+        self.assertIsNotNone(connect(self.tmp.name))
+
+
+@unittest.skipUnless(default_transport() == "unix", "Unix sockets not available")
+class TestAgentUnixSocket(AgentTestMixin, unittest.TestCase):
+    transport = "unix"
+
+    def test_socket_is_private(self):
+        mode = os.stat(os.path.join(self.tmp.name, "agent.sock")).st_mode
+        self.assertEqual(mode & 0o077, 0)
+
+
+class TestAgentTcp(AgentTestMixin, unittest.TestCase):
+    transport = "tcp"
+
+
+class TestNoAgent(unittest.TestCase):
+    def test_connect_returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(connect(tmp))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+# tests/test_anomaly.py
+# Streaming detection of reconnect bursts and cloned serials (core/anomaly.py).
+
+import os
+import tempfile
+import unittest
+
+from core.anomaly import AnomalyDetector
+from core.blocker import StubEnforcer
+from core.db import DB
+from core.events import EventBus
+from core.guardian import process_event
+from core.notifier import CountingBackend, Notifier, device_toast
+from core.sinks import AlertDispatcher, Sink, SyslogSink
+from core.usb_monitor import _device_event
+
+
+def _evt(ts, serial="2004A1B2C3", vid="0781", pid="5567", action="insert"):
+    return {"timestamp": ts, "action": action, "model": "Stick", "pnp_id": f"USB\\VID_{vid}&PID_{pid}\\{serial}",
+            "vid": vid, "pid": pid, "serial": serial}
+
+
+class TestAnomalyDetector(unittest.TestCase):
+    def test_rapid_reconnects_within_window(self):
+        det = AnomalyDetector(window=10, burst=3)
+        self.assertEqual(det.observe(_evt(100)), [])
+        self.assertEqual(det.observe(_evt(100, action="remove")), [])
+        self.assertEqual(det.observe(_evt(104)), [])
+        findings = det.observe(_evt(108))
+        self.assertEqual([f["kind"] for f in findings], ["rapid_reconnect"])
+        self.assertEqual(findings[0]["detail"], "3 inserts in 8.0s")
+        # spread out: the oldest of the last three is outside the window
+        self.assertEqual(det.observe(_evt(125)), [])
+
+    def test_serial_under_another_identity(self):
+        det = AnomalyDetector()
+        det.observe(_evt(1))
+        findings = det.observe(_evt(2, vid="1337", pid="0001"))
+        self.assertEqual([f["kind"] for f in findings], ["identity_mismatch"])
+        self.assertIn("0781:5567", findings[0]["detail"])
+        # generic and short serials are shared by real devices; no finding
+        det.observe(_evt(3, serial="0123456789ABCDEF"))
+        self.assertEqual(det.observe(_evt(4, serial="0123456789ABCDEF", vid="1337")), [])
+        self.assertEqual(det.snapshot()["identity_mismatch"], 1)
+
+    def test_usbstor_disk_with_resolved_parent_ids(self):
+        # live events: a USBSTOR disk id whose VID/PID come from the parent USB device
+        disk = type("Disk", (), {"Model": "Stick", "PNPDeviceID": r"USBSTOR\DISK&VEN_X&PROD_Y&REV_1.00\2004A1B2C3&0"})()
+        det = AnomalyDetector()
+        self.assertEqual(det.observe(_device_event("insert", disk, lambda _p: ("0781", "5567"))), [])
+        findings = det.observe(_device_event("insert", disk, lambda _p: ("1337", "0001")))
+        self.assertEqual([f["kind"] for f in findings], ["identity_mismatch"])
+        # parent not found: nothing to compare
+        self.assertEqual(det.observe(_device_event("insert", disk, lambda _p: (None, None))), [])
+
+    def test_memory_is_bounded(self):
+        det = AnomalyDetector(max_devices=50, max_serials=100)
+        for i in range(1000):
+            det.observe(_evt(i, serial=f"SERIAL{i:06d}"))
+        snap = det.snapshot()
+        self.assertEqual((snap["devices"], snap["serials"], snap["events"]), (50, 100, 1000))
+
+
+class TestAnomalousEvents(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "usb.db"))
+        self.db.whitelist_add("Office", "0781", "5567", "2004A1B2C3")
+        self.notifier = Notifier(CountingBackend())  # not started: toasts just queue
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def _process(self, det, evt, enforcer):
+        findings = det.observe(evt)
+        if findings:
+            evt["anomalies"] = findings
+        return process_event(evt, self.db, self.bus, notifier=self.notifier, enforcer=enforcer)
+
+    def test_force_block_overrides_whitelist(self):
+        self.bus = EventBus()
+        sub = self.bus.subscribe()
+        enforcer = StubEnforcer()
+        det = AnomalyDetector(burst=2, force_block=True)
+        self.assertEqual(self._process(det, _evt(1), enforcer)["decision"], "allowed")
+        result = self._process(det, _evt(2), enforcer)
+        self.assertEqual(result["decision"], "blocked")
+        self.assertTrue(result["note"].startswith("on whitelist but anomalous; disabled; ANOMALY: 2 inserts"))
+        self.assertEqual([c[0] for c in enforcer.calls], ["enable", "disable"])
+        record = [sub.get(1), sub.get(1)][1]
+        self.assertEqual(record["anomalies"][0]["kind"], "rapid_reconnect")
+        toast = device_toast(dict(_evt(2), anomalies=record["anomalies"]), "blocked", result["note"])
+        self.assertEqual((toast.group, toast.title), ("anomalous", "USB ANOMALY (BLOCKED)"))
+
+    def test_detect_only_keeps_decision(self):
+        self.bus = None
+        det = AnomalyDetector(burst=2)
+        self._process(det, _evt(1), StubEnforcer())
+        result = self._process(det, _evt(2), StubEnforcer())
+        self.assertEqual(result["decision"], "allowed")
+        self.assertIn("ANOMALY", result["note"])
+
+    def test_alerts_forward_anomalies_at_high_severity(self):
+        class Recording(Sink):
+            name = "recording"
+
+            def __init__(self):
+                self.records = []
+
+            async def send(self, records):
+                self.records.extend(records)
+
+        sink = Recording()
+        dispatcher = AlertDispatcher([sink], batch_window=0.01, spill_dir=self.tmp.name).start()
+        record = {"kind": "event", "id": 1, "decision": "allowed", "action": "insert", "ts": 1,
+                  "anomalies": [{"kind": "rapid_reconnect", "detail": "x", "block": False}]}
+        try:
+            self.assertTrue(dispatcher.submit(record))
+            self.assertFalse(dispatcher.submit(dict(record, id=2, anomalies=None)))  # plain allow: filtered
+        finally:
+            dispatcher.stop()
+        self.assertEqual([r["id"] for r in sink.records], [1])
+        self.assertTrue(SyslogSink().format(record).startswith(b"<34>1 "))  # auth.crit
+
+
+if __name__ == "__main__":
+    unittest.main()
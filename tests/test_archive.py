@@ -0,0 +1,86 @@
+# tests/test_archive.py
+# Columnar event archive (core/archive.py): round trip, time-range block skipping.
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from core.db import DB
+
+COLUMNS = ("id", "ts", "action", "decision", "model", "pnp_id", "vid", "pid", "serial", "note",
+           "detect_us", "decide_us", "enforce_us")
+
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "usb.db"))
+        for i in range(1000):
+            blocked = i % 3 == 0
+            self.db.log_event(1700000000 + i * 60 - (i % 7), "insert", f"Model {i % 5}", f"USB\\X\\S{i % 40}",
+                              "0781", None if i % 11 == 0 else "5567", f"S{i % 40}",
+                              "blocked" if blocked else "allowed", "not on whitelist" if blocked else None,
+                              {"detect": i, "decide": 5} if i % 2 else None)
+        self.path = os.path.join(self.tmp.name, "events.uga")
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def _rows(self, where="", params=()):
+        return self.db.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM events {where} ORDER BY id", params).fetchall()
+
+    def test_round_trip(self):
+        from core.archive import Archive, write_archive
+        stats = write_archive(self.db.conn, self.path, block_rows=128)
+        self.assertEqual((stats["rows"], stats["blocks"]), (1000, 8))
+        with Archive(self.path) as archive:
+            data = archive.scan(COLUMNS, decode=True)
+        rows = list(zip(*(data[c].tolist() for c in COLUMNS)))
+        expected = [r[:10] + tuple(-1 if v is None else v for v in r[10:]) for r in self._rows()]
+        self.assertEqual(rows, expected)
+
+    def test_time_range_skips_blocks(self):
+        from core.archive import Archive, write_archive
+        write_archive(self.db.conn, self.path, block_rows=100)
+        since, until = 1700000000 + 250 * 60, 1700000000 + 420 * 60
+        with Archive(self.path) as archive:
+            self.assertEqual(archive.blocks(since, until).tolist(), [2, 3, 4])
+            data = archive.scan(("id", "decision"), since, until)
+            blocked = archive.code("decision", "blocked")
+            self.assertIsNone(archive.code("decision", "observe"))
+            expected = self._rows("WHERE ts >= ? AND ts <= ?", (since, until))
+            self.assertEqual(data["id"].tolist(), [r[0] for r in expected])
+            self.assertEqual(int((data["decision"] == blocked).sum()), sum(r[3] == "blocked" for r in expected))
+            self.assertEqual(len(archive.scan(("ts",), since=2 ** 40)["ts"]), 0)
+
+    def test_partial_export_and_bad_files(self):
+        from core.archive import Archive, write_archive
+        self.assertEqual(write_archive(self.db.conn, self.path, since=2 ** 40)["rows"], 0)
+        with Archive(self.path) as archive:
+            self.assertEqual((archive.rows, archive.time_range()), (0, (None, None)))
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        with self.assertRaises(ValueError):
+            Archive(self.path)
+        self.assertFalse(os.path.exists(self.path + ".part"))
+
+    def test_cli_missing_database(self):
+        import archive_events
+        with contextlib.redirect_stderr(io.StringIO()) as err:
+            code = archive_events.main(["write", self.path, "--db", os.path.join(os.path.dirname(self.path), "no.db")])
+        self.assertEqual(code, 2)
+        self.assertIn("no.db", err.getvalue())
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
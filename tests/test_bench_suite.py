@@ -0,0 +1,29 @@
+# tests/test_bench_suite.py
+# bench/suite.py: baseline comparison and the whitelist lookup benchmark on a tiny whitelist.
+
+import tempfile
+import unittest
+
+from bench.suite import bench_whitelist_lookup, compare
+
+
+class TestBenchCompare(unittest.TestCase):
+    def test_regressions_respect_direction(self):
+        base = {"results": {"rate": {"value": 100, "better": "higher"}, "ms": {"value": 10, "better": "lower"},
+                            "gone": {"value": 1, "better": "lower"}}}
+        ok = {"results": {"rate": {"value": 80}, "ms": {"value": 12}}}
+        bad = {"results": {"rate": {"value": 70}, "ms": {"value": 13}}}
+        self.assertEqual(compare(ok, base, 0.25), [])
+        self.assertEqual(compare(bad, base, 0.25), ["rate", "ms"])
+
+
+class TestWhitelistLookup(unittest.TestCase):
+    def test_hits_and_misses_measured(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = bench_whitelist_lookup((50,), tmp)
+        self.assertEqual(sorted(out), ["whitelist_hit_50", "whitelist_miss_50"])
+        self.assertTrue(all(unit == "us/lookup" for _, unit, _ in out.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+# tests/test_db_changes.py
+# Change detection used by the GUI's incremental refresh (core/db.py).
+
+import os
+import tempfile
+import unittest
+
+from core.db import DB
+
+
+class TestChangeDetection(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "test.db")
+        self.db = DB(self.path)
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_data_version_moves_on_own_writes(self):
+        v0 = self.db.data_version()
+        self.assertEqual(self.db.data_version(), v0)
+        self.db.log_event(1, "insert", None, None, None, None, "S1", "blocked")
+        self.assertNotEqual(self.db.data_version(), v0)
+
+    def test_data_version_moves_on_other_connection_writes(self):
+        other = DB(self.path)
+        try:
+            v0 = self.db.data_version()
+            other.whitelist_add_serial("x", "S1")
+            self.assertNotEqual(self.db.data_version(), v0)
+        finally:
+            other.conn.close()
+
+    def test_whitelist_version_counts_changes(self):
+        v0 = self.db.whitelist_version()
+        self.db.whitelist_add_serial("x", "S1")
+        self.db.whitelist_add_serial("y", "S2")
+        self.assertEqual(self.db.whitelist_version(), v0 + 2)
+        self.db.remove_whitelist("S1")
+        self.assertEqual(self.db.whitelist_version(), v0 + 3)
+        self.db.log_event(1, "insert", None, None, None, None, "S2", "allowed")
+        self.assertEqual(self.db.whitelist_version(), v0 + 3)
+
+    def test_recent_blocked_after_id(self):
+        import time
+        now = time.time()
+        for i in range(3):
+            self.db.log_event(now, "insert", "M", f"P{i}", None, None, f"S{i}", "blocked")
+        rows = self.db.list_recent_blocked()
+        self.assertEqual([r["serial"] for r in rows], ["S2", "S1", "S0"])
+        newer = self.db.list_recent_blocked(after_id=rows[1]["id"])
+        self.assertEqual([r["serial"] for r in newer], ["S2"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
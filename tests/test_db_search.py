@@ -0,0 +1,125 @@
+# tests/test_db_search.py
+# Full-text search over events (core/db.py events_fts) on a throwaway database.
+
+import os
+import tempfile
+import unittest
+
+from core.db import DB, _event_where
+
+
+class TestEventSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "test.db"))
+        self.db.log_event(1000, "insert", "SanDisk Ultra USB Device", r"USB\VID_0781&PID_5567\2004A1B2C3D4",
+                          "0781", "5567", "2004A1B2C3D4", "blocked", "not on whitelist; disabled")
+        self.db.log_event(1001, "insert", "Kingston DataTraveler", r"USB\VID_0951&PID_1666\KT998877",
+                          "0951", "1666", "KT998877", "allowed", "on whitelist")
+        self.db.log_event(1002, "remove", "Kingston DataTraveler", r"USB\VID_0951&PID_1666\KT998877",
+                          "0951", "1666", "KT998877", "observe", "device removed")
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_serial_substring(self):
+        rows = self.db.search_events("a1b2c3")
+        self.assertEqual([r["serial"] for r in rows], ["2004A1B2C3D4"])
+
+    def test_model_substring_newest_first_on_tie(self):
+        rows = self.db.search_events("datatraveler")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({r["decision"] for r in rows}, {"allowed", "observe"})
+        # identical rows rank the same; the newer one comes first
+        again = self.db.log_event(1003, "remove", "Kingston DataTraveler", r"USB\VID_0951&PID_1666\KT998877",
+                                  "0951", "1666", "KT998877", "observe", "device removed")
+        rows = [r for r in self.db.search_events("datatraveler") if r["decision"] == "observe"]
+        self.assertEqual([r["id"] for r in rows], [again, again - 1])
+
+    def test_note_and_pagination(self):
+        self.assertEqual(len(self.db.search_events("whitelist")), 2)
+        self.assertEqual(len(self.db.search_events("whitelist", limit=1, offset=1)), 1)
+        self.assertEqual(self.db.search_events("whitelist", limit=1, offset=2), [])
+
+    def test_short_term_falls_back_to_like(self):
+        rows = self.db.search_events("KT")
+        self.assertEqual(len(rows), 2)
+
+    def test_quotes_are_literal(self):
+        self.assertEqual(self.db.search_events('"OR'), [])
+
+    def test_index_follows_delete(self):
+        with self.db.conn:
+            self.db.conn.execute("DELETE FROM events WHERE serial = 'KT998877'")
+        self.assertEqual(self.db.search_events("KT998877"), [])
+
+    def test_existing_history_is_indexed_on_reopen(self):
+        path = os.path.join(self.tmp.name, "test.db")
+        with self.db.conn:
+            self.db.conn.execute("DROP TABLE events_fts")
+            self.db.conn.execute("PRAGMA user_version = 0")  # a file from before the index existed
+        self.db.conn.close()
+        self.db = DB(path)
+        self.assertEqual(len(self.db.search_events("SanDisk")), 1)
+
+
+class TestQueryEvents(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "test.db"))
+        # 10 events, two per second, alternating decision
+        for i in range(10):
+            self.db.log_event(2000 + i // 2, "insert" if i % 3 else "remove", "Model", f"USB\\VID_0781&PID_5567\\S{i}",
+                              "0781", "5567" if i < 5 else "9999", f"s{i}", "blocked" if i % 2 else "allowed")
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def _all_pages(self, filters=None, limit=3):
+        out, cursor = [], None
+        while True:
+            rows, cursor = self.db.query_events(filters, cursor, limit=limit)
+            out.extend(rows)
+            if cursor is None:
+                return out
+
+    def test_pages_cover_everything_once_newest_first(self):
+        rows = self._all_pages()
+        self.assertEqual(len(rows), 10)
+        keys = [(r["ts"], r["id"]) for r in rows]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertEqual(len(set(keys)), 10)
+
+    def test_cursor_breaks_ties_on_id(self):
+        rows, cursor = self.db.query_events(limit=1)
+        self.assertEqual(cursor, (rows[0]["ts"], rows[0]["id"]))
+        rows2, _ = self.db.query_events(after_cursor=cursor, limit=1)
+        self.assertEqual(rows2[0]["ts"], rows[0]["ts"])
+        self.assertLess(rows2[0]["id"], rows[0]["id"])
+
+    def test_filters(self):
+        self.assertEqual(len(self._all_pages({"decision": "blocked"})), 5)
+        self.assertEqual(len(self._all_pages({"action": "remove"})), 4)
+        self.assertEqual(len(self._all_pages({"vid": "0781", "pid": "9999"})), 5)
+        self.assertEqual([r["serial"] for r in self._all_pages({"serial": "s3"})], ["S3"])
+        self.assertEqual(len(self._all_pages({"since": 2001, "until": 2002})), 4)
+
+    def test_single_column_filters_need_no_sort(self):
+        for filters in ({"vid": "0781"}, {"pid": "9999"}, {"action": "insert"}, {"decision": "blocked"}):
+            where, params = _event_where(filters)
+            plan = " ".join(r[-1] for r in self.db.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM events WHERE " + " AND ".join(where)
+                + " ORDER BY ts DESC, id DESC LIMIT 10", params))
+            self.assertNotIn("TEMP B-TREE", plan, filters)
+            self.assertRegex(plan, r"SEARCH events USING (COVERING )?INDEX", filters)
+
+    def test_short_last_page_has_no_cursor(self):
+        rows, cursor = self.db.query_events({"decision": "blocked"}, limit=50)
+        self.assertEqual(len(rows), 5)
+        self.assertIsNone(cursor)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
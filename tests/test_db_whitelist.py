@@ -0,0 +1,64 @@
+# tests/test_db_whitelist.py
+# Paged whitelist queries and removal by id (core/db.py).
+
+import os
+import tempfile
+import unittest
+
+from core.db import DB
+
+
+class TestWhitelistQuery(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "test.db"))
+        self.db.whitelist_add("Office SanDisk", "0781", "5567", "2004A1")
+        self.db.whitelist_add("office_kingston", "0951", "1666", None)   # VID/PID-only entry
+        self.db.whitelist_add_serial("ADATA Personal", "27C07")
+        self.db.whitelist_add("Lab 50%", "0781", "5567", "LAB-1")
+        for i in range(20):
+            self.db.whitelist_add_serial(f"Bulk {i}", f"BULK{i:02d}")
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_full_rows_returned(self):
+        rows, _ = self.db.query_whitelist(limit=2)
+        self.assertEqual(rows[1]["label"], "office_kingston")
+        self.assertEqual((rows[1]["vid"], rows[1]["pid"], rows[1]["serial"]), ("0951", "1666", None))
+
+    def test_keyset_pages(self):
+        seen, after = [], 0
+        while after is not None:
+            rows, after = self.db.query_whitelist(after_id=after, limit=5)
+            seen.extend(r["id"] for r in rows)
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 24)
+
+    def test_prefix_search_label_or_serial(self):
+        rows, _ = self.db.query_whitelist("office")
+        self.assertEqual({r["label"] for r in rows}, {"Office SanDisk", "office_kingston"})
+        rows, _ = self.db.query_whitelist("27c")
+        self.assertEqual([r["label"] for r in rows], ["ADATA Personal"])
+        self.assertEqual(self.db.count_whitelist("bulk1"), 10)
+        # wildcard characters in the search are literal
+        self.assertEqual(self.db.count_whitelist("office_"), 1)
+        self.assertEqual(self.db.count_whitelist("Lab 50%"), 1)
+        self.assertEqual(self.db.count_whitelist("Lab 5%"), 0)
+
+    def test_vid_pid_filters(self):
+        self.assertEqual(self.db.count_whitelist(vid="0781"), 2)
+        rows, _ = self.db.query_whitelist("lab", vid="0781", pid="5567")
+        self.assertEqual([r["serial"] for r in rows], ["LAB-1"])
+
+    def test_remove_by_id(self):
+        rows, _ = self.db.query_whitelist("office_")
+        self.assertTrue(self.db.whitelist_remove_id(rows[0]["id"]))
+        self.assertFalse(self.db.whitelist_contains("0951", "1666", None))
+        self.assertFalse(self.db.whitelist_remove_id(rows[0]["id"]))
+        self.assertEqual(self.db.count_whitelist(), 23)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,79 @@
+# tests/test_events.py
+# In-process event bus (core/events.py) and event filter matching (core/db.py).
+
+import threading
+import time
+import unittest
+
+from core.db import event_matches
+from core.events import EventBus, Subscription, event_record
+
+
+def _evt(serial="abc1", action="insert"):
+    return {"timestamp": 1700000000.25, "action": action, "model": "Stick",
+            "pnp_id": f"USB\\VID_0781&PID_5567\\{serial}", "vid": "0781", "pid": "5567", "serial": serial}
+
+
+class TestEventBus(unittest.TestCase):
+    def test_every_subscriber_gets_records_in_order(self):
+        bus = EventBus()
+        a, b = bus.subscribe(), bus.subscribe()
+        for i in range(3):
+            bus.publish({"n": i})
+        self.assertEqual([r["seq"] for r in a.drain()], [1, 2, 3])
+        self.assertEqual([r["n"] for r in b.drain()], [0, 1, 2])
+
+    def test_full_buffer_drops_oldest(self):
+        bus = EventBus()
+        slow = bus.subscribe(maxsize=3)
+        for i in range(10):
+            bus.publish({"n": i})
+        self.assertEqual([r["n"] for r in slow.drain()], [7, 8, 9])
+        self.assertEqual(slow.dropped, 7)
+
+    def test_publish_never_waits_for_readers(self):
+        bus = EventBus()
+        bus.subscribe(maxsize=10)  # never read
+        t0 = time.perf_counter()
+        for i in range(10000):
+            bus.publish({"n": i})
+        self.assertLess(time.perf_counter() - t0, 2.0)
+
+    def test_get_blocks_until_publish_or_close(self):
+        bus = EventBus()
+        sub = bus.subscribe()
+        self.assertIsNone(sub.get(timeout=0.01))
+        threading.Timer(0.05, bus.publish, args=({"n": 1},)).start()
+        self.assertEqual(sub.get(timeout=5)["n"], 1)
+        threading.Timer(0.05, sub.close).start()
+        self.assertIsNone(sub.get(timeout=5))
+        bus.publish({"n": 2})
+        self.assertEqual(bus.subscribers, [])
+
+    def test_standalone_subscription(self):
+        sub = Subscription(maxsize=2)
+        for i in range(3):
+            sub.put({"n": i})
+        self.assertEqual([r["n"] for r in sub.drain()], [1, 2])
+        self.assertEqual(sub.dropped, 1)
+
+
+class TestEventRecord(unittest.TestCase):
+    def test_record_matches_logged_row(self):
+        rec = event_record(_evt(), "blocked", "not on whitelist", 42)
+        self.assertEqual((rec["id"], rec["ts"], rec["serial"], rec["kind"]), (42, 1700000000, "ABC1", "event"))
+        self.assertEqual(rec["detected_at"], 1700000000.25)
+
+    def test_event_matches_filters(self):
+        rec = event_record(_evt(), "blocked", "x", 42)
+        self.assertTrue(event_matches(rec, {}))
+        self.assertTrue(event_matches(rec, {"decision": "blocked", "serial": " abc1 ", "vid": "0781", "pid": ""}))
+        self.assertTrue(event_matches(rec, {"since": 1700000000, "min_id": 41}))
+        self.assertFalse(event_matches(rec, {"decision": "allowed"}))
+        self.assertFalse(event_matches(rec, {"action": "remove"}))
+        self.assertFalse(event_matches(rec, {"until": 1699999999}))
+        self.assertFalse(event_matches(rec, {"min_id": 42}))
+
+
+if __name__ == "__main__":
+    unittest.main()
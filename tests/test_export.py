@@ -0,0 +1,80 @@
+# tests/test_export.py
+# Streaming event export (core/export.py) and its CLI.
+
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import export_events as cli
+from core.db import DB
+from core.export import ExportCancelled, export_events, format_for_path
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "test.db")
+        self.db = DB(self.db_path)
+        for i in range(25):
+            self.db.log_event(1000 + i, "insert", f"Model {i}", f"PNP{i}", "0781", "5567", f"s{i}",
+                              "blocked" if i % 5 == 0 else "allowed", "note, with comma")
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def _out(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_format_for_path(self):
+        self.assertEqual(format_for_path("a.CSV"), "csv")
+        self.assertEqual(format_for_path("a.jsonl.gz"), "jsonl.gz")
+        self.assertEqual(format_for_path("a.csv.gz"), "csv.gz")
+        self.assertEqual(format_for_path("a.json"), "jsonl")
+        self.assertEqual(format_for_path("a.txt"), "csv")
+
+    def test_csv_in_small_chunks(self):
+        progress = []
+        n = export_events(self.db, self._out("e.csv"), chunk_size=7, progress=lambda d, t: progress.append((d, t)))
+        self.assertEqual(n, 25)
+        self.assertEqual(progress[-1], (25, 25))
+        self.assertEqual(len(progress), 4)
+        with open(self._out("e.csv"), newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][0], "Timestamp")
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(rows[1][3], "Model 24")  # newest first
+        self.assertEqual(rows[1][8], "note, with comma")
+
+    def test_jsonl_gz_with_filters(self):
+        n = export_events(self.db, self._out("b.jsonl.gz"), filters={"decision": "blocked"}, chunk_size=2)
+        self.assertEqual(n, 5)
+        with gzip.open(self._out("b.jsonl.gz"), "rt", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([r["serial"] for r in rows], ["S20", "S15", "S10", "S5", "S0"])
+        self.assertEqual(rows[0]["ts"], 1020)
+
+    def test_cancel_removes_partial_file(self):
+        calls = []
+
+        def cancelled():
+            calls.append(1)
+            return len(calls) > 1
+
+        with self.assertRaises(ExportCancelled):
+            export_events(self.db, self._out("c.csv"), chunk_size=5, cancelled=cancelled)
+        self.assertFalse(os.path.exists(self._out("c.csv")))
+        self.assertFalse(os.path.exists(self._out("c.csv.part")))
+
+    def test_cli(self):
+        rc = cli.main(["--db", self.db_path, "--since", "1010", "--quiet", self._out("cli.csv.gz")])
+        self.assertEqual(rc, 0)
+        with gzip.open(self._out("cli.csv.gz"), "rt", encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 16)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
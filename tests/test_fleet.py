@@ -0,0 +1,161 @@
+# tests/test_fleet.py
+# Agent -> collector event shipping (core/shipper.py, core/collector.py).
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from core.collector import Collector, CollectorError, make_server
+from core.db import DB, EVENT_COLUMNS
+from core.shipper import STATE_NAME, Shipper, encode_batch
+from core.signing import SIGNATURE_HEADER, sign
+
+
+def _log(db, n, start=0):
+    for i in range(start, start + n):
+        db.log_event(1700000000 + i, "insert", "Stick", f"USB\\X\\S{i}", "0781", "5567", f"S{i}", "blocked", "x")
+
+
+class TestFleetShipping(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "agent.db"))
+        self.collector = Collector(os.path.join(self.tmp.name, "fleet.db"))
+        self.server = make_server(self.collector, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.key = self.collector.enroll("host-a")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.collector.close()
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def _shipper(self, url=None, key=None, **kw):
+        return Shipper(self.db, url or self.url, key or self.key, spool_dir=os.path.join(self.tmp.name, "spool"),
+                       agent_id="host-a", batch_size=10, **kw)
+
+    def _post(self, body, agent_id, key):
+        req = urllib.request.Request(self.url + "/ingest", data=body, method="POST", headers={
+            "Content-Encoding": "gzip", "X-Agent-Id": agent_id, SIGNATURE_HEADER: sign(key, body)})
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return json.loads(resp.read())
+
+    def _fleet_rows(self):
+        return self.collector.conn.execute("SELECT COUNT(*), COUNT(DISTINCT event_id) FROM fleet_events").fetchone()
+
+    def test_ships_new_rows_in_batches(self):
+        _log(self.db, 25)
+        shipper = self._shipper()
+        self.assertEqual(shipper.run_once(), 3)
+        _log(self.db, 4, start=25)
+        self.assertEqual(shipper.run_once(), 1)
+        self.assertEqual(self._fleet_rows(), (29, 29))
+        self.assertEqual(self.collector.stats()["host-a"]["last_seq"], 4)
+        self.assertEqual(shipper.pending(), [])
+
+    def test_offline_spool_then_catch_up(self):
+        _log(self.db, 15)
+        offline = self._shipper(url="http://127.0.0.1:9")  # nothing listens on the discard port
+        self.assertEqual(offline.run_once(), 0)
+        self.assertEqual(len(offline.pending()), 2)
+        self.assertIsNotNone(offline.last_error)
+        # restart with the same spool (e.g. after a reboot) once the collector is reachable
+        _log(self.db, 5, start=15)
+        online = self._shipper()
+        self.assertEqual(online.run_once(), 3)
+        self.assertEqual(self._fleet_rows(), (20, 20))
+
+    def test_resend_after_lost_ack_is_not_duplicated(self):
+        _log(self.db, 10)
+        shipper = self._shipper()
+        shipper.spool_new()
+        (name,) = shipper.pending()
+        with open(os.path.join(shipper.spool_dir, name), "rb") as f:
+            body = f.read()
+        shipper.ship_pending()
+        # the collector applied it but the agent never saw the reply: it sends the batch again
+        with open(os.path.join(shipper.spool_dir, name), "wb") as f:
+            f.write(body)
+        shipper.ship_pending()
+        self.assertEqual(shipper.stats["duplicates"], 1)
+        self.assertEqual(self._fleet_rows(), (10, 10))
+
+    def test_watermark_survives_restart(self):
+        _log(self.db, 10)
+        self._shipper().run_once()
+        _log(self.db, 3, start=10)
+        self.assertEqual(self._shipper().spool_new(), 3)
+
+    def test_unsigned_or_foreign_batches_rejected(self):
+        forged = encode_batch("host-a", 1, [])
+        other = self.collector.enroll("host-b")
+        for agent_id, key in (("host-a", "0" * 64), ("host-b", other)):
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                self._post(forged, agent_id, key)  # wrong key; host-b's batch claiming to be host-a's
+            self.assertEqual(ctx.exception.code, 401)
+        self.assertEqual(self.collector.stats(), {})
+        _log(self.db, 5)
+        shipper = self._shipper(key=other)
+        self.assertEqual(shipper.run_once(), 0)
+        self.assertIn("HTTP 401", shipper.last_error)
+        self.assertEqual(len(shipper.pending()), 1)
+
+    def test_gap_renumbers_spool(self):
+        _log(self.db, 20)
+        shipper = self._shipper()
+        self.assertEqual(shipper.run_once(), 2)
+        # the collector is restored from a backup taken after the first batch
+        with self.collector.conn:
+            self.collector.conn.execute("UPDATE agents SET last_seq = 1")
+        _log(self.db, 10, start=20)
+        self.assertEqual(shipper.run_once(), 1)
+        self.assertEqual(shipper.stats["resyncs"], 1)
+        self.assertEqual(self.collector.stats()["host-a"]["last_seq"], 2)
+        self.assertEqual(shipper.state["next_seq"], 3)
+        self.assertEqual(self._fleet_rows(), (30, 30))
+
+    def test_overlapping_batch_after_lost_state(self):
+        _log(self.db, 10)
+        self._shipper().run_once()
+        _log(self.db, 5, start=10)
+        rows = self.db.conn.execute("SELECT " + ", ".join(EVENT_COLUMNS) + " FROM events ORDER BY id").fetchall()
+        # state lost: seq 1 re-cut with new rows is a duplicate seq, but its new rows are kept
+        self.assertEqual(self._post(encode_batch("host-a", 1, rows[:12]), "host-a", self.key), {"status": "duplicate"})
+        self.assertEqual(self._fleet_rows(), (12, 12))
+        # a fresh seq overlapping stored rows is applied, only the new rows count
+        self.assertEqual(self._post(encode_batch("host-a", 2, rows[8:]), "host-a", self.key),
+                         {"status": "ok", "rows": 3})
+        self.assertEqual(self._fleet_rows(), (15, 15))
+        self.assertEqual(self.collector.stats()["host-a"]["rows"], 15)
+
+    def test_construction_leaves_spool_state_alone(self):
+        self._shipper()
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "spool", STATE_NAME)))
+
+    def test_sequence_gap_rejected(self):
+        doc = json.loads(gzip.decompress(encode_batch("host-b", 2, [])))
+        with self.assertRaises(CollectorError) as ctx:
+            self.collector.ingest(doc)
+        self.assertEqual((ctx.exception.status, ctx.exception.body["expected"]), (409, 1))
+
+    def test_malformed_rows_rejected_whole(self):
+        self.collector.ingest(json.loads(gzip.decompress(encode_batch("host-b", 1, []))))
+        doc = json.loads(gzip.decompress(encode_batch("host-b", 2, [])))
+        doc["rows"] = [[1, 1700000000, "insert", "blocked", "m", "S", "0781", "5567", "p", "n"], [2, None]]
+        with self.assertRaises(CollectorError) as ctx:
+            self.collector.ingest(doc)
+        self.assertEqual(ctx.exception.status, 400)
+        self.assertEqual(self.collector.stats()["host-b"]["last_seq"], 1)
+        self.assertEqual(self._fleet_rows(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# tests/test_gen_db.py
+# Synthetic database generator (bench/gen_db.py).
+
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy  # noqa: F401
+except ImportError:
+    numpy = None
+
+from core.db import DB
+
+END = 1700006400  # fixed "today" so runs are comparable
+
+
+@unittest.skipIf(numpy is None, "bench/gen_db.py needs NumPy")
+class TestGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _generate(self, name, seed=1):
+        from bench.gen_db import generate
+        path = os.path.join(self.tmp.name, name)
+        stats = generate(path, 20000, whitelist=500, days=60, seed=seed, end=END, chunk_days=7)
+        return path, stats
+
+    def _content(self, path):
+        db = DB(path)
+        rows = db.conn.execute("SELECT ts, action, serial, decision FROM events ORDER BY id").fetchall()
+        wl = db.conn.execute("SELECT vid, pid, serial FROM whitelist ORDER BY id").fetchall()
+        db.conn.close()
+        return rows, wl
+
+    def test_deterministic_from_seed(self):
+        a, _ = self._generate("a.db")
+        b, _ = self._generate("b.db")
+        c, _ = self._generate("c.db", seed=2)
+        self.assertEqual(self._content(a), self._content(b))
+        self.assertNotEqual(self._content(a), self._content(c))
+
+    def test_usable_and_skewed(self):
+        path, stats = self._generate("u.db")
+        self.assertEqual(stats["events"], 20000)
+        db = DB(path)
+        self.assertEqual(db.count_events(), 20000)
+        self.assertEqual(db.count_events({"action": "insert"}), 10000)
+        self.assertEqual(db.count_whitelist(), 500)
+        ts = [r[0] for r in db.conn.execute("SELECT ts FROM events ORDER BY id")]
+        self.assertEqual(ts, sorted(ts))
+        self.assertTrue(END - 60 * 86400 <= ts[0] and ts[-1] < END)
+        # a handful of regular devices account for a large share of plug-ins
+        top = db.conn.execute("SELECT COUNT(*) FROM events WHERE action = 'insert' "
+                              "GROUP BY serial ORDER BY COUNT(*) DESC LIMIT 5").fetchall()
+        self.assertGreater(sum(n for (n,) in top), 10000 * 0.2)
+        serial = db.conn.execute("SELECT serial FROM events WHERE decision = 'blocked' LIMIT 1").fetchone()[0]
+        self.assertTrue(db.search_events(serial[3:11]))
+        db.conn.close()
+
+    def test_no_index_defers_build_to_first_open(self):
+        from bench.gen_db import generate
+        path = os.path.join(self.tmp.name, "n.db")
+        generate(path, 2000, whitelist=50, days=10, end=END, build_indexes=False)
+        db = DB(path)
+        serial = db.conn.execute("SELECT serial FROM events LIMIT 1").fetchone()[0]
+        self.assertTrue(db.search_events(serial))
+        self.assertTrue(db.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_events_ts'").fetchone())
+        db.conn.close()
+
+    def test_refuses_to_overwrite(self):
+        path, _ = self._generate("x.db")
+        from bench.gen_db import generate
+        with self.assertRaises(FileExistsError):
+            generate(path, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+# tests/test_guardian.py
+# core/guardian.process_event with a stub enforcer and notifier (no PowerShell, no toasts).
+
+import os
+import tempfile
+import time
+import unittest
+
+from core.blocker import StubEnforcer
+from core.db import DB
+from core.guardian import process_event
+from core.notifier import CountingBackend, Notifier
+
+
+def _evt(serial, action="insert"):
+    return {"timestamp": time.time(), "action": action, "model": "Stick", "pnp_id": f"USB\\VID_0781&PID_5567\\{serial}",
+            "vid": "0781", "pid": "5567", "serial": serial}
+
+
+class TestProcessEvent(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "usb.db"))
+        self.notifier = Notifier(CountingBackend())  # not started: toasts just queue
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_blocked_device_disabled(self):
+        enforcer = StubEnforcer()
+        result = process_event(_evt("S1"), self.db, notifier=self.notifier, enforcer=enforcer)
+        self.assertEqual((result["decision"], result["note"]), ("blocked", "not on whitelist; disabled"))
+        self.assertEqual(enforcer.calls, [("disable", "USB\\VID_0781&PID_5567\\S1")])
+
+    def test_whitelisted_device_enabled(self):
+        self.db.whitelist_add("Office", "0781", "5567", "S2")
+        enforcer = StubEnforcer()
+        result = process_event(_evt("S2"), self.db, notifier=self.notifier, enforcer=enforcer)
+        self.assertEqual(result["decision"], "allowed")
+        self.assertEqual(enforcer.calls, [("enable", "USB\\VID_0781&PID_5567\\S2")])
+
+    def test_failures_and_missing_admin_are_noted(self):
+        failed = process_event(_evt("S3"), self.db, notifier=self.notifier, enforcer=StubEnforcer(ok=False))
+        self.assertEqual(failed["note"], "not on whitelist; disable failed: stub failure")
+        no_admin = StubEnforcer(admin=False)
+        result = process_event(_evt("S4"), self.db, notifier=self.notifier, enforcer=no_admin)
+        self.assertEqual(result["note"], "not on whitelist; NOT disabled (needs admin)")
+        self.assertEqual(no_admin.calls, [])
+
+    def test_removal_is_observed(self):
+        enforcer = StubEnforcer()
+        result = process_event(_evt("S5", "remove"), self.db, notifier=self.notifier, enforcer=enforcer)
+        self.assertEqual(result["decision"], "observe")
+        self.assertEqual(enforcer.calls, [])
+        self.assertEqual(self.db.count_events({"decision": "observe"}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
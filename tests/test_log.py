@@ -0,0 +1,77 @@
+# tests/test_log.py
+# Structured, queued logging (core/log.py) and the record core/guardian.py writes per event.
+
+import json
+import logging
+import os
+import queue
+import tempfile
+import time
+import unittest
+
+from core import log
+from core.db import DB
+from core.guardian import process_event
+from core.notifier import CountingBackend, Notifier
+
+
+class TestStructuredLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "logs", "agent.log")
+
+    def tearDown(self):
+        log.shutdown_logging()
+        log.set_level("INFO")
+        self.tmp.cleanup()
+
+    def _records(self):
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_event_record_has_fields_and_stages(self):
+        log.setup_logging(self.path, console=False)
+        db = DB(os.path.join(self.tmp.name, "usb.db"))
+        notifier = Notifier(CountingBackend())  # not started: toasts just queue
+        evt = {"timestamp": 1700000000, "action": "insert", "model": "Stick", "pnp_id": "USB\\X\\S1",
+               "vid": "0781", "pid": "5567", "serial": "S1"}
+        result = process_event(evt, db, notifier=notifier)
+        log.shutdown_logging()
+        db.conn.close()
+        (rec,) = self._records()
+        self.assertEqual((rec["logger"], rec["level"], rec["event_id"], rec["decision"]),
+                         ("usb_guard.guardian", "INFO", result["id"], "blocked"))
+        self.assertIn("-> BLOCKED", rec["msg"])
+        self.assertEqual(set(rec["stages_us"]), {"decide", "enforce", "log", "notify", "total", "exposure"})
+
+    def test_runtime_level(self):
+        log.setup_logging(self.path, level="WARNING", console=False)
+        logger = logging.getLogger("usb_guard.test")
+        logger.info("hidden")
+        self.assertEqual(log.set_level("debug"), "DEBUG")
+        logger.debug("shown", extra={"fields": {"n": 1}})
+        log.shutdown_logging()
+        self.assertEqual([(r["msg"], r["n"]) for r in self._records()], [("shown", 1)])
+
+    def test_rotates_by_size(self):
+        log.setup_logging(self.path, max_bytes=2000, backups=2, console=False)
+        logger = logging.getLogger("usb_guard.test")
+        for i in range(200):
+            logger.warning("record %d", i)
+        log.shutdown_logging()
+        self.assertTrue(os.path.exists(self.path + ".1"))
+        self.assertFalse(os.path.exists(self.path + ".3"))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = log.DroppingQueueHandler(queue.Queue(2))  # nothing drains it
+        logger = logging.Logger("usb_guard.isolated")
+        logger.addHandler(handler)
+        t0 = time.perf_counter()
+        for i in range(10):
+            logger.warning("record %d", i)
+        self.assertLess(time.perf_counter() - t0, 0.5)
+        self.assertEqual((handler.queue.qsize(), handler.dropped), (2, 8))
+
+
+if __name__ == "__main__":
+    unittest.main()
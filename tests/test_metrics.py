@@ -0,0 +1,91 @@
+# tests/test_metrics.py
+# Prometheus exposition (core/metrics.py), scraped from a locally running agent.
+
+import os
+import tempfile
+import time
+import unittest
+import urllib.request
+
+from core.agent import Agent
+from core.db import DB
+from core.guardian import process_event
+from core.metrics import EVENTS, MetricsExporter, Registry
+from core.notifier import CountingBackend, Notifier
+
+
+def _parse(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+class TestScrapeAgent(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "test.db"))
+        toasts = Notifier(CountingBackend())
+        self.agent = Agent(self.db, runtime_dir=self.tmp.name, monitor=False,
+                           process=lambda evt, db, bus: process_event(evt, db, bus, notifier=toasts),
+                           metrics=MetricsExporter(port=0, textfile=os.path.join(self.tmp.name, "agent.prom")))
+        self.assertTrue(self.agent.start())
+
+    def tearDown(self):
+        self.agent.stop()
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def _scrape(self) -> dict:
+        url = f"http://127.0.0.1:{self.agent.metrics.port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            self.assertTrue(resp.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+            return _parse(resp.read().decode("utf-8"))
+
+    def test_scrape(self):
+        before = EVENTS.get("insert", "blocked")
+        self.db.whitelist_add_serial("Stick", "OK1")
+        for serial in ("S1", "S2", "OK1"):
+            self.agent.handle_event({"timestamp": time.time(), "action": "insert", "model": "Stick",
+                                     "pnp_id": f"USB\\X\\{serial}", "vid": None, "pid": None, "serial": serial,
+                                     "trace_ns": time.perf_counter_ns()})
+        m = self._scrape()
+        self.assertEqual(m['usbguard_events_total{action="insert",decision="blocked"}'], before + 2)
+        self.assertEqual(m["usbguard_whitelist_entries"], 1)
+        self.assertGreaterEqual(m['usbguard_db_commit_seconds_bucket{le="+Inf"}'], 3)
+        self.assertEqual(m['usbguard_stage_seconds_count{stage="decide"}'], 3)
+        decide = self.agent.latency.histograms["decide"]
+        self.assertAlmostEqual(m['usbguard_stage_seconds_sum{stage="decide"}'], decide.total / 1e6)
+        self.assertIn('usbguard_queue_depth{queue="subscribers"}', m)
+
+    def test_textfile_written(self):
+        with open(os.path.join(self.tmp.name, "agent.prom"), encoding="utf-8") as f:
+            self.assertIn("# TYPE usbguard_events_total counter", f.read())
+
+
+class TestRegistry(unittest.TestCase):
+    def test_histogram_exposition(self):
+        reg = Registry()
+        h = reg.histogram("t_seconds", "test", buckets=(0.1, 1.0))
+        for v in (0.05, 0.5, 5.0):
+            h.observe(v)
+        reg.counter("t_total", "test", ("path",)).inc('a"b')
+        text = reg.render()
+        self.assertIn('t_seconds_bucket{le="0.1"} 1\nt_seconds_bucket{le="1.0"} 2\nt_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('t_total{path="a\\"b"} 1', text)
+
+    def test_failing_callback_is_skipped_and_logged(self):
+        reg = Registry()
+        reg.gauge("t_ok", "test").set(1)
+        reg.gauge("t_gone", "test").set_function(lambda: 1 / 0)
+        with self.assertLogs("usb_guard.metrics", "DEBUG") as logs:
+            text = reg.render()
+        self.assertIn("t_ok 1", text)
+        self.assertNotIn("t_gone", text)
+        self.assertIn("t_gone", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# tests/test_notifier.py
+# Toast coalescing and rate limiting (core/notifier.py), driven by a fake clock.
+
+import time
+import unittest
+
+from core.notifier import Coalescer, CountingBackend, Notifier, device_toast
+
+
+def _evt(serial, action="insert", model="Stick"):
+    return {"timestamp": 0, "action": action, "model": model, "pnp_id": f"USB\\VID_0781&PID_5567\\{serial}",
+            "vid": "0781", "pid": "5567", "serial": serial}
+
+
+def _toast(serial, decision="blocked", action="insert"):
+    return device_toast(_evt(serial, action), decision, "not on whitelist")
+
+
+class TestCoalescer(unittest.TestCase):
+    def test_single_event_shown_at_once(self):
+        c = Coalescer(window=2.0)
+        c.offer(_toast("A"), now=100.0)
+        shown = c.due(100.0)
+        self.assertEqual(len(shown), 1)
+        self.assertEqual(shown[0][0], "USB BLOCKED")
+        self.assertIn("S/N:A", shown[0][1])
+
+    def test_burst_becomes_one_summary(self):
+        c = Coalescer(window=2.0)
+        c.offer(_toast("A"), now=100.0)
+        self.assertEqual(len(c.due(100.0)), 1)
+        for i in range(5):
+            c.offer(_toast(f"H{i}"), now=100.2 + i * 0.3)
+        self.assertEqual(c.due(101.0), [])
+        self.assertEqual(c.deadline(), 102.0)
+        (summary,) = c.due(102.0)
+        self.assertEqual(summary[0], "USB BLOCKED ×5")
+        self.assertTrue(summary[1].startswith("5 devices blocked in"))
+        self.assertIn("and 2 more", summary[1])
+        self.assertEqual(c.stats["coalesced"], 4)
+
+    def test_groups_summarised_separately(self):
+        c = Coalescer(window=2.0)
+        c.offer(_toast("A"), now=0.0)
+        c.due(0.0)
+        c.offer(_toast("B", "allowed"), now=0.5)
+        c.offer(_toast("C"), now=0.6)
+        c.offer(_toast("D"), now=0.7)
+        titles = [t[0] for t in c.due(2.0)]
+        self.assertEqual(sorted(titles), ["USB ALLOWED", "USB BLOCKED ×2"])
+
+    def test_flapping_device_rate_limited(self):
+        c = Coalescer(window=0.0, device_interval=30.0, burst=100)
+        shown = 0
+        for i in range(20):
+            c.offer(_toast("FLAP"), now=i * 1.0)
+            shown += len(c.due(i * 1.0))
+        self.assertEqual(shown, 1)
+        self.assertEqual(c.stats["suppressed_device"], 19)
+        c.offer(_toast("FLAP"), now=31.0)
+        self.assertEqual(len(c.due(31.0)), 1)
+
+    def test_global_rate_limit_reports_held_count(self):
+        c = Coalescer(window=0.0, device_interval=0.0, rate=0.5, burst=2)
+        shown = []
+        for i in range(5):
+            c.offer(_toast(f"D{i}"), now=0.0)
+            shown += c.due(0.0)
+        self.assertEqual(len(shown), 2)
+        self.assertEqual(c.stats["rate_limited"], 3)
+        c.offer(_toast("LATE"), now=10.0)
+        (late,) = c.due(10.0)
+        self.assertIn("+3 more notifications suppressed", late[1])
+
+    def test_removals_suppressible(self):
+        c = Coalescer(show_removals=False)
+        c.offer(_toast("A", "observe", action="remove"), now=0.0)
+        self.assertEqual(c.due(0.0), [])
+        self.assertEqual(c.stats["suppressed_removal"], 1)
+
+
+class TestNotifier(unittest.TestCase):
+    def test_submit_does_not_wait_for_backend(self):
+        backend = CountingBackend(delay=0.2)
+        n = Notifier(backend, window=1.0).start()
+        t0 = time.perf_counter()
+        for i in range(50):
+            n.device_event(_evt(f"S{i}"), "blocked", "not on whitelist")
+        self.assertLess(time.perf_counter() - t0, 0.2)
+        n.stop()
+        # the first toast (or first batch) at once, everything after it in one summary
+        self.assertLessEqual(backend.count, 2)
+        self.assertEqual(n.stats()["coalesced"], 50 - backend.count)
+        self.assertTrue(backend.calls[-1][0].startswith("USB BLOCKED ×"))
+
+    def test_backend_errors_are_logged(self):
+        def broken(title, message, duration):
+            raise RuntimeError("no notification backend")
+
+        n = Notifier(broken, window=0)
+        with self.assertLogs("usb_guard.notifier", "WARNING") as logs:
+            n._show([("USB BLOCKED", "Stick", 5)])
+        self.assertIn("no notification backend", logs.output[0])
+
+    def test_full_queue_drops(self):
+        n = Notifier(CountingBackend(), max_queue=3)  # not started, so nothing drains
+        results = [n.device_event(_evt(f"S{i}"), "blocked", "x") for i in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(n.stats()["dropped"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
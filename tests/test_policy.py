@@ -0,0 +1,138 @@
+# tests/test_policy.py
+# Central policy distribution (core/policy.py) against a local policy server.
+
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.db import DB
+from core.policy import PolicyStore, PolicySync, make_server, not_modified_body
+from core.signing import SIGNATURE_HEADER, sign
+
+
+class TestPolicySync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "agent.db"))
+        self.store = PolicyStore(os.path.join(self.tmp.name, "policy.db"))
+        self.server = self._serve(self.store)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.changes = []
+        self.sync = PolicySync(self.db, self.url, self.store.signing_key(), agent_id="host-a",
+                               on_change=lambda: self.changes.append(1))
+
+    def _serve(self, store):
+        server = make_server(store, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def tearDown(self):
+        self.store.close()
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_first_sync_is_full_then_not_modified(self):
+        self.store.put_many([("A", "0781", "5567", None), ("B", None, None, "S1")])
+        result = self.sync.sync_once()
+        self.assertEqual((result["status"], result["full"], result["inserted"]), ("applied", True, 2))
+        self.assertTrue(self.db.whitelist_contains("0781", "5567", None))
+        self.assertEqual(self.sync.sync_once(), {"status": "current", "version": 1})
+        self.assertEqual(self.store.acks()["host-a"]["version"], 1)
+        self.assertEqual(self.changes, [1])
+
+    def test_delta_only_carries_changes(self):
+        self.store.put_many([(f"L{i}", None, None, f"S{i}") for i in range(100)])
+        self.sync.sync_once()
+        self.store.put("Relabelled", None, None, "s5")
+        self.store.remove(None, None, "S6")
+        self.store.put("New", "0951", "1666", None)
+        result = self.sync.sync_once()
+        self.assertEqual((result["full"], result["inserted"], result["updated"], result["removed"]),
+                         (False, 1, 1, 1))
+        self.assertEqual(self.db.policy_version(), 4)
+        self.assertEqual(self.db.count_whitelist(), 100)
+        self.assertFalse(self.db.whitelist_contains(None, None, "S6"))
+        self.assertEqual(self.store.acks()["host-a"]["version"], 4)
+
+    def test_local_entries_are_kept(self):
+        self.db.whitelist_add_serial("Local", "LOCAL1")
+        self.store.put("A", None, None, "S1")
+        self.sync.sync_once()
+        self.assertTrue(self.db.whitelist_contains(None, None, "LOCAL1"))
+
+    def test_reset_store_sends_full_snapshot(self):
+        self.store.put("A", None, None, "S1")
+        self.store.put("B", None, None, "S2")
+        self.sync.sync_once()
+        delta = self.store.changes_since(7, self.db.policy_epoch())  # agent ahead, e.g. store restored from a backup
+        self.assertTrue(delta["full"])
+        self.assertEqual(len(delta["upserts"]), 2)
+
+    def test_replaced_store_revokes_missing_entries(self):
+        self.db.whitelist_add_serial("Local", "LOCAL1")
+        self.store.put_many([("A", None, None, "S1"), ("B", None, None, "S2")])
+        self.sync.sync_once()
+        # a new store with the same key grows past the agent's version before the agent polls
+        store = PolicyStore(os.path.join(self.tmp.name, "policy2.db"))
+        self.addCleanup(store.close)
+        with store.conn:
+            store.conn.execute("INSERT INTO policy_secrets(name, value) VALUES ('signing_key', ?)",
+                               (self.store.signing_key(),))
+        for serial in ("S1", "S3", "S4"):
+            store.put("X", None, None, serial)
+        self.sync.url = f"http://127.0.0.1:{self._serve(store).server_address[1]}"
+        result = self.sync.sync_once()
+        self.assertEqual((result["full"], result["inserted"], result["removed"]), (True, 2, 1))
+        self.assertFalse(self.db.whitelist_contains(None, None, "S2"))
+        for serial in ("S1", "S3", "S4", "LOCAL1"):
+            self.assertTrue(self.db.whitelist_contains(None, None, serial))
+        self.assertEqual((self.db.policy_version(), self.db.policy_epoch()), (3, store.epoch(3)))
+
+    def test_unsigned_requests_and_replies_rejected(self):
+        self.store.put("A", None, None, "S1")
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            urllib.request.urlopen(f"{self.url}/policy?since=0", timeout=5)
+        self.assertEqual(ctx.exception.code, 401)
+        forged = PolicySync(self.db, self.url, "0" * 64, agent_id="host-a")
+        self.assertIsNone(forged.run_once())
+        self.assertEqual(self.db.count_whitelist(), 0)
+        self.assertEqual(self.store.acks(), {})
+
+    def test_unsigned_or_replayed_304_rejected(self):
+        key = self.store.signing_key()
+        replayed = sign(key, not_modified_body("/policy?since=0&epoch=0&agent=host-a&nonce=00"))
+        for signature in (None, replayed):
+            class NotModified(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    self.send_response(304)
+                    if signature:
+                        self.send_header(SIGNATURE_HEADER, signature)
+                    self.end_headers()
+
+                def log_message(self, *args):
+                    pass
+
+            server = ThreadingHTTPServer(("127.0.0.1", 0), NotModified)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+            sync = PolicySync(self.db, f"http://127.0.0.1:{server.server_address[1]}", key, agent_id="host-a")
+            self.assertIsNone(sync.run_once())
+            self.assertIn("304", sync.last_error)
+            self.assertEqual(sync.stats["not_modified"], 0)
+
+    def test_unreachable_server_is_reported(self):
+        sync = PolicySync(self.db, "http://127.0.0.1:9", "0" * 64, timeout=2)  # nothing listens on the discard port
+        self.assertIsNone(sync.run_once())
+        self.assertEqual(sync.stats["errors"], 1)
+        self.assertEqual(self.db.policy_version(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# tests/test_profiling.py
+# On-demand CPU and memory profiling of the running agent (core/profiling.py).
+
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+
+from core.agent import Agent, AgentClient
+from core.db import DB
+from core.ipc import IpcError
+from core.profiling import Profiler, latest_dump, render_dump
+from tests.test_agent_ipc import _evt, fake_process
+
+
+def _wait_idle(profiler, timeout=10):
+    deadline = time.monotonic() + timeout
+    while profiler.status()["cpu"] is not None and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+
+class ProfilerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.profiler = Profiler(self.tmp.name)
+
+    def tearDown(self):
+        self.profiler.stop()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.tmp.cleanup()
+
+    def test_idle_call_is_passthrough(self):
+        self.assertEqual(self.profiler.call(sum, [1, 2, 3]), 6)
+        self.assertEqual(self.profiler.profiles, [])
+
+    def test_cprofile_capture_merges_threads(self):
+        def busy_work():
+            return sorted(str(i) for i in range(2000))
+
+        started = self.profiler.cpu(seconds=5)
+        with self.assertRaises(RuntimeError):
+            self.profiler.cpu(seconds=1)
+        workers = [threading.Thread(target=self.profiler.call, args=(busy_work,)) for _ in range(3)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        self.profiler.stop()
+        self.assertTrue(os.path.exists(started["path"]))
+        self.assertEqual(latest_dump(self.tmp.name), started["path"])
+        self.assertIn("busy_work", render_dump(started["path"]))
+
+    def test_sampling_capture_sees_other_threads(self):
+        stop = threading.Event()
+
+        def spin_here():
+            while not stop.is_set():
+                sum(range(1000))
+
+        t = threading.Thread(target=spin_here, name="spinner")
+        t.start()
+        started = self.profiler.cpu(seconds=0.3, mode="sample", interval=0.002)
+        _wait_idle(self.profiler)
+        stop.set()
+        t.join()
+        with open(started["path"], encoding="utf-8") as f:
+            self.assertTrue(any(line.startswith("spinner;") and "spin_here" in line for line in f))
+        self.assertIn("samples", render_dump(started["path"]))
+
+    def test_memory_diff_reports_growth(self):
+        with self.assertRaises(RuntimeError):
+            self.profiler.mem_snapshot()
+        self.profiler.mem_start()
+        hoard = [bytearray(1024) for _ in range(2000)]  # ~2 MB allocated on this line
+        result = self.profiler.mem_stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        with open(result["path"], encoding="utf-8") as f:
+            report = f.read()
+        self.assertIn("test_profiling.py", report.split("\n\n", 1)[1].splitlines()[1])
+        del hoard
+
+
+class AgentProfilingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "test.db"))
+        self.agent = Agent(self.db, runtime_dir=self.tmp.name, monitor=False, process=fake_process)
+        self.assertTrue(self.agent.start())
+        self.client = AgentClient(self.tmp.name, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.agent.stop()
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_profile_over_ipc(self):
+        started = self.client.profile("cpu", seconds=5)
+        self.assertEqual(self.client.status()["profiling"]["cpu"], "cprofile")
+        self.agent.handle_event(_evt("S1"))
+        self.client.count_events()
+        self.client.profile("stop")
+        self.assertTrue(started["path"].startswith(os.path.join(self.tmp.name, "profiles")))
+        view = render_dump(started["path"])
+        self.assertIn("fake_process", view)
+        self.assertIn("count_events", view)
+        with self.assertRaises(IpcError):
+            self.client.profile("exec")
+
+
+if __name__ == "__main__":
+    unittest.main()
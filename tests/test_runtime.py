@@ -0,0 +1,194 @@
+# tests/test_runtime.py
+# asyncio agent runtime (core/runtime.py), driven on a virtual clock.
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from core.agent import Agent, AgentClient
+from core.blocker import StubEnforcer
+from core.db import DB
+from core.events import EventBus
+from core.notifier import CountingBackend, Notifier
+from core.profiling import Profiler, render_dump
+from core.runtime import Runtime, VirtualClockLoop
+
+
+def _evt(i, action="insert", serial=None):
+    serial = serial or f"SERIAL{i:05d}"
+    return {"action": action, "timestamp": 1700000000 + i, "model": "Stick", "vid": "0781", "pid": "5567",
+            "serial": serial, "pnp_id": f"USB\\VID_0781&PID_5567\\{serial}"}
+
+
+class TestRuntime(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "usb.db"))
+        self.db.whitelist_add("Office", "0781", "5567", "SERIAL00000")
+        self.enforcer = StubEnforcer()
+        self.backend = CountingBackend()
+        self.bus = EventBus()
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def _runtime(self, **kwargs):
+        return Runtime(self.db, self.bus, enforcer=self.enforcer, notifier=Notifier(self.backend, window=0).start(),
+                       **kwargs)
+
+    def _drive(self, runtime, scenario):
+        """Run serve() and scenario(loop) on a VirtualClockLoop; returns scenario's result."""
+        loop = VirtualClockLoop(start=1000.0)
+        loop.busy = lambda: runtime.executing > 0
+
+        async def main():
+            serving = loop.create_task(runtime.serve())
+            await asyncio.sleep(0)
+            try:
+                return await scenario(loop)
+            finally:
+                runtime.request_stop()
+                await serving
+
+        try:
+            return loop.run_until_complete(main())
+        finally:
+            loop.close()
+
+    def test_single_event_waits_one_batch_window(self):
+        runtime = self._runtime(batch_window=0.5)
+
+        async def scenario(loop):
+            t0 = loop.time()
+            result = await (await runtime.put(_evt(0)))
+            return result, loop.time() - t0
+
+        result, elapsed = self._drive(runtime, scenario)
+        self.assertEqual(result["decision"], "allowed")
+        self.assertEqual(elapsed, 0.5)  # exactly the batch window: virtual time, no sleeping
+        self.assertEqual(self.db.count_events(), 1)
+        self.assertEqual(self.enforcer.calls, [("enable", _evt(0)["pnp_id"])])
+
+    def test_thousands_in_flight(self):
+        runtime = self._runtime(max_inflight=500, batch_size=256, batch_window=0.05)
+
+        async def scenario(loop):
+            t0 = loop.time()
+            futures = [await runtime.put(_evt(i)) for i in range(3000)]
+            results = await asyncio.gather(*futures)
+            return results, loop.time() - t0
+
+        results, elapsed = self._drive(runtime, scenario)
+        self.assertEqual(len({r["id"] for r in results}), 3000)
+        self.assertEqual([r["decision"] for r in results[:2]], ["allowed", "blocked"])
+        self.assertEqual(self.db.count_events(), 3000)
+        stats = runtime.stats
+        self.assertEqual(stats["max_inflight"], 500)
+        self.assertLessEqual(stats["max_batch"], 256)
+        self.assertLess(stats["batches"], 100)  # rows are committed in batches, not one by one
+        self.assertLessEqual(elapsed, stats["batches"] * 0.05)
+
+    def test_one_device_in_order(self):
+        runtime = self._runtime()
+        sub = self.bus.subscribe(maxsize=100)
+
+        async def scenario(loop):
+            futures = []
+            for i in range(10):
+                futures.append(await runtime.put(_evt(i, "insert" if i % 2 == 0 else "remove", serial="SAME0001")))
+            return await asyncio.gather(*futures)
+
+        results = self._drive(runtime, scenario)
+        self.assertEqual([r["id"] for r in results], sorted(r["id"] for r in results))
+        self.assertEqual([r["action"] for r in sub.drain()], ["insert", "remove"] * 5)
+
+    def test_stop_drains_queued_events(self):
+        runtime = self._runtime(max_inflight=8, batch_window=0.1)
+
+        async def scenario(loop):
+            futures = [await runtime.put(_evt(i)) for i in range(200)]
+            runtime.request_stop()
+            self.assertIsNone(await runtime.put(_evt(999)))  # intake closed
+            return futures
+
+        futures = self._drive(runtime, scenario)
+        self.assertTrue(all(f.done() and not f.cancelled() for f in futures))
+        self.assertEqual(self.db.count_events(), 200)
+        self.assertEqual((runtime.stats["handled"], runtime.stats["rejected"]), (200, 1))
+        # the notifier was stopped on the notify executor, showing (summaries of) what it held
+        self.assertIsNone(runtime.notifier.thread)
+        self.assertEqual(runtime.notifier.stats()["queued"], 0)
+        self.assertGreater(self.backend.count, 0)
+
+    def test_watcher_thread_and_background_loop(self):
+        seen = threading.Event()
+
+        def watch(on_event, stopped):
+            for i in range(5):
+                on_event(_evt(i))
+            seen.set()
+            stopped.wait()
+
+        results = []
+        runtime = self._runtime(watch=watch, on_result=results.append).start()
+        self.assertTrue(seen.wait(5))
+        runtime.stop()
+        self.assertEqual(len(results), 5)
+        self.assertFalse(runtime.thread)
+        self.assertEqual(self.db.count_events(), 5)
+
+    def test_cprofile_capture_sees_executor_work(self):
+        profiler = Profiler(os.path.join(self.tmp.name, "profiles"))
+        started = profiler.cpu(seconds=30)
+        seen = threading.Event()
+
+        def watch(on_event, stopped):
+            for i in range(5):
+                on_event(_evt(i))
+            seen.set()
+            stopped.wait()
+
+        runtime = self._runtime(watch=watch, profiler=profiler).start()
+        self.assertTrue(seen.wait(5))
+        runtime.stop()
+        profiler.stop()
+        report = render_dump(started["path"])
+        self.assertIn("whitelist_contains", report)
+        self.assertIn("log_events", report)
+
+
+class TestAgentRuntime(unittest.TestCase):
+    def test_agent_on_runtime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "usb.db"))
+
+            def watch(on_event, stopped):
+                for i in range(20):
+                    on_event(_evt(i))
+                stopped.wait()
+
+            agent = Agent(db, runtime_dir=tmp, monitor=watch, runtime={
+                "enforcer": StubEnforcer(), "notifier": Notifier(CountingBackend()).start()})
+            self.assertTrue(agent.start())
+            client = AgentClient(tmp, timeout=5)
+            try:
+                deadline = time.time() + 5
+                while agent.events_handled < 20 and time.time() < deadline:
+                    time.sleep(0.01)
+                status = client.status()
+                self.assertEqual(status["events_handled"], 20)
+                self.assertEqual((status["runtime"]["handled"], status["runtime"]["accepting"]), (20, True))
+            finally:
+                client.close()
+                agent.stop()
+            self.assertFalse(agent.runtime.accepting)
+            self.assertEqual(db.count_events({"decision": "blocked"}), 20)
+            db.conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
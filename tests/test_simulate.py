@@ -0,0 +1,121 @@
+# tests/test_simulate.py
+# What-if whitelist simulation (core/simulate.py) against DB.whitelist_contains.
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from core.db import DB
+
+DAY = 86400
+T0 = 1700006400  # a midnight, UTC
+
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class TestSimulate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "usb.db"))
+        self.db.whitelist_add("Office", "0781", "5567", "S1")
+        self.db.whitelist_add("No serial", "0951", "1666", None)
+        self.db.whitelist_add("Serial only", None, None, "LOOSE")
+        self.db.whitelist_add_vendor("All Lexar", "05DC")
+        self.devices = [("0781", "5567", "S1"), ("0781", "5567", "S2"), ("0951", "1666", None),
+                        ("0951", "1666", "X"), ("05DC", "A81D", "L1"), (None, None, "LOOSE"),
+                        (None, None, "OTHER"), ("1234", "0001", "LOOSE"), (None, None, None)]
+        rnd = random.Random(7)
+        for i in range(300):
+            vid, pid, serial = rnd.choice(self.devices)
+            ok = self.db.whitelist_contains(vid, pid, serial)
+            ts = T0 + i * 3000
+            self.db.log_event(ts, "insert", "m", "p", vid, pid, serial, "allowed" if ok else "blocked", "")
+            self.db.log_event(ts + 5, "remove", "m", "p", vid, pid, serial, "observe", "")
+        self.conn = self.db.conn
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_current_whitelist_changes_nothing(self):
+        from core.simulate import Rules, simulate
+        result = simulate(self.conn, Rules.from_db(self.conn), chunk_size=37)
+        t = result["totals"]
+        self.assertEqual((t["inserts"], t["newly_blocked"], t["newly_allowed"]), (300, 0, 0))
+        self.assertEqual(t["recorded_allowed"], t["simulated_allowed"])
+        self.assertEqual(int(result["per_day"]["inserts"].sum()), 300)
+
+    def test_matches_whitelist_contains(self):
+        from core.simulate import Rules, evaluate
+        keys = [f"{v or ''}|{p or ''}|{s or ''}" for v, p, s in self.devices]
+        expected = [self.db.whitelist_contains(*d) for d in self.devices]
+        self.assertEqual(evaluate(keys, Rules.from_db(self.conn)).tolist(), expected)
+        # a serial-only rule also matches the device once its VID/PID are known, as in whitelist_contains
+        self.assertTrue(expected[self.devices.index(("1234", "0001", "LOOSE"))])
+
+    def test_removal_and_addition(self):
+        from core.simulate import Rules, changed_days, simulate, top_devices
+        rules = Rules.from_db(self.conn, add=[("new", "0781", "5567", "S2")],
+                              remove=[("x", "05DC", None, None)])
+        result = simulate(self.conn, rules, since=T0, until=T0 + 10 * DAY)
+        counts = dict(self.conn.execute(
+            "SELECT vid || '|' || pid || '|' || serial, COUNT(*) FROM events WHERE action = 'insert' "
+            "AND ts <= ? AND serial IN ('S2', 'L1') GROUP BY 1", (T0 + 10 * DAY,)))
+        self.assertEqual(top_devices(result, "newly_blocked"), [("05DC|A81D|L1", counts["05DC|A81D|L1"])])
+        self.assertEqual(top_devices(result, "newly_allowed"), [("0781|5567|S2", counts["0781|5567|S2"])])
+        days = changed_days(result)
+        self.assertEqual(days[0][0], T0 // DAY)
+        self.assertEqual(sum(b for _d, _n, b, _a in days), counts["05DC|A81D|L1"])
+        self.assertEqual(result["totals"]["inserts"], sum(n for n in result["per_day"]["inserts"].tolist()))
+
+    def test_range_is_optional(self):
+        from core.simulate import INSERTS_SQL, Rules, simulate
+        # no range: a plain scan, no ts bounds forced onto idx_events_ts
+        plan = " ".join(r[-1] for r in self.conn.execute("EXPLAIN QUERY PLAN " + INSERTS_SQL))
+        self.assertNotIn("ts>", plan)
+        rules = Rules.from_db(self.conn, remove=[("x", "05DC", None, None)])
+        everything = simulate(self.conn, rules, chunk_size=50)
+        bounded = simulate(self.conn, rules, since=T0, until=T0 + 300 * 3000)
+        self.assertEqual(everything["totals"], bounded["totals"])
+        self.assertEqual(everything["first_day"], bounded["first_day"])
+        self.assertEqual(everything["devices"]["key"].tolist(), ["05DC|A81D|L1"])
+        self.assertEqual(bounded["devices"]["key"].tolist(), ["05DC|A81D|L1"])
+        late = simulate(self.conn, rules, since=T0 + 150 * 3000)
+        self.assertLess(late["totals"]["inserts"], 300)
+        self.assertEqual(late["first_day"], (T0 + 150 * 3000) // DAY)
+
+    def test_edited_candidate(self):
+        from core.simulate import Rules
+        rules = Rules.edited([("a", "0781", "5567", "S1"), ("b", None, None, "loose")],
+                             add=[("c", "05DC", None, None)], remove=[("x", None, None, "LOOSE")])
+        self.assertEqual((rules.entries, rules.exact, rules.loose, rules.vendors),
+                         (2, {"0781|5567|S1"}, frozenset(), {"05DC"}))
+
+    def test_cli_errors(self):
+        import what_if
+        path = os.path.join(self.tmp.name, "rules.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("label,vid,pid,serial\nv,0781,,\n")
+        with contextlib.redirect_stderr(io.StringIO()) as err:
+            self.assertEqual(what_if.main(["--db", os.path.join(self.tmp.name, "missing.db")]), 2)
+            self.assertEqual(what_if.main(["--db", path, "--rules", path]), 2)  # not a database
+        self.assertIn("missing.db", err.getvalue())
+
+    def test_rule_file(self):
+        from core.simulate import read_rule_file
+        path = os.path.join(self.tmp.name, "rules.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("label,vid,pid,serial\nv,0781,,\nbad,,5567,\n")
+        with self.assertRaisesRegex(ValueError, "rules.csv:3"):
+            read_rule_file(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
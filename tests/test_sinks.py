@@ -0,0 +1,219 @@
+# tests/test_sinks.py
+# Alert forwarding (core/sinks.py) against local HTTP, SMTP and syslog servers.
+
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.events import EventBus
+from core.sinks import AlertDispatcher, Sink, SmtpSink, Spill, SyslogSink, WebhookSink, load_dispatcher
+
+
+def _record(i, decision="blocked"):
+    return {"kind": "event", "id": i, "ts": 1700000000 + i, "action": "insert", "decision": decision,
+            "model": "Stick", "serial": f"S{i}", "vid": "0781", "pid": "5567", "pnp_id": f"USB\\X\\S{i}", "note": "x"}
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class _HookHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        srv = self.server
+        with srv.lock:
+            srv.connections.add(self.client_address)
+            fail = srv.fail_next > 0
+            if fail:
+                srv.fail_next -= 1
+            else:
+                srv.batches.append(json.loads(body)["events"])
+        self.send_response(503 if fail else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept mail (stand-in for a debugging SMTP server)."""
+
+    def handle(self):
+        self.wfile.write(b"220 test ESMTP\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.strip().upper()
+            if cmd == b"DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                data = []
+                for body_line in self.rfile:
+                    if body_line in (b".\r\n", b".\n"):
+                        break
+                    data.append(body_line)
+                self.server.messages.append(b"".join(data).decode("utf-8"))
+                self.wfile.write(b"250 queued\r\n")
+            elif cmd == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+class TestWebhook(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _HookHandler)
+        self.server.lock = threading.Lock()
+        self.server.connections, self.server.batches, self.server.fail_next = set(), [], 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def _dispatcher(self, **kw):
+        sink = WebhookSink(self.url, batch_size=50, concurrency=1)
+        opts = dict(batch_window=0.05, backoff=0.01, spill_dir=self.tmp.name)
+        opts.update(kw)
+        return sink, AlertDispatcher([sink], **opts).start()
+
+    def test_batches_over_one_keepalive_connection(self):
+        sink, d = self._dispatcher()
+        for i in range(120):
+            d.submit(_record(i))
+        self.assertTrue(_wait(lambda: sum(map(len, self.server.batches)) == 120))
+        d.stop()
+        self.assertLessEqual(len(self.server.batches), 10)
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(sink.connections_opened, 1)
+
+    def test_only_selected_decisions_forwarded(self):
+        _, d = self._dispatcher()
+        self.assertFalse(d.submit(_record(1, "allowed")))
+        self.assertTrue(d.submit(_record(2)))
+        d.stop()
+        self.assertEqual([r["id"] for b in self.server.batches for r in b], [2])
+
+    def test_retry_with_backoff(self):
+        self.server.fail_next = 2
+        _, d = self._dispatcher()
+        d.submit(_record(1))
+        self.assertTrue(_wait(lambda: d.stats()["webhook"]["sent"] == 1))
+        stats = d.stats()["webhook"]
+        d.stop()
+        self.assertEqual((stats["retries"], stats["sent"]), (2, 1))
+
+    def test_outage_spills_then_replays(self):
+        self.server.fail_next = 1000
+        _, d = self._dispatcher(retries=1)
+        for i in range(5):
+            d.submit(_record(i))
+        self.assertTrue(_wait(lambda: d.stats()["webhook"]["spilled"] == 5))
+        self.server.fail_next = 0
+        d.submit(_record(99))
+        self.assertTrue(_wait(lambda: sum(map(len, self.server.batches)) == 6))
+        self.assertTrue(_wait(lambda: d.stats()["webhook"]["replayed"] == 5))  # counted once the reply is read
+        stats = d.stats()["webhook"]
+        d.stop()
+        self.assertEqual(stats["replayed"], 5)
+        self.assertEqual(stats["spill_bytes"], 0)
+
+    def test_fed_from_event_bus(self):
+        bus = EventBus()
+        _, d = self._dispatcher()
+        d.attach(bus)
+        bus.publish({"kind": "whitelist"})
+        bus.publish(_record(7))
+        self.assertTrue(_wait(lambda: self.server.batches))
+        d.stop()
+        self.assertEqual([r["id"] for b in self.server.batches for r in b], [7])
+
+
+class TestSpill(unittest.TestCase):
+    def test_bounded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spill = Spill(os.path.join(tmp, "s.jsonl"), max_bytes=400)
+            self.assertTrue(spill.append([_record(1)]))
+            while spill.append([_record(2)]):
+                pass
+            self.assertLessEqual(spill.size(), 400)
+            self.assertEqual(spill.dropped, 1)
+            records = spill.take()
+            self.assertEqual(records[0]["id"], 1)
+            self.assertEqual(spill.size(), 0)
+
+
+class TestSmtpAndSyslog(unittest.TestCase):
+    def test_smtp_one_mail_per_batch(self):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SmtpHandler)
+        server.messages = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        with tempfile.TemporaryDirectory() as tmp:
+            sink = SmtpSink("127.0.0.1", ["soc@example.com"], port=server.server_address[1])
+            d = AlertDispatcher([sink], batch_window=0.2, spill_dir=tmp).start()
+            for i in range(3):
+                d.submit(_record(i))
+            self.assertTrue(_wait(lambda: server.messages))
+            d.stop()
+        server.shutdown()
+        server.server_close()
+        self.assertEqual(len(server.messages), 1)
+        self.assertIn("3 event(s), 3 blocked", server.messages[0])
+        self.assertIn("S/N:S2", server.messages[0])
+
+    def test_syslog_udp(self):
+        recv = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        recv.bind(("127.0.0.1", 0))
+        recv.settimeout(5)
+        with tempfile.TemporaryDirectory() as tmp:
+            sink = SyslogSink("127.0.0.1", recv.getsockname()[1])
+            d = AlertDispatcher([sink], batch_window=0.01, spill_dir=tmp).start()
+            d.submit(_record(1))
+            msg = recv.recv(4096).decode("utf-8")
+            d.stop()
+        recv.close()
+        self.assertTrue(msg.startswith("<36>1 2023-11-14T22:13:21Z "))
+        self.assertIn('decision="blocked"', msg)
+
+
+class TestConfig(unittest.TestCase):
+    def test_load_dispatcher(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "alerts.json")
+            with open(path, "w") as f:
+                json.dump({"sinks": [{"type": "webhook", "url": "http://127.0.0.1:9/x"},
+                                     {"type": "syslog", "port": 5514}],
+                           "decisions": ["blocked", "allowed"], "spill_dir": tmp}, f)
+            d = load_dispatcher(path)
+        self.assertEqual([s.name for s in d.sinks], ["webhook", "syslog"])
+        self.assertEqual(d.decisions, {"blocked", "allowed"})
+
+    def test_sink_without_send_is_rejected(self):
+        class NoSend(Sink):
+            name = "nosend"
+
+        with self.assertRaises(TypeError):
+            NoSend()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_startup.py
+# Startup cost: lazy imports, skipped migrations and cold-start-to-first-event (core/startup.py).
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from core import startup
+from core.db import DB, SCHEMA_VERSION
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use only; none of them may be imported by bringing the agent up.
+LAZY_MODULES = ("bcrypt", "plyer", "wmi", "pythoncom", "numpy", "http.server", "cProfile", "smtplib")
+
+# A fresh interpreter starts an agent with stub backends (a monitor that reports one
+# insert straight away, StubEnforcer, CountingBackend toasts) and waits for the event.
+COLD_START = r"""
+from core import startup
+import json, os, sys, tempfile, threading, time
+from core.agent import Agent
+from core.blocker import StubEnforcer
+from core.guardian import process_event
+from core.notifier import CountingBackend, Notifier
+startup.mark("imports")
+loaded = [m for m in sys.argv[1].split(",") if m in sys.modules]
+
+evt = {"action": "insert", "model": "Stick", "pnp_id": "USB\\VID_0781&PID_5567\\S1", "vid": "0781",
+       "pid": "5567", "serial": "S1", "timestamp": time.time(), "trace_ns": time.perf_counter_ns()}
+toasts, enforcer = Notifier(CountingBackend()).start(), StubEnforcer()
+agent = Agent(runtime_dir=tempfile.mkdtemp(), monitor=lambda on_event: threading.Thread(target=on_event, args=(evt,)).start(),
+              process=lambda e, db, bus: process_event(e, db, bus, notifier=toasts, enforcer=enforcer))
+os.chdir(agent.runtime_dir)  # DB() opens data/usb_guard.db under the temp dir
+assert agent.start()
+deadline = time.monotonic() + 30
+while agent.events_handled < 1 and time.monotonic() < deadline:
+    time.sleep(0.001)
+agent.stop()
+toasts.stop()
+print(json.dumps({"timeline": dict(startup.timeline()), "loaded": loaded, "enforced": enforcer.calls}))
+"""
+
+
+class StartupTests(unittest.TestCase):
+    def test_cold_start_to_first_event(self):
+        proc = subprocess.run([sys.executable, "-c", COLD_START, ",".join(LAZY_MODULES)], cwd=ROOT,
+                              capture_output=True, text=True, timeout=60)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        self.assertEqual(result["loaded"], [])
+        self.assertEqual(result["enforced"], [["disable", "USB\\VID_0781&PID_5567\\S1"]])
+        timeline = result["timeline"]
+        self.assertEqual(list(timeline), ["imports", "db open", "agent started", "first event"])
+        # generous: a cold start is ~100 ms here; the budget catches an eager heavy import, not noise
+        self.assertLess(timeline["imports"], startup.IMPORT_BUDGET_MS * 4)
+        self.assertLess(timeline["first event"], 2000)
+
+    def test_migrations_skipped_when_current(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "t.db")
+            db = DB(path)
+            self.assertEqual(db.conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+            db.conn.close()
+            with mock.patch.object(DB, "_migrate") as migrate:
+                DB(path).conn.close()
+            migrate.assert_not_called()
+
+    def test_timeline_marks(self):
+        ms = startup.mark("test phase")
+        startup.mark("test phase", once=True)
+        self.assertEqual([m for p, m in startup.timeline() if p == "test phase"], [round(ms, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# tests/test_tasks.py
+# core/tasks.TaskRunner without a display: a tiny widget stand-in provides after().
+
+import threading
+import time
+import unittest
+
+from core import tasks as tasks_mod
+from core.tasks import TaskRunner
+
+
+class FakeWidget:
+    """Just enough of a Tk widget: after() callbacks run when pump() is called."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, fn):
+        self.callbacks.append(fn)
+
+    def pump(self, until, timeout=2.0):
+        deadline = time.time() + timeout
+        while not until() and time.time() < deadline:
+            pending, self.callbacks = self.callbacks, []
+            for fn in pending:
+                fn()
+            time.sleep(0.005)
+
+
+class TestTaskRunner(unittest.TestCase):
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.runner = TaskRunner(self.widget, workers=2)
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def test_result_delivered_on_polling_thread(self):
+        got = []
+        main = threading.get_ident()
+        self.runner.submit(lambda x: (x * 2, threading.get_ident()),
+                           21, on_done=lambda r: got.append((r, threading.get_ident())))
+        self.widget.pump(lambda: got)
+        (value, worker), caller = got[0]
+        self.assertEqual(value, 42)
+        self.assertNotEqual(worker, main)
+        self.assertEqual(caller, main)
+
+    def test_errors_go_to_on_error(self):
+        errors = []
+        self.runner.submit(lambda: 1 / 0, on_error=errors.append)
+        self.widget.pump(lambda: errors)
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+
+    def test_unhandled_error_is_logged_with_traceback(self):
+        with self.assertLogs("usb_guard.tasks", "ERROR") as logs:
+            self.runner.submit(lambda: 1 / 0)
+            self.widget.pump(lambda: logs.records)
+        self.assertIsInstance(logs.records[0].exc_info[1], ZeroDivisionError)
+
+    def test_superseded_task_result_is_dropped(self):
+        gate = threading.Event()
+        got = []
+        first = self.runner.submit(lambda: gate.wait(2) and "old", on_done=got.append, key="refresh")
+        self.runner.submit(lambda: "new", on_done=got.append, key="refresh")
+        self.assertTrue(first.cancelled)
+        gate.set()
+        self.widget.pump(lambda: self.runner.pending == 0)
+        self.assertEqual(got, ["new"])
+
+    def test_worker_can_poll_cancellation(self):
+        started = threading.Event()
+        seen = []
+
+        def work():
+            started.set()
+            while not tasks_mod.cancelled():
+                time.sleep(0.001)
+            seen.append("stopped")
+
+        task = self.runner.submit(work)
+        started.wait(2)
+        task.cancel()
+        self.widget.pump(lambda: self.runner.pending == 0)
+        self.assertEqual(seen, ["stopped"])
+
+    def test_progress_reported_in_order(self):
+        progress, done = [], []
+
+        def work():
+            for i in range(3):
+                tasks_mod.report_progress(i, 3)
+            return "ok"
+
+        self.runner.submit(work, on_progress=lambda d, t: progress.append((d, t)), on_done=done.append)
+        self.widget.pump(lambda: done)
+        self.assertEqual(progress, [(0, 3), (1, 3), (2, 3)])
+        self.assertEqual(done, ["ok"])
+
+    def test_busy_listener_edges(self):
+        states = []
+        self.runner.add_busy_listener(states.append)
+        self.runner.submit(lambda: None)
+        self.runner.submit(lambda: None)
+        self.widget.pump(lambda: self.runner.pending == 0)
+        self.assertEqual(states, [True, False])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+# tests/test_trace.py
+# Latency tracing (core/trace.py) and the stage timings stored with events.
+
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from core.db import DB
+from core.guardian import process_event
+from core.notifier import CountingBackend, Notifier
+from core.trace import Histogram, LatencyRecorder, Trace
+
+
+class TestHistogram(unittest.TestCase):
+    def test_percentiles_within_precision(self):
+        rng = random.Random(1)
+        values = sorted(int(rng.lognormvariate(8, 1.5)) for _ in range(20000))
+        h = Histogram()
+        for v in values:
+            h.record(v)
+        for p in (50, 90, 99):
+            exact = values[int(len(values) * p / 100) - 1]
+            self.assertLessEqual(abs(h.percentile(p) - exact), exact / 60 + 1, p)
+        self.assertEqual(h.max, values[-1])
+        self.assertEqual(h.percentile(100), values[-1])
+
+    def test_small_values_exact(self):
+        h = Histogram()
+        for v in (1, 2, 3, 100):
+            h.record(v)
+        self.assertEqual((h.percentile(50), h.percentile(75), h.summary()["max"]), (2, 3, 100))
+
+
+class TestTrace(unittest.TestCase):
+    def test_spans_and_exposure(self):
+        trace = Trace(time.perf_counter_ns() - 5_000_000)  # event handed over 5 ms ago
+        trace.mark("detect")
+        trace.mark("decide")
+        trace.mark("enforce")
+        spans = trace.finish(blocked=True)
+        self.assertGreaterEqual(spans["detect"], 5000)
+        self.assertEqual(spans["exposure"], spans["detect"] + spans["decide"] + spans["enforce"])
+        self.assertGreaterEqual(spans["total"], spans["exposure"])
+
+    def test_recorder_from_stored_rows(self):
+        rec = LatencyRecorder.from_rows([("blocked", 10, 2, 300), ("allowed", 12, 3, 5), ("blocked", None, 2, 100)])
+        summary = rec.summary()
+        self.assertEqual(list(summary), ["detect", "decide", "enforce", "exposure"])
+        self.assertEqual((summary["detect"]["count"], summary["exposure"]["count"]), (2, 2))
+        self.assertEqual(summary["exposure"]["max"], 312)
+
+
+class TestStoredTimings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "usb.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_process_event_stores_stages(self):
+        db = DB(self.path)
+        evt = {"timestamp": 1700000000, "action": "insert", "model": "Stick", "pnp_id": "USB\\X\\S1",
+               "vid": "0781", "pid": "5567", "serial": "S1", "trace_ns": time.perf_counter_ns()}
+        result = process_event(evt, db, notifier=Notifier(CountingBackend()))
+        (row,) = db.stage_timings()
+        db.conn.close()
+        self.assertEqual(row[0], "blocked")
+        self.assertEqual(row[1:], tuple(result["stages_us"][s] for s in ("detect", "decide", "enforce")))
+
+    def test_old_events_table_gets_columns(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, ts INTEGER, action TEXT, "
+                     "model TEXT, pnp_id TEXT, vid TEXT, pid TEXT, serial TEXT, decision TEXT, note TEXT)")
+        conn.execute("INSERT INTO events(ts, action, decision) VALUES (1, 'insert', 'blocked')")
+        conn.commit()
+        conn.close()
+        db = DB(self.path)
+        db.log_event(2, "insert", "M", "P", None, None, "S", "allowed", stages={"decide": 7, "enforce": 9})
+        self.assertEqual(db.stage_timings(), [("allowed", None, 7, 9)])
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,55 +4,11 @@
 import unittest
 from datetime import datetime, timezone
 
-# ---- Local copies of the pure helpers (mirroring core/usb_monitor.py) ----
+# The real parsers: core/usb_monitor.py only needs WMI once monitoring starts.
+from core.usb_monitor import (_device_event, parent_usb_query, parent_vid_pid, parse_ids, parse_serial,
+                               parse_vid_pid, usbstor_serial)
 
-import re
-VID_PID_RE = re.compile(r"VID_([0-9A-F]{4}).*PID_([0-9A-F]{4})", re.IGNORECASE)
-
-def parse_ids(pnp_id: str):
-    """
-    Extract VID, PID, Vendor, Product, Serial if available.
-    Returns dict with any fields found.
-    """
-    ids = {"vid": None, "pid": None, "vendor": None, "product": None, "serial": None}
-    if not pnp_id:
-        return ids
-
-    vid_match = re.search(r"VID_([0-9A-Fa-f]{4})", pnp_id)
-    pid_match = re.search(r"PID_([0-9A-Fa-f]{4})", pnp_id)
-
-    if vid_match:
-        ids["vid"] = vid_match.group(1).upper()
-    if pid_match:
-        ids["pid"] = pid_match.group(1).upper()
-
-    ven_match = re.search(r"VEN_([A-Z0-9]+)", pnp_id, re.IGNORECASE)
-    prod_match = re.search(r"PROD_([A-Z0-9_]+)", pnp_id, re.IGNORECASE)
-
-    if ven_match:
-        ids["vendor"] = ven_match.group(1).upper()
-    if prod_match:
-        ids["product"] = prod_match.group(1).upper()
-
-    parts = pnp_id.split("\\")
-    if len(parts) >= 3:
-        ids["serial"] = parts[-1]
-
-    return ids
-
-def parse_serial(pnp_id: str | None):
-    if not pnp_id:
-        return None
-    parts = pnp_id.split("\\")
-    return parts[-1] if len(parts) >= 3 else None
-
-def parse_vid_pid(pnp_id: str):
-    if not pnp_id:
-        return None, None
-    m = VID_PID_RE.search(pnp_id)
-    if not m:
-        return None, None
-    return m.group(1).upper(), m.group(2).upper()
+USBSTOR_PNP = r"USBSTOR\DISK&VEN_SANDISK&PROD_ULTRA&REV_1.00\4C5300012301&0"
 
 
 # ---- A tiny monitor "simulator" to mimic on_event callback flow ----
@@ -141,6 +97,50 @@ class TestUSBMonitorParsing(unittest.TestCase):
         self.assertIsNone(parse_serial(None))
 
 
+class FakeWMI:
+    """Just enough of a wmi.WMI() connection for parent_vid_pid: query() over fixed DeviceIDs."""
+
+    def __init__(self, device_ids):
+        self.device_ids = device_ids
+        self.queries = []
+
+    def query(self, wql):
+        self.queries.append(wql)
+        return [type("Entity", (), {"DeviceID": d})() for d in self.device_ids]
+
+
+class TestParentUSBDevice(unittest.TestCase):
+    def test_usbstor_serial(self):
+        self.assertEqual(usbstor_serial(USBSTOR_PNP), "4C5300012301")
+        # Windows-generated instance id: the device reported no serial
+        self.assertIsNone(usbstor_serial(r"USBSTOR\DISK&VEN_GENERIC&PROD_FLASH&REV_1.00\7&2A3B4C5D&0"))
+        self.assertIsNone(usbstor_serial(r"USB\VID_0781&PID_5567\4C5300012301"))
+        self.assertIsNone(usbstor_serial(None))
+
+    def test_parent_query(self):
+        self.assertEqual(parent_usb_query(USBSTOR_PNP),
+                         r"SELECT DeviceID FROM Win32_PnPEntity WHERE DeviceID LIKE 'USB\\VID[_]%\\4C5300012301'")
+        self.assertIsNone(parent_usb_query(r"USBSTOR\DISK&VEN_X\7&2A3B4C5D&0"))
+
+    def test_parent_vid_pid(self):
+        c = FakeWMI([r"USB\VID_0781&PID_5567\4C5300012301"])
+        self.assertEqual(parent_vid_pid(c, USBSTOR_PNP), ("0781", "5567"))
+        self.assertEqual(parent_vid_pid(FakeWMI([]), USBSTOR_PNP), (None, None))
+        self.assertEqual(parent_vid_pid(c, r"USBSTOR\DISK&VEN_X\7&2A3B4C5D&0"), (None, None))
+        self.assertEqual(len(c.queries), 1)  # no serial, no query
+
+    def test_device_event_uses_resolved_ids(self):
+        disk = type("Disk", (), {"PNPDeviceID": USBSTOR_PNP, "Model": "SanDisk Ultra USB Device"})()
+        evt = _device_event("insert", disk, lambda pnp_id: parent_vid_pid(
+            FakeWMI([r"USB\VID_0781&PID_5567\4C5300012301"]), pnp_id))
+        self.assertEqual((evt["vid"], evt["pid"], evt["serial"]), ("0781", "5567", "4C5300012301&0"))
+        self.assertEqual(evt["vendor"], "SANDISK")
+        # ids in the disk's own id win; resolve is not consulted
+        disk.PNPDeviceID = r"USB\VID_0951&PID_1666\KT1"
+        evt = _device_event("insert", disk, lambda pnp_id: self.fail("resolved"))
+        self.assertEqual((evt["vid"], evt["pid"]), ("0951", "1666"))
+
+
 class TestUSBMonitorSimulation(unittest.TestCase):
     def test_simulated_monitor_emits_two_events(self):
         captured = []
@@ -0,0 +1,108 @@
+# tests/test_usbids.py
+# usb.ids name index (core/usbids.py) and vendor-level whitelist rules.
+
+import os
+import tempfile
+import unittest
+
+from core.db import DB
+from core.usbids import UsbIds, compile_usb_ids, describe, parse_usb_ids
+from core.whitelist_io import validate_row
+
+USB_IDS = """\
+#
+#	List of USB ID's
+#
+# Syntax:
+# vendor  vendor_name
+#	device  device_name				<-- single tab
+#		interface  interface_name		<-- two tabs
+
+0781  SanDisk Corp.
+	5567  Cruzer Blade
+	5583  Ultra Fit
+0951  Kingston Technology
+	1666  DataTraveler 100 G3/G4/SE9 G2/50
+		00  Interface that is not a product
+1f75  Innostor Technology Corporation
+
+# List of known device classes, subclasses and protocols
+C 00  (Defined at Interface level)
+	01  Not a product either
+"""
+
+
+class TestUsbIds(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        src = os.path.join(self.tmp.name, "usb.ids")
+        with open(src, "w", encoding="utf-8") as f:
+            f.write(USB_IDS)
+        self.path = os.path.join(self.tmp.name, "usb.ids.idx")
+        self.counts = compile_usb_ids(src, self.path)
+        self.index = UsbIds(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_parse_skips_interfaces_and_classes(self):
+        entries = list(parse_usb_ids(USB_IDS.splitlines()))
+        self.assertEqual(len(entries), 6)
+        self.assertIn((0x0951, 0x1666, "DataTraveler 100 G3/G4/SE9 G2/50"), entries)
+        self.assertEqual(self.counts, (3, 3))
+
+    def test_lookup(self):
+        self.assertEqual(self.index.lookup("0781", "5567"), ("SanDisk Corp.", "Cruzer Blade"))
+        self.assertEqual(self.index.lookup(0x0951, 0x1666)[0], "Kingston Technology")
+        self.assertEqual(self.index.lookup("1F75", "0917"), ("Innostor Technology Corporation", None))
+        self.assertEqual(self.index.lookup("FFFF", "0000"), (None, None))
+        self.assertEqual(self.index.lookup(None, "zz"), (None, None))
+        self.assertEqual(describe("0781", "5583", self.index), "SanDisk Corp. Ultra Fit")
+
+    def test_find_vendors(self):
+        self.assertEqual(self.index.find_vendors("sandisk"), [("0781", "SanDisk Corp.")])
+        self.assertEqual(len(self.index.find_vendors("TECHNOLOGY")), 2)
+
+    def test_rejects_other_files(self):
+        with open(self.path + ".bad", "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            UsbIds(self.path + ".bad")
+
+
+class TestVendorRules(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "test.db"))
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def test_vendor_rule_allows_any_product_of_that_vendor(self):
+        self.assertFalse(self.db.whitelist_contains("0781", "5567", "S1"))
+        self.db.whitelist_add_vendor("All SanDisk", "0781")
+        self.assertTrue(self.db.whitelist_contains("0781", "5567", "S1"))
+        self.assertTrue(self.db.whitelist_contains("0781", "ABCD", None))
+        self.assertFalse(self.db.whitelist_contains("0951", "1666", "S1"))
+        self.db.whitelist_remove("0781", None, None)
+        self.assertFalse(self.db.whitelist_contains("0781", "5567", "S1"))
+
+    def test_serial_only_entry_matches_resolved_device(self):
+        # whitelisted from a USBSTOR event before the monitor resolved the parent VID/PID
+        self.db.whitelist_add_serial("Stick", "4C5300012301&0")
+        self.assertTrue(self.db.whitelist_contains(None, None, "4C5300012301&0"))
+        self.assertTrue(self.db.whitelist_contains("0781", "5567", "4C5300012301&0"))
+        self.assertFalse(self.db.whitelist_contains("0781", "5567", "OTHER&0"))
+
+    def test_import_accepts_vid_only_rows(self):
+        self.assertEqual(validate_row({"label": "v", "vid": "0781"}), ("v", "0781", None, None))
+        with self.assertRaises(ValueError):
+            validate_row({"label": "v", "vid": "0781", "serial": "S1"})
+        with self.assertRaises(ValueError):
+            validate_row({"label": "v", "pid": "5567"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# tests/test_whitelist_io.py
+# Bulk whitelist import/export (core/whitelist_io.py).
+
+import json
+import os
+import tempfile
+import unittest
+
+from core.db import DB
+from core.whitelist_io import export_whitelist, import_whitelist
+
+
+class TestWhitelistImportExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(os.path.join(self.tmp.name, "test.db"))
+
+    def tearDown(self):
+        self.db.conn.close()
+        self.tmp.cleanup()
+
+    def _file(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_csv_import_validates_normalizes_and_dedups(self):
+        self.db.whitelist_add_serial("already there", "abc123")
+        path = self._file("wl.csv", (
+            "Label,VID,PID,Serial\n"
+            "Office SanDisk,0781,5567,2004a1b2\n"
+            "Dup of existing,,, abc123 \n"
+            "Dup in file,0781,5567,2004A1B2\n"
+            "Model only,0951,1666,\n"
+            "Bad hex,07G1,5567,X\n"
+            "Half pair,0781,,X\n"
+            "Nothing,,,\n"
+        ))
+        stats = import_whitelist(self.db, path, chunk_size=2)
+        self.assertEqual(stats["read"], 7)
+        self.assertEqual(stats["inserted"], 2)
+        self.assertEqual(stats["duplicates"], 2)
+        self.assertEqual(stats["invalid"], 3)
+        self.assertTrue(stats["errors"][0].startswith("line 6:"))
+        self.assertTrue(self.db.whitelist_contains("0781", "5567", "2004A1B2"))
+        self.assertTrue(self.db.whitelist_contains("0951", "1666", None))
+
+    def test_json_and_jsonl(self):
+        arr = self._file("wl.json", json.dumps([{"label": "a", "serial": "s1"}, {"label": "b", "serial": "s2"}]))
+        lines = self._file("wl.jsonl", '{"label": "c", "vid": "1234", "pid": "abcd"}\n\n{"label": "d", "serial": "s1"}\n')
+        self.assertEqual(import_whitelist(self.db, arr)["inserted"], 2)
+        stats = import_whitelist(self.db, lines)
+        self.assertEqual((stats["inserted"], stats["duplicates"]), (1, 1))
+
+    def test_export_round_trip(self):
+        self.db.whitelist_add("Office", "0781", "5567", "SN1")
+        self.db.whitelist_add_serial("Personal", "SN2")
+        for name in ("out.csv", "out.json", "out.jsonl"):
+            path = os.path.join(self.tmp.name, name)
+            self.assertEqual(export_whitelist(self.db, path), 2)
+            other = DB(os.path.join(self.tmp.name, name + ".db"))
+            stats = import_whitelist(other, path)
+            self.assertEqual(stats["inserted"], 2, name)
+            self.assertEqual(list(other.iter_whitelist()), list(self.db.iter_whitelist()))
+            other.conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
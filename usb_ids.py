@@ -0,0 +1,48 @@
+# usb_ids.py
+# Build and query the vendor/product name index (core/usbids.py).
+#
+#   python usb_ids.py build usb.ids            compile usb.ids into data/usb.ids.idx
+#   python usb_ids.py lookup 0781 [5567]       vendor (and product) name
+#   python usb_ids.py vendors sandisk          VIDs whose vendor name matches
+#
+# usb.ids is published at http://www.linux-usb.org/usb.ids; download it first.
+import argparse
+import sys
+import time
+
+from core.usbids import DEFAULT_INDEX_PATH, UsbIds, compile_usb_ids
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="USB vendor/product name index.")
+    ap.add_argument("--index", default=DEFAULT_INDEX_PATH, help=f"index file (default {DEFAULT_INDEX_PATH})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build", help="compile a usb.ids file into the index")
+    build.add_argument("src")
+    lookup = sub.add_parser("lookup", help="names for a VID (and PID)")
+    lookup.add_argument("vid")
+    lookup.add_argument("pid", nargs="?")
+    vendors = sub.add_parser("vendors", help="search vendor names")
+    vendors.add_argument("text")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        n_vendors, n_products = compile_usb_ids(args.src, args.index)
+        print(f"{n_vendors:,} vendors, {n_products:,} products -> {args.index} "
+              f"({time.perf_counter() - t0:.2f}s)")
+        sys.exit(0)
+
+    try:
+        index = UsbIds(args.index)
+    except (OSError, ValueError) as e:
+        print(f"Cannot open the index ({e}); build it with: python usb_ids.py build usb.ids")
+        sys.exit(1)
+    if args.cmd == "lookup":
+        vendor, product = index.lookup(args.vid, args.pid)
+        print(f"{args.vid.upper()}: {vendor or 'unknown vendor'}")
+        if args.pid:
+            print(f"{args.vid.upper()}:{args.pid.upper()}: {product or 'unknown product'}")
+    else:
+        for vid, name in index.find_vendors(args.text):
+            print(f"{vid}  {name}")
+    index.close()
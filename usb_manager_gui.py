@@ -1,35 +1,100 @@
 # usb_manager_gui.py
-import threading
+from core import startup  # first, so the startup timeline covers every other import
+import collections
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-from datetime import datetime
-import csv
 
 
-from core.db import DB
-from core.usb_monitor import monitor_usb_storage
-from core.guardian import process_event
-from core.blocker import is_admin, enable_device
-
-db = DB()
-
-# ---------------------------
-# Background watcher
-# ---------------------------
-def watcher():
-    monitor_usb_storage(lambda evt: process_event(evt, db))
-
+from core import log
+from core.agent import connect_or_start
+from core.anomaly import AnomalyDetector
+from core.db import event_matches
+from core.events import Subscription
+from core.export import export_events, fmt_ts
+from core.tasks import TaskRunner, report_progress, cancelled as tasks_cancelled
+from core.trace import format_summary
+from core.usbids import describe
+
+db = None  # AgentClient (same API as core.db.DB), connected in __main__
+agent = None  # Agent hosted by this process when no other one was running
+tasks = None  # TaskRunner, created with the Tk root in __main__
+
+SEARCH_PAGE_SIZE = 200
+PAGE_SIZE = 200
+
+# Logs tab period filter -> seconds back from now (None = all time)
+PERIODS = {
+    "All": None,
+    "Last hour": 3600,
+    "Last 24h": 86400,
+    "Last 7 days": 7 * 86400,
+    "Last 30 days": 30 * 86400,
+}
+
+
+BLOCKED_LIMIT = 200
+WL_PAGE_SIZE = 100
+PUSH_POLL_MS = 100     # how often the Tk thread picks up events pushed by the agent
+PUSH_BUFFER = 1000     # pushed events held for the Tk thread (oldest dropped beyond this)
+RECONCILE_MS = 30000   # fallback DB re-read, for changes made outside the agent (e.g. CLI import)
+
+EXPORT_FILETYPES = [
+    ("CSV", "*.csv"),
+    ("JSON Lines", "*.jsonl"),
+    ("CSV (gzip)", "*.csv.gz"),
+    ("JSON Lines (gzip)", "*.jsonl.gz"),
+]
+
+
+class RefreshStats:
+    """Main-thread time spent in a tab's refreshes (ms), shown under View > Refresh Timings."""
+
+    def __init__(self):
+        self.count = 0
+        self.skipped = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def record(self, ms: float, skipped: bool = False):
+        self.count += 1
+        self.skipped += skipped
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.last_ms = ms
+
+    def summary(self) -> str:
+        avg = self.total_ms / self.count if self.count else 0.0
+        return (f"{self.count} refreshes ({self.skipped} skipped, unchanged) — "
+                f"last {self.last_ms:.2f} ms, avg {avg:.2f} ms, max {self.max_ms:.2f} ms")
+
+
+class LatencyStats:
+    """Device-detected to on-screen time of pushed events (ms), shown under View > Refresh Timings."""
+
+    def __init__(self, window: int = 500):
+        self.count = 0
+        self.max_ms = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def record(self, ms: float):
+        self.count += 1
+        self.max_ms = max(self.max_ms, ms)
+        self.recent.append(ms)
+
+    def summary(self) -> str:
+        if not self.count:
+            return "no events pushed yet"
+        recent = sorted(self.recent)
+        p50 = recent[len(recent) // 2]
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))]
+        return (f"{self.count} events — p50 {p50:.1f} ms, p95 {p95:.1f} ms (last {len(recent)}), "
+                f"max {self.max_ms:.1f} ms")
 
 # ---------------------------
 # Auth dialogs (DB-backed)
 # ---------------------------
-def _users_count() -> int:
-    cur = db.conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM users")
-    (n,) = cur.fetchone()
-    return int(n or 0)
-
-
 class SetupDialog(simpledialog.Dialog):
     """Shown on first run when there are no users. Creates the first admin user."""
 
@@ -72,7 +137,7 @@ class SetupDialog(simpledialog.Dialog):
     def apply(self):
         u = self.username_var.get().strip()
         p1 = self.pw1_var.get()
-        ok = db.add_user(u, p1)
+        ok = tasks.run_and_wait(db.add_user, u, p1)  # bcrypt; keep the UI painting
         if not ok:
             messagebox.showerror("Setup", f'User "{u}" already exists. Choose a different username.')
             self.result = None
@@ -171,7 +236,7 @@ class LoginDialog(simpledialog.Dialog):
     def apply(self):
         u = self.username_var.get().strip()
         p = self.password_var.get()
-        if not db.verify_user(u, p):
+        if not tasks.run_and_wait(db.verify_user, u, p):
             messagebox.showerror("Access Denied", "Incorrect username or password.")
             self.result = None
         else:
@@ -183,6 +248,7 @@ class ChangePasswordDialog(simpledialog.Dialog):
 
     def __init__(self, parent, username: str):
         self.username = username
+        self.checking = False
         super().__init__(parent)
 
     def body(self, master):
@@ -211,7 +277,14 @@ class ChangePasswordDialog(simpledialog.Dialog):
         n1 = self.n1_var.get()
         n2 = self.n2_var.get()
 
-        if not db.verify_user(self.username, cur):
+        if self.checking:
+            return False  # OK clicked again while the previous check is still running
+        self.checking = True
+        try:
+            cur_ok = tasks.run_and_wait(db.verify_user, self.username, cur)
+        finally:
+            self.checking = False
+        if not cur_ok:
             messagebox.showerror("Change Password", "Current password is incorrect.")
             return False
         if not n1:
@@ -223,7 +296,7 @@ class ChangePasswordDialog(simpledialog.Dialog):
         return True
 
     def apply(self):
-        ok = db.change_password(self.username, self.n1_var.get())
+        ok = tasks.run_and_wait(db.change_password, self.username, self.cur_var.get(), self.n1_var.get())
         if not ok:
             messagebox.showerror("Change Password", "Failed to change password.")
             self.result = None
@@ -257,15 +330,36 @@ class WhitelistTab(ttk.Frame):
         btns1 = ttk.Frame(frame1)
         btns1.pack(fill="x", pady=4)
         ttk.Button(btns1, text="Whitelist & Enable", command=self.whitelist_and_enable).pack(side="left", padx=4)
+        ttk.Button(btns1, text="Whitelist Vendor", command=self.whitelist_vendor).pack(side="left", padx=4)
         ttk.Button(btns1, text="Refresh", command=self.refresh).pack(side="left", padx=4)
 
-        # --- Whitelist ---
-        frame2 = ttk.LabelFrame(self, text="Whitelisted Serials")
+        # --- Whitelist (one page at a time; the tree only ever holds the visible page) ---
+        frame2 = ttk.LabelFrame(self, text="Whitelist")
         frame2.pack(fill="both", expand=True, padx=10, pady=5)
 
-        self.tree_wl = ttk.Treeview(frame2, columns=("serial",), show="headings", height=8)
-        self.tree_wl.heading("serial", text="Serial")
-        self.tree_wl.column("serial", width=320)
+        find = ttk.Frame(frame2)
+        find.pack(fill="x", pady=(2, 4))
+        self.wl_search_var = tk.StringVar()
+        self.wl_vid_var = tk.StringVar()
+        self.wl_pid_var = tk.StringVar()
+        ttk.Label(find, text="Label/Serial starts with:").pack(side="left", padx=4)
+        search_entry = ttk.Entry(find, textvariable=self.wl_search_var, width=24)
+        search_entry.pack(side="left")
+        search_entry.bind("<Return>", lambda _e: self.find_whitelist())
+        for label, var in (("VID:", self.wl_vid_var), ("PID:", self.wl_pid_var)):
+            ttk.Label(find, text=label).pack(side="left", padx=4)
+            ttk.Entry(find, textvariable=var, width=6).pack(side="left")
+        ttk.Button(find, text="Find", command=self.find_whitelist).pack(side="left", padx=6)
+        ttk.Button(find, text="< Prev", command=self.wl_prev_page).pack(side="left", padx=(12, 2))
+        ttk.Button(find, text="Next >", command=self.wl_next_page).pack(side="left", padx=2)
+        self.wl_page_label = ttk.Label(find, text="")
+        self.wl_page_label.pack(side="left", padx=8)
+
+        cols_wl = ("label", "vid", "pid", "serial", "added")
+        self.tree_wl = ttk.Treeview(frame2, columns=cols_wl, show="headings", height=8)
+        for c, hdr in zip(cols_wl, ("Label", "VID", "PID", "Serial", "Added")):
+            self.tree_wl.heading(c, text=hdr)
+            self.tree_wl.column(c, width=80 if c in ("vid", "pid") else 140 if c == "added" else 260, anchor="w")
         self.tree_wl.pack(fill="both", expand=True)
 
         btns2 = ttk.Frame(frame2)
@@ -273,23 +367,139 @@ class WhitelistTab(ttk.Frame):
         ttk.Button(btns2, text="Remove from Whitelist", command=self.remove_from_whitelist).pack(side="left", padx=4)
         ttk.Button(btns2, text="Refresh", command=self.refresh).pack(side="left", padx=4)
 
-        # periodic refresh
-        self.after(2000, self._periodic_refresh)
+        # keyset paging: after_id of every page visited so far (for Prev), and of the next one
+        self.wl_query = ("", "", "")
+        self.wl_page_starts = [0]
+        self.wl_next = None
+
+        # incremental refresh state (Treeview iids are DB row ids)
+        self.seen_version = None
+        self.seen_wl_version = None
+        self.last_blocked_id = 0
+        self.blocked_ts = {}   # iid -> event ts, for expiring rows out of the 60 min window
+        self.blocked_vid = {}  # iid -> event vid (USBSTOR ids carry none; the monitor resolves it)
+        self.wl_values = {}    # iid -> values currently shown
+        self.refresh_stats = RefreshStats()
+
+        # new blocks arrive as pushed events (on_events); this is only a fallback re-read
+        self.after(RECONCILE_MS, self._periodic_refresh)
         self.refresh()
 
+    def on_events(self, events):
+        """Render pushed blocked inserts without touching the DB."""
+        blocked = [e for e in events if e["action"] == "insert" and e["decision"] == "blocked"]
+        if blocked:
+            self._insert_blocked(sorted(blocked, key=lambda e: e["id"], reverse=True))
+            self._expire_blocked()
+
     def refresh(self):
-        # blocked list
-        for i in self.tree_blocked.get_children():
-            self.tree_blocked.delete(i)
-        for r in db.list_recent_blocked(since_minutes=60, limit=200):
-            when = datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M:%S")
-            self.tree_blocked.insert("", "end", values=(when, r["model"], r["serial"], r["pnp_id"], r["note"]))
-
-        # whitelist list
-        for i in self.tree_wl.get_children():
-            self.tree_wl.delete(i)
-        for row in db.list_whitelist():
-            self.tree_wl.insert("", "end", values=(row["serial"],))
+        tasks.submit(
+            self._load, self.seen_version, self.seen_wl_version, self.last_blocked_id,
+            self.wl_query, self.wl_page_starts[-1],
+            on_done=self._apply, key=("whitelist-refresh", id(self)),
+        )
+
+    @staticmethod
+    def _load(seen_version, seen_wl_version, last_blocked_id, wl_query, wl_after_id) -> dict:
+        # worker thread: read only what changed since the last applied refresh
+        snap = {"version": db.data_version(), "blocked": None, "whitelist": None}
+        if snap["version"] == seen_version:
+            return snap
+        snap["blocked"] = db.list_recent_blocked(since_minutes=60, limit=BLOCKED_LIMIT, after_id=last_blocked_id)
+        snap["wl_version"] = db.whitelist_version()
+        if snap["wl_version"] != seen_wl_version:
+            snap["whitelist"], snap["wl_next"] = db.query_whitelist(*wl_query, after_id=wl_after_id, limit=WL_PAGE_SIZE)
+            snap["wl_total"] = db.count_whitelist(*wl_query)
+            snap["wl_query"] = (wl_query, wl_after_id)
+        return snap
+
+    def reload_whitelist(self):
+        """Force the whitelist page to be re-read on the next refresh."""
+        self.seen_version = None
+        self.seen_wl_version = None
+        self.refresh()
+
+    def find_whitelist(self):
+        self.wl_query = (self.wl_search_var.get().strip(), self.wl_vid_var.get().strip(), self.wl_pid_var.get().strip())
+        self.wl_page_starts = [0]
+        self.reload_whitelist()
+
+    def wl_next_page(self):
+        if self.wl_next is not None:
+            self.wl_page_starts.append(self.wl_next)
+            self.reload_whitelist()
+
+    def wl_prev_page(self):
+        if len(self.wl_page_starts) > 1:
+            self.wl_page_starts.pop()
+            self.reload_whitelist()
+
+    def _apply(self, snap: dict):
+        t0 = time.perf_counter()
+        changed = snap["blocked"] is not None
+        if changed:
+            self.seen_version = snap["version"]
+            self._insert_blocked(snap["blocked"])
+            # ignore a page read for a query/page the user has since moved away from
+            if snap["whitelist"] is not None and snap["wl_query"] == (self.wl_query, self.wl_page_starts[-1]):
+                self.seen_wl_version = snap["wl_version"]
+                self.wl_next = snap["wl_next"]
+                self._diff_whitelist(snap["whitelist"])
+                first = (len(self.wl_page_starts) - 1) * WL_PAGE_SIZE
+                shown = len(snap["whitelist"])
+                self.wl_page_label.config(
+                    text=f"{first + 1 if shown else 0}–{first + shown} of {snap['wl_total']:,}"
+                )
+            elif snap["whitelist"] is not None:
+                self.seen_version = None  # stale page; read again next tick
+        self._expire_blocked()
+        self.refresh_stats.record((time.perf_counter() - t0) * 1000.0, skipped=not changed)
+
+    def _insert_blocked(self, rows):
+        # rows are newer than the newest one shown, newest first
+        for r in reversed(rows):
+            iid = str(r["id"])
+            if self.tree_blocked.exists(iid):
+                continue
+            self.tree_blocked.insert("", 0, iid=iid, values=(fmt_ts(r["ts"]), r["model"], r["serial"], r["pnp_id"], r["note"]))
+            self.blocked_ts[iid] = r["ts"]
+            self.blocked_vid[iid] = r["vid"]
+        if rows:
+            self.last_blocked_id = max(self.last_blocked_id, rows[0]["id"])
+
+    def _expire_blocked(self):
+        # drop rows from the bottom that fell out of the window or over the limit
+        cutoff = time.time() - 3600
+        children = self.tree_blocked.get_children()
+        n = len(children)
+        while n and (n > BLOCKED_LIMIT or self.blocked_ts[children[n - 1]] < cutoff):
+            n -= 1
+            self.tree_blocked.delete(children[n])
+            del self.blocked_ts[children[n]]
+            self.blocked_vid.pop(children[n], None)
+
+    def _diff_whitelist(self, whitelist):
+        current = {
+            str(row["id"]): (
+                row["label"] or "", row["vid"] or "", row["pid"] or "", row["serial"] or "",
+                fmt_ts(row["created_at"]) if row["created_at"] else "",
+            )
+            for row in whitelist
+        }
+        for iid in [i for i in self.wl_values if i not in current]:
+            self.tree_wl.delete(iid)
+            del self.wl_values[iid]
+        for iid, values in current.items():
+            shown = self.wl_values.get(iid)
+            if shown is None:
+                self.tree_wl.insert("", "end", iid=iid, values=values)
+            elif shown != values:
+                self.tree_wl.item(iid, values=values)
+            self.wl_values[iid] = values
+        # keep id order when a page shift brings in rows that sort before existing ones
+        for index, iid in enumerate(current):
+            if self.tree_wl.index(iid) != index:
+                self.tree_wl.move(iid, "", index)
 
     def whitelist_and_enable(self):
         sel = self.tree_blocked.focus()
@@ -302,39 +512,63 @@ class WhitelistTab(ttk.Frame):
             messagebox.showerror("Missing serial", "Blocked record has no serial; cannot whitelist.")
             return
 
-        db.whitelist_add_serial(model or "Unknown", serial)
-
-        if is_admin() and pnp_id:
-            ok, msg = enable_device(pnp_id)
-            if ok:
+        def done(result):
+            if result is None:
+                messagebox.showinfo(
+                    "Whitelisted",
+                    f"Whitelisted:\n{model}\nS/N: {serial}\n(Replug if not visible.)",
+                )
+            elif result[0]:
                 messagebox.showinfo("Whitelisted", f"Whitelisted & enabled:\n{model}\nS/N: {serial}")
             else:
                 messagebox.showwarning(
                     "Whitelisted",
-                    f"Whitelisted, but enable failed:\n{msg}\nYou may replug the device.",
+                    f"Whitelisted, but enable failed:\n{result[1]}\nYou may replug the device.",
                 )
-        else:
-            messagebox.showinfo(
-                "Whitelisted",
-                f"Whitelisted:\n{model}\nS/N: {serial}\n(Replug if not visible.)",
-            )
-        self.refresh()
+            self.refresh()
+
+        # the agent whitelists and re-enables (PowerShell); keep it off the UI thread
+        tasks.submit(db.whitelist_and_enable, model or "Unknown", serial, pnp_id or None,
+                     on_done=done, on_error=lambda e: messagebox.showerror("Whitelist", str(e)))
+
+    def whitelist_vendor(self):
+        """Allow every device from the selected blocked device's vendor (a VID-only rule)."""
+        sel = self.tree_blocked.focus()
+        if not sel:
+            messagebox.showwarning("Select", "Select a blocked item first.")
+            return
+        vid = self.blocked_vid.get(sel)
+        if not vid:
+            messagebox.showerror("Missing VID", "Blocked record has no vendor id; cannot whitelist its vendor.")
+            return
+        name = describe(vid, None) or "unknown vendor"
+        if not messagebox.askyesno("Whitelist Vendor", f"Allow every device from VID {vid} ({name})?"):
+            return
+        tasks.submit(db.whitelist_add_vendor, f"Vendor {vid} ({name})", vid,
+                     on_done=lambda _r: self.refresh(),
+                     on_error=lambda e: messagebox.showerror("Whitelist", str(e)))
 
     def remove_from_whitelist(self):
         sel = self.tree_wl.focus()
         if not sel:
             messagebox.showwarning("Select", "Select a whitelist entry first.")
             return
-        serial = self.tree_wl.item(sel, "values")[0]
-        db.remove_whitelist(serial)
-        messagebox.showinfo("Removed", f"Removed S/N: {serial} from whitelist.")
-        self.refresh()
+        label, vid, pid, serial = self.wl_values[sel][:4]
+        what = f"{label}  VID:{vid or '—'} PID:{pid or '—'} S/N:{serial or '—'}"
+
+        def done(_):
+            messagebox.showinfo("Removed", f"Removed from whitelist:\n{what}")
+            self.refresh()
+
+        # by primary key, so VID/PID-only entries and duplicate serials are handled exactly
+        tasks.submit(db.whitelist_remove_id, int(sel), on_done=done,
+                     on_error=lambda e: messagebox.showerror("Remove", str(e)))
 
     def _periodic_refresh(self):
         try:
             self.refresh()
         finally:
-            self.after(2000, self._periodic_refresh)
+            self.after(RECONCILE_MS, self._periodic_refresh)
 
 
 class LogsTab(ttk.Frame):
@@ -355,11 +589,55 @@ class LogsTab(ttk.Frame):
         self.decision_filter.current(0)
         self.decision_filter.pack(side="left")
 
+        ttk.Label(filter_frame, text="Action:").pack(side="left", padx=5)
+        self.action_filter = ttk.Combobox(
+            filter_frame,
+            values=["All", "insert", "remove"],
+            state="readonly",
+            width=8,
+        )
+        self.action_filter.current(0)
+        self.action_filter.pack(side="left")
+
+        ttk.Label(filter_frame, text="Period:").pack(side="left", padx=5)
+        self.period_filter = ttk.Combobox(
+            filter_frame,
+            values=list(PERIODS),
+            state="readonly",
+            width=10,
+        )
+        self.period_filter.current(0)
+        self.period_filter.pack(side="left")
+
+        self.vid_var = tk.StringVar()
+        self.pid_var = tk.StringVar()
+        self.serial_var = tk.StringVar()
+        for label, var, width in (("VID:", self.vid_var, 6), ("PID:", self.pid_var, 6), ("Serial:", self.serial_var, 20)):
+            ttk.Label(filter_frame, text=label).pack(side="left", padx=5)
+            ttk.Entry(filter_frame, textvariable=var, width=width).pack(side="left")
+
         ttk.Button(filter_frame, text="Apply Filter", command=self.refresh).pack(side="left", padx=10)
-        ttk.Button(filter_frame, text="Export CSV", command=self.export_csv).pack(side="left", padx=10)
+        ttk.Button(filter_frame, text="Export…", command=self.export).pack(side="left", padx=10)
+
+        # --- Full-text search (model / serial / InstanceId / note) ---
+        search_frame = ttk.Frame(self)
+        search_frame.pack(fill="x", padx=10, pady=(0, 5))
+
+        ttk.Label(search_frame, text="Search:").pack(side="left", padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=40)
+        search_entry.pack(side="left")
+        search_entry.bind("<Return>", lambda _e: self.search())
+        ttk.Button(search_frame, text="Search", command=self.search).pack(side="left", padx=5)
+        ttk.Button(search_frame, text="Clear", command=self.clear_search).pack(side="left")
+        ttk.Button(search_frame, text="< Prev", command=self.prev_page).pack(side="left", padx=(15, 2))
+        ttk.Button(search_frame, text="Next >", command=self.next_page).pack(side="left", padx=2)
+        self.page_label = ttk.Label(search_frame, text="")
+        self.page_label.pack(side="left", padx=8)
+        self.search_page = 0
 
         # --- Events Table ---
-        cols = ("when", "action", "decision", "model", "serial", "vid", "pid", "pnp_id", "note")
+        cols = ("when", "action", "decision", "model", "serial", "vid", "pid", "device", "pnp_id", "note")
         self.tree = ttk.Treeview(self, columns=cols, show="headings", height=20)
 
         headers = {
@@ -370,6 +648,7 @@ class LogsTab(ttk.Frame):
             "serial": "Serial",
             "vid": "VID",
             "pid": "PID",
+            "device": "Vendor / Product",
             "pnp_id": "InstanceId",
             "note": "Note",
         }
@@ -378,57 +657,234 @@ class LogsTab(ttk.Frame):
             self.tree.heading(c, text=headers[c])
             self.tree.column(c, width=150 if c in ("when", "decision", "action") else 220, anchor="w")
 
-        self.tree.pack(fill="both", expand=True, padx=10, pady=5)
-
-        # periodic refresh
-        self.after(3000, self._periodic_refresh)
+        table = ttk.Frame(self)
+        table.pack(fill="both", expand=True, padx=10, pady=5)
+        self.scrollbar = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(in_=table, side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # keyset cursor of the last loaded page (None = nothing more to load)
+        self.cursor = None
+        self.pages_loaded = 0
+        self.load_pending = False
+        # newest event id shown and DB version it was read at, for incremental refresh
+        self.newest_id = 0
+        self.seen_version = None
+        # bumped by refresh(); results of loads started before it are dropped
+        self.generation = 0
+        self.refresh_stats = RefreshStats()
+
+        # new events arrive as pushed events (on_events); this is only a fallback re-read
+        self.after(RECONCILE_MS, self._periodic_refresh)
         self.refresh()
 
+    def on_events(self, events):
+        """Prepend pushed events that match the current filters; the DB is only read for history."""
+        if not self.pages_loaded or self.search_var.get().strip():
+            return
+        filters = self.current_filters()
+        rows = [e for e in events if e["id"] > self.newest_id and event_matches(e, filters)]
+        if rows:
+            rows.sort(key=lambda e: (e["ts"], e["id"]), reverse=True)
+            self._insert_rows(rows, index=0)
+
+    def current_filters(self) -> dict:
+        filters = {
+            "vid": self.vid_var.get(),
+            "pid": self.pid_var.get(),
+            "serial": self.serial_var.get(),
+        }
+        if self.decision_filter.get() != "All":
+            filters["decision"] = self.decision_filter.get()
+        if self.action_filter.get() != "All":
+            filters["action"] = self.action_filter.get()
+        seconds = PERIODS[self.period_filter.get()]
+        if seconds:
+            filters["since"] = time.time() - seconds
+        return filters
+
     def refresh(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        """Reload from the first page (or the current search page) on a worker."""
+        self.generation += 1
+        gen = self.generation
+        self.cursor = None
+        self.pages_loaded = 0
+        self.load_pending = False
+
+        text = self.search_var.get().strip()
+        if text:
+            tasks.submit(self._load_search, text, self.search_page,
+                         on_done=lambda res: self._apply_page(gen, res, clear=True),
+                         key=("logs-page", id(self)))
+            return
+        self.page_label.config(text="")
+        tasks.submit(self._load_page, self.current_filters(), None,
+                     on_done=lambda res: self._apply_page(gen, res, clear=True),
+                     key=("logs-page", id(self)))
+
+    def load_more(self):
+        """Append the next keyset page to the table."""
+        if self.pages_loaded and self.cursor is None:
+            self.load_pending = False
+            return
+        gen = self.generation
+        tasks.submit(self._load_page, self.current_filters(), self.cursor,
+                     on_done=lambda res: self._apply_page(gen, res, clear=False),
+                     key=("logs-more", id(self)))
+
+    @staticmethod
+    def _load_page(filters, cursor):
+        # version is read first so anything committed during the query shows up as "new" later
+        version = db.data_version()
+        rows, next_cursor = db.query_events(filters, cursor, limit=PAGE_SIZE)
+        return version, rows, next_cursor
+
+    @staticmethod
+    def _load_search(text, page):
+        version = db.data_version()
+        rows = db.search_events(text, limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE)
+        return version, rows, None
+
+    @staticmethod
+    def _load_new(filters, newest_id, seen_version):
+        version = db.data_version()
+        if version == seen_version:
+            return None
+        filters["min_id"] = newest_id
+        rows, more = db.query_events(filters, limit=PAGE_SIZE)
+        return version, rows, more
+
+    def _apply_page(self, gen, result, clear):
+        if gen != self.generation:
+            return  # a newer refresh started meanwhile
+        t0 = time.perf_counter()
+        version, rows, next_cursor = result
+        if clear:
+            for i in self.tree.get_children():
+                self.tree.delete(i)
+            self.newest_id = 0
+            self.seen_version = version
+            if self.search_var.get().strip():
+                self.page_label.config(text=f"Page {self.search_page + 1} ({len(rows)} matches)")
+        self._insert_rows(rows)
+        self.cursor = next_cursor
+        self.pages_loaded += 1
+        self.load_pending = False
+        self.refresh_stats.record((time.perf_counter() - t0) * 1000.0)
+
+    def _apply_new(self, gen, result):
+        if gen != self.generation:
+            return
+        t0 = time.perf_counter()
+        if result is None:
+            self.refresh_stats.record((time.perf_counter() - t0) * 1000.0, skipped=True)
+            return
+        version, rows, more = result
+        if more is not None:
+            self.refresh()  # too many new rows to splice in; start over
+            return
+        self.seen_version = version
+        self._insert_rows(rows, index=0)
+        self.refresh_stats.record((time.perf_counter() - t0) * 1000.0)
 
-        dec_filter = self.decision_filter.get()
-        query = "SELECT ts, action, decision, model, serial, vid, pid, pnp_id, note FROM events"
-        params = []
-        if dec_filter != "All":
-            query += " WHERE decision = ?"
-            params.append(dec_filter)
-        query += " ORDER BY ts DESC LIMIT 1000"
+    def _insert_rows(self, rows, index="end"):
+        if index != "end":
+            rows = reversed(rows)
+        for r in rows:
+            self.tree.insert("", index, values=(
+                fmt_ts(r["ts"]), r["action"], r["decision"], r["model"], r["serial"],
+                r["vid"], r["pid"], describe(r["vid"], r["pid"]), r["pnp_id"], r["note"],
+            ))
+            self.newest_id = max(self.newest_id, r["id"])
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # fetch the next page once the user scrolls near the bottom
+        if (float(last) >= 0.95 and self.cursor is not None and not self.load_pending
+                and not self.search_var.get().strip()):
+            self.load_pending = True
+            self.after_idle(self.load_more)
+
+    def search(self):
+        self.search_page = 0
+        self.refresh()
 
-        cur = db.conn.cursor()
-        cur.execute(query, params)
-        rows = cur.fetchall()
+    def clear_search(self):
+        self.search_var.set("")
+        self.search()
 
-        for r in rows:
-            ts = datetime.fromtimestamp(r[0]).strftime("%Y-%m-%d %H:%M:%S")
-            self.tree.insert("", "end", values=(ts, r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[8]))
+    def next_page(self):
+        if self.search_var.get().strip() and len(self.tree.get_children()) == SEARCH_PAGE_SIZE:
+            self.search_page += 1
+            self.refresh()
+
+    def prev_page(self):
+        if self.search_page > 0:
+            self.search_page -= 1
+            self.refresh()
 
-    def export_csv(self):
-        file = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")])
+    def export(self):
+        file = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=EXPORT_FILETYPES)
         if not file:
             return
+        ExportDialog(self, file, self.current_filters())
 
-        cur = db.conn.cursor()
-        cur.execute(
-            "SELECT ts, action, decision, model, serial, vid, pid, pnp_id, note FROM events ORDER BY ts DESC"
-        )
-        rows = cur.fetchall()
-
-        with open(file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Timestamp", "Action", "Decision", "Model", "Serial", "VID", "PID", "InstanceId", "Note"])
-            for r in rows:
-                ts = datetime.fromtimestamp(r[0]).strftime("%Y-%m-%d %H:%M:%S")
-                writer.writerow([ts, r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[8]])
-
-        messagebox.showinfo("Exported", f"Logs exported to {file}")
+    def load_new(self):
+        # live updates only for the plain (non-search) view
+        if self.pages_loaded and not self.search_var.get().strip():
+            gen = self.generation
+            tasks.submit(self._load_new, self.current_filters(), self.newest_id, self.seen_version,
+                         on_done=lambda res: self._apply_new(gen, res),
+                         key=("logs-new", id(self)))
 
     def _periodic_refresh(self):
         try:
-            self.refresh()
+            self.load_new()
         finally:
-            self.after(3000, self._periodic_refresh)
+            self.after(RECONCILE_MS, self._periodic_refresh)
+
+
+class ExportDialog(tk.Toplevel):
+    """Progress + Cancel for a background streaming export (core/export.py)."""
+
+    def __init__(self, parent, path: str, filters: dict):
+        super().__init__(parent)
+        self.title("Exporting events")
+        self.resizable(False, False)
+        self.transient(parent)
+        self.path = path
+
+        ttk.Label(self, text=f"Exporting to {path}").pack(padx=12, pady=(12, 4), anchor="w")
+        self.bar = ttk.Progressbar(self, mode="determinate", length=360, maximum=1)
+        self.bar.pack(padx=12, pady=4)
+        self.status = ttk.Label(self, text="Counting rows…")
+        self.status.pack(padx=12, anchor="w")
+        ttk.Button(self, text="Cancel", command=self.cancel).pack(pady=(6, 12))
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.task = tasks.submit(
+            export_events, db, path, None, filters,
+            progress=report_progress, cancelled=tasks_cancelled,
+            on_progress=self._on_progress, on_done=self._on_done, on_error=self._on_error,
+        )
+
+    def _on_progress(self, done, total):
+        self.bar.config(maximum=max(total, 1), value=done)
+        self.status.config(text=f"{done:,} / {total:,} rows")
+
+    def _on_done(self, n):
+        self.destroy()
+        messagebox.showinfo("Exported", f"{n:,} events exported to {self.path}")
+
+    def _on_error(self, e):
+        self.destroy()
+        messagebox.showerror("Export", f"Export failed:\n{e}")
+
+    def cancel(self):
+        # the worker notices between chunks and removes the partial file
+        self.task.cancel()
+        self.destroy()
 
 
 # ---------------------------
@@ -442,6 +898,14 @@ class USBManagerApp:
         self.root.title(f"USB Manager — Whitelist & Logs (Logged in as: {self.username})")
         self.root.geometry("1100x700")
 
+        # status bar with a busy indicator while background tasks run
+        status = ttk.Frame(root)
+        status.pack(side="bottom", fill="x")
+        self.busy_bar = ttk.Progressbar(status, mode="indeterminate", length=120)
+        self.busy_label = ttk.Label(status, text="")
+        self.busy_label.pack(side="right", padx=6)
+        tasks.add_busy_listener(self._on_busy)
+
         notebook = ttk.Notebook(root)
         notebook.pack(fill="both", expand=True)
 
@@ -455,6 +919,8 @@ class USBManagerApp:
         menubar = tk.Menu(root)
         view_menu = tk.Menu(menubar, tearoff=0)
         view_menu.add_command(label="Refresh All", command=self.refresh_all)
+        view_menu.add_command(label="Refresh Timings", command=self.show_refresh_timings)
+        view_menu.add_command(label="Enforcement Latency", command=self.show_enforcement_latency)
         menubar.add_cascade(label="View", menu=view_menu)
 
         account_menu = tk.Menu(menubar, tearoff=0)
@@ -463,22 +929,96 @@ class USBManagerApp:
 
         root.config(menu=menubar)
 
+        # events pushed by the agent; the IPC reader thread only buffers, the Tk thread renders
+        self.pushed = Subscription(PUSH_BUFFER)
+        self.last_seq = None
+        self.seen_dropped = 0
+        self.push_latency = LatencyStats()
+        db.subscribe(self.pushed.put)
+        self.root.after(PUSH_POLL_MS, self._drain_pushed)
+
+    def _drain_pushed(self):
+        try:
+            records = self.pushed.drain()
+            if records:
+                self._render_pushed(records)
+        finally:
+            self.root.after(PUSH_POLL_MS, self._drain_pushed)
+
+    def _render_pushed(self, records):
+        # a seq gap means events were dropped on the way (agent or local buffer); re-read those from the DB
+        missed = self.pushed.dropped != self.seen_dropped
+        self.seen_dropped = self.pushed.dropped
+        for r in records:
+            if self.last_seq is not None and r["seq"] != self.last_seq + 1:
+                missed = True
+            self.last_seq = r["seq"]
+
+        events = [r for r in records if r.get("kind") == "event"]
+        self.whitelist_tab.on_events(events)
+        self.logs_tab.on_events(events)
+        if any(r.get("kind") == "whitelist" for r in records):
+            self.whitelist_tab.reload_whitelist()
+        if missed:
+            self.whitelist_tab.refresh()
+            self.logs_tab.load_new()
+
+        if events:
+            self.root.update_idletasks()  # paint now, so the measurement covers reaching the screen
+            now = time.time()
+            for e in events:
+                self.push_latency.record((now - e["detected_at"]) * 1000.0)
+
+    def _on_busy(self, busy: bool):
+        if busy:
+            self.busy_label.config(text="Working…")
+            self.busy_bar.pack(side="right", padx=6, pady=2)
+            self.busy_bar.start(15)
+        else:
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+            self.busy_label.config(text="")
+
     def refresh_all(self):
         self.whitelist_tab.refresh()
         self.logs_tab.refresh()
 
+    def show_refresh_timings(self):
+        messagebox.showinfo(
+            "Refresh Timings",
+            f"Whitelist tab:\n{self.whitelist_tab.refresh_stats.summary()}\n\n"
+            f"Logs tab:\n{self.logs_tab.refresh_stats.summary()}\n\n"
+            f"Pushed events, insert to screen:\n{self.push_latency.summary()}",
+        )
+
+    def show_enforcement_latency(self):
+        tasks.submit(
+            db.latency,
+            on_done=lambda summary: messagebox.showinfo(
+                "Enforcement Latency", f"Per stage, since the agent started:\n\n{format_summary(summary)}"),
+            on_error=lambda e: messagebox.showerror("Enforcement Latency", str(e)),
+        )
+
     def change_password(self):
         dlg = ChangePasswordDialog(self.root, self.username)
         # result handled inside dialog; nothing else required here
 
 
 if __name__ == "__main__":
+    startup.mark("imports")
     root = tk.Tk()
     root.withdraw()  # hide main window during auth
 
+    tasks = TaskRunner(root)
+    tasks.add_busy_listener(lambda busy: root.config(cursor="watch" if busy else ""))
+
     # First-run setup if no users exist
     try:
-        if _users_count() == 0:
+        db, agent = connect_or_start(detector=AnomalyDetector(), runtime={})
+        if agent is not None:
+            log.setup_logging()  # this process hosts the agent, so it writes the agent log
+        startup.mark("agent connected")
+        if db.count_users() == 0:
             created = None
             while created is None:
                 setup = SetupDialog(root)
@@ -494,6 +1034,7 @@ if __name__ == "__main__":
 
     # Login
     login_user = None
+    startup.mark("login shown")
     while login_user is None:
         dlg = LoginDialog(root)
         login_user = dlg.result
@@ -505,8 +1046,14 @@ if __name__ == "__main__":
     # Auth OK -> show app
     root.deiconify()
 
-    # start monitor thread (daemon so app can exit normally)
-    threading.Thread(target=watcher, daemon=True).start()
-
     app = USBManagerApp(root, username=login_user)
-    root.mainloop()
+    startup.mark("main window")
+    startup.report()
+    try:
+        root.mainloop()
+    finally:
+        tasks.shutdown()
+        db.close()
+        if agent is not None:
+            agent.stop()
+            log.shutdown_logging()
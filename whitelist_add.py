@@ -1,4 +1,5 @@
 # tools/whitelist_add.py
+import re
 import sys
 from core.db import DB
 
@@ -6,10 +7,15 @@ USAGE = """
 Usage:
   python tools/whitelist_add.py <label> <vid> <pid> [serial]
   python tools/whitelist_add.py --serial-only <label> <serial>
+  python tools/whitelist_add.py --vendor <label> <vid|vendor name>
+  python tools/whitelist_add.py --import <file.csv|file.json|file.jsonl>
+  python tools/whitelist_add.py --export <file.csv|file.json|file.jsonl>
 
 Examples:
   python tools/whitelist_add.py "Office SanDisk" 0781 5567 2004A1B2C3D4
   python tools/whitelist_add.py --serial-only "ADATA Personal" "27C0717200120064&0"
+  python tools/whitelist_add.py --vendor "All SanDisk" sandisk   (names need: python usb_ids.py build usb.ids)
+  python tools/whitelist_add.py --import department.csv   (columns: label,vid,pid,serial)
 """
 
 args = sys.argv[1:]
@@ -18,12 +24,42 @@ if not args:
 
 db = DB()
 
-if args[0] == "--serial-only":
+if args[0] in ("--import", "--export"):
+    from core.whitelist_io import import_whitelist, export_whitelist
+    if len(args) != 2:
+        print(USAGE); sys.exit(1)
+    if args[0] == "--import":
+        stats = import_whitelist(db, args[1])
+        print(f"Imported {stats['inserted']} of {stats['read']} entries "
+              f"({stats['duplicates']} duplicates, {stats['invalid']} invalid).")
+        for err in stats["errors"]:
+            print("  " + err)
+        sys.exit(1 if stats["invalid"] else 0)
+    n = export_whitelist(db, args[1])
+    print(f"Exported {n} whitelist entries to {args[1]}")
+elif args[0] == "--serial-only":
     if len(args) != 3:
         print(USAGE); sys.exit(1)
     label, serial = args[1], args[2]
     db.whitelist_add_serial(label, serial)
     print(f"Whitelisted by serial: {label} S/N:{serial}")
+elif args[0] == "--vendor":
+    if len(args) != 3:
+        print(USAGE); sys.exit(1)
+    from core.usbids import default_index
+    label, vid = args[1], args[2]
+    index = default_index()
+    if not re.match(r"^[0-9A-Fa-f]{4}$", vid):
+        matches = index.find_vendors(vid) if index is not None else []
+        if len(matches) != 1:
+            print(f"'{vid}' matches {len(matches)} vendors; give the VID instead.")
+            for v, name in matches:
+                print(f"  {v}  {name}")
+            sys.exit(1)
+        vid = matches[0][0]
+    db.whitelist_add_vendor(label, vid)
+    name = index.vendor(vid) if index is not None else None
+    print(f"Whitelisted every device from VID:{vid.upper()}{f' ({name})' if name else ''}: {label}")
 else:
     if len(args) < 3:
         print(USAGE); sys.exit(1)
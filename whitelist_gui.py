@@ -1,19 +1,17 @@
+from core import startup  # first, so the startup timeline covers every other import
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
-import time
 from datetime import datetime
 
-from core.db import DB
-from core.usb_monitor import monitor_usb_storage
-from core.guardian import process_event
-from core.blocker import is_admin, enable_device
+from core import log
+from core.agent import connect_or_start
+from core.anomaly import AnomalyDetector
+from core.events import Subscription
 
-db = DB()
+db = None  # AgentClient, connected in __main__ (monitoring/enforcement live in the agent)
 
-# background monitoring uses the same enforcement logic
-def watcher():
-    monitor_usb_storage(lambda evt: process_event(evt, db))
+# the full manager (usb_manager_gui.py) pages through large lists; this view shows the first entries
+WL_LIMIT = 1000
 
 class WhitelistGUI:
     def __init__(self, root):
@@ -37,12 +35,14 @@ class WhitelistGUI:
         ttk.Button(btns1, text="Refresh", command=self.refresh).pack(side="left", padx=4)
 
         # --- Whitelist ---
-        frame2 = ttk.LabelFrame(root, text="Whitelisted Serials")
+        frame2 = ttk.LabelFrame(root, text="Whitelist")
         frame2.pack(fill="both", expand=True, padx=10, pady=5)
 
-        self.tree_wl = ttk.Treeview(frame2, columns=("serial",), show="headings", height=8)
-        self.tree_wl.heading("serial", text="Serial")
-        self.tree_wl.column("serial", width=320)
+        cols_wl = ("label", "vid", "pid", "serial")
+        self.tree_wl = ttk.Treeview(frame2, columns=cols_wl, show="headings", height=8)
+        for c, hdr in zip(cols_wl, ("Label", "VID", "PID", "Serial")):
+            self.tree_wl.heading(c, text=hdr)
+            self.tree_wl.column(c, width=80 if c in ("vid", "pid") else 260)
         self.tree_wl.pack(fill="both", expand=True)
 
         btns2 = ttk.Frame(frame2)
@@ -54,6 +54,16 @@ class WhitelistGUI:
         # periodic auto-refresh
         self.root.after(2000, self.refresh)
 
+        # refresh as soon as the agent pushes a device event
+        self.pushed = Subscription(100)
+        db.subscribe(self.pushed.put)
+        self.root.after(200, self._drain_pushed)
+
+    def _drain_pushed(self):
+        if self.pushed.drain():
+            self.refresh()
+        self.root.after(200, self._drain_pushed)
+
     def refresh(self):
         # blocked list
         for i in self.tree_blocked.get_children():
@@ -65,8 +75,11 @@ class WhitelistGUI:
         # whitelist list
         for i in self.tree_wl.get_children():
             self.tree_wl.delete(i)
-        for row in db.list_whitelist():
-            self.tree_wl.insert("", "end", values=(row["serial"],))
+        rows, _ = db.query_whitelist(limit=WL_LIMIT)
+        for row in rows:
+            self.tree_wl.insert("", "end", iid=str(row["id"]), values=(
+                row["label"] or "", row["vid"] or "", row["pid"] or "", row["serial"] or "",
+            ))
 
     def whitelist_and_enable(self):
         sel = self.tree_blocked.focus()
@@ -79,12 +92,10 @@ class WhitelistGUI:
             messagebox.showerror("Missing serial", "Blocked record has no serial; cannot whitelist.")
             return
 
-        # Add to whitelist by serial
-        db.whitelist_add_serial(model or "Unknown", serial)
-
-        # Try to enable immediately (requires admin)
-        if is_admin() and pnp_id:
-            ok, msg = enable_device(pnp_id)
+        # Add to whitelist by serial; the agent also tries to enable it (requires admin)
+        result = db.whitelist_and_enable(model or "Unknown", serial, pnp_id or None)
+        if result is not None:
+            ok, msg = result
             if ok:
                 messagebox.showinfo("Whitelisted", f"Whitelisted & enabled:\n{model}\nS/N: {serial}")
             else:
@@ -99,14 +110,26 @@ class WhitelistGUI:
         if not sel:
             messagebox.showwarning("Select", "Select a whitelist entry first.")
             return
-        serial = self.tree_wl.item(sel, "values")[0]
-        db.remove_whitelist(serial)
-        messagebox.showinfo("Removed", f"Removed S/N: {serial} from whitelist.")
+        label = self.tree_wl.set(sel, "label")
+        db.whitelist_remove_id(int(sel))
+        messagebox.showinfo("Removed", f"Removed {label or 'entry'} from whitelist.")
         self.refresh()
 
 if __name__ == "__main__":
-    # run monitor (with enforcement) in the background
-    threading.Thread(target=watcher, daemon=True).start()
+    startup.mark("imports")
+    # attach to the agent, or run one in this process if none is up
+    db, agent = connect_or_start(detector=AnomalyDetector(), runtime={})
+    if agent is not None:
+        log.setup_logging()  # this process hosts the agent, so it writes the agent log
+    startup.mark("agent connected")
     root = tk.Tk()
     app = WhitelistGUI(root)
-    root.mainloop()
+    startup.mark("main window")
+    startup.report()
+    try:
+        root.mainloop()
+    finally:
+        db.close()
+        if agent is not None:
+            agent.stop()
+            log.shutdown_logging()